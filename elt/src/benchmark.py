@@ -0,0 +1,369 @@
+'''
+Benchmark the pipeline stages on synthetic data at several scales. Every stage runs in its own process, so that its
+peak memory is measured in isolation, and the results are compared against a stored baseline: a stage whose
+throughput drops, or whose peak memory grows, beyond the tolerance fails the benchmark. Measures only compare on the
+same machine, so the baseline records it and is kept locally: create it with --update-baseline on the machine that
+runs the benchmark.
+
+With --layout, the data-skipping layouts of the silver fact tables are benchmarked instead: typical gold and app
+predicates are run against the tables as produced, and clustered linearly and in Z-order.
+'''
+
+import argparse
+import json
+import os
+import platform
+import pyarrow.compute as pc
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from deltalake import DeltaTable
+from pathlib import Path
+from synthetic_data import generate_dataset
+
+STAGES = ["bronze", "silver", "gold"]
+LAYOUT_TABLES = ["tracking", "dynamic_events"]
+
+
+'''
+Describe the machine running the benchmark: measures are only comparable between runs on the same one.
+
+:return: Host name, CPU model and count, operating system and Python version.
+'''
+def get_machine() -> dict:
+    cpu = platform.processor()
+    cpuinfo = Path("/proc/cpuinfo")
+    if cpuinfo.exists():
+        cpu = next(
+            (line.split(":", 1)[1].strip() for line in cpuinfo.read_text().splitlines() if line.startswith("model name")),
+            cpu,
+        )
+
+    return {
+        "host": platform.node(),
+        "cpu": cpu or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "system": f"{platform.system()} {platform.release()}",
+        "python": platform.python_version(),
+    }
+
+
+'''
+Run one pipeline stage on the data under the given ELT folder (child process of the benchmark).
+
+:param stage: Name of the stage.
+:param base_path: Path to the ELT folder, containing the data folder.
+'''
+def run_stage(stage: str, base_path: Path):
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+
+    if stage == "bronze":
+        import ingest_bronze
+        ingest_bronze.main(base_path=base_path, download=False)
+    elif stage == "silver":
+        import transform_silver
+        transform_silver.main(base_path=base_path)
+    elif stage == "gold":
+        import build_gold
+        build_gold.main(base_path=base_path)
+    else:
+        raise ValueError(f"Unknown stage: {stage}")
+
+    print(json.dumps({
+        "stage": stage,
+        "wall_s": round(time.perf_counter() - start_wall, 4),
+        "cpu_s": round(time.process_time() - start_cpu, 4),
+    }))
+
+
+'''
+Run a stage in a child process and measure it.
+
+:param stage: Name of the stage.
+:param base_path: Path to the ELT folder, containing the data folder.
+
+:return: Stage measures: wall time and CPU time of the stage, peak RSS of its process.
+'''
+def measure_stage(stage: str, base_path: Path) -> dict:
+    with tempfile.TemporaryFile("w+") as stdout, tempfile.TemporaryFile("w+") as stderr:
+        process = subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), "--run-stage", stage, "--base-path", str(base_path)],
+            stdout=stdout,
+            stderr=stderr,
+            text=True,
+        )
+        # Reaping the child with wait4 gives the resource usage of this process only
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+
+        stdout.seek(0)
+        stderr.seek(0)
+        if process.returncode != 0:
+            raise RuntimeError(f"Stage {stage} failed:\n{stderr.read()}")
+        measures = json.loads(stdout.read().strip().splitlines()[-1])
+
+    measures["peak_rss_mb"] = round(usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    return measures
+
+
+'''
+Benchmark every stage at every scale.
+
+:param scales: Numbers of matches to generate.
+:param frame_rate: Tracking frame rate in Hz.
+:param match_minutes: Minutes of play per match.
+:param work_path: Folder where the synthetic data and the stage outputs are written.
+
+:return: Benchmark results: configuration and measures by scale and stage.
+'''
+def run_benchmark(scales: list[int], frame_rate: int, match_minutes: int, work_path: Path) -> dict:
+    results = {
+        "config": {"frame_rate": frame_rate, "match_minutes": match_minutes, "machine": get_machine()},
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "scales": {},
+    }
+
+    for n_matches in scales:
+        base_path = work_path / f"matches_{n_matches}" / "elt"
+        tracking_rows = generate_dataset(base_path / "data/raw", n_matches, frame_rate=frame_rate, match_minutes=match_minutes)
+
+        scale = {}
+        for stage in STAGES:
+            measures = measure_stage(stage, base_path)
+            measures["tracking_rows"] = tracking_rows
+            measures["rows_per_s"] = round(tracking_rows / measures["wall_s"], 1)
+            scale[stage] = measures
+            print(f"{n_matches:>4} matches  {stage:<7} {measures['wall_s']:>8.2f}s  "
+                  f"{measures['rows_per_s']:>12,.0f} rows/s  {measures['peak_rss_mb']:>8.1f} MB", flush=True)
+
+        results["scales"][str(n_matches)] = scale
+
+    return results
+
+
+'''
+Compare benchmark results against a baseline, if it was measured on the same machine with the same configuration.
+
+:param results: Benchmark results.
+:param baseline: Baseline benchmark results.
+:param tolerance: Relative throughput drop or peak memory growth allowed (e.g. 0.25 for 25%).
+
+:return: List of regressions, as messages.
+'''
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    config, reference_config = dict(results["config"]), dict(baseline.get("config", {}))
+    machine, reference_machine = config.pop("machine"), reference_config.pop("machine", None)
+    if machine != reference_machine:
+        print(f"Baseline measured on {reference_machine}, not on {machine}, not compared.")
+        return []
+    if config != reference_config:
+        print(f"Baseline configuration {reference_config} differs from {config}, not compared.")
+        return []
+
+    regressions = []
+    for n_matches, scale in results["scales"].items():
+        for stage, measures in scale.items():
+            reference = baseline["scales"].get(n_matches, {}).get(stage)
+            if reference is None:
+                continue
+            if measures["rows_per_s"] < reference["rows_per_s"] * (1 - tolerance):
+                regressions.append(
+                    f"{stage} at {n_matches} matches: {measures['rows_per_s']:,.0f} rows/s "
+                    f"(baseline {reference['rows_per_s']:,.0f} rows/s)"
+                )
+            if measures["peak_rss_mb"] > reference["peak_rss_mb"] * (1 + tolerance):
+                regressions.append(
+                    f"{stage} at {n_matches} matches: {measures['peak_rss_mb']:.1f} MB peak RSS "
+                    f"(baseline {reference['peak_rss_mb']:.1f} MB)"
+                )
+
+    return regressions
+
+
+'''
+Build the typical predicates of the gold stage and the app on the silver fact tables, for a match, a team and a
+player of the data: whole matches, replay windows, player trajectories and tactical event searches.
+
+:param silver_path: Path to the silver Delta Lake tables.
+:param frame_rate: Tracking frame rate in Hz.
+:param match_minutes: Minutes of play per match.
+
+:return: Pyarrow filter expressions by query name, by table name.
+'''
+def get_layout_queries(silver_path: Path, frame_rate: int, match_minutes: int) -> dict[str, dict[str, pc.Expression]]:
+    events = DeltaTable(str(silver_path / "dynamic_events")).to_pyarrow_table(
+        columns=["match_id", "team_id", "player_id", "event_type"]
+    )
+    match_ids = sorted(set(events["match_id"].to_pylist()))
+    match_id = match_ids[len(match_ids) // 2]
+    match_events = events.filter(pc.field("match_id") == match_id)
+    team_id, player_id = match_events["team_id"][0].as_py(), match_events["player_id"][0].as_py()
+    event_type = Counter(events["event_type"].to_pylist()).most_common(1)[0][0]
+
+    window_start = match_minutes * 60 * frame_rate // 2
+    return {
+        "tracking": {
+            "match": pc.field("match_id") == match_id,
+            "replay window (30 s)": (pc.field("match_id") == match_id)
+                & (pc.field("frame") >= window_start) & (pc.field("frame") < window_start + 30 * frame_rate),
+            "player trajectory": pc.field("object_id") == player_id,
+        },
+        "dynamic_events": {
+            "match": pc.field("match_id") == match_id,
+            "team event type": (pc.field("team_id") == team_id) & (pc.field("event_type") == event_type),
+            "player": pc.field("player_id") == player_id,
+        },
+    }
+
+
+'''
+Measure a filtered read of a Delta Lake table: the files and row groups left to read once their statistics are
+checked against the filter, and the best wall time of the read over a few runs.
+
+:param path: Path to the Delta Lake table.
+:param expression: Pyarrow filter expression.
+:param runs: Number of timed reads (default is 3).
+
+:return: Query measures.
+'''
+def measure_query(path: Path, expression: pc.Expression, runs: int = 3) -> dict:
+    dataset = DeltaTable(str(path)).to_pyarrow_dataset()
+    files = list(dataset.get_fragments(filter=expression))
+    row_groups = [row_group for file in files for row_group in file.split_by_row_group(expression)]
+
+    wall_s = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        rows_out = DeltaTable(str(path)).to_pyarrow_dataset().to_table(filter=expression).num_rows
+        wall_s.append(time.perf_counter() - start)
+
+    return {
+        "files": len(files),
+        "files_total": len(dataset.files),
+        "row_groups": len(row_groups),
+        "rows_scanned": sum(row_group.row_groups[0].num_rows for row_group in row_groups),
+        "rows_out": rows_out,
+        "wall_ms": round(min(wall_s) * 1000, 2),
+    }
+
+
+'''
+Benchmark the data-skipping layouts of the silver fact tables. Silver is written in the order its rows are produced,
+then every table is rewritten into files of the target size as is, clustered linearly and in Z-order by the columns of
+its layout (see transform_silver.LAYOUTS), and the typical predicates are measured against each version.
+
+:param n_matches: Number of matches to generate.
+:param frame_rate: Tracking frame rate in Hz.
+:param match_minutes: Minutes of play per match.
+:param work_path: Folder where the synthetic data and the tables are written.
+:param target_file_mb: Target size of the rewritten files in megabytes.
+:param row_group_rows: Maximum number of rows per Parquet row group.
+
+:return: Benchmark results: configuration and query measures by table, query and layout.
+'''
+def run_layout_benchmark(
+    n_matches: int,
+    frame_rate: int,
+    match_minutes: int,
+    work_path: Path,
+    target_file_mb: int,
+    row_group_rows: int,
+) -> dict:
+    import ingest_bronze
+    import transform_silver
+    from delta_utils import rewrite_table
+
+    base_path = work_path / f"matches_{n_matches}" / "elt"
+    generate_dataset(base_path / "data/raw", n_matches, frame_rate=frame_rate, match_minutes=match_minutes)
+    ingest_bronze.main(base_path=base_path, download=False)
+    transform_silver.main(base_path=base_path, layouts={})
+
+    silver_path = base_path / "data/delta/silver"
+    queries = get_layout_queries(silver_path, frame_rate, match_minutes)
+    results = {
+        "config": {"n_matches": n_matches, "frame_rate": frame_rate, "match_minutes": match_minutes,
+                   "target_file_mb": target_file_mb, "row_group_rows": row_group_rows, "machine": get_machine()},
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "tables": {},
+    }
+
+    for table in LAYOUT_TABLES:
+        columns = transform_silver.LAYOUTS[table][0]
+        layouts = {"as produced": None, "linear": (columns, "linear"), "zorder": (columns, "zorder")}
+        measures = results["tables"][table] = {"columns": columns, "queries": {name: {} for name in queries[table]}}
+
+        for layout, cluster_by in layouts.items():
+            layout_path = work_path / "layouts" / layout.replace(" ", "_") / table
+            shutil.copytree(silver_path / table, layout_path)
+            rewrite_table(layout_path, target_file_mb, cluster_by, row_group_rows)
+
+            for name, expression in queries[table].items():
+                query = measures["queries"][name][layout] = measure_query(layout_path, expression)
+                print(f"{table:<15} {name:<22} {layout:<12} {query['files']:>4}/{query['files_total']:<4} files  "
+                      f"{query['rows_scanned']:>10,} rows scanned  {query['rows_out']:>9,} rows  "
+                      f"{query['wall_ms']:>8.2f} ms", flush=True)
+
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic data.")
+    parser.add_argument("--scales", default="1,2,4", help="comma-separated numbers of matches")
+    parser.add_argument("--frame-rate", type=int, default=10, help="tracking frame rate in Hz")
+    parser.add_argument("--minutes", type=int, default=10, help="minutes of play per match")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="relative regression allowed against the baseline")
+    parser.add_argument("--baseline", type=Path, default=Path(__file__).resolve().parent.parent / "benchmarks/baseline.json")
+    parser.add_argument("--update-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--output", type=Path, default=None, help="path of the JSON results")
+    parser.add_argument("--layout", action="store_true", help="benchmark the silver table layouts, at the largest scale")
+    parser.add_argument("--target-file-mb", type=int, default=1, help="file size of the layouts benchmarked")
+    parser.add_argument("--row-group-rows", type=int, default=16384, help="row group size of the layouts benchmarked")
+    parser.add_argument("--run-stage", choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument("--base-path", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        run_stage(args.run_stage, args.base_path)
+        return 0
+
+    scales = [int(scale) for scale in args.scales.split(",")]
+    with tempfile.TemporaryDirectory(prefix="elt_benchmark_") as work_path:
+        if args.layout:
+            results = run_layout_benchmark(
+                max(scales), args.frame_rate, args.minutes, Path(work_path), args.target_file_mb, args.row_group_rows
+            )
+        else:
+            results = run_benchmark(scales, args.frame_rate, args.minutes, Path(work_path))
+
+    name = "layout_benchmark" if args.layout else "benchmark"
+    output = args.output or Path(__file__).resolve().parent.parent / f"data/reports/{name}_{datetime.now():%Y%m%dT%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"Results written to {output}")
+
+    # Layouts are compared with each other, not against the stage baseline
+    if args.layout:
+        return 0
+
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"Baseline updated at {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}, run with --update-baseline to create it.")
+        return 0
+
+    regressions = compare_to_baseline(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+    for regression in regressions:
+        print(f"Regression: {regression}")
+
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+'''
+Utilities for bitmap indexes: inverted indexes from every value of low-cardinality columns to the rows holding it, so
+that searches combining equality filters on many columns intersect precomputed row sets instead of scanning the table.
+
+A row set is stored as the sorted list of its row numbers when the value is rare and the list is smaller than a
+bitmap, and as a bitmap (one bit per row) otherwise. Indexes are written as Arrow IPC files, memory-mapped to search.
+'''
+
+import numpy as np
+import os
+import polars as pl
+import pyarrow as pa
+from pathlib import Path
+
+ROW_IDS = "row_ids"
+BITMAP = "bitmap"
+
+
+'''
+Build the bitmap index of a table: a row per (column, value), with the rows holding the value. Values are indexed as
+strings (booleans as "true" and "false"), nulls under a null value.
+
+:param df: Polars DataFrame, in the row order of the indexed table.
+:param columns: Columns to index.
+
+:return: Arrow Table of the index, with the number of rows of the indexed table in its metadata.
+'''
+def build_bitmap_index(df: pl.DataFrame, columns: list[str]) -> pa.Table:
+    rows = df.height
+    bitmap_bytes = (rows + 7) // 8
+    index = {"column": [], "value": [], "encoding": [], "cardinality": [], "data": []}
+
+    for column in columns:
+        postings = (
+            df.select(pl.col(column).cast(pl.Utf8).alias("value"))
+            .with_row_index("row")
+            .group_by("value", maintain_order=True)
+            .agg(pl.col("row"))
+        )
+        for value, row_ids in postings.iter_rows():
+            row_ids = np.asarray(row_ids, dtype=np.uint32)
+            if row_ids.nbytes < bitmap_bytes:
+                encoding, data = ROW_IDS, row_ids.tobytes()
+            else:
+                mask = np.zeros(rows, dtype=bool)
+                mask[row_ids] = True
+                encoding, data = BITMAP, np.packbits(mask, bitorder="little").tobytes()
+
+            index["column"].append(column)
+            index["value"].append(value)
+            index["encoding"].append(encoding)
+            index["cardinality"].append(len(row_ids))
+            index["data"].append(data)
+
+    schema = pa.schema(
+        [("column", pa.string()), ("value", pa.string()), ("encoding", pa.string()),
+         ("cardinality", pa.int64()), ("data", pa.large_binary())],
+        metadata={"rows": str(rows)},
+    )
+    return pa.table(index, schema=schema)
+
+
+'''
+Build the bitmap index of a table and write it as an Arrow IPC file, renamed into place once complete.
+
+:param df: Polars DataFrame, in the row order of the indexed table.
+:param columns: Columns to index.
+:param path: Path to the index file.
+
+:return: Number of (column, value) entries indexed.
+'''
+def write_bitmap_index(df: pl.DataFrame, columns: list[str], path: Path) -> int:
+    index = build_bitmap_index(df, columns)
+
+    tmp_path = path.with_suffix(".tmp")
+    with pa.ipc.new_file(str(tmp_path), index.schema) as writer:
+        writer.write_table(index)
+    os.replace(tmp_path, path)
+
+    return index.num_rows
+
+
+'''
+Bitmap index of a table, memory-mapped from its file. Searches take equality filters, a list of accepted values per
+column: the row sets of the values of a column are united, and those of the columns intersected, starting with the
+smallest so that rare values narrow the search down early.
+'''
+class BitmapIndex:
+    def __init__(self, path: Path):
+        table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+        self.rows = int(table.schema.metadata[b"rows"])
+        self.entries: dict[str, dict[str | None, tuple[str, int, memoryview]]] = {}
+        for column, value, encoding, cardinality, data in zip(*(table[name] for name in table.column_names)):
+            self.entries.setdefault(column.as_py(), {})[value.as_py()] = (
+                encoding.as_py(), cardinality.as_py(), data.as_buffer()
+            )
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self.entries)
+
+    def _row_ids(self, encoding: str, data) -> np.ndarray:
+        if encoding == ROW_IDS:
+            return np.frombuffer(data, dtype=np.uint32)
+        bitmap = np.frombuffer(data, dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.rows, bitorder="little")).astype(np.uint32)
+
+    def _bitmap(self, encoding: str, data) -> np.ndarray:
+        if encoding == BITMAP:
+            return np.frombuffer(data, dtype=np.uint8)
+        mask = np.zeros(self.rows, dtype=bool)
+        mask[np.frombuffer(data, dtype=np.uint32)] = True
+        return np.packbits(mask, bitorder="little")
+
+    def _postings(self, column: str, values: list) -> list[tuple[str, int, memoryview]]:
+        if column not in self.entries:
+            raise KeyError(f"Column not indexed: {column}")
+        # Values are indexed as strings, booleans as "true" and "false"
+        values = [
+            value if value is None else str(value).lower() if isinstance(value, bool) else str(value)
+            for value in values
+        ]
+        return [self.entries[column][value] for value in values if value in self.entries[column]]
+
+    def search(self, filters: dict[str, list]) -> np.ndarray:
+        # Every column narrows the rows down, the rarest column first
+        columns = sorted(
+            ((column, self._postings(column, values)) for column, values in filters.items()),
+            key=lambda item: sum(cardinality for _, cardinality, _ in item[1]),
+        )
+
+        row_ids, bitmap = None, None
+        for column, postings in columns:
+            if not postings:
+                return np.empty(0, dtype=np.uint32)
+
+            if row_ids is None and bitmap is None:
+                # Starting from row IDs as long as they are few, from a bitmap otherwise
+                if all(encoding == ROW_IDS for encoding, _, _ in postings):
+                    row_ids = np.unique(np.concatenate([self._row_ids(encoding, data) for encoding, _, data in postings]))
+                else:
+                    bitmap = np.bitwise_or.reduce([self._bitmap(encoding, data) for encoding, _, data in postings])
+                continue
+
+            column_bitmap = np.bitwise_or.reduce([self._bitmap(encoding, data) for encoding, _, data in postings])
+            if row_ids is not None:
+                row_ids = row_ids[((column_bitmap[row_ids >> 3] >> (row_ids & 7)) & 1).astype(bool)]
+            else:
+                bitmap = bitmap & column_bitmap
+
+        if row_ids is None and bitmap is None:
+            return np.arange(self.rows, dtype=np.uint32)
+        if row_ids is None:
+            row_ids = np.flatnonzero(np.unpackbits(bitmap, count=self.rows, bitorder="little")).astype(np.uint32)
+        return row_ids
+
+    def count(self, filters: dict[str, list]) -> int:
+        return len(self.search(filters))
@@ -2,1161 +2,2096 @@
 Build gold views and aggregated tables from silver data.
 """
 
+import hashlib
+import json
+import numpy as np
+import os
 import polars as pl
+import shutil
 from pathlib import Path
-from schemas import apply_schema
-from delta_utils import read_delta
+from schemas import apply_schema, gold_schemas, player_percentile_metrics, player_form_rate_metrics, team_form_rate_metrics
+from delta_utils import read_table
+from cache_utils import code_fingerprint
+from ipc_utils import write_ipc_table
+from bitmap_utils import write_bitmap_index
+from lod_utils import downsample_frames, simplify_trajectories
+from dag_utils import run_tasks, report_tasks
+from memory_utils import check_memory_budget, clear_spill_path, get_spill_path, set_memory_budget
+from profile_utils import profile_step, record_output
+from selection_utils import Selection, is_selective
+from typing import Callable
 from datetime import datetime
 
-def main():
-    print("Gold views and aggregated tables creation started...")
+# Per-match additive metrics. Season and rolling aggregates are re-reduced from these partials
+PLAYER_EVENT_METRICS = [
+    (pl.col("event_type") == "off_ball_run").sum().alias("off_ball_runs"),
+    ((pl.col("event_type") == "off_ball_run") & (pl.col("targeted"))).sum().alias("off_ball_runs_targeted"),
+    (pl.col("event_subtype") == "dropping_off").sum().alias("dropping_off_runs"),
+    ((pl.col("event_subtype") == "dropping_off") & (pl.col("targeted"))).sum().alias("dropping_off_runs_targeted"),
+    (pl.col("event_subtype") == "coming_short").sum().alias("coming_short_runs"),
+    ((pl.col("event_subtype") == "coming_short") & (pl.col("targeted"))).sum().alias("coming_short_runs_targeted"),
+    (pl.col("event_subtype") == "pulling_wide").sum().alias("pulling_wide_runs"),
+    ((pl.col("event_subtype") == "pulling_wide") & (pl.col("targeted"))).sum().alias("pulling_wide_runs_targeted"),
+    (pl.col("event_subtype") == "pulling_half_space").sum().alias("pulling_half_space_runs"),
+    ((pl.col("event_subtype") == "pulling_half_space") & (pl.col("targeted"))).sum().alias("pulling_half_space_runs_targeted"),
+    (pl.col("event_subtype") == "support").sum().alias("support_runs"),
+    ((pl.col("event_subtype") == "support") & (pl.col("targeted"))).sum().alias("support_runs_targeted"),
+    (pl.col("event_subtype") == "run_ahead_of_the_ball").sum().alias("run_ahead_of_the_ball_runs"),
+    ((pl.col("event_subtype") == "run_ahead_of_the_ball") & (pl.col("targeted"))).sum().alias("run_ahead_of_the_ball_runs_targeted"),
+    (pl.col("event_subtype") == "overlap").sum().alias("overlap_runs"),
+    ((pl.col("event_subtype") == "overlap") & (pl.col("targeted"))).sum().alias("overlap_runs_targeted"),
+    (pl.col("event_subtype") == "underlap").sum().alias("underlap_runs"),
+    ((pl.col("event_subtype") == "underlap") & (pl.col("targeted"))).sum().alias("underlap_runs_targeted"),
+    (pl.col("event_subtype") == "behind").sum().alias("behind_runs"),
+    ((pl.col("event_subtype") == "behind") & (pl.col("targeted"))).sum().alias("behind_runs_targeted"),
+    (pl.col("event_subtype") == "cross_receiver").sum().alias("cross_receiver_runs"),
+    ((pl.col("event_subtype") == "cross_receiver") & (pl.col("targeted"))).sum().alias("cross_receiver_runs_targeted"),
+    (pl.col("event_type") == "on_ball_engagement").sum().alias("on_ball_engagements"),
+    (pl.col("event_subtype") == "pressure").sum().alias("pressures"),
+    (pl.col("event_subtype") == "recovery_press").sum().alias("recovery_pressures"),
+    (pl.col("event_subtype") == "counter_press").sum().alias("counter_pressures"),
+    ((pl.col("event_type") == "on_ball_engagement")
+        & (pl.col("end_type") == "direct_regain")).sum().alias("on_ball_engagement_recoveries"),
+    ((pl.col("event_subtype") == "pressure") 
+        & (pl.col("end_type") == "direct_regain")).sum().alias("pressure_recoveries"),
+    ((pl.col("event_subtype") == "recovery_press")
+        & (pl.col("end_type") == "direct_regain")).sum().alias("recovery_pressure_recoveries"),
+    ((pl.col("event_subtype") == "counter_press")
+        & (pl.col("end_type") == "direct_regain")).sum().alias("counter_pressure_recoveries"),
+    ((pl.col("event_type") == "on_ball_engagement") 
+        & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("on_ball_engagements_high"),
+    ((pl.col("event_type") == "on_ball_engagement")
+        & (pl.col("end_type") == "direct_regain") 
+        & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("on_ball_engagement_high_recoveries"),
+    ((pl.col("event_subtype") == "pressure") 
+        & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("pressures_high"),
+    ((pl.col("event_subtype") == "pressure")
+        & (pl.col("end_type") == "direct_regain") 
+        & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("pressure_high_recoveries"),
+    ((pl.col("event_subtype") == "recovery_press") 
+        & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("recovery_pressures_high"),
+    ((pl.col("event_subtype") == "recovery_press")
+        & (pl.col("end_type") == "direct_regain") 
+        & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("recovery_pressure_high_recoveries"),
+    ((pl.col("event_subtype") == "counter_press") 
+        & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("counter_pressures_high"),
+    ((pl.col("event_subtype") == "counter_press")
+        & (pl.col("end_type") == "direct_regain") 
+        & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("counter_pressure_high_recoveries"),
+]
 
-    base_path = Path(__file__).resolve().parent.parent
+PLAYER_IN_POSSESSION_METRICS = [
+    pl.len().alias("in_possession_events"),
+    ((pl.col("targeted")) & (pl.col("event_type") == "passing_option")).sum().alias("passes"),
+    ((pl.col("received")) & (pl.col("event_type") == "passing_option")).sum().alias("passes_completed"),
+    pl.col("xpass_completion").filter((pl.col("targeted")) & (pl.col("event_type") == "passing_option")).sum().alias("xpass_completion_sum"),
+    pl.col("xpass_completion").filter((pl.col("targeted")) & (pl.col("event_type") == "passing_option")).count().alias("xpass_completion_count"),
+    pl.col("xpass_completion").filter((pl.col("received")) & (pl.col("event_type") == "passing_option")).sum().alias("xpass_completion_completed_sum"),
+    pl.col("xpass_completion").filter((pl.col("received")) & (pl.col("event_type") == "passing_option")).count().alias("xpass_completion_completed_count"),
+    pl.col("xthreat").filter((pl.col("received")) & (pl.col("event_type") == "passing_option")).sum().alias("xthreat_sum"),
+    pl.col("xthreat").filter((pl.col("received")) & (pl.col("event_type") == "passing_option")).count().alias("xthreat_count"),
+    ((pl.col("targeted")) & (pl.col("event_type") == "passing_option") & ((pl.col("first_line_break")) | (pl.col("second_last_line_break")) | (pl.col("last_line_break")))).sum().alias("line_breaking_passes"),
+    ((pl.col("received")) & (pl.col("event_type") == "passing_option") & ((pl.col("first_line_break")) | (pl.col("second_last_line_break")) | (pl.col("last_line_break")))).sum().alias("line_breaking_passes_completed"),
+    ((pl.col("targeted")) & (pl.col("event_type") == "passing_option") & (pl.col("first_line_break"))).sum().alias("first_line_breaking_passes"),
+    ((pl.col("targeted")) & (pl.col("event_type") == "passing_option") & (pl.col("second_last_line_break"))).sum().alias("second_last_line_breaking_passes"),
+    ((pl.col("targeted")) & (pl.col("event_type") == "passing_option") & (pl.col("last_line_break"))).sum().alias("last_line_breaking_passes"),
+    ((pl.col("received")) & (pl.col("event_type") == "passing_option") & (pl.col("first_line_break"))).sum().alias("first_line_breaking_passes_completed"),
+    ((pl.col("received")) & (pl.col("event_type") == "passing_option") & (pl.col("second_last_line_break"))).sum().alias("second_last_line_breaking_passes_completed"),
+    ((pl.col("received")) & (pl.col("event_type") == "passing_option") & (pl.col("last_line_break"))).sum().alias("last_line_breaking_passes_completed"),
+    ((pl.col("targeted")) & (pl.col("event_type") == "passing_option") & (pl.col("pass_ahead"))).sum().alias("ahead_passes"),
+    ((pl.col("received")) & (pl.col("event_type") == "passing_option") & (pl.col("pass_ahead"))).sum().alias("ahead_passes_completed"),
+]
 
-    # Final gold views
-    silver_match = read_delta(base_path / "data/delta/silver/match")
-    silver_team = read_delta(base_path / "data/delta/silver/team")
-    silver_player = read_delta(base_path / "data/delta/silver/player")
-    silver_competition = read_delta(base_path / "data/delta/silver/competition")
-    silver_team_kit = read_delta(base_path / "data/delta/silver/team_kit")
-    silver_tracking = read_delta(base_path / "data/delta/silver/tracking")
-    silver_player_match = read_delta(base_path / "data/delta/silver/player_match")
-    silver_dynamic_events = read_delta(base_path / "data/delta/silver/dynamic_events")
-
-    tracking_view_df = (
-        silver_tracking
-        .join(
-            silver_player_match
-            .with_columns(object_id = pl.col("player_id"))
-            .select(["match_id", "object_id", "player_id","number","team_id","position_acronym"]).rename({"number":"player_number"}),
-            on=["match_id","object_id"], how="left"
-        )
-        .join(silver_match.select([
-                "match_id","date_time","home_team_id","away_team_id","competition_edition_id","round_number",
-                "team_homekit_id","team_awaykit_id"
-        ]), on="match_id", how="left")
-
-        # Player/team info
-        .join(silver_player.select(["player_id","short_name"]).rename({"short_name":"player_name"}),
-              on="player_id", how="left")
-        .join(silver_team.select(["team_id","short_name"])
-                    .rename({"short_name":"team_shortname"}),
-              on="team_id", how="left")
-    
-        # Kit & competition info
-        .with_columns(
-            pl.when(pl.col("team_id").is_null())
-              .then(pl.lit(None))
-              .when(pl.col("team_id") == pl.col("home_team_id"))
-              .then(pl.col("team_homekit_id"))
-              .otherwise(pl.col("team_awaykit_id"))
-              .alias("team_kit_id")
-        )
-        .join(silver_team_kit.select(["team_kit_id","jersey_color","number_color"])
-                    .rename({"jersey_color":"team_jersey_color","number_color":"team_number_color"}),
-              on="team_kit_id", how="left")
-        .join(silver_competition.select(["competition_edition_id","competition_name","season_name"]),
-              on="competition_edition_id", how="left")
+TEAM_EVENT_METRICS = [
+    (pl.col("event_type") == "off_ball_run").sum().alias("off_ball_runs"),
+    ((pl.col("event_type") == "off_ball_run") & (pl.col("targeted"))).sum().alias("off_ball_runs_targeted"),
+    (pl.col("event_subtype") == "dropping_off").sum().alias("dropping_off_runs"),
+    ((pl.col("event_subtype") == "dropping_off") & (pl.col("targeted"))).sum().alias("dropping_off_runs_targeted"),
+    (pl.col("event_subtype") == "coming_short").sum().alias("coming_short_runs"),
+    ((pl.col("event_subtype") == "coming_short") & (pl.col("targeted"))).sum().alias("coming_short_runs_targeted"),
+    (pl.col("event_subtype") == "pulling_wide").sum().alias("pulling_wide_runs"),
+    ((pl.col("event_subtype") == "pulling_wide") & (pl.col("targeted"))).sum().alias("pulling_wide_runs_targeted"),
+    (pl.col("event_subtype") == "pulling_half_space").sum().alias("pulling_half_space_runs"),
+    ((pl.col("event_subtype") == "pulling_half_space") & (pl.col("targeted"))).sum().alias("pulling_half_space_runs_targeted"),
+    (pl.col("event_subtype") == "support").sum().alias("support_runs"),
+    ((pl.col("event_subtype") == "support") & (pl.col("targeted"))).sum().alias("support_runs_targeted"),
+    (pl.col("event_subtype") == "run_ahead_of_the_ball").sum().alias("run_ahead_of_the_ball_runs"),
+    ((pl.col("event_subtype") == "run_ahead_of_the_ball") & (pl.col("targeted"))).sum().alias("run_ahead_of_the_ball_runs_targeted"),
+    (pl.col("event_subtype") == "overlap").sum().alias("overlap_runs"),
+    ((pl.col("event_subtype") == "overlap") & (pl.col("targeted"))).sum().alias("overlap_runs_targeted"),
+    (pl.col("event_subtype") == "underlap").sum().alias("underlap_runs"),
+    ((pl.col("event_subtype") == "underlap") & (pl.col("targeted"))).sum().alias("underlap_runs_targeted"),
+    (pl.col("event_subtype") == "behind").sum().alias("behind_runs"),
+    ((pl.col("event_subtype") == "behind") & (pl.col("targeted"))).sum().alias("behind_runs_targeted"),
+    (pl.col("event_subtype") == "cross_receiver").sum().alias("cross_receiver_runs"),
+    ((pl.col("event_subtype") == "cross_receiver") & (pl.col("targeted"))).sum().alias("cross_receiver_runs_targeted"),
+    (pl.col("event_type") == "on_ball_engagement").sum().alias("on_ball_engagements"),
+    (pl.col("event_subtype") == "pressure").sum().alias("pressures"),
+    (pl.col("event_subtype") == "recovery_press").sum().alias("recovery_pressures"),
+    (pl.col("event_subtype") == "counter_press").sum().alias("counter_pressures"),
+    ((pl.col("event_type") == "on_ball_engagement")
+        & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))).sum().alias("on_ball_engagement_recoveries"),
+    ((pl.col("event_subtype") == "pressure") 
+        & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))).sum().alias("pressure_recoveries"),
+    ((pl.col("event_subtype") == "recovery_press")
+        & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))).sum().alias("recovery_pressure_recoveries"),
+    ((pl.col("event_subtype") == "counter_press")
+        & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))).sum().alias("counter_pressure_recoveries"),
+    ((pl.col("event_type") == "on_ball_engagement") 
+        & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("on_ball_engagements_high"),
+    ((pl.col("event_type") == "on_ball_engagement")
+        & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"])) 
+        & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("on_ball_engagement_high_recoveries"),
+    ((pl.col("event_subtype") == "pressure") 
+        & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("pressures_high"),
+    ((pl.col("event_subtype") == "pressure")
+        & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"])) 
+        & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("pressure_high_recoveries"),
+    ((pl.col("event_subtype") == "recovery_press") 
+        & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("recovery_pressures_high"),
+    ((pl.col("event_subtype") == "recovery_press")
+        & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"])) 
+        & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("recovery_pressure_high_recoveries"),
+    ((pl.col("event_subtype") == "counter_press") 
+        & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("counter_pressures_high"),
+    ((pl.col("event_subtype") == "counter_press")
+        & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"])) 
+        & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("counter_pressure_high_recoveries"),
+]
+
+TEAM_LINES_RECOVERIES_METRICS = [
+    (pl.col("x_end").filter((pl.col("event_type") == "on_ball_engagement")
+        & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))
+        & (pl.col("position_group").is_in(["Full Back","Central Defender"])))).sum().alias("defense_recovery_height_sum"),
+    (pl.col("x_end").filter((pl.col("event_type") == "on_ball_engagement")
+        & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))
+        & (pl.col("position_group").is_in(["Full Back","Central Defender"])))).count().alias("defense_recovery_height_count"),
+    (pl.col("x_end").filter((pl.col("event_type") == "on_ball_engagement")
+        & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))
+        & (pl.col("position_group") == "Midfield"))).sum().alias("midfield_recovery_height_sum"),
+    (pl.col("x_end").filter((pl.col("event_type") == "on_ball_engagement")
+        & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))
+        & (pl.col("position_group") == "Midfield"))).count().alias("midfield_recovery_height_count"),
+    (pl.col("x_end").filter((pl.col("event_type") == "on_ball_engagement")
+        & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))
+        & (pl.col("position_group").is_in(["Center Forward","Wide Attacker"])))).sum().alias("attack_recovery_height_sum"),
+    (pl.col("x_end").filter((pl.col("event_type") == "on_ball_engagement")
+        & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))
+        & (pl.col("position_group").is_in(["Center Forward","Wide Attacker"])))).count().alias("attack_recovery_height_count"),
+    ((pl.col("event_type") == "on_ball_engagement")
+        & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))
+        & (pl.col("position_group").is_in(["Full Back","Central Defender"]))).sum().alias("defense_recoveries"),
+    ((pl.col("event_type") == "on_ball_engagement")
+        & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))
+        & (pl.col("position_group") == "Midfield")).sum().alias("midfield_recoveries"),
+    ((pl.col("event_type") == "on_ball_engagement")
+        & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))
+        & (pl.col("position_group").is_in(["Center Forward","Wide Attacker"]))).sum().alias("attack_recoveries"),
+]
+
+PLAYER_EVENT_METRIC_NAMES = [metric.meta.output_name() for metric in PLAYER_EVENT_METRICS]
+TEAM_EVENT_METRIC_NAMES = [metric.meta.output_name() for metric in TEAM_EVENT_METRICS]
+
+# Order of the snapshots of an event on a same frame
+SNAPSHOT_ORDER = {"start": 0, "window": 1, "end": 2}
+
+# Native frame rate of the tracking data, the level-of-detail tiers take every n-th frame of it
+TRACKING_FRAME_RATE = 10
+
+# Low-cardinality columns the tactical find screen filters the dynamic events on, indexed for the query service
+DYNAMIC_EVENTS_INDEX_COLUMNS = [
+    "event_type", "event_subtype", "season_name", "competition_name", "team_shortname", "group", "match_longname",
+    "period_name", "game_state", "team_in_possession_phase_type", "team_out_of_possession_phase_type",
+    "player_in_possession_name", "player_in_possession_position", "player_in_possession_zone_start",
+    "player_in_possession_zone_end", "player_name", "player_position", "position_group", "zone_start", "zone_end",
+    "channel_start", "channel_end", "third_start", "third_end", "targeted", "received",
+]
+
+
+'''
+Build the event snapshot table: positions of every tracked object at the start and end frame of each dynamic event.
+
+:param dynamic_events: Gold dynamic events view (needs match_id, event_id, frame_start and frame_end).
+:param tracking: Gold tracking view.
+:param full_window: If True, keeps every frame between frame_start and frame_end instead of only both ends. Every event
+    has a start and an end snapshot, on the same frame for single-frame events.
+
+:return: Polars LazyFrame with one row per event, snapshot frame and tracked object, sorted by event_id.
+'''
+def build_event_snapshots(
+    dynamic_events: pl.LazyFrame,
+    tracking: pl.LazyFrame,
+    full_window: bool = False,
+) -> pl.LazyFrame:
+    events = (
+        dynamic_events
+        .select(["match_id", "event_id", "frame_start", "frame_end"])
+        .filter(pl.col("frame_start").is_not_null())
+        .with_columns(pl.col("frame_end").fill_null(pl.col("frame_start")))
+    )
+
+    if full_window:
+        event_frames = pl.concat([
+            events
+            .with_columns(
+                frame = pl.int_ranges(pl.col("frame_start"), pl.col("frame_end") + 1, dtype=pl.Int32)
+            )
+            .explode("frame")
+            .with_columns(
+                snapshot = pl.when(pl.col("frame") == pl.col("frame_start"))
+                             .then(pl.lit("start"))
+                             .when(pl.col("frame") == pl.col("frame_end"))
+                             .then(pl.lit("end"))
+                             .otherwise(pl.lit("window"))
+            ),
+            # Single-frame events get an end snapshot too, on the same frame as their start one
+            events
+            .filter(pl.col("frame_start") == pl.col("frame_end"))
+            .with_columns(frame = pl.col("frame_end").cast(pl.Int32), snapshot = pl.lit("end")),
+        ])
+    else:
+        event_frames = pl.concat([
+            events.select(["match_id", "event_id", pl.col("frame_start").alias("frame"), pl.lit("start").alias("snapshot")]),
+            events.select(["match_id", "event_id", pl.col("frame_end").alias("frame"), pl.lit("end").alias("snapshot")]),
+        ])
+
+    return (
+        event_frames
+        .select(["match_id", "event_id", "snapshot", "frame"])
+        .join(tracking, on=["match_id", "frame"], how="inner")
+        # The start snapshot of a single-frame event comes before its end one, on the same frame
+        .sort(["event_id", "frame", pl.col("snapshot").replace(SNAPSHOT_ORDER, return_dtype=pl.Int8), "object_id"])
+    )
+
+
+'''
+Build the per-match player partial aggregates: additive counts, sums and denominators per match, player and team.
+Season-level aggregates are obtained by summing these partials, so only new or changed matches need to be computed.
+
+:param dynamic_events: Gold dynamic events view.
+:param player_match: Silver player match facts.
+:param match: Silver match dimension.
+
+:return: Polars LazyFrame with one row per match, player and team.
+'''
+def build_player_match_partials(
+    dynamic_events: pl.LazyFrame,
+    player_match: pl.LazyFrame,
+    match: pl.LazyFrame,
+) -> pl.LazyFrame:
+    lineup_partials = (
+        player_match
+        .filter(pl.col("position_acronym") != "SUB")
         .select([
-            "match_id","date_time",
-            "competition_name","season_name","round_number",
-            "player_id","player_name", "player_number", "team_id","team_shortname","group","position_acronym",
-            "frame","timestamp","period","object_id",
-            "x","y","z",
-            "has_possession",
-            "team_jersey_color","team_number_color",
+            "match_id", "player_id", "team_id", "minutes_played", "position_acronym",
+            pl.lit(1).alias("matches_played"),
+            pl.when(pl.col("start_time") == "00:00:00")
+              .then(pl.lit(1))
+              .otherwise(pl.lit(0))
+              .alias("starts"),
         ])
-        .filter(pl.col("timestamp").is_not_null())
-    ).collect()
-
-    dynamic_events_view_df = (
-        silver_dynamic_events
-        .join(silver_match.select([
-                "match_id","date_time","home_team_id","away_team_id","team_homekit_id","team_awaykit_id","competition_edition_id","round_number",
-                "youtube_video_id", "first_period_start", "second_period_start", "home_team_side_first", "home_team_side_second",
-                "away_team_side_first", "away_team_side_second"
-        ]), on="match_id", how="left")
-        .with_columns(
-            pl.when(pl.col("period") == 1)
-              .then(pl.col("first_period_start") + pl.col("seconds_start"))
-              .otherwise(pl.col("second_period_start") + pl.col("seconds_start") - (45*60) )
-              .alias("event_start_seconds"),
-            pl.when(pl.col("period") == 1)
-              .then(pl.col("first_period_start") + pl.col("seconds_end"))
-              .otherwise(pl.col("second_period_start") + pl.col("seconds_end") - (45*60) )
-              .alias("event_end_seconds")
-        )
-        .drop(["first_period_start", "second_period_start"])
-        .with_columns(
-            period_name = pl.when(pl.col("period") == 1)
-                            .then(pl.lit("First Half"))
-                            .when(pl.col("period") == 2)
-                            .then(pl.lit("Second Half"))
-                            .when(pl.col("period") == 3)
-                            .then(pl.lit("First Extra Time"))
-                            .when(pl.col("period") == 4)
-                            .then(pl.lit("Second Extra Time"))
-                            .otherwise(pl.lit("Penalty Shootout"))
-        )
-        .with_columns(
-            pl.when(pl.col("team_id").is_null())
-              .then(pl.lit(None))
-              .when(pl.col("team_id") == pl.col("home_team_id"))
-              .then(pl.lit("home"))
-              .otherwise(pl.lit("away"))
-              .alias("group")
-        )
-        .join(silver_team.select(["team_id","short_name"])
-                          .rename({"team_id":"home_team_id", 
-                                   "short_name":"home_team_shortname"}),
-              on="home_team_id", how="left"
+    )
+
+    event_partials = (
+        dynamic_events
+        .filter(pl.col("player_id").is_not_null())
+        .group_by(["match_id", "player_id", "team_id"])
+        .agg([
+            *PLAYER_EVENT_METRICS,
+            pl.col("passing_option_score").sum().alias("passing_option_score_sum"),
+            pl.col("passing_option_score").count().alias("passing_option_score_count"),
+        ])
+    )
+
+    in_possession_partials = (
+        dynamic_events
+        .filter(pl.col("player_in_possession_id").is_not_null())
+        .group_by(["match_id", "player_in_possession_id", "team_id"])
+        .agg(PLAYER_IN_POSSESSION_METRICS)
+        .rename({"player_in_possession_id": "player_id"})
+    )
+
+    return (
+        pl.concat([lineup_partials, event_partials, in_possession_partials], how="diagonal")
+        .group_by(["match_id", "player_id", "team_id"])
+        .agg([
+            pl.all().exclude("position_acronym").sum(),
+            pl.col("position_acronym").drop_nulls().first(),
+        ])
+        .join(match.select(["match_id", "competition_edition_id", "date_time"]), on="match_id", how="left")
+    )
+
+
+'''
+Build the per-match team partial aggregates: additive counts, sums and denominators per match and team.
+
+:param dynamic_events: Gold dynamic events view.
+:param match: Silver match dimension.
+
+:return: Polars LazyFrame with one row per match and team.
+'''
+def build_team_match_partials(
+    dynamic_events: pl.LazyFrame,
+    match: pl.LazyFrame,
+) -> pl.LazyFrame:
+    match_partials = pl.concat([
+        match.select(
+            match_id = pl.col("match_id"),
+            team_id = pl.col("home_team_id"),
+            minutes_played = pl.col("first_period_duration_minutes") + pl.col("second_period_duration_minutes"),
+            matches_played = pl.lit(1)
+        ),
+        match.select(
+            match_id = pl.col("match_id"),
+            team_id = pl.col("away_team_id"),
+            minutes_played = pl.col("first_period_duration_minutes") + pl.col("second_period_duration_minutes"),
+            matches_played = pl.lit(1)
         )
-        .join(silver_team.select(["team_id","short_name"])
-                          .rename({"team_id":"away_team_id", 
-                                   "short_name":"away_team_shortname"}),
-              on="away_team_id", how="left"
+    ])
+
+    event_partials = (
+        dynamic_events
+        .filter(pl.col("team_id").is_not_null())
+        .group_by(["match_id", "team_id"])
+        .agg([*TEAM_EVENT_METRICS, *TEAM_LINES_RECOVERIES_METRICS])
+    )
+
+    return (
+        pl.concat([match_partials, event_partials], how="diagonal")
+        .group_by(["match_id", "team_id"])
+        .agg(pl.all().sum())
+        .join(match.select(["match_id", "competition_edition_id", "date_time"]), on="match_id", how="left")
+    )
+
+
+'''
+Collect partial aggregates with common subexpression elimination disabled. In Polars 0.20.18 (pinned in
+requirements.txt), the elimination takes is_in masks over different lists for one another when they are used both
+as filters and as sums in the same aggregation, as the recovery metrics by position group are, e.g. in
+    df.group_by("g").agg(pl.col("v").filter(pl.col("p").is_in(["a"])).count(), pl.col("p").is_in(["a"]).sum(),
+                         pl.col("v").filter(pl.col("p").is_in(["b"])).count(), pl.col("p").is_in(["b"]).sum())
+the counts of "b" are those of "a".
+
+:param partials: Polars LazyFrame of the partial aggregates.
+
+:return: Polars DataFrame of the partial aggregates.
+'''
+def collect_partials(partials: pl.LazyFrame) -> pl.DataFrame:
+    return partials.collect(comm_subexpr_elim=False)
+
+'''
+Fingerprint the inputs of the partial aggregates of every match: the rows of every input table of the match are hashed,
+along with the code building the partials, so that a fingerprint changes whenever a row of the match is corrected or
+the partials are computed differently.
+
+:param inputs: Polars DataFrames or LazyFrames of the partials inputs, each with a match_id column.
+:param code: Fingerprint of the code building the partials.
+
+:return: Polars DataFrame with the fingerprint of every match.
+'''
+def get_match_fingerprints(inputs: list[pl.DataFrame | pl.LazyFrame], code: str) -> pl.DataFrame:
+    hashes = None
+    for position, data in enumerate(inputs):
+        df = data.lazy().collect()
+        # Row hashes are summed, so that the fingerprint of a match does not depend on the order of its rows
+        match_hashes = (
+            df.select("match_id")
+            .with_columns(df.hash_rows(seed=0).alias(f"hash_{position}"))
+            .group_by("match_id")
+            .agg(pl.col(f"hash_{position}").sum())
         )
-        .with_columns(
-            match_name = pl.concat_str([
-                  pl.col("home_team_shortname"), 
-                  pl.lit(" - "), 
-                  pl.col("away_team_shortname")
-            ]),
-            match_longname = pl.concat_str([
-                  pl.lit("R"),
-                  pl.col("round_number"),
-                  pl.lit(": "),
-                  pl.col("home_team_shortname"),
-                  pl.lit(" - "), 
-                  pl.col("away_team_shortname")
+        hashes = match_hashes if hashes is None else hashes.join(match_hashes, on="match_id", how="outer_coalesce")
+
+    match_ids, *input_hashes = hashes.get_columns()
+    fingerprints = [
+        hashlib.sha256(json.dumps([code, *row]).encode()).hexdigest()[:16]
+        for row in zip(*(column.to_list() for column in input_hashes))
+    ]
+    return pl.DataFrame({"match_id": match_ids, "fingerprint": fingerprints})
+
+
+'''
+Get the path of the fingerprints of the stored partials, a JSON file next to them.
+
+:param partials_path: Path to the stored partials parquet file.
+
+:return: Path to the fingerprints file.
+'''
+def get_fingerprints_path(partials_path: Path) -> Path:
+    return partials_path.with_suffix(".fingerprints.json")
+
+
+'''
+Get the match ids whose partial aggregates have to be computed: new matches, and matches whose inputs or partials code
+changed since their partials were stored.
+
+:param partials_path: Path to the stored partials parquet file.
+:param fingerprints: Polars DataFrame with the current fingerprint of every match available in silver.
+:param full_refresh: If True, every match is recomputed.
+
+:return: Polars Series with the pending match ids.
+'''
+def get_pending_match_ids(partials_path: Path, fingerprints: pl.DataFrame, full_refresh: bool = False) -> pl.Series:
+    fingerprints_path = get_fingerprints_path(partials_path)
+    if full_refresh or not partials_path.exists() or not fingerprints_path.exists():
+        return fingerprints["match_id"]
+
+    stored = json.loads(fingerprints_path.read_text(encoding="utf-8"))
+    return fingerprints.filter(
+        pl.col("match_id").cast(pl.Utf8).replace(stored, default=None).ne_missing(pl.col("fingerprint"))
+    )["match_id"]
+
+
+'''
+Merge freshly computed partials into the stored ones. Recomputed matches replace their stored rows
+and matches no longer present in silver are dropped.
+
+:param partials_path: Path to the stored partials parquet file.
+:param new_partials: Polars DataFrame with the partials of the pending matches.
+:param match_ids: Polars Series with every match id available in silver.
+
+:return: Polars DataFrame with the partials of every match.
+'''
+def merge_match_partials(partials_path: Path, new_partials: pl.DataFrame, match_ids: pl.Series) -> pl.DataFrame:
+    if not partials_path.exists():
+        partials = new_partials
+    elif new_partials.height == 0:
+        partials = pl.read_parquet(partials_path)
+    else:
+        partials = pl.concat([
+            pl.read_parquet(partials_path).filter(~pl.col("match_id").is_in(new_partials["match_id"].unique())),
+            new_partials,
+        ])
+
+    return partials.filter(pl.col("match_id").is_in(match_ids))
+
+
+'''
+Write the partials of every match, then the fingerprints of the inputs they were computed from. Fingerprints are written
+last: after a failure in between, the stored fingerprints of the recomputed matches are outdated, and they are
+recomputed again by the next run.
+
+:param partials_path: Path to the stored partials parquet file.
+:param partials: Polars DataFrame with the partials of every match.
+:param fingerprints: Polars DataFrame with the fingerprints of the recomputed matches.
+:param match_ids: Polars Series with every match id available in silver.
+'''
+def write_match_partials(partials_path: Path, partials: pl.DataFrame, fingerprints: pl.DataFrame, match_ids: pl.Series):
+    fingerprints_path = get_fingerprints_path(partials_path)
+    stored = json.loads(fingerprints_path.read_text(encoding="utf-8")) if fingerprints_path.exists() else {}
+    stored.update({str(match_id): fingerprint for match_id, fingerprint in fingerprints.iter_rows()})
+    kept = {str(match_id) for match_id in match_ids.to_list()}
+
+    write_atomically(partials_path, partials.write_parquet)
+    tmp_path = fingerprints_path.with_suffix(".tmp")
+    tmp_path.write_text(
+        json.dumps({match_id: stored[match_id] for match_id in sorted(stored) if match_id in kept}, indent=2),
+        encoding="utf-8"
+    )
+    os.replace(tmp_path, fingerprints_path)
+
+
+'''
+Build the player percentile table: percentile and rank of every metric within (competition, season, position group)
+cohorts, computed in a single pass. Players under the minutes threshold get no percentile and do not count in the
+cohort. Every player is also ranked in an "All" positions cohort.
+
+:param player_aggregates: Gold player aggregates.
+:param player_position_groups: Main position group per player, team, competition and season.
+:param min_minutes: Minimum minutes played to enter a cohort.
+
+:return: Polars DataFrame with one row per player and cohort.
+'''
+def build_player_percentiles(
+    player_aggregates: pl.DataFrame,
+    player_position_groups: pl.DataFrame,
+    min_minutes: int = 270,
+) -> pl.DataFrame:
+    players = player_aggregates.join(
+        player_position_groups,
+        on=["player_id", "team_id", "competition_id", "season_id"],
+        how="left"
+    )
+
+    cohorts = pl.concat([
+        players.with_columns(cohort_position_group = pl.col("position_group")),
+        players.with_columns(cohort_position_group = pl.lit("All")),
+    ])
+
+    cohort = ["competition_id", "season_id", "cohort_position_group"]
+    eligible = pl.col("minutes_played") >= min_minutes
+    eligible_values = {metric: pl.when(eligible).then(pl.col(metric)) for metric in player_percentile_metrics}
+
+    # Same definition as the app: (rank with ties at max - 1) / non-null values * 100
+    return cohorts.select([
+        "player_id", "team_id", "competition_id", "competition_name", "season_id", "season_name",
+        "position_group", "cohort_position_group", "minutes_played",
+        eligible.sum().over(cohort).alias("cohort_size"),
+        *[((values.rank("max") - 1) / values.count() * 100).over(cohort).round(2).alias(f"{metric}_prct")
+          for metric, values in eligible_values.items()],
+        *[values.rank("min", descending=True).over(cohort).alias(f"{metric}_rank")
+          for metric, values in eligible_values.items()],
+    ])
+
+
+'''
+Build the similar players table: the k nearest players to every player over their standardised per 90 metrics.
+Distances are computed with NumPy in chunks of rows, so memory stays bounded by chunk_size x cohort size.
+
+:param player_aggregates: Gold player aggregates.
+:param player_position_groups: Main position group per player, team, competition and season.
+:param k: Number of similar players kept per player.
+:param min_minutes: Minimum minutes played to be part of the index.
+:param cohort: Columns a similar player must share with the player (default is the competition, season and position
+    group, the cohorts of the percentile table).
+:param chunk_size: Number of players whose distances are computed at once.
+
+:return: Polars DataFrame with one row per player and similar player, ranked by distance.
+'''
+def build_similar_players(
+    player_aggregates: pl.DataFrame,
+    player_position_groups: pl.DataFrame,
+    k: int = 10,
+    min_minutes: int = 270,
+    cohort: tuple[str, ...] | None = ("competition_id", "season_id", "position_group"),
+    chunk_size: int = 1024,
+) -> pl.DataFrame:
+    metrics = [metric for metric in player_percentile_metrics if metric.endswith("_90")]
+    id_columns = [
+        "player_id", "player_name", "team_id", "team_shortname",
+        "competition_id", "competition_name", "season_id", "season_name", "position_group"
+    ]
+
+    players = (player_aggregates
+        .join(player_position_groups, on=["player_id", "team_id", "competition_id", "season_id"], how="left")
+        .filter(pl.col("minutes_played") >= min_minutes)
+        .with_columns(pl.col(metrics).cast(pl.Float64).fill_null(0.0).fill_nan(0.0))
+    )
+
+    groups = [group for _, group in players.group_by(list(cohort))] if cohort else [players]
+    similar_players = []
+
+    for group in groups:
+        if group.height < 2:
+            continue
+
+        values = group.select(metrics).to_numpy()
+        std = values.std(axis=0)
+        std[std == 0] = 1.0
+        values = (values - values.mean(axis=0)) / std
+
+        squared_norms = (values ** 2).sum(axis=1)
+        player_ids = group["player_id"].to_numpy()
+        neighbours = min(k, group.height - 1)
+
+        for start in range(0, group.height, chunk_size):
+            end = min(start + chunk_size, group.height)
+
+            # Squared euclidean distances of the chunk against the whole cohort
+            distances = squared_norms[start:end, None] + squared_norms[None, :] - 2.0 * (values[start:end] @ values.T)
+            np.maximum(distances, 0.0, out=distances)
+            distances[player_ids[start:end, None] == player_ids[None, :]] = np.inf
+
+            nearest = np.argpartition(distances, neighbours - 1, axis=1)[:, :neighbours]
+            nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+            order = np.argsort(nearest_distances, axis=1)
+            nearest = np.take_along_axis(nearest, order, axis=1)
+            nearest_distances = np.sqrt(np.take_along_axis(nearest_distances, order, axis=1))
+
+            rows = np.repeat(np.arange(start, end), neighbours)
+            similar_players.append(
+                pl.concat([
+                    group.select(id_columns)[rows],
+                    group.select(id_columns)[nearest.ravel()].select(pl.all().name.prefix("similar_")),
+                    pl.DataFrame({
+                        "similar_rank": np.tile(np.arange(1, neighbours + 1), end - start),
+                        "distance": nearest_distances.ravel(),
+                    }),
+                ], how="horizontal")
+            )
+
+    if not similar_players:
+        return pl.DataFrame()
+
+    return (pl.concat(similar_players)
+        .filter(pl.col("distance").is_finite())
+        .with_columns(similarity = 1 / (1 + pl.col("distance")))
+    )
+
+
+'''
+Build rolling form aggregates from the per-match partials: every additive column summed over each entity's last N
+matches, at every match. All window sizes are computed in a single pass over the sorted partials.
+
+:param partials: Per-match partials (player or team).
+:param entity: Columns identifying the entity whose matches are rolled (e.g. ["player_id"]).
+:param rate_metrics: Columns that also get a per 90 rate over the window.
+:param windows: Window sizes, in matches.
+
+:return: Polars DataFrame with one row per entity, match and window size.
+'''
+def build_rolling_form(
+    partials: pl.DataFrame,
+    entity: list[str],
+    rate_metrics: list[str],
+    windows: tuple[int, ...] = (3, 5, 10),
+) -> pl.DataFrame:
+    id_columns = ["match_id", "player_id", "team_id", "competition_edition_id", "date_time"]
+    id_columns = [column for column in id_columns if column in partials.columns]
+    metrics = [
+        column for column in partials.columns
+        if column not in id_columns and partials.schema[column].is_numeric()
+    ]
+
+    # Window sums are differences of one running total per metric: cum_sum - cum_sum shifted by the window size
+    windowed = (partials
+        .filter(pl.col("matches_played") > 0)
+        .sort([*entity, "date_time", "match_id"])
+        .with_columns([
+            pl.col(metric).cum_sum().over(entity).alias(f"{metric}_cum")
+            for metric in metrics
+        ])
+        .with_columns([
+            (pl.col(f"{metric}_cum") - pl.col(f"{metric}_cum").shift(window).over(entity).fill_null(0))
+                .alias(f"{metric}_last_{window}")
+            for window in windows
+            for metric in metrics
+        ])
+    )
+
+    return (pl.concat([
+            windowed.select([
+                pl.lit(window).alias("window_size"),
+                *id_columns,
+                *[pl.col(f"{metric}_last_{window}").alias(metric) for metric in metrics],
             ])
-        )
-        .drop(["home_team_shortname", "away_team_shortname"])
+            for window in windows
+        ])
+        .with_columns([
+            (pl.when(pl.col("minutes_played") == 0)
+                .then(pl.lit(0.0))
+                .otherwise((pl.col(metric) / pl.col("minutes_played") * 90))
+            ).round(2).alias(f"{metric}_90")
+            for metric in rate_metrics
+        ])
+    )
+
+
+'''
+Write a file to a temporary path and rename it into place once complete, so that the readers of the file (e.g. the
+query service, which maps the gold tables) never open a partially written one.
+
+:param path: Path to the file.
+:param write: Function writing the file to the path it is given.
+'''
+def write_atomically(path: Path, write: Callable[[Path], None]):
+    tmp_path = path.with_suffix(f"{path.suffix}.tmp")
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+'''
+Read the rows of a gold table that a scoped write keeps: the rows of the matches that are not replaced.
+
+:param name: Name of the table, used as file name.
+:param gold_path: Path to the gold layer folder.
+:param replace_match_ids: Identifiers of the matches whose rows are replaced.
+
+:return: Polars LazyFrame with the kept rows, or None if the table does not exist yet.
+'''
+def scan_kept_rows(name: str, gold_path: Path, replace_match_ids: pl.Series) -> pl.LazyFrame | None:
+    table_path = Path(f"{gold_path}/{name}.parquet")
+    if not table_path.exists():
+        return None
+
+    return pl.scan_parquet(table_path).filter(~pl.col("match_id").is_in(replace_match_ids))
+
+
+'''
+Export a gold table to the app data folder as an Arrow IPC file, for app processes to memory-map instead of decoding
+its Parquet file. Rows are indexed by event for event snapshots, the app reads them event by event, and by match for
+the other tables holding matches.
+
+:param data: Polars DataFrame or LazyFrame of the table.
+:param name: Name of the table, used as file name.
+:param app_ext_data_path: Path to the app data folder.
+'''
+def export_gold_table(data: pl.DataFrame | pl.LazyFrame, name: str, app_ext_data_path: Path):
+    columns = data.columns
+    index_by = "event_id" if name == "event_snapshots" else "match_id" if "match_id" in columns else None
+    write_ipc_table(data, Path(f"{app_ext_data_path}/{name}.arrow"), index_by=index_by)
+    record_output(Path(f"{app_ext_data_path}/{name}.arrow"), 0)
+
+
+'''
+Write a gold table to the gold layer and to the app data folder, as Parquet and as an Arrow IPC export. Every file is
+written to a temporary path and renamed into place.
+
+:param df: Polars DataFrame to write.
+:param name: Name of the table, used as file name.
+:param gold_path: Path to the gold layer folder.
+:param app_ext_data_path: Path to the app data folder.
+:param replace_match_ids: Scope of the write: only the rows of these matches are replaced (default is None, the
+    whole table).
+'''
+def write_gold_table(
+    df: pl.DataFrame,
+    name: str,
+    gold_path: Path,
+    app_ext_data_path: Path,
+    replace_match_ids: pl.Series | None = None,
+):
+    kept_rows = scan_kept_rows(name, gold_path, replace_match_ids) if replace_match_ids is not None else None
+    if kept_rows is not None:
+        df = pl.concat([kept_rows.collect(), df])
+
+    # Column statistics let the readers filtering the table (e.g. the query service) skip row groups
+    write_atomically(Path(f"{gold_path}/{name}.parquet"), lambda path: df.write_parquet(path, statistics=True))
+    write_atomically(Path(f"{app_ext_data_path}/{name}.parquet"), lambda path: df.to_pandas().to_parquet(path))
+    export_gold_table(df, name, app_ext_data_path)
+
+    record_output(Path(f"{gold_path}/{name}.parquet"), df.height)
+    record_output(Path(f"{app_ext_data_path}/{name}.parquet"), 0)
+
+
+'''
+Write a gold table built match by match (out-of-core mode): each match is spilled to a local Parquet file as soon as
+it is built, then the spilled parts are streamed into the gold table file, sorted out-of-core if needed, and the file
+is copied to the app data folder, along with its Arrow IPC export. Files are renamed into place once complete.
+
+:param build_match: Function building the table rows of a match, with the table schema applied.
+:param match_ids: Match identifiers.
+:param name: Name of the table, used as file name.
+:param schema_name: Name of the table schema.
+:param gold_path: Path to the gold layer folder.
+:param app_ext_data_path: Path to the app data folder.
+:param spill_path: Path to the spill folder.
+:param sort_by: Columns to sort the table by (default is None, match order).
+:param replace_match_ids: Scope of the write: only the rows of these matches are replaced (default is None, the
+    whole table).
+
+:return: Polars LazyFrame scanning the written gold table.
+'''
+def write_gold_table_by_match(
+    build_match: Callable[[int], pl.DataFrame],
+    match_ids: pl.Series,
+    name: str,
+    schema_name: str,
+    gold_path: Path,
+    app_ext_data_path: Path,
+    spill_path: Path,
+    sort_by: list[str] | None = None,
+    replace_match_ids: pl.Series | None = None,
+) -> pl.LazyFrame:
+    parts_path = spill_path / name
+    parts_path.mkdir(parents=True, exist_ok=True)
+
+    parts, rows = [], 0
+
+    # Kept rows are spilled too, the gold table file is rewritten from the parts
+    kept_rows = scan_kept_rows(name, gold_path, replace_match_ids) if replace_match_ids is not None else None
+    if kept_rows is not None:
+        parts.append(parts_path / "kept.parquet")
+        kept_rows.sink_parquet(parts[-1])
+        rows += pl.scan_parquet(parts[-1]).select(pl.len()).collect().item()
+    for match_id in match_ids:
+        df = build_match(match_id)
+        if df.height:
+            parts.append(parts_path / f"{match_id}.parquet")
+            df.write_parquet(parts[-1])
+            rows += df.height
+        check_memory_budget(f"{name} of match {match_id}")
+
+    table = pl.scan_parquet(parts) if parts else pl.LazyFrame(schema=gold_schemas[schema_name])
+    if sort_by:
+        table = table.sort(sort_by)
+    write_atomically(Path(f"{gold_path}/{name}.parquet"), lambda path: table.sink_parquet(path, statistics=True))
+    write_atomically(
+        Path(f"{app_ext_data_path}/{name}.parquet"),
+        lambda path: shutil.copyfile(Path(f"{gold_path}/{name}.parquet"), path)
+    )
+    export_gold_table(pl.scan_parquet(Path(f"{gold_path}/{name}.parquet")), name, app_ext_data_path)
+    clear_spill_path(parts_path)
+
+    record_output(Path(f"{gold_path}/{name}.parquet"), rows)
+    record_output(Path(f"{app_ext_data_path}/{name}.parquet"), 0)
+
+    return pl.scan_parquet(Path(f"{gold_path}/{name}.parquet"))
+
+
+def main(
+    snapshot_full_window: bool = False,
+    full_refresh: bool = False,
+    percentile_min_minutes: int = 270,
+    similar_players_k: int = 10,
+    form_windows: tuple[int, ...] = (3, 5, 10),
+    tracking_lod_rates: tuple[int, ...] = (5, 1),
+    tracking_lod_tolerance: float | None = None,
+    silver: dict[str, pl.DataFrame] | None = None,
+    max_workers: int | None = None,
+    base_path: Path | None = None,
+    max_memory_mb: int | None = None,
+    selection: Selection | None = None,
+):
+    print("Gold views and aggregated tables creation started...")
+
+    base_path = base_path or Path(__file__).resolve().parent.parent
+
+    for rate in tracking_lod_rates:
+        if rate <= 0 or TRACKING_FRAME_RATE % rate:
+            raise ValueError(f"Tracking tier rate must divide the {TRACKING_FRAME_RATE} Hz frame rate: {rate}")
+
+    # Memory-budgeted mode: tracking stays in Delta Lake and the tracking-sized tables are built match by match,
+    # spilled to local Parquet files, and tasks run one at a time
+    out_of_core = max_memory_mb is not None
+    set_memory_budget(max_memory_mb)
+
+    silver_match = read_table(silver, "match", base_path / "data/delta/silver/match")
+    silver_team = read_table(silver, "team", base_path / "data/delta/silver/team")
+    silver_player = read_table(silver, "player", base_path / "data/delta/silver/player")
+    silver_competition = read_table(silver, "competition", base_path / "data/delta/silver/competition")
+    silver_team_kit = read_table(silver, "team_kit", base_path / "data/delta/silver/team_kit")
+    silver_player_match = read_table(silver, "player_match", base_path / "data/delta/silver/player_match")
+
+    # Selective run: only the selected matches are read from the silver facts (the filter is pushed down into the
+    # Delta scans), they replace their own rows in the match-level gold tables and their match partials. Season
+    # tables are rebuilt from the stored partials of every match
+    selective = is_selective(selection)
+    match_predicate = None
+    if selective:
+        print(f"Selection: {selection}")
+        selected_match_ids = silver_match.filter(selection.match_filter()).select("match_id").collect()["match_id"]
+        match_predicate = pl.col("match_id").is_in(selected_match_ids)
+
+    silver_tracking = read_table(silver, "tracking", base_path / "data/delta/silver/tracking", predicate=match_predicate)
+    silver_dynamic_events = read_table(
+        silver, "dynamic_events", base_path / "data/delta/silver/dynamic_events", predicate=match_predicate
+    )
+
+    # Silver tables are loaded once, up front: Delta scans call back into Python and cannot be collected concurrently.
+    # Out-of-core, tracking is read match by match instead, by tasks running one at a time
+    with profile_step("load_silver") as step:
+        silver_tables = pl.collect_all([
+            silver_match, silver_team, silver_player, silver_competition,
+            silver_team_kit, silver_player_match, silver_dynamic_events,
+            *([] if out_of_core else [silver_tracking])
+        ])
+        step["rows_out"] = sum(df.height for df in silver_tables)
+    (
+        silver_match, silver_team, silver_player, silver_competition,
+        silver_team_kit, silver_player_match, silver_dynamic_events, *loaded_tracking
+    ) = [df.lazy() for df in silver_tables]
+    if not out_of_core:
+        silver_tracking = loaded_tracking[0]
+
+    gold_path = Path(base_path / "data/delta/gold")
+    gold_path.mkdir(parents=True, exist_ok=True)
+    app_ext_data_path = Path(base_path.parent / "apps/dynamicSkillsFinder/inst/extdata")
+    app_ext_data_path.mkdir(parents=True, exist_ok=True)
+
+    now = datetime.utcnow()
+
+    match_ids = silver_match.select("match_id").collect()["match_id"]
+    if not selective:
+        selected_match_ids = match_ids
+    replace_match_ids = selected_match_ids if selective else None
+
+    spill_path = get_spill_path(base_path, "gold") if out_of_core else None
+
+    # Match partials are recomputed when their inputs change, and when the code building them or the Polars version
+    # hashing their inputs does
+    partials_code = code_fingerprint([Path(__file__), Path(__file__).with_name("schemas.py")]) + pl.__version__
+
+    # Every gold table is built by a task receiving the tables it depends on, so independent tables run concurrently
+
+    # Final gold views
+    def build_tracking_view(tracking: pl.LazyFrame) -> pl.LazyFrame:
+        return (
+            tracking
+            .join(
+                silver_player_match
+                .with_columns(object_id = pl.col("player_id"))
+                .select(["match_id", "object_id", "player_id","number","team_id","position_acronym"]).rename({"number":"player_number"}),
+                on=["match_id","object_id"], how="left"
+            )
+            .join(silver_match.select([
+                    "match_id","date_time","home_team_id","away_team_id","competition_edition_id","round_number",
+                    "team_homekit_id","team_awaykit_id"
+            ]), on="match_id", how="left")
+
+            # Player/team info
+            .join(silver_player.select(["player_id","short_name"]).rename({"short_name":"player_name"}),
+                  on="player_id", how="left")
+            .join(silver_team.select(["team_id","short_name"])
+                        .rename({"short_name":"team_shortname"}),
+                  on="team_id", how="left")
     
-        # Kit & competition info
-        .with_columns(
-            pl.when(pl.col("team_id").is_null())
-              .then(pl.lit(None))
-              .when(pl.col("team_id") == pl.col("home_team_id"))
-              .then(pl.col("team_homekit_id"))
-              .otherwise(pl.col("team_awaykit_id"))
-              .alias("team_kit_id")
+            # Kit & competition info
+            .with_columns(
+                pl.when(pl.col("team_id").is_null())
+                  .then(pl.lit(None))
+                  .when(pl.col("team_id") == pl.col("home_team_id"))
+                  .then(pl.col("team_homekit_id"))
+                  .otherwise(pl.col("team_awaykit_id"))
+                  .alias("team_kit_id")
+            )
+            .join(silver_team_kit.select(["team_kit_id","jersey_color","number_color"])
+                        .rename({"jersey_color":"team_jersey_color","number_color":"team_number_color"}),
+                  on="team_kit_id", how="left")
+            .join(silver_competition.select(["competition_edition_id","competition_name","season_name"]),
+                  on="competition_edition_id", how="left")
+            .select([
+                "match_id","date_time",
+                "competition_name","season_name","round_number",
+                "player_id","player_name", "player_number", "team_id","team_shortname","group","position_acronym",
+                "frame","timestamp","period","object_id",
+                "x","y","z",
+                "has_possession",
+                "team_jersey_color","team_number_color",
+            ])
+            .filter(pl.col("timestamp").is_not_null())
         )
-        .join(silver_player_match.select(["match_id","player_id","number","position_group"]).rename({"number":"player_number"}),
-              on=["match_id","player_id"], how="left")
-        .join(silver_team_kit.select(["team_kit_id","jersey_color","number_color"])
-                    .rename({"jersey_color":"team_jersey_color","number_color":"team_number_color"}),
-              on="team_kit_id", how="left")
-        .join(silver_competition.select(["competition_edition_id","competition_name","season_name"]),
-              on="competition_edition_id", how="left")
-
-        # Tracking plot coords
-        .with_columns(
-            pl.when((pl.col("group") == "home") & (pl.col("home_team_side_first") == "right") & (pl.col("period") == 1))
-              .then(pl.col("x_start") * (-1))
-              .otherwise(
-                  pl.when((pl.col("group") == "home") & (pl.col("home_team_side_first") == "left") & (pl.col("period") == 1))
-                  .then(pl.col("x_start"))
+
+    def write_tracking_view():
+        if out_of_core:
+            tracking_view = write_gold_table_by_match(
+                lambda match_id: apply_schema(
+                    build_tracking_view(silver_tracking.filter(pl.col("match_id") == match_id)),
+                    "gold_tracking"
+                ).collect(),
+                selected_match_ids, "tracking", "gold_tracking", gold_path, app_ext_data_path, spill_path,
+                replace_match_ids=replace_match_ids
+            )
+
+            print("Tracking view created!")
+
+            return tracking_view
+
+        tracking_view = apply_schema(build_tracking_view(silver_tracking), "gold_tracking").collect()
+        write_gold_table(tracking_view, "tracking", gold_path, app_ext_data_path, replace_match_ids)
+
+        print("Tracking view created!")
+
+        return tracking_view
+
+    # Level-of-detail tiers of the tracking view (tracking_<rate>hz), side by side with the full table: every n-th frame,
+    # and optionally the trajectories simplified within a tolerance
+    def build_tracking_tier(tracking: pl.DataFrame, step: int) -> pl.DataFrame:
+        tier = downsample_frames(tracking, step)
+        if tracking_lod_tolerance is not None:
+            tier = simplify_trajectories(tier, tracking_lod_tolerance, step)
+        return tier
+
+    def write_tracking_lod(tracking_view: pl.DataFrame | pl.LazyFrame):
+        for rate in tracking_lod_rates:
+            name, step = f"tracking_{rate}hz", TRACKING_FRAME_RATE // rate
+            if out_of_core:
+                write_gold_table_by_match(
+                    lambda match_id, step=step: build_tracking_tier(
+                        tracking_view.filter(pl.col("match_id") == match_id).collect(), step
+                    ),
+                    selected_match_ids, name, "gold_tracking", gold_path, app_ext_data_path, spill_path,
+                    replace_match_ids=replace_match_ids
+                )
+            else:
+                write_gold_table(
+                    build_tracking_tier(tracking_view, step), name, gold_path, app_ext_data_path, replace_match_ids
+                )
+
+            print(f"Tracking {rate} Hz tier created!")
+
+    def write_dynamic_events_view():
+        dynamic_events_view_df = (
+            silver_dynamic_events
+            .join(silver_match.select([
+                    "match_id","date_time","home_team_id","away_team_id","team_homekit_id","team_awaykit_id","competition_edition_id","round_number",
+                    "youtube_video_id", "first_period_start", "second_period_start", "home_team_side_first", "home_team_side_second",
+                    "away_team_side_first", "away_team_side_second"
+            ]), on="match_id", how="left")
+            .with_columns(
+                pl.when(pl.col("period") == 1)
+                  .then(pl.col("first_period_start") + pl.col("seconds_start"))
+                  .otherwise(pl.col("second_period_start") + pl.col("seconds_start") - (45*60) )
+                  .alias("event_start_seconds"),
+                pl.when(pl.col("period") == 1)
+                  .then(pl.col("first_period_start") + pl.col("seconds_end"))
+                  .otherwise(pl.col("second_period_start") + pl.col("seconds_end") - (45*60) )
+                  .alias("event_end_seconds")
+            )
+            .drop(["first_period_start", "second_period_start"])
+            .with_columns(
+                period_name = pl.when(pl.col("period") == 1)
+                                .then(pl.lit("First Half"))
+                                .when(pl.col("period") == 2)
+                                .then(pl.lit("Second Half"))
+                                .when(pl.col("period") == 3)
+                                .then(pl.lit("First Extra Time"))
+                                .when(pl.col("period") == 4)
+                                .then(pl.lit("Second Extra Time"))
+                                .otherwise(pl.lit("Penalty Shootout"))
+            )
+            .with_columns(
+                pl.when(pl.col("team_id").is_null())
+                  .then(pl.lit(None))
+                  .when(pl.col("team_id") == pl.col("home_team_id"))
+                  .then(pl.lit("home"))
+                  .otherwise(pl.lit("away"))
+                  .alias("group")
+            )
+            .join(silver_team.select(["team_id","short_name"])
+                              .rename({"team_id":"home_team_id", 
+                                       "short_name":"home_team_shortname"}),
+                  on="home_team_id", how="left"
+            )
+            .join(silver_team.select(["team_id","short_name"])
+                              .rename({"team_id":"away_team_id", 
+                                       "short_name":"away_team_shortname"}),
+                  on="away_team_id", how="left"
+            )
+            .with_columns(
+                match_name = pl.concat_str([
+                      pl.col("home_team_shortname"), 
+                      pl.lit(" - "), 
+                      pl.col("away_team_shortname")
+                ]),
+                match_longname = pl.concat_str([
+                      pl.lit("R"),
+                      pl.col("round_number"),
+                      pl.lit(": "),
+                      pl.col("home_team_shortname"),
+                      pl.lit(" - "), 
+                      pl.col("away_team_shortname")
+                ])
+            )
+            .drop(["home_team_shortname", "away_team_shortname"])
+    
+            # Kit & competition info
+            .with_columns(
+                pl.when(pl.col("team_id").is_null())
+                  .then(pl.lit(None))
+                  .when(pl.col("team_id") == pl.col("home_team_id"))
+                  .then(pl.col("team_homekit_id"))
+                  .otherwise(pl.col("team_awaykit_id"))
+                  .alias("team_kit_id")
+            )
+            .join(silver_player_match.select(["match_id","player_id","number","position_group"]).rename({"number":"player_number"}),
+                  on=["match_id","player_id"], how="left")
+            .join(silver_team_kit.select(["team_kit_id","jersey_color","number_color"])
+                        .rename({"jersey_color":"team_jersey_color","number_color":"team_number_color"}),
+                  on="team_kit_id", how="left")
+            .join(silver_competition.select(["competition_edition_id","competition_name","season_name"]),
+                  on="competition_edition_id", how="left")
+
+            # Tracking plot coords
+            .with_columns(
+                pl.when((pl.col("group") == "home") & (pl.col("home_team_side_first") == "right") & (pl.col("period") == 1))
+                  .then(pl.col("x_start") * (-1))
                   .otherwise(
-                        pl.when((pl.col("group") == "home") & (pl.col("home_team_side_second") == "right") & (pl.col("period") == 2))
-                        .then(pl.col("x_start") * (-1))
-                        .otherwise(
-                            pl.when((pl.col("group") == "home") & (pl.col("home_team_side_second") == "left") & (pl.col("period") == 2))
-                            .then(pl.col("x_start"))
+                      pl.when((pl.col("group") == "home") & (pl.col("home_team_side_first") == "left") & (pl.col("period") == 1))
+                      .then(pl.col("x_start"))
+                      .otherwise(
+                            pl.when((pl.col("group") == "home") & (pl.col("home_team_side_second") == "right") & (pl.col("period") == 2))
+                            .then(pl.col("x_start") * (-1))
                             .otherwise(
-                                pl.when((pl.col("group") == "away") & (pl.col("away_team_side_first") == "right") & (pl.col("period") == 1))
-                                .then(pl.col("x_start") * (-1))
+                                pl.when((pl.col("group") == "home") & (pl.col("home_team_side_second") == "left") & (pl.col("period") == 2))
+                                .then(pl.col("x_start"))
                                 .otherwise(
-                                    pl.when((pl.col("group") == "away") & (pl.col("away_team_side_first") == "left") & (pl.col("period") == 1))
-                                    .then(pl.col("x_start"))
+                                    pl.when((pl.col("group") == "away") & (pl.col("away_team_side_first") == "right") & (pl.col("period") == 1))
+                                    .then(pl.col("x_start") * (-1))
                                     .otherwise(
-                                        pl.when((pl.col("group") == "away") & (pl.col("away_team_side_second") == "right") & (pl.col("period") == 2))
-                                        .then(pl.col("x_start") * (-1))
+                                        pl.when((pl.col("group") == "away") & (pl.col("away_team_side_first") == "left") & (pl.col("period") == 1))
+                                        .then(pl.col("x_start"))
                                         .otherwise(
-                                            pl.when((pl.col("group") == "away") & (pl.col("away_team_side_second") == "left") & (pl.col("period") == 2))
-                                            .then(pl.col("x_start"))
-                                            .otherwise(pl.lit(None))
+                                            pl.when((pl.col("group") == "away") & (pl.col("away_team_side_second") == "right") & (pl.col("period") == 2))
+                                            .then(pl.col("x_start") * (-1))
+                                            .otherwise(
+                                                pl.when((pl.col("group") == "away") & (pl.col("away_team_side_second") == "left") & (pl.col("period") == 2))
+                                                .then(pl.col("x_start"))
+                                                .otherwise(pl.lit(None))
+                                            )
                                         )
                                     )
                                 )
                             )
-                        )
-                  )
-            ).alias("x_start_tracking"),
-            pl.when((pl.col("group") == "home") & (pl.col("home_team_side_first") == "right") & (pl.col("period") == 1))
-              .then(pl.col("x_end") * (-1))
-              .otherwise(
-                  pl.when((pl.col("group") == "home") & (pl.col("home_team_side_first") == "left") & (pl.col("period") == 1))
-                  .then(pl.col("x_end"))
+                      )
+                ).alias("x_start_tracking"),
+                pl.when((pl.col("group") == "home") & (pl.col("home_team_side_first") == "right") & (pl.col("period") == 1))
+                  .then(pl.col("x_end") * (-1))
                   .otherwise(
-                        pl.when((pl.col("group") == "home") & (pl.col("home_team_side_second") == "right") & (pl.col("period") == 2))
-                        .then(pl.col("x_end") * (-1))
-                        .otherwise(
-                            pl.when((pl.col("group") == "home") & (pl.col("home_team_side_second") == "left") & (pl.col("period") == 2))
-                            .then(pl.col("x_end"))
+                      pl.when((pl.col("group") == "home") & (pl.col("home_team_side_first") == "left") & (pl.col("period") == 1))
+                      .then(pl.col("x_end"))
+                      .otherwise(
+                            pl.when((pl.col("group") == "home") & (pl.col("home_team_side_second") == "right") & (pl.col("period") == 2))
+                            .then(pl.col("x_end") * (-1))
                             .otherwise(
-                                pl.when((pl.col("group") == "away") & (pl.col("away_team_side_first") == "right") & (pl.col("period") == 1))
-                                .then(pl.col("x_end") * (-1))
+                                pl.when((pl.col("group") == "home") & (pl.col("home_team_side_second") == "left") & (pl.col("period") == 2))
+                                .then(pl.col("x_end"))
                                 .otherwise(
-                                    pl.when((pl.col("group") == "away") & (pl.col("away_team_side_first") == "left") & (pl.col("period") == 1))
-                                    .then(pl.col("x_end"))
+                                    pl.when((pl.col("group") == "away") & (pl.col("away_team_side_first") == "right") & (pl.col("period") == 1))
+                                    .then(pl.col("x_end") * (-1))
                                     .otherwise(
-                                        pl.when((pl.col("group") == "away") & (pl.col("away_team_side_second") == "right") & (pl.col("period") == 2))
-                                        .then(pl.col("x_end") * (-1))
+                                        pl.when((pl.col("group") == "away") & (pl.col("away_team_side_first") == "left") & (pl.col("period") == 1))
+                                        .then(pl.col("x_end"))
                                         .otherwise(
-                                            pl.when((pl.col("group") == "away") & (pl.col("away_team_side_second") == "left") & (pl.col("period") == 2))
-                                            .then(pl.col("x_end"))
-                                            .otherwise(pl.lit(None))
+                                            pl.when((pl.col("group") == "away") & (pl.col("away_team_side_second") == "right") & (pl.col("period") == 2))
+                                            .then(pl.col("x_end") * (-1))
+                                            .otherwise(
+                                                pl.when((pl.col("group") == "away") & (pl.col("away_team_side_second") == "left") & (pl.col("period") == 2))
+                                                .then(pl.col("x_end"))
+                                                .otherwise(pl.lit(None))
+                                            )
                                         )
                                     )
                                 )
                             )
-                        )
-                  )
-            ).alias("x_end_tracking"),
-            pl.when((pl.col("group") == "home") & (pl.col("home_team_side_first") == "right") & (pl.col("period") == 1))
-              .then(pl.col("y_start") * (-1))
-              .otherwise(
-                  pl.when((pl.col("group") == "home") & (pl.col("home_team_side_first") == "left") & (pl.col("period") == 1))
-                  .then(pl.col("y_start"))
+                      )
+                ).alias("x_end_tracking"),
+                pl.when((pl.col("group") == "home") & (pl.col("home_team_side_first") == "right") & (pl.col("period") == 1))
+                  .then(pl.col("y_start") * (-1))
                   .otherwise(
-                        pl.when((pl.col("group") == "home") & (pl.col("home_team_side_second") == "right") & (pl.col("period") == 2))
-                        .then(pl.col("y_start") * (-1))
-                        .otherwise(
-                            pl.when((pl.col("group") == "home") & (pl.col("home_team_side_second") == "left") & (pl.col("period") == 2))
-                            .then(pl.col("y_start"))
+                      pl.when((pl.col("group") == "home") & (pl.col("home_team_side_first") == "left") & (pl.col("period") == 1))
+                      .then(pl.col("y_start"))
+                      .otherwise(
+                            pl.when((pl.col("group") == "home") & (pl.col("home_team_side_second") == "right") & (pl.col("period") == 2))
+                            .then(pl.col("y_start") * (-1))
                             .otherwise(
-                                pl.when((pl.col("group") == "away") & (pl.col("away_team_side_first") == "right") & (pl.col("period") == 1))
-                                .then(pl.col("y_start") * (-1))
+                                pl.when((pl.col("group") == "home") & (pl.col("home_team_side_second") == "left") & (pl.col("period") == 2))
+                                .then(pl.col("y_start"))
                                 .otherwise(
-                                    pl.when((pl.col("group") == "away") & (pl.col("away_team_side_first") == "left") & (pl.col("period") == 1))
-                                    .then(pl.col("y_start"))
+                                    pl.when((pl.col("group") == "away") & (pl.col("away_team_side_first") == "right") & (pl.col("period") == 1))
+                                    .then(pl.col("y_start") * (-1))
                                     .otherwise(
-                                        pl.when((pl.col("group") == "away") & (pl.col("away_team_side_second") == "right") & (pl.col("period") == 2))
-                                        .then(pl.col("y_start") * (-1))
+                                        pl.when((pl.col("group") == "away") & (pl.col("away_team_side_first") == "left") & (pl.col("period") == 1))
+                                        .then(pl.col("y_start"))
                                         .otherwise(
-                                            pl.when((pl.col("group") == "away") & (pl.col("away_team_side_second") == "left") & (pl.col("period") == 2))
-                                            .then(pl.col("y_start"))
-                                            .otherwise(pl.lit(None))
+                                            pl.when((pl.col("group") == "away") & (pl.col("away_team_side_second") == "right") & (pl.col("period") == 2))
+                                            .then(pl.col("y_start") * (-1))
+                                            .otherwise(
+                                                pl.when((pl.col("group") == "away") & (pl.col("away_team_side_second") == "left") & (pl.col("period") == 2))
+                                                .then(pl.col("y_start"))
+                                                .otherwise(pl.lit(None))
+                                            )
                                         )
                                     )
                                 )
                             )
-                        )
-                  )
-            ).alias("y_start_tracking"),
-            pl.when((pl.col("group") == "home") & (pl.col("home_team_side_first") == "right") & ((pl.col("period") == 1)) )
-              .then(pl.col("y_end") * (-1))
-              .otherwise(
-                  pl.when((pl.col("group") == "home") & (pl.col("home_team_side_first") == "left") & (pl.col("period") == 1))
-                  .then(pl.col("y_end"))
+                      )
+                ).alias("y_start_tracking"),
+                pl.when((pl.col("group") == "home") & (pl.col("home_team_side_first") == "right") & ((pl.col("period") == 1)) )
+                  .then(pl.col("y_end") * (-1))
                   .otherwise(
-                        pl.when((pl.col("group") == "home") & (pl.col("home_team_side_second") == "right") & (pl.col("period") == 2))
-                        .then(pl.col("y_end") * (-1))
-                        .otherwise(
-                            pl.when((pl.col("group") == "home") & (pl.col("home_team_side_second") == "left") & (pl.col("period") == 2))
-                            .then(pl.col("y_end"))
+                      pl.when((pl.col("group") == "home") & (pl.col("home_team_side_first") == "left") & (pl.col("period") == 1))
+                      .then(pl.col("y_end"))
+                      .otherwise(
+                            pl.when((pl.col("group") == "home") & (pl.col("home_team_side_second") == "right") & (pl.col("period") == 2))
+                            .then(pl.col("y_end") * (-1))
                             .otherwise(
-                                pl.when((pl.col("group") == "away") & (pl.col("away_team_side_first") == "right") & (pl.col("period") == 1))
-                                .then(pl.col("y_end") * (-1))
+                                pl.when((pl.col("group") == "home") & (pl.col("home_team_side_second") == "left") & (pl.col("period") == 2))
+                                .then(pl.col("y_end"))
                                 .otherwise(
-                                    pl.when((pl.col("group") == "away") & (pl.col("away_team_side_first") == "left") & (pl.col("period") == 1))
-                                    .then(pl.col("y_end"))
+                                    pl.when((pl.col("group") == "away") & (pl.col("away_team_side_first") == "right") & (pl.col("period") == 1))
+                                    .then(pl.col("y_end") * (-1))
                                     .otherwise(
-                                        pl.when((pl.col("group") == "away") & (pl.col("away_team_side_second") == "right") & (pl.col("period") == 2))
-                                        .then(pl.col("y_end") * (-1))
+                                        pl.when((pl.col("group") == "away") & (pl.col("away_team_side_first") == "left") & (pl.col("period") == 1))
+                                        .then(pl.col("y_end"))
                                         .otherwise(
-                                            pl.when((pl.col("group") == "away") & (pl.col("away_team_side_second") == "left") & (pl.col("period") == 2))
-                                            .then(pl.col("y_end"))
-                                            .otherwise(pl.lit(None))
+                                            pl.when((pl.col("group") == "away") & (pl.col("away_team_side_second") == "right") & (pl.col("period") == 2))
+                                            .then(pl.col("y_end") * (-1))
+                                            .otherwise(
+                                                pl.when((pl.col("group") == "away") & (pl.col("away_team_side_second") == "left") & (pl.col("period") == 2))
+                                                .then(pl.col("y_end"))
+                                                .otherwise(pl.lit(None))
+                                            )
                                         )
                                     )
                                 )
                             )
-                        )
-                  )
-            ).alias("y_end_tracking")
+                      )
+                ).alias("y_end_tracking")
+            )
+            .select([
+                "match_id", "match_name", "match_longname",
+                "date_time",
+                "competition_name","season_name","round_number",
+                "event_id", 
+                "frame_start", "frame_end", 
+                "time_start", "time_end",
+                "minute_start", "minute_end",
+                "seconds_start", "seconds_end", 
+                "period", "period_name",
+                "team_id", "team_shortname", "group",
+                "team_jersey_color","team_number_color",
+                "event_type", "event_subtype",
+                "player_id", "player_name", "player_number", "position_group", "player_position", 
+                "player_in_possession_id", "player_in_possession_name", "player_in_possession_position",
+                "x_start","y_start",
+                "x_end","y_end",
+                "channel_start", "channel_end", 
+                "third_start", "third_end",
+                "zone_start", "zone_end",
+                "player_in_possession_zone_start", "player_in_possession_zone_end",
+                "team_in_possession_phase_type", "team_out_of_possession_phase_type",
+                "start_type", 
+                "end_type",
+                "game_state_id", "game_state",
+                "associated_player_possession_event_id",
+                "targeted", "received",
+                "xthreat", "xpass_completion", "passing_option_score",
+                "first_line_break", "second_last_line_break", "last_line_break",
+                "pass_ahead",
+                "speed_avg_band",
+                "pressing_chain_index",
+                "pressing_chain_end_type",
+                "youtube_video_id", 
+                "event_start_seconds", "event_end_seconds", 
+                "home_team_side_first", "home_team_side_second",
+                "away_team_side_first", "away_team_side_second",
+                "x_start_tracking", "y_start_tracking",
+                "x_end_tracking", "y_end_tracking"
+            ])
+        ).collect()
+
+        dynamic_events_view = apply_schema(dynamic_events_view_df, "gold_dynamic_events")
+        write_gold_table(dynamic_events_view, "dynamic_events", gold_path, app_ext_data_path, replace_match_ids)
+
+        print("Dynamic events view created!")
+
+        # Aggregates need columns that are not published in the view
+        return dynamic_events_view_df
+
+    # Bitmap index of the dynamic events, built from the written gold table rather than from the view, so that its
+    # row numbers match the file (kept rows come first in a selective build)
+    def write_dynamic_events_index(dynamic_events_view: pl.DataFrame):
+        dynamic_events_path = Path(f"{gold_path}/dynamic_events.parquet")
+        index_path = Path(f"{gold_path}/dynamic_events.bitmap.arrow")
+        entries = write_bitmap_index(
+            pl.read_parquet(dynamic_events_path, columns=DYNAMIC_EVENTS_INDEX_COLUMNS),
+            DYNAMIC_EVENTS_INDEX_COLUMNS,
+            index_path
         )
-        .select([
-            "match_id", "match_name", "match_longname",
-            "date_time",
-            "competition_name","season_name","round_number",
-            "event_id", 
-            "frame_start", "frame_end", 
-            "time_start", "time_end",
-            "minute_start", "minute_end",
-            "seconds_start", "seconds_end", 
-            "period", "period_name",
-            "team_id", "team_shortname", "group",
-            "team_jersey_color","team_number_color",
-            "event_type", "event_subtype",
-            "player_id", "player_name", "player_number", "position_group", "player_position", 
-            "player_in_possession_id", "player_in_possession_name", "player_in_possession_position",
-            "x_start","y_start",
-            "x_end","y_end",
-            "channel_start", "channel_end", 
-            "third_start", "third_end",
-            "zone_start", "zone_end",
-            "player_in_possession_zone_start", "player_in_possession_zone_end",
-            "team_in_possession_phase_type", "team_out_of_possession_phase_type",
-            "start_type", 
-            "end_type",
-            "game_state_id", "game_state",
-            "associated_player_possession_event_id",
-            "targeted", "received",
-            "xthreat", "xpass_completion", "passing_option_score",
-            "first_line_break", "second_last_line_break", "last_line_break",
-            "pass_ahead",
-            "speed_avg_band",
-            "pressing_chain_index",
-            "pressing_chain_end_type",
-            "youtube_video_id", 
-            "event_start_seconds", "event_end_seconds", 
-            "home_team_side_first", "home_team_side_second",
-            "away_team_side_first", "away_team_side_second",
-            "x_start_tracking", "y_start_tracking",
-            "x_end_tracking", "y_end_tracking"
-        ])
-    ).collect()
+        record_output(index_path, entries)
 
-    tracking_view = apply_schema(tracking_view_df, "gold_tracking")
-    dynamic_events_view = apply_schema(dynamic_events_view_df, "gold_dynamic_events")
+        print("Dynamic events index created!")
 
-    gold_path = Path(base_path / "data/delta/gold")
-    gold_path.mkdir(parents=True, exist_ok=True)
-    app_ext_data_path = Path(base_path.parent / "apps/dynamicSkillsFinder/inst/extdata")
-    app_ext_data_path.mkdir(parents=True, exist_ok=True)
+    # Event snapshots (tracking at each event start/end frame)
+    def write_event_snapshots(tracking_view: pl.DataFrame | pl.LazyFrame, dynamic_events_view: pl.DataFrame):
+        if out_of_core:
+            dynamic_events = apply_schema(dynamic_events_view.lazy(), "gold_dynamic_events")
+            write_gold_table_by_match(
+                lambda match_id: apply_schema(
+                    build_event_snapshots(
+                        dynamic_events.filter(pl.col("match_id") == match_id),
+                        tracking_view.lazy().filter(pl.col("match_id") == match_id),
+                        full_window=snapshot_full_window
+                    ),
+                    "gold_event_snapshots"
+                ).collect(),
+                selected_match_ids, "event_snapshots", "gold_event_snapshots", gold_path, app_ext_data_path, spill_path,
+                sort_by=["event_id", "frame", "object_id"], replace_match_ids=replace_match_ids
+            )
+
+            print("Event snapshots table created!")
 
-    tracking_view.write_parquet(Path(f"{gold_path}/tracking.parquet"))
-    tracking_view.to_pandas().to_parquet(f"{app_ext_data_path}/tracking.parquet")
+            return
 
-    dynamic_events_view.write_parquet(Path(f"{gold_path}/dynamic_events.parquet"))
-    dynamic_events_view.to_pandas().to_parquet(f"{app_ext_data_path}/dynamic_events.parquet")
+        event_snapshots = apply_schema(
+            build_event_snapshots(
+                apply_schema(dynamic_events_view.lazy(), "gold_dynamic_events"),
+                tracking_view.lazy(),
+                full_window=snapshot_full_window
+            ),
+            "gold_event_snapshots"
+        ).collect()
+
+        write_gold_table(event_snapshots, "event_snapshots", gold_path, app_ext_data_path, replace_match_ids)
 
-    print("Dynamic events and tracking views created!")
+        print("Event snapshots table created!")
 
     # Aggregated gold tables
-    now = datetime.utcnow()
+    def write_player_match_partials(dynamic_events_view: pl.DataFrame) -> pl.DataFrame:
+        player_partials_path = Path(f"{gold_path}/agg_player_match.parquet")
+        fingerprints = get_match_fingerprints(
+            [
+                dynamic_events_view,
+                silver_player_match.filter(pl.col("match_id").is_in(selected_match_ids)),
+                silver_match.filter(pl.col("match_id").is_in(selected_match_ids)),
+            ],
+            partials_code
+        )
+        pending_match_ids = (
+            selected_match_ids if selective else get_pending_match_ids(player_partials_path, fingerprints, full_refresh)
+        )
 
-    agg_player_match_df = (
-        silver_player_match.select([
-            "match_id", "player_id" , "team_id", "competition_edition_id",
-            "minutes_played", "start_time", "position_acronym"
-        ])
-        .filter(pl.col("position_acronym") != "SUB")
-        .with_columns(pl.when(pl.col("start_time") == "00:00:00")
-                        .then(pl.lit(1))
-                        .otherwise(pl.lit(0))
-                        .alias("starts"))
-        .group_by([
-            "player_id", "team_id", "competition_edition_id"
-        ])
-        .agg([
-            pl.col("match_id").count().alias("matches_played"),
-            pl.col("minutes_played").sum().alias("minutes_played"),
-            pl.col("starts").sum().alias("starts"),
-            pl.col("position_acronym").unique().alias("positions_list")
-        ])
-        .with_columns(
-            pl.col("positions_list").list.join(", ").alias("positions")
+        player_match_partials = merge_match_partials(
+            player_partials_path,
+            collect_partials(apply_schema(
+                build_player_match_partials(
+                    dynamic_events_view.lazy().filter(pl.col("match_id").is_in(pending_match_ids)),
+                    silver_player_match.filter(pl.col("match_id").is_in(pending_match_ids)),
+                    silver_match.filter(pl.col("match_id").is_in(pending_match_ids))
+                ),
+                "gold_player_match_partials"
+            )),
+            match_ids
         )
-        .drop("positions_list")
-        .join(silver_player.select(["player_id", "short_name", "birthday"]).rename({"short_name":"player_name"}),
-                on="player_id", how="left")
-        .with_columns(
-            age = (
-                pl.lit(now.year) - pl.col("birthday").dt.year() -
-                (
-                    (pl.lit(now.month) < pl.col("birthday").dt.month()) |
-                    ((pl.lit(now.month) == pl.col("birthday").dt.month()) & (pl.lit(now.day) < pl.col("birthday").dt.day()))
-                )
-            ).cast(pl.Int16)
+        write_match_partials(
+            player_partials_path,
+            player_match_partials,
+            fingerprints.filter(pl.col("match_id").is_in(pending_match_ids)),
+            match_ids
         )
-        .join(silver_team.select(["team_id","short_name"]).rename({"short_name":"team_shortname"}),
-                on="team_id", how="left")
-        .join(silver_competition.select(["competition_edition_id", "competition_id", "season_id", "competition_name", "season_name"]),
-                on="competition_edition_id", how="left")
-        .select([
-            "player_id", "player_name", "birthday", "age", "team_id", "team_shortname",
-            "competition_id", "competition_name", "season_id", "season_name",
-            "positions", "minutes_played", "matches_played", "starts"
-        ]).collect()
-    )
+        record_output(player_partials_path, player_match_partials.height)
 
-    agg_player_dynamic_events_df = (dynamic_events_view_df
-        .select(["player_id", "team_id", "competition_name", "season_name", "event_type", "event_subtype", "team_out_of_possession_phase_type", 
-                 "passing_option_score", "targeted", "end_type"])
-        .group_by([
-            "player_id", "team_id", "competition_name", "season_name"
-        ])
-        .agg([
-            (pl.col("event_type") == "off_ball_run").sum().alias("off_ball_runs"),
-            ((pl.col("event_type") == "off_ball_run") & (pl.col("targeted"))).sum().alias("off_ball_runs_targeted"),
-            (pl.col("event_subtype") == "dropping_off").sum().alias("dropping_off_runs"),
-            ((pl.col("event_subtype") == "dropping_off") & (pl.col("targeted"))).sum().alias("dropping_off_runs_targeted"),
-            (pl.col("event_subtype") == "coming_short").sum().alias("coming_short_runs"),
-            ((pl.col("event_subtype") == "coming_short") & (pl.col("targeted"))).sum().alias("coming_short_runs_targeted"),
-            (pl.col("event_subtype") == "pulling_wide").sum().alias("pulling_wide_runs"),
-            ((pl.col("event_subtype") == "pulling_wide") & (pl.col("targeted"))).sum().alias("pulling_wide_runs_targeted"),
-            (pl.col("event_subtype") == "pulling_half_space").sum().alias("pulling_half_space_runs"),
-            ((pl.col("event_subtype") == "pulling_half_space") & (pl.col("targeted"))).sum().alias("pulling_half_space_runs_targeted"),
-            (pl.col("event_subtype") == "support").sum().alias("support_runs"),
-            ((pl.col("event_subtype") == "support") & (pl.col("targeted"))).sum().alias("support_runs_targeted"),
-            (pl.col("event_subtype") == "run_ahead_of_the_ball").sum().alias("run_ahead_of_the_ball_runs"),
-            ((pl.col("event_subtype") == "run_ahead_of_the_ball") & (pl.col("targeted"))).sum().alias("run_ahead_of_the_ball_runs_targeted"),
-            (pl.col("event_subtype") == "overlap").sum().alias("overlap_runs"),
-            ((pl.col("event_subtype") == "overlap") & (pl.col("targeted"))).sum().alias("overlap_runs_targeted"),
-            (pl.col("event_subtype") == "underlap").sum().alias("underlap_runs"),
-            ((pl.col("event_subtype") == "underlap") & (pl.col("targeted"))).sum().alias("underlap_runs_targeted"),
-            (pl.col("event_subtype") == "behind").sum().alias("behind_runs"),
-            ((pl.col("event_subtype") == "behind") & (pl.col("targeted"))).sum().alias("behind_runs_targeted"),
-            (pl.col("event_subtype") == "cross_receiver").sum().alias("cross_receiver_runs"),
-            ((pl.col("event_subtype") == "cross_receiver") & (pl.col("targeted"))).sum().alias("cross_receiver_runs_targeted"),
-            (pl.col("event_type") == "on_ball_engagement").sum().alias("on_ball_engagements"),
-            (pl.col("event_subtype") == "pressure").sum().alias("pressures"),
-            (pl.col("event_subtype") == "recovery_press").sum().alias("recovery_pressures"),
-            (pl.col("event_subtype") == "counter_press").sum().alias("counter_pressures"),
-            ((pl.col("event_type") == "on_ball_engagement")
-                & (pl.col("end_type") == "direct_regain")).sum().alias("on_ball_engagement_recoveries"),
-            ((pl.col("event_subtype") == "pressure") 
-                & (pl.col("end_type") == "direct_regain")).sum().alias("pressure_recoveries"),
-            ((pl.col("event_subtype") == "recovery_press")
-                & (pl.col("end_type") == "direct_regain")).sum().alias("recovery_pressure_recoveries"),
-            ((pl.col("event_subtype") == "counter_press")
-                & (pl.col("end_type") == "direct_regain")).sum().alias("counter_pressure_recoveries"),
-            ((pl.col("event_type") == "on_ball_engagement") 
-                & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("on_ball_engagements_high"),
-            ((pl.col("event_type") == "on_ball_engagement")
-                & (pl.col("end_type") == "direct_regain") 
-                & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("on_ball_engagement_high_recoveries"),
-            ((pl.col("event_subtype") == "pressure") 
-                & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("pressures_high"),
-            ((pl.col("event_subtype") == "pressure")
-                & (pl.col("end_type") == "direct_regain") 
-                & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("pressure_high_recoveries"),
-            ((pl.col("event_subtype") == "recovery_press") 
-                & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("recovery_pressures_high"),
-            ((pl.col("event_subtype") == "recovery_press")
-                & (pl.col("end_type") == "direct_regain") 
-                & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("recovery_pressure_high_recoveries"),
-            ((pl.col("event_subtype") == "counter_press") 
-                & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("counter_pressures_high"),
-            ((pl.col("event_subtype") == "counter_press")
-                & (pl.col("end_type") == "direct_regain") 
-                & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("counter_pressure_high_recoveries"),
-            pl.col("passing_option_score").mean().round(2).alias("passing_option_score_avg"),
-        ])
-    )
+        print(f"Player match partials updated ({pending_match_ids.len()} new or changed matches)!")
 
-    agg_player_df = (agg_player_match_df
-        .join(agg_player_dynamic_events_df, on=["player_id", "team_id", "competition_name", "season_name"], how="left")
-        .with_columns(
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("off_ball_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("off_ball_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("off_ball_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("off_ball_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("dropping_off_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("dropping_off_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("dropping_off_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("dropping_off_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("coming_short_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("coming_short_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("coming_short_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("coming_short_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pulling_wide_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("pulling_wide_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pulling_wide_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("pulling_wide_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pulling_half_space_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("pulling_half_space_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pulling_half_space_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("pulling_half_space_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("support_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("support_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("support_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("support_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("run_ahead_of_the_ball_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("run_ahead_of_the_ball_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("run_ahead_of_the_ball_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("run_ahead_of_the_ball_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("overlap_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("overlap_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("overlap_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("overlap_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("underlap_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("underlap_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("underlap_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("underlap_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("behind_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("behind_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("behind_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("behind_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("cross_receiver_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("cross_receiver_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("cross_receiver_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("cross_receiver_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("on_ball_engagements") / pl.col("minutes_played") * 90))
-            ).round(2).alias("on_ball_engagements_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("on_ball_engagement_recoveries") / pl.col("minutes_played") * 90))
-            ).round(2).alias("on_ball_engagement_recoveries_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pressures") / pl.col("minutes_played") * 90))
-            ).round(2).alias("pressures_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pressure_recoveries") / pl.col("minutes_played") * 90))
-            ).round(2).alias("pressure_recoveries_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("recovery_pressures") / pl.col("minutes_played") * 90))
-            ).round(2).alias("recovery_pressures_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("recovery_pressure_recoveries") / pl.col("minutes_played") * 90))
-            ).round(2).alias("recovery_pressure_recoveries_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("counter_pressures") / pl.col("minutes_played") * 90))
-            ).round(2).alias("counter_pressures_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("counter_pressure_recoveries") / pl.col("minutes_played") * 90))
-            ).round(2).alias("counter_pressure_recoveries_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("on_ball_engagements_high") / pl.col("minutes_played") * 90))
-            ).round(2).alias("on_ball_engagements_high_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("on_ball_engagement_high_recoveries") / pl.col("minutes_played") * 90))
-            ).round(2).alias("on_ball_engagement_high_recoveries_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pressures_high") / pl.col("minutes_played") * 90))
-            ).round(2).alias("pressures_high_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pressure_high_recoveries") / pl.col("minutes_played") * 90))
-            ).round(2).alias("pressure_high_recoveries_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("recovery_pressures_high") / pl.col("minutes_played") * 90))
-            ).round(2).alias("recovery_pressures_high_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("recovery_pressure_high_recoveries") / pl.col("minutes_played") * 90))
-            ).round(2).alias("recovery_pressure_high_recoveries_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("counter_pressures_high") / pl.col("minutes_played") * 90))
-            ).round(2).alias("counter_pressures_high_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("counter_pressure_high_recoveries") / pl.col("minutes_played") * 90))
-            ).round(2).alias("counter_pressure_high_recoveries_90"),
+        return player_match_partials
+
+    def write_agg_player(player_match_partials: pl.DataFrame) -> pl.DataFrame:
+        agg_player_season_df = (player_match_partials.lazy()
+            .group_by([
+                "player_id", "team_id", "competition_edition_id"
+            ])
+            .agg([
+                pl.all().exclude(["match_id", "date_time", "position_acronym"]).sum(),
+                # Sorted, so that the positions do not depend on the order the partials were merged in
+                pl.col("position_acronym").drop_nulls().unique().sort().alias("positions_list")
+            ])
+            .filter(pl.col("matches_played") > 0)
+            .with_columns(
+                pl.col("positions_list").list.join(", ").alias("positions")
+            )
+            .drop("positions_list")
+            .join(silver_player.select(["player_id", "short_name", "birthday"]).rename({"short_name":"player_name"}),
+                    on="player_id", how="left")
+            .with_columns(
+                age = (
+                    pl.lit(now.year) - pl.col("birthday").dt.year() -
+                    (
+                        (pl.lit(now.month) < pl.col("birthday").dt.month()) |
+                        ((pl.lit(now.month) == pl.col("birthday").dt.month()) & (pl.lit(now.day) < pl.col("birthday").dt.day()))
+                    )
+                ).cast(pl.Int16)
+            )
+            .join(silver_team.select(["team_id","short_name"]).rename({"short_name":"team_shortname"}),
+                    on="team_id", how="left")
+            .join(silver_competition.select(["competition_edition_id", "competition_id", "season_id", "competition_name", "season_name"]),
+                    on="competition_edition_id", how="left")
+            .with_columns(
+                (pl.when(pl.col("passing_option_score_count") > 0)
+                    .then(pl.col("passing_option_score_sum") / pl.col("passing_option_score_count"))
+                ).round(2).alias("passing_option_score_avg")
+            )
+        ).collect()
+
+        agg_player_df = (agg_player_season_df
+            .select([
+                "player_id", "player_name", "birthday", "age", "team_id", "team_shortname",
+                "competition_id", "competition_name", "season_id", "season_name",
+                "positions", "minutes_played", "matches_played", "starts",
+                *PLAYER_EVENT_METRIC_NAMES, "passing_option_score_avg"
+            ])
+            .with_columns(
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("off_ball_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("off_ball_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("off_ball_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("off_ball_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("dropping_off_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("dropping_off_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("dropping_off_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("dropping_off_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("coming_short_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("coming_short_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("coming_short_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("coming_short_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pulling_wide_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("pulling_wide_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pulling_wide_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("pulling_wide_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pulling_half_space_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("pulling_half_space_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pulling_half_space_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("pulling_half_space_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("support_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("support_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("support_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("support_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("run_ahead_of_the_ball_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("run_ahead_of_the_ball_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("run_ahead_of_the_ball_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("run_ahead_of_the_ball_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("overlap_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("overlap_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("overlap_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("overlap_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("underlap_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("underlap_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("underlap_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("underlap_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("behind_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("behind_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("behind_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("behind_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("cross_receiver_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("cross_receiver_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("cross_receiver_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("cross_receiver_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("on_ball_engagements") / pl.col("minutes_played") * 90))
+                ).round(2).alias("on_ball_engagements_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("on_ball_engagement_recoveries") / pl.col("minutes_played") * 90))
+                ).round(2).alias("on_ball_engagement_recoveries_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pressures") / pl.col("minutes_played") * 90))
+                ).round(2).alias("pressures_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pressure_recoveries") / pl.col("minutes_played") * 90))
+                ).round(2).alias("pressure_recoveries_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("recovery_pressures") / pl.col("minutes_played") * 90))
+                ).round(2).alias("recovery_pressures_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("recovery_pressure_recoveries") / pl.col("minutes_played") * 90))
+                ).round(2).alias("recovery_pressure_recoveries_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("counter_pressures") / pl.col("minutes_played") * 90))
+                ).round(2).alias("counter_pressures_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("counter_pressure_recoveries") / pl.col("minutes_played") * 90))
+                ).round(2).alias("counter_pressure_recoveries_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("on_ball_engagements_high") / pl.col("minutes_played") * 90))
+                ).round(2).alias("on_ball_engagements_high_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("on_ball_engagement_high_recoveries") / pl.col("minutes_played") * 90))
+                ).round(2).alias("on_ball_engagement_high_recoveries_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pressures_high") / pl.col("minutes_played") * 90))
+                ).round(2).alias("pressures_high_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pressure_high_recoveries") / pl.col("minutes_played") * 90))
+                ).round(2).alias("pressure_high_recoveries_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("recovery_pressures_high") / pl.col("minutes_played") * 90))
+                ).round(2).alias("recovery_pressures_high_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("recovery_pressure_high_recoveries") / pl.col("minutes_played") * 90))
+                ).round(2).alias("recovery_pressure_high_recoveries_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("counter_pressures_high") / pl.col("minutes_played") * 90))
+                ).round(2).alias("counter_pressures_high_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("counter_pressure_high_recoveries") / pl.col("minutes_played") * 90))
+                ).round(2).alias("counter_pressure_high_recoveries_90"),
+            )
+            .with_columns(
+                (pl.when(pl.col("off_ball_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("off_ball_runs_targeted") / pl.col("off_ball_runs")) * 100)
+                ).round(2).alias("off_ball_runs_targeted_pct"),
+                (pl.when(pl.col("dropping_off_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("dropping_off_runs_targeted") / pl.col("dropping_off_runs")) * 100)
+                ).round(2).alias("dropping_off_runs_targeted_pct"),
+                (pl.when(pl.col("coming_short_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("coming_short_runs_targeted") / pl.col("coming_short_runs")) * 100)
+                ).round(2).alias("coming_short_runs_targeted_pct"),
+                (pl.when(pl.col("pulling_wide_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pulling_wide_runs_targeted") / pl.col("pulling_wide_runs")) * 100)
+                ).round(2).alias("pulling_wide_runs_targeted_pct"),
+                (pl.when(pl.col("pulling_half_space_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pulling_half_space_runs_targeted") / pl.col("pulling_half_space_runs")) * 100)
+                ).round(2).alias("pulling_half_space_runs_targeted_pct"),
+                (pl.when(pl.col("support_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("support_runs_targeted") / pl.col("support_runs")) * 100)
+                ).round(2).alias("support_runs_targeted_pct"),
+                (pl.when(pl.col("run_ahead_of_the_ball_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("run_ahead_of_the_ball_runs_targeted") / pl.col("run_ahead_of_the_ball_runs")) * 100)
+                ).round(2).alias("run_ahead_of_the_ball_runs_targeted_pct"),
+                (pl.when(pl.col("overlap_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("overlap_runs_targeted") / pl.col("overlap_runs")) * 100)
+                ).round(2).alias("overlap_runs_targeted_pct"),
+                (pl.when(pl.col("underlap_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("underlap_runs_targeted") / pl.col("underlap_runs")) * 100)
+                ).round(2).alias("underlap_runs_targeted_pct"),
+                (pl.when(pl.col("behind_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("behind_runs_targeted") / pl.col("behind_runs")) * 100)
+                ).round(2).alias("behind_runs_targeted_pct"),
+                (pl.when(pl.col("cross_receiver_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("cross_receiver_runs_targeted") / pl.col("cross_receiver_runs")) * 100)
+                ).round(2).alias("cross_receiver_runs_targeted_pct"),
+                (pl.when(pl.col("on_ball_engagements") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("on_ball_engagement_recoveries") / pl.col("on_ball_engagements")) * 100)
+                ).round(2).alias("on_ball_engagement_recoveries_pct"),
+                (pl.when(pl.col("pressures") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pressure_recoveries") / pl.col("pressures")) * 100)
+                ).round(2).alias("pressure_recoveries_pct"),
+                (pl.when(pl.col("recovery_pressures") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("recovery_pressure_recoveries") / pl.col("recovery_pressures")) * 100)
+                ).round(2).alias("recovery_pressure_recoveries_pct"),
+                (pl.when(pl.col("counter_pressures") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("counter_pressure_recoveries") / pl.col("counter_pressures")) * 100)
+                ).round(2).alias("counter_pressure_recoveries_pct"),
+                (pl.when(pl.col("on_ball_engagements_high") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("on_ball_engagement_high_recoveries") / pl.col("on_ball_engagements_high")) * 100)
+                ).round(2).alias("on_ball_engagement_high_recoveries_pct"),
+                (pl.when(pl.col("pressures_high") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pressure_high_recoveries") / pl.col("pressures_high")) * 100)
+                ).round(2).alias("pressure_high_recoveries_pct"),
+                (pl.when(pl.col("recovery_pressures_high") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("recovery_pressure_high_recoveries") / pl.col("recovery_pressures_high")) * 100)
+                ).round(2).alias("recovery_pressure_high_recoveries_pct"),
+                (pl.when(pl.col("counter_pressures_high") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("counter_pressure_high_recoveries") / pl.col("counter_pressures_high")) * 100)
+                ).round(2).alias("counter_pressure_high_recoveries_pct")
+            )
+        ).fill_nan(pl.lit(0.0)).fill_null(pl.lit(0.0))
+
+        agg_player_in_possession_events_df = (agg_player_season_df
+            .filter(pl.col("in_possession_events") > 0)
+            .with_columns(
+                (pl.when(pl.col("passes") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("passes_completed") / pl.col("passes")) * 100)
+                ).round(2).alias("pass_completion_pct"),
+                (pl.when(pl.col("xpass_completion_count") > 0)
+                    .then(pl.col("xpass_completion_sum") / pl.col("xpass_completion_count"))
+                ).round(2).alias("xpass_completion_avg"),
+                (pl.when(pl.col("xpass_completion_completed_count") > 0)
+                    .then(pl.col("xpass_completion_completed_sum") / pl.col("xpass_completion_completed_count"))
+                ).round(2).alias("xpass_completion_completed_avg"),
+                pl.col("xthreat_sum").round(2).alias("xthreat"),
+                (pl.when(pl.col("xthreat_count") > 0)
+                    .then(pl.col("xthreat_sum") / pl.col("xthreat_count"))
+                ).round(2).alias("xthreat_avg"),
+            )
+            .select([
+                "player_id", "team_id", "competition_name", "season_name", "minutes_played", "passes", "passes_completed", "pass_completion_pct", "xpass_completion_avg", 
+                "xpass_completion_completed_avg", "xthreat", "xthreat_avg", "line_breaking_passes", "line_breaking_passes_completed",
+                "first_line_breaking_passes", "second_last_line_breaking_passes", "last_line_breaking_passes",
+                "first_line_breaking_passes_completed", "second_last_line_breaking_passes_completed", "last_line_breaking_passes_completed",
+                "ahead_passes", "ahead_passes_completed"
+            ])
+            .with_columns(
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("line_breaking_passes") / pl.col("minutes_played") * 90))
+                ).round(2).alias("line_breaking_passes_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("line_breaking_passes_completed") / pl.col("minutes_played") * 90))
+                ).round(2).alias("line_breaking_passes_completed_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("first_line_breaking_passes") / pl.col("minutes_played") * 90))
+                ).round(2).alias("first_line_breaking_passes_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("second_last_line_breaking_passes") / pl.col("minutes_played") * 90))
+                ).round(2).alias("second_last_line_breaking_passes_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("last_line_breaking_passes") / pl.col("minutes_played") * 90))
+                ).round(2).alias("last_line_breaking_passes_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("first_line_breaking_passes_completed") / pl.col("minutes_played") * 90))
+                ).round(2).alias("first_line_breaking_passes_completed_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("second_last_line_breaking_passes_completed") / pl.col("minutes_played") * 90))
+                ).round(2).alias("second_last_line_breaking_passes_completed_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("last_line_breaking_passes_completed") / pl.col("minutes_played") * 90))
+                ).round(2).alias("last_line_breaking_passes_completed_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("passes") / pl.col("minutes_played") * 90))
+                ).round(2).alias("passes_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("passes_completed") / pl.col("minutes_played") * 90))
+                ).round(2).alias("passes_completed_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("ahead_passes") / pl.col("minutes_played") * 90))
+                ).round(2).alias("ahead_passes_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("ahead_passes_completed") / pl.col("minutes_played") * 90))
+                ).round(2).alias("ahead_passes_completed_90")
+            )
+            .drop("minutes_played")
+        ).fill_nan(pl.lit(0.0)).fill_null(pl.lit(0.0))
+
+        agg_player_df = agg_player_df.join(
+            agg_player_in_possession_events_df,
+            on=["player_id", "team_id", "competition_name", "season_name"],
+            how="left"
         )
-        .with_columns(
-            (pl.when(pl.col("off_ball_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("off_ball_runs_targeted") / pl.col("off_ball_runs")) * 100)
-            ).round(2).alias("off_ball_runs_targeted_pct"),
-            (pl.when(pl.col("dropping_off_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("dropping_off_runs_targeted") / pl.col("dropping_off_runs")) * 100)
-            ).round(2).alias("dropping_off_runs_targeted_pct"),
-            (pl.when(pl.col("coming_short_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("coming_short_runs_targeted") / pl.col("coming_short_runs")) * 100)
-            ).round(2).alias("coming_short_runs_targeted_pct"),
-            (pl.when(pl.col("pulling_wide_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pulling_wide_runs_targeted") / pl.col("pulling_wide_runs")) * 100)
-            ).round(2).alias("pulling_wide_runs_targeted_pct"),
-            (pl.when(pl.col("pulling_half_space_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pulling_half_space_runs_targeted") / pl.col("pulling_half_space_runs")) * 100)
-            ).round(2).alias("pulling_half_space_runs_targeted_pct"),
-            (pl.when(pl.col("support_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("support_runs_targeted") / pl.col("support_runs")) * 100)
-            ).round(2).alias("support_runs_targeted_pct"),
-            (pl.when(pl.col("run_ahead_of_the_ball_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("run_ahead_of_the_ball_runs_targeted") / pl.col("run_ahead_of_the_ball_runs")) * 100)
-            ).round(2).alias("run_ahead_of_the_ball_runs_targeted_pct"),
-            (pl.when(pl.col("overlap_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("overlap_runs_targeted") / pl.col("overlap_runs")) * 100)
-            ).round(2).alias("overlap_runs_targeted_pct"),
-            (pl.when(pl.col("underlap_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("underlap_runs_targeted") / pl.col("underlap_runs")) * 100)
-            ).round(2).alias("underlap_runs_targeted_pct"),
-            (pl.when(pl.col("behind_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("behind_runs_targeted") / pl.col("behind_runs")) * 100)
-            ).round(2).alias("behind_runs_targeted_pct"),
-            (pl.when(pl.col("cross_receiver_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("cross_receiver_runs_targeted") / pl.col("cross_receiver_runs")) * 100)
-            ).round(2).alias("cross_receiver_runs_targeted_pct"),
-            (pl.when(pl.col("on_ball_engagements") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("on_ball_engagement_recoveries") / pl.col("on_ball_engagements")) * 100)
-            ).round(2).alias("on_ball_engagement_recoveries_pct"),
-            (pl.when(pl.col("pressures") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pressure_recoveries") / pl.col("pressures")) * 100)
-            ).round(2).alias("pressure_recoveries_pct"),
-            (pl.when(pl.col("recovery_pressures") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("recovery_pressure_recoveries") / pl.col("recovery_pressures")) * 100)
-            ).round(2).alias("recovery_pressure_recoveries_pct"),
-            (pl.when(pl.col("counter_pressures") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("counter_pressure_recoveries") / pl.col("counter_pressures")) * 100)
-            ).round(2).alias("counter_pressure_recoveries_pct"),
-            (pl.when(pl.col("on_ball_engagements_high") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("on_ball_engagement_high_recoveries") / pl.col("on_ball_engagements_high")) * 100)
-            ).round(2).alias("on_ball_engagement_high_recoveries_pct"),
-            (pl.when(pl.col("pressures_high") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pressure_high_recoveries") / pl.col("pressures_high")) * 100)
-            ).round(2).alias("pressure_high_recoveries_pct"),
-            (pl.when(pl.col("recovery_pressures_high") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("recovery_pressure_high_recoveries") / pl.col("recovery_pressures_high")) * 100)
-            ).round(2).alias("recovery_pressure_high_recoveries_pct"),
-            (pl.when(pl.col("counter_pressures_high") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("counter_pressure_high_recoveries") / pl.col("counter_pressures_high")) * 100)
-            ).round(2).alias("counter_pressure_high_recoveries_pct")
+
+        agg_player = apply_schema(agg_player_df, "gold_player_aggregates")
+        write_gold_table(agg_player, "agg_player", gold_path, app_ext_data_path)
+
+        print("Aggregated player table created!")
+
+        return agg_player
+
+    def write_player_form(player_match_partials: pl.DataFrame):
+        player_form = apply_schema(
+            build_rolling_form(player_match_partials, ["player_id"], player_form_rate_metrics, windows=form_windows),
+            "gold_player_form"
         )
-    ).fill_nan(pl.lit(0.0)).fill_null(pl.lit(0.0))
+        write_gold_table(player_form, "player_form", gold_path, app_ext_data_path)
 
-    agg_player_in_possession_events_df = (dynamic_events_view_df
-        .select(["player_in_possession_id", "team_id", "competition_name", "season_name", "event_type", "event_subtype", "team_out_of_possession_phase_type", 
-                 "passing_option_score", "targeted", "received", "end_type", "xthreat", "xpass_completion","first_line_break", "second_last_line_break", "last_line_break",
-                 "pass_ahead"
-                ])
-        .group_by([
-             "player_in_possession_id",  "team_id", "competition_name", "season_name"
-        ])
-        .agg([
-            ((pl.col("targeted")) & (pl.col("event_type") == "passing_option")).sum().alias("passes"),
-            ((pl.col("received")) & (pl.col("event_type") == "passing_option")).sum().alias("passes_completed"),
-            pl.col("xpass_completion").filter((pl.col("targeted")) & (pl.col("event_type") == "passing_option")).mean().round(2).alias("xpass_completion_avg"),
-            pl.col("xpass_completion").filter((pl.col("received")) & (pl.col("event_type") == "passing_option")).mean().round(2).alias("xpass_completion_completed_avg"),
-            pl.col("xthreat").filter((pl.col("received")) & (pl.col("event_type") == "passing_option")).sum().round(2).alias("xthreat"),
-            pl.col("xthreat").filter((pl.col("received")) & (pl.col("event_type") == "passing_option")).mean().round(2).alias("xthreat_avg"),
-            ((pl.col("targeted")) & (pl.col("event_type") == "passing_option") & ((pl.col("first_line_break")) | (pl.col("second_last_line_break")) | (pl.col("last_line_break")))).sum().alias("line_breaking_passes"),
-            ((pl.col("received")) & (pl.col("event_type") == "passing_option") & ((pl.col("first_line_break")) | (pl.col("second_last_line_break")) | (pl.col("last_line_break")))).sum().alias("line_breaking_passes_completed"),
-            ((pl.col("targeted")) & (pl.col("event_type") == "passing_option") & (pl.col("first_line_break"))).sum().alias("first_line_breaking_passes"),
-            ((pl.col("targeted")) & (pl.col("event_type") == "passing_option") & (pl.col("second_last_line_break"))).sum().alias("second_last_line_breaking_passes"),
-            ((pl.col("targeted")) & (pl.col("event_type") == "passing_option") & (pl.col("last_line_break"))).sum().alias("last_line_breaking_passes"),
-            ((pl.col("received")) & (pl.col("event_type") == "passing_option") & (pl.col("first_line_break"))).sum().alias("first_line_breaking_passes_completed"),
-            ((pl.col("received")) & (pl.col("event_type") == "passing_option") & (pl.col("second_last_line_break"))).sum().alias("second_last_line_breaking_passes_completed"),
-            ((pl.col("received")) & (pl.col("event_type") == "passing_option") & (pl.col("last_line_break"))).sum().alias("last_line_breaking_passes_completed"),
-            ((pl.col("targeted")) & (pl.col("event_type") == "passing_option") & (pl.col("pass_ahead"))).sum().alias("ahead_passes"),
-            ((pl.col("received")) & (pl.col("event_type") == "passing_option") & (pl.col("pass_ahead"))).sum().alias("ahead_passes_completed"),
-        ])
-        .with_columns(
-            (pl.when(pl.col("passes") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("passes_completed") / pl.col("passes")) * 100)
-            ).round(2).alias("pass_completion_pct")
+        print("Player form table created!")
+
+    def get_player_position_groups() -> pl.DataFrame:
+        return (silver_player_match
+            .filter(pl.col("position_acronym") != "SUB")
+            .group_by(["player_id", "team_id", "competition_id", "season_id"])
+            .agg(pl.col("position_group").drop_nulls().mode().sort().first())
+        ).collect()
+
+    def write_player_percentiles(agg_player: pl.DataFrame, player_position_groups: pl.DataFrame):
+        player_percentiles = apply_schema(
+            build_player_percentiles(agg_player, player_position_groups, min_minutes=percentile_min_minutes),
+            "gold_player_percentiles"
         )
-        .rename({"player_in_possession_id":"player_id"})
-        .select([
-            "player_id", "team_id", "competition_name", "season_name", "passes", "passes_completed", "pass_completion_pct", "xpass_completion_avg", 
-            "xpass_completion_completed_avg", "xthreat", "xthreat_avg", "line_breaking_passes", "line_breaking_passes_completed",
-            "first_line_breaking_passes", "second_last_line_breaking_passes", "last_line_breaking_passes",
-            "first_line_breaking_passes_completed", "second_last_line_breaking_passes_completed", "last_line_breaking_passes_completed",
-            "ahead_passes", "ahead_passes_completed"
-        ])
-        .join(agg_player_match_df, on=["player_id", "team_id", "competition_name", "season_name"], how="left")
-        .with_columns(
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("line_breaking_passes") / pl.col("minutes_played") * 90))
-            ).round(2).alias("line_breaking_passes_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("line_breaking_passes_completed") / pl.col("minutes_played") * 90))
-            ).round(2).alias("line_breaking_passes_completed_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("first_line_breaking_passes") / pl.col("minutes_played") * 90))
-            ).round(2).alias("first_line_breaking_passes_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("second_last_line_breaking_passes") / pl.col("minutes_played") * 90))
-            ).round(2).alias("second_last_line_breaking_passes_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("last_line_breaking_passes") / pl.col("minutes_played") * 90))
-            ).round(2).alias("last_line_breaking_passes_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("first_line_breaking_passes_completed") / pl.col("minutes_played") * 90))
-            ).round(2).alias("first_line_breaking_passes_completed_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("second_last_line_breaking_passes_completed") / pl.col("minutes_played") * 90))
-            ).round(2).alias("second_last_line_breaking_passes_completed_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("last_line_breaking_passes_completed") / pl.col("minutes_played") * 90))
-            ).round(2).alias("last_line_breaking_passes_completed_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("passes") / pl.col("minutes_played") * 90))
-            ).round(2).alias("passes_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("passes_completed") / pl.col("minutes_played") * 90))
-            ).round(2).alias("passes_completed_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("ahead_passes") / pl.col("minutes_played") * 90))
-            ).round(2).alias("ahead_passes_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("ahead_passes_completed") / pl.col("minutes_played") * 90))
-            ).round(2).alias("ahead_passes_completed_90")
+        write_gold_table(player_percentiles, "player_percentiles", gold_path, app_ext_data_path)
+
+        print("Player percentiles table created!")
+
+    def write_similar_players(agg_player: pl.DataFrame, player_position_groups: pl.DataFrame):
+        similar_players = apply_schema(
+            build_similar_players(agg_player, player_position_groups, k=similar_players_k, min_minutes=percentile_min_minutes),
+            "gold_similar_players"
         )
-    ).fill_nan(pl.lit(0.0)).fill_null(pl.lit(0.0))
+        # Without any player over the minutes threshold, the table is written empty, replacing the one of a previous run
+        if similar_players.height == 0:
+            similar_players = pl.DataFrame(schema=gold_schemas["gold_similar_players"])
+        write_gold_table(similar_players, "similar_players", gold_path, app_ext_data_path)
 
-    agg_player_df = agg_player_df.join(
-        agg_player_in_possession_events_df,
-        on=["player_id", "team_id", "competition_name", "season_name"],
-        how="left"
-    )
+        print("Similar players table created!")
 
-    agg_player = apply_schema(agg_player_df, "gold_player_aggregates")
-    agg_player.write_parquet(Path(f"{gold_path}/agg_player.parquet"))
-    agg_player.to_pandas().to_parquet(f"{app_ext_data_path}/agg_player.parquet")
+    def write_team_match_partials(dynamic_events_view: pl.DataFrame) -> pl.DataFrame:
+        team_partials_path = Path(f"{gold_path}/agg_team_match.parquet")
+        fingerprints = get_match_fingerprints(
+            [dynamic_events_view, silver_match.filter(pl.col("match_id").is_in(selected_match_ids))],
+            partials_code
+        )
+        pending_match_ids = (
+            selected_match_ids if selective else get_pending_match_ids(team_partials_path, fingerprints, full_refresh)
+        )
+
+        team_match_partials = merge_match_partials(
+            team_partials_path,
+            collect_partials(apply_schema(
+                build_team_match_partials(
+                    dynamic_events_view.lazy().filter(pl.col("match_id").is_in(pending_match_ids)),
+                    silver_match.filter(pl.col("match_id").is_in(pending_match_ids))
+                ),
+                "gold_team_match_partials"
+            )),
+            match_ids
+        )
+        write_match_partials(
+            team_partials_path,
+            team_match_partials,
+            fingerprints.filter(pl.col("match_id").is_in(pending_match_ids)),
+            match_ids
+        )
+        record_output(team_partials_path, team_match_partials.height)
 
-    print("Aggregated player table created!")
+        print(f"Team match partials updated ({pending_match_ids.len()} new or changed matches)!")
 
-    agg_team_match_df = (
-        pl.concat([
-            silver_match.select(
-                team_id=pl.col("home_team_id"),
-                competition_edition_id=pl.col("competition_edition_id"),
-                first_period_duration_minutes=pl.col("first_period_duration_minutes"),
-                second_period_duration_minutes=pl.col("second_period_duration_minutes")
-            ),
-            silver_match.select(
-                team_id = pl.col("away_team_id"),
-                competition_edition_id = pl.col("competition_edition_id"),
-                first_period_duration_minutes = pl.col("first_period_duration_minutes"),
-                second_period_duration_minutes = pl.col("second_period_duration_minutes")
+        return team_match_partials
+
+    def write_agg_team(team_match_partials: pl.DataFrame):
+        agg_team_season_df = (team_match_partials.lazy()
+            .group_by(["team_id", "competition_edition_id"])
+            .agg(pl.all().exclude(["match_id", "date_time"]).sum())
+            .filter(pl.col("matches_played") > 0)
+            .join(silver_competition.select(["competition_edition_id", "competition_id", "season_id", "competition_name", "season_name"]),
+                on="competition_edition_id", how="left")
+            .join(silver_team.select(["team_id","short_name"]).rename({"short_name":"team_shortname"}),
+                on="team_id", how="left")
+        ).collect()
+
+        agg_team_df = (agg_team_season_df
+            .select([
+                "team_id", "team_shortname", "competition_id", "competition_name", "season_id", "season_name",
+                "minutes_played", "matches_played", *TEAM_EVENT_METRIC_NAMES
+            ])
+            .with_columns(
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("off_ball_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("off_ball_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("off_ball_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("off_ball_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("dropping_off_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("dropping_off_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("dropping_off_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("dropping_off_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("coming_short_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("coming_short_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("coming_short_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("coming_short_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pulling_wide_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("pulling_wide_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pulling_wide_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("pulling_wide_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pulling_half_space_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("pulling_half_space_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pulling_half_space_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("pulling_half_space_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("support_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("support_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("support_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("support_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("run_ahead_of_the_ball_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("run_ahead_of_the_ball_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("run_ahead_of_the_ball_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("run_ahead_of_the_ball_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("overlap_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("overlap_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("overlap_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("overlap_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("underlap_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("underlap_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("underlap_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("underlap_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("behind_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("behind_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("behind_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("behind_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("cross_receiver_runs") / pl.col("minutes_played") * 90))
+                ).round(2).alias("cross_receiver_runs_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("cross_receiver_runs_targeted") / pl.col("minutes_played") * 90))
+                ).round(2).alias("cross_receiver_runs_targeted_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("on_ball_engagements") / pl.col("minutes_played") * 90))
+                ).round(2).alias("on_ball_engagements_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("on_ball_engagement_recoveries") / pl.col("minutes_played") * 90))
+                ).round(2).alias("on_ball_engagement_recoveries_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pressures") / pl.col("minutes_played") * 90))
+                ).round(2).alias("pressures_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pressure_recoveries") / pl.col("minutes_played") * 90))
+                ).round(2).alias("pressure_recoveries_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("recovery_pressures") / pl.col("minutes_played") * 90))
+                ).round(2).alias("recovery_pressures_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("recovery_pressure_recoveries") / pl.col("minutes_played") * 90))
+                ).round(2).alias("recovery_pressure_recoveries_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("counter_pressures") / pl.col("minutes_played") * 90))
+                ).round(2).alias("counter_pressures_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("counter_pressure_recoveries") / pl.col("minutes_played") * 90))
+                ).round(2).alias("counter_pressure_recoveries_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("on_ball_engagements_high") / pl.col("minutes_played") * 90))
+                ).round(2).alias("on_ball_engagements_high_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("on_ball_engagement_high_recoveries") / pl.col("minutes_played") * 90))
+                ).round(2).alias("on_ball_engagement_high_recoveries_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pressures_high") / pl.col("minutes_played") * 90))
+                ).round(2).alias("pressures_high_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pressure_high_recoveries") / pl.col("minutes_played") * 90))
+                ).round(2).alias("pressure_high_recoveries_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("recovery_pressures_high") / pl.col("minutes_played") * 90))
+                ).round(2).alias("recovery_pressures_high_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("recovery_pressure_high_recoveries") / pl.col("minutes_played") * 90))
+                ).round(2).alias("recovery_pressure_high_recoveries_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("counter_pressures_high") / pl.col("minutes_played") * 90))
+                ).round(2).alias("counter_pressures_high_90"),
+                (pl.when(pl.col("minutes_played") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("counter_pressure_high_recoveries") / pl.col("minutes_played") * 90))
+                ).round(2).alias("counter_pressure_high_recoveries_90"),
             )
-        ])
-        .with_columns((pl.col("first_period_duration_minutes") + pl.col("second_period_duration_minutes")).alias("total_match_minutes"))
-        .group_by(["team_id", "competition_edition_id"])
-        .agg(
-            pl.sum("total_match_minutes").alias("minutes_played"),
-            pl.len().alias("matches_played")
+            .with_columns(
+                (pl.when(pl.col("off_ball_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("off_ball_runs_targeted") / pl.col("off_ball_runs")) * 100)
+                ).round(2).alias("off_ball_runs_targeted_pct"),
+                (pl.when(pl.col("dropping_off_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("dropping_off_runs_targeted") / pl.col("dropping_off_runs")) * 100)
+                ).round(2).alias("dropping_off_runs_targeted_pct"),
+                (pl.when(pl.col("coming_short_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("coming_short_runs_targeted") / pl.col("coming_short_runs")) * 100)
+                ).round(2).alias("coming_short_runs_targeted_pct"),
+                (pl.when(pl.col("pulling_wide_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pulling_wide_runs_targeted") / pl.col("pulling_wide_runs")) * 100)
+                ).round(2).alias("pulling_wide_runs_targeted_pct"),
+                (pl.when(pl.col("pulling_half_space_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pulling_half_space_runs_targeted") / pl.col("pulling_half_space_runs")) * 100)
+                ).round(2).alias("pulling_half_space_runs_targeted_pct"),
+                (pl.when(pl.col("support_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("support_runs_targeted") / pl.col("support_runs")) * 100)
+                ).round(2).alias("support_runs_targeted_pct"),
+                (pl.when(pl.col("run_ahead_of_the_ball_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("run_ahead_of_the_ball_runs_targeted") / pl.col("run_ahead_of_the_ball_runs")) * 100)
+                ).round(2).alias("run_ahead_of_the_ball_runs_targeted_pct"),
+                (pl.when(pl.col("overlap_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("overlap_runs_targeted") / pl.col("overlap_runs")) * 100)
+                ).round(2).alias("overlap_runs_targeted_pct"),
+                (pl.when(pl.col("underlap_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("underlap_runs_targeted") / pl.col("underlap_runs")) * 100)
+                ).round(2).alias("underlap_runs_targeted_pct"),
+                (pl.when(pl.col("behind_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("behind_runs_targeted") / pl.col("behind_runs")) * 100)
+                ).round(2).alias("behind_runs_targeted_pct"),
+                (pl.when(pl.col("cross_receiver_runs") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("cross_receiver_runs_targeted") / pl.col("cross_receiver_runs")) * 100)
+                ).round(2).alias("cross_receiver_runs_targeted_pct"),
+                (pl.when(pl.col("on_ball_engagements") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("on_ball_engagement_recoveries") / pl.col("on_ball_engagements")) * 100)
+                ).round(2).alias("on_ball_engagement_recoveries_pct"),
+                (pl.when(pl.col("pressures") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pressure_recoveries") / pl.col("pressures")) * 100)
+                ).round(2).alias("pressure_recoveries_pct"),
+                (pl.when(pl.col("recovery_pressures") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("recovery_pressure_recoveries") / pl.col("recovery_pressures")) * 100)
+                ).round(2).alias("recovery_pressure_recoveries_pct"),
+                (pl.when(pl.col("counter_pressures") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("counter_pressure_recoveries") / pl.col("counter_pressures")) * 100)
+                ).round(2).alias("counter_pressure_recoveries_pct"),
+                (pl.when(pl.col("on_ball_engagements_high") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("on_ball_engagement_recoveries") / pl.col("on_ball_engagements_high")) * 100)
+                ).round(2).alias("on_ball_engagement_high_recoveries_pct"),
+                (pl.when(pl.col("pressures_high") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("pressure_high_recoveries") / pl.col("pressures_high")) * 100)
+                ).round(2).alias("pressure_high_recoveries_pct"),
+                (pl.when(pl.col("recovery_pressures_high") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("recovery_pressure_high_recoveries") / pl.col("recovery_pressures_high")) * 100)
+                ).round(2).alias("recovery_pressure_high_recoveries_pct"),
+                (pl.when(pl.col("counter_pressures_high") == 0)
+                    .then(pl.lit(0.0))
+                    .otherwise((pl.col("counter_pressure_high_recoveries") / pl.col("counter_pressures_high")) * 100)
+                ).round(2).alias("counter_pressure_high_recoveries_pct")
+            )
+        ).fill_nan(pl.lit(0.0)).fill_null(pl.lit(0.0))
+
+        agg_team_lines_recoveries_df = (agg_team_season_df
+            .select([
+                "team_id", "competition_name", "season_name",
+                (pl.when(pl.col("defense_recovery_height_count") > 0)
+                    .then(pl.col("defense_recovery_height_sum") / pl.col("defense_recovery_height_count"))
+                ).round(2).alias("defense_recovery_height_avg"),
+                (pl.when(pl.col("midfield_recovery_height_count") > 0)
+                    .then(pl.col("midfield_recovery_height_sum") / pl.col("midfield_recovery_height_count"))
+                ).round(2).alias("midfield_recovery_height_avg"),
+                (pl.when(pl.col("attack_recovery_height_count") > 0)
+                    .then(pl.col("attack_recovery_height_sum") / pl.col("attack_recovery_height_count"))
+                ).round(2).alias("attack_recovery_height_avg"),
+                "defense_recoveries", "midfield_recoveries", "attack_recoveries",
+            ])
+        )
+    
+        agg_team_df = agg_team_df.join(
+            agg_team_lines_recoveries_df,
+            on=["team_id", "competition_name", "season_name"],
+            how="left"
         )
-        .join(silver_competition.select(["competition_edition_id", "competition_id", "season_id", "competition_name", "season_name"]),
-            on="competition_edition_id", how="left")
-        .join(silver_team.select(["team_id","short_name"]).rename({"short_name":"team_shortname"}),
-            on="team_id", how="left")
-        .select([
-            "team_id", "team_shortname", "competition_id", "competition_name", "season_id", "season_name", "minutes_played", "matches_played"
-        ]).collect()
-    )
 
-    agg_team_dynamic_events_df = (dynamic_events_view_df
-        .select(["team_id", "competition_name", "season_name", "event_type", "event_subtype", "x_end", "team_out_of_possession_phase_type",
-                 "targeted", "end_type"])
-        .group_by([
-            "team_id", "competition_name", "season_name"
-        ])
-        .agg([
-            (pl.col("event_type") == "off_ball_run").sum().alias("off_ball_runs"),
-            ((pl.col("event_type") == "off_ball_run") & (pl.col("targeted"))).sum().alias("off_ball_runs_targeted"),
-            (pl.col("event_subtype") == "dropping_off").sum().alias("dropping_off_runs"),
-            ((pl.col("event_subtype") == "dropping_off") & (pl.col("targeted"))).sum().alias("dropping_off_runs_targeted"),
-            (pl.col("event_subtype") == "coming_short").sum().alias("coming_short_runs"),
-            ((pl.col("event_subtype") == "coming_short") & (pl.col("targeted"))).sum().alias("coming_short_runs_targeted"),
-            (pl.col("event_subtype") == "pulling_wide").sum().alias("pulling_wide_runs"),
-            ((pl.col("event_subtype") == "pulling_wide") & (pl.col("targeted"))).sum().alias("pulling_wide_runs_targeted"),
-            (pl.col("event_subtype") == "pulling_half_space").sum().alias("pulling_half_space_runs"),
-            ((pl.col("event_subtype") == "pulling_half_space") & (pl.col("targeted"))).sum().alias("pulling_half_space_runs_targeted"),
-            (pl.col("event_subtype") == "support").sum().alias("support_runs"),
-            ((pl.col("event_subtype") == "support") & (pl.col("targeted"))).sum().alias("support_runs_targeted"),
-            (pl.col("event_subtype") == "run_ahead_of_the_ball").sum().alias("run_ahead_of_the_ball_runs"),
-            ((pl.col("event_subtype") == "run_ahead_of_the_ball") & (pl.col("targeted"))).sum().alias("run_ahead_of_the_ball_runs_targeted"),
-            (pl.col("event_subtype") == "overlap").sum().alias("overlap_runs"),
-            ((pl.col("event_subtype") == "overlap") & (pl.col("targeted"))).sum().alias("overlap_runs_targeted"),
-            (pl.col("event_subtype") == "underlap").sum().alias("underlap_runs"),
-            ((pl.col("event_subtype") == "underlap") & (pl.col("targeted"))).sum().alias("underlap_runs_targeted"),
-            (pl.col("event_subtype") == "behind").sum().alias("behind_runs"),
-            ((pl.col("event_subtype") == "behind") & (pl.col("targeted"))).sum().alias("behind_runs_targeted"),
-            (pl.col("event_subtype") == "cross_receiver").sum().alias("cross_receiver_runs"),
-            ((pl.col("event_subtype") == "cross_receiver") & (pl.col("targeted"))).sum().alias("cross_receiver_runs_targeted"),
-            (pl.col("event_type") == "on_ball_engagement").sum().alias("on_ball_engagements"),
-            (pl.col("event_subtype") == "pressure").sum().alias("pressures"),
-            (pl.col("event_subtype") == "recovery_press").sum().alias("recovery_pressures"),
-            (pl.col("event_subtype") == "counter_press").sum().alias("counter_pressures"),
-            ((pl.col("event_type") == "on_ball_engagement")
-                & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))).sum().alias("on_ball_engagement_recoveries"),
-            ((pl.col("event_subtype") == "pressure") 
-                & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))).sum().alias("pressure_recoveries"),
-            ((pl.col("event_subtype") == "recovery_press")
-                & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))).sum().alias("recovery_pressure_recoveries"),
-            ((pl.col("event_subtype") == "counter_press")
-                & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))).sum().alias("counter_pressure_recoveries"),
-            ((pl.col("event_type") == "on_ball_engagement") 
-                & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("on_ball_engagements_high"),
-            ((pl.col("event_type") == "on_ball_engagement")
-                & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"])) 
-                & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("on_ball_engagement_high_recoveries"),
-            ((pl.col("event_subtype") == "pressure") 
-                & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("pressures_high"),
-            ((pl.col("event_subtype") == "pressure")
-                & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"])) 
-                & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("pressure_high_recoveries"),
-            ((pl.col("event_subtype") == "recovery_press") 
-                & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("recovery_pressures_high"),
-            ((pl.col("event_subtype") == "recovery_press")
-                & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"])) 
-                & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("recovery_pressure_high_recoveries"),
-            ((pl.col("event_subtype") == "counter_press") 
-                & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("counter_pressures_high"),
-            ((pl.col("event_subtype") == "counter_press")
-                & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"])) 
-                & (pl.col("team_out_of_possession_phase_type") == "high_block")).sum().alias("counter_pressure_high_recoveries"),
-        ])
-    )
+        agg_team = apply_schema(agg_team_df, "gold_team_aggregates")
+        write_gold_table(agg_team, "agg_team", gold_path, app_ext_data_path)
 
-    agg_team_df = (agg_team_match_df
-        .join(agg_team_dynamic_events_df, on=["team_id", "competition_name", "season_name"], how="left")
-        .with_columns(
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("off_ball_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("off_ball_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("off_ball_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("off_ball_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("dropping_off_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("dropping_off_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("dropping_off_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("dropping_off_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("coming_short_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("coming_short_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("coming_short_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("coming_short_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pulling_wide_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("pulling_wide_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pulling_wide_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("pulling_wide_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pulling_half_space_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("pulling_half_space_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pulling_half_space_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("pulling_half_space_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("support_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("support_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("support_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("support_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("run_ahead_of_the_ball_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("run_ahead_of_the_ball_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("run_ahead_of_the_ball_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("run_ahead_of_the_ball_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("overlap_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("overlap_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("overlap_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("overlap_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("underlap_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("underlap_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("underlap_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("underlap_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("behind_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("behind_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("behind_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("behind_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("cross_receiver_runs") / pl.col("minutes_played") * 90))
-            ).round(2).alias("cross_receiver_runs_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("cross_receiver_runs_targeted") / pl.col("minutes_played") * 90))
-            ).round(2).alias("cross_receiver_runs_targeted_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("on_ball_engagements") / pl.col("minutes_played") * 90))
-            ).round(2).alias("on_ball_engagements_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("on_ball_engagement_recoveries") / pl.col("minutes_played") * 90))
-            ).round(2).alias("on_ball_engagement_recoveries_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pressures") / pl.col("minutes_played") * 90))
-            ).round(2).alias("pressures_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pressure_recoveries") / pl.col("minutes_played") * 90))
-            ).round(2).alias("pressure_recoveries_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("recovery_pressures") / pl.col("minutes_played") * 90))
-            ).round(2).alias("recovery_pressures_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("recovery_pressure_recoveries") / pl.col("minutes_played") * 90))
-            ).round(2).alias("recovery_pressure_recoveries_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("counter_pressures") / pl.col("minutes_played") * 90))
-            ).round(2).alias("counter_pressures_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("counter_pressure_recoveries") / pl.col("minutes_played") * 90))
-            ).round(2).alias("counter_pressure_recoveries_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("on_ball_engagements_high") / pl.col("minutes_played") * 90))
-            ).round(2).alias("on_ball_engagements_high_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("on_ball_engagement_high_recoveries") / pl.col("minutes_played") * 90))
-            ).round(2).alias("on_ball_engagement_high_recoveries_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pressures_high") / pl.col("minutes_played") * 90))
-            ).round(2).alias("pressures_high_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pressure_high_recoveries") / pl.col("minutes_played") * 90))
-            ).round(2).alias("pressure_high_recoveries_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("recovery_pressures_high") / pl.col("minutes_played") * 90))
-            ).round(2).alias("recovery_pressures_high_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("recovery_pressure_high_recoveries") / pl.col("minutes_played") * 90))
-            ).round(2).alias("recovery_pressure_high_recoveries_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("counter_pressures_high") / pl.col("minutes_played") * 90))
-            ).round(2).alias("counter_pressures_high_90"),
-            (pl.when(pl.col("minutes_played") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("counter_pressure_high_recoveries") / pl.col("minutes_played") * 90))
-            ).round(2).alias("counter_pressure_high_recoveries_90"),
-        )
-        .with_columns(
-            (pl.when(pl.col("off_ball_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("off_ball_runs_targeted") / pl.col("off_ball_runs")) * 100)
-            ).round(2).alias("off_ball_runs_targeted_pct"),
-            (pl.when(pl.col("dropping_off_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("dropping_off_runs_targeted") / pl.col("dropping_off_runs")) * 100)
-            ).round(2).alias("dropping_off_runs_targeted_pct"),
-            (pl.when(pl.col("coming_short_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("coming_short_runs_targeted") / pl.col("coming_short_runs")) * 100)
-            ).round(2).alias("coming_short_runs_targeted_pct"),
-            (pl.when(pl.col("pulling_wide_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pulling_wide_runs_targeted") / pl.col("pulling_wide_runs")) * 100)
-            ).round(2).alias("pulling_wide_runs_targeted_pct"),
-            (pl.when(pl.col("pulling_half_space_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pulling_half_space_runs_targeted") / pl.col("pulling_half_space_runs")) * 100)
-            ).round(2).alias("pulling_half_space_runs_targeted_pct"),
-            (pl.when(pl.col("support_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("support_runs_targeted") / pl.col("support_runs")) * 100)
-            ).round(2).alias("support_runs_targeted_pct"),
-            (pl.when(pl.col("run_ahead_of_the_ball_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("run_ahead_of_the_ball_runs_targeted") / pl.col("run_ahead_of_the_ball_runs")) * 100)
-            ).round(2).alias("run_ahead_of_the_ball_runs_targeted_pct"),
-            (pl.when(pl.col("overlap_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("overlap_runs_targeted") / pl.col("overlap_runs")) * 100)
-            ).round(2).alias("overlap_runs_targeted_pct"),
-            (pl.when(pl.col("underlap_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("underlap_runs_targeted") / pl.col("underlap_runs")) * 100)
-            ).round(2).alias("underlap_runs_targeted_pct"),
-            (pl.when(pl.col("behind_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("behind_runs_targeted") / pl.col("behind_runs")) * 100)
-            ).round(2).alias("behind_runs_targeted_pct"),
-            (pl.when(pl.col("cross_receiver_runs") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("cross_receiver_runs_targeted") / pl.col("cross_receiver_runs")) * 100)
-            ).round(2).alias("cross_receiver_runs_targeted_pct"),
-            (pl.when(pl.col("on_ball_engagements") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("on_ball_engagement_recoveries") / pl.col("on_ball_engagements")) * 100)
-            ).round(2).alias("on_ball_engagement_recoveries_pct"),
-            (pl.when(pl.col("pressures") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pressure_recoveries") / pl.col("pressures")) * 100)
-            ).round(2).alias("pressure_recoveries_pct"),
-            (pl.when(pl.col("recovery_pressures") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("recovery_pressure_recoveries") / pl.col("recovery_pressures")) * 100)
-            ).round(2).alias("recovery_pressure_recoveries_pct"),
-            (pl.when(pl.col("counter_pressures") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("counter_pressure_recoveries") / pl.col("counter_pressures")) * 100)
-            ).round(2).alias("counter_pressure_recoveries_pct"),
-            (pl.when(pl.col("on_ball_engagements_high") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("on_ball_engagement_recoveries") / pl.col("on_ball_engagements_high")) * 100)
-            ).round(2).alias("on_ball_engagement_high_recoveries_pct"),
-            (pl.when(pl.col("pressures_high") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("pressure_high_recoveries") / pl.col("pressures_high")) * 100)
-            ).round(2).alias("pressure_high_recoveries_pct"),
-            (pl.when(pl.col("recovery_pressures_high") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("recovery_pressure_high_recoveries") / pl.col("recovery_pressures_high")) * 100)
-            ).round(2).alias("recovery_pressure_high_recoveries_pct"),
-            (pl.when(pl.col("counter_pressures_high") == 0)
-                .then(pl.lit(0.0))
-                .otherwise((pl.col("counter_pressure_high_recoveries") / pl.col("counter_pressures_high")) * 100)
-            ).round(2).alias("counter_pressure_high_recoveries_pct")
+        print("Aggregated team table created!")
+
+    def write_team_form(team_match_partials: pl.DataFrame):
+        team_form = apply_schema(
+            build_rolling_form(team_match_partials, ["team_id"], team_form_rate_metrics, windows=form_windows),
+            "gold_team_form"
         )
-    ).fill_nan(pl.lit(0.0)).fill_null(pl.lit(0.0))
+        write_gold_table(team_form, "team_form", gold_path, app_ext_data_path)
 
-    agg_team_lines_recoveries_df = (dynamic_events_view_df
-        .select(["team_id", "competition_name", "season_name", "position_group", "event_type", "x_end", "end_type"])
-        .group_by([
-            "team_id", "competition_name", "season_name", "position_group"
-        ])
-        .agg([
-            (pl.col("x_end").filter((pl.col("event_type") == "on_ball_engagement")
-                & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))
-                & (pl.col("position_group").is_in(["Full Back","Central Defender"])))).mean().round(2).alias("defense_recovery_height_avg"),
-            (pl.col("x_end").filter((pl.col("event_type") == "on_ball_engagement")
-                & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))
-                & (pl.col("position_group") == "Midfield"))).mean().round(2).alias("midfield_recovery_height_avg"),
-            (pl.col("x_end").filter((pl.col("event_type") == "on_ball_engagement")
-                & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))
-                & (pl.col("position_group").is_in(["Center Forward","Wide Attacker"])))).mean().round(2).alias("attack_recovery_height_avg"),
-            ((pl.col("event_type") == "on_ball_engagement")
-                & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))
-                & (pl.col("position_group").is_in(["Full Back","Central Defender"]))).sum().alias("defense_recoveries"),
-            ((pl.col("event_type") == "on_ball_engagement")
-                & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))
-                & (pl.col("position_group") == "Midfield")).sum().alias("midfield_recoveries"),
-            ((pl.col("event_type") == "on_ball_engagement")
-                & (pl.col("end_type").is_in(["direct_regain", "indirect_regain"]))
-                & (pl.col("position_group").is_in(["Center Forward","Wide Attacker"]))).sum().alias("attack_recoveries"),
-        ])
-    )
-    
-    agg_team_df = agg_team_df.join(
-        agg_team_lines_recoveries_df,
-        on=["team_id", "competition_name", "season_name"],
-        how="left"
-    )
+        print("Team form table created!")
 
-    agg_team = apply_schema(agg_team_df, "gold_team_aggregates")
-    agg_team.write_parquet(Path(f"{gold_path}/agg_team.parquet"))
-    agg_team.to_pandas().to_parquet(f"{app_ext_data_path}/agg_team.parquet")
+    tasks = {
+        "tracking_view": (write_tracking_view, []),
+        "tracking_lod": (write_tracking_lod, ["tracking_view"]),
+        "dynamic_events_view": (write_dynamic_events_view, []),
+        "dynamic_events_index": (write_dynamic_events_index, ["dynamic_events_view"]),
+        "event_snapshots": (write_event_snapshots, ["tracking_view", "dynamic_events_view"]),
+        "player_match_partials": (write_player_match_partials, ["dynamic_events_view"]),
+        "agg_player": (write_agg_player, ["player_match_partials"]),
+        "player_form": (write_player_form, ["player_match_partials"]),
+        "player_position_groups": (get_player_position_groups, []),
+        "player_percentiles": (write_player_percentiles, ["agg_player", "player_position_groups"]),
+        "similar_players": (write_similar_players, ["agg_player", "player_position_groups"]),
+        "team_match_partials": (write_team_match_partials, ["dynamic_events_view"]),
+        "agg_team": (write_agg_team, ["team_match_partials"]),
+        "team_form": (write_team_form, ["team_match_partials"]),
+    }
+    _, timings = run_tasks(tasks, max_workers=1 if out_of_core else max_workers)
+    report_tasks("Gold layer", tasks, timings)
 
-    print("Aggregated team table created!")
+    if out_of_core:
+        clear_spill_path(spill_path)
 
     print("Gold layer build completed!")
 
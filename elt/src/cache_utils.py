@@ -0,0 +1,183 @@
+'''
+Utilities to memoize pipeline stages: cache keys built from the state of the stage inputs, its code and parameters.
+'''
+
+import ast
+import hashlib
+import json
+from deltalake import DeltaTable
+from pathlib import Path
+
+MAINTENANCE_OPERATIONS = {"OPTIMIZE", "VACUUM START", "VACUUM END"}
+
+
+'''
+Get the path of the maintenance log of a Delta Lake table: a JSON file next to the table folder, listing the commits
+of maintenance rewrites. Those are plain overwrite commits (WRITE operations) that keep the rows of the table, so they
+are told apart from data changes by this log.
+
+:param path: Path to the Delta Lake table.
+
+:return: Path to the maintenance log.
+'''
+def get_maintenance_log_path(path: Path) -> Path:
+    return path.with_name(f"{path.name}.maintenance.json")
+
+
+'''
+Get the commits listed in the maintenance log of a Delta Lake table.
+
+:param path: Path to the Delta Lake table.
+
+:return: Commits, as (version, timestamp) pairs.
+'''
+def get_maintenance_commits(path: Path) -> set[tuple[int, int]]:
+    log_path = get_maintenance_log_path(path)
+    if not log_path.exists():
+        return set()
+    return {tuple(commit) for commit in json.loads(log_path.read_text(encoding="utf-8"))}
+
+
+'''
+Record the last commit of a Delta Lake table as a maintenance rewrite, which left its data unchanged. Commits are
+identified by their version and timestamp, so that a table recreated under the same path does not match them.
+
+:param path: Path to the Delta Lake table.
+'''
+def record_maintenance_commit(path: Path):
+    commit = DeltaTable(str(path)).history(1)[0]
+    commits = get_maintenance_commits(path) | {(commit["version"], commit["timestamp"])}
+    get_maintenance_log_path(path).write_text(json.dumps(sorted(commits)), encoding="utf-8")
+
+
+'''
+Get the version of a Delta Lake table that last changed its data: maintenance commits (compaction, vacuum, and the
+rewrites recorded by record_maintenance_commit) are skipped, so that maintaining a table does not invalidate the
+stages reading it.
+
+:param path: Path to the Delta Lake table.
+
+:return: Table version.
+'''
+def delta_data_version(path: Path) -> int:
+    table = DeltaTable(str(path))
+    rewrites = get_maintenance_commits(path)
+    for commit in table.history():
+        if commit["operation"] in MAINTENANCE_OPERATIONS or (commit["version"], commit["timestamp"]) in rewrites:
+            continue
+        return commit["version"]
+    return table.version()
+
+
+'''
+Get a fingerprint of a pipeline input: the data version of a Delta Lake table, or the name, size and modification time
+of a file or of every file in a directory.
+
+:param path: Path to the Delta Lake table, file or directory.
+
+:return: JSON-serializable fingerprint, or None if the path does not exist.
+'''
+def path_fingerprint(path: Path):
+    if not path.exists():
+        return None
+
+    if (path / "_delta_log").is_dir():
+        return {"delta_version": delta_data_version(path)}
+
+    files = [path] if path.is_file() else sorted(file for file in path.rglob("*") if file.is_file())
+    return [
+        [str(file.relative_to(path)) if file != path else file.name, file.stat().st_size, file.stat().st_mtime_ns]
+        for file in files
+    ]
+
+
+'''
+Get the version of a file, as a digest of its fingerprint: it changes whenever the file is rewritten.
+
+:param path: Path to the file.
+
+:return: Hex digest of the file fingerprint.
+'''
+def file_version(path: Path) -> str:
+    return hashlib.sha256(json.dumps(path_fingerprint(path)).encode()).hexdigest()[:16]
+
+
+'''
+Hash the source of the modules implementing a stage.
+
+:param files: Paths to the source files.
+
+:return: Hex digest of the source files contents.
+'''
+def code_fingerprint(files: list[Path]) -> str:
+    digest = hashlib.sha256()
+    for file in sorted(files):
+        digest.update(file.name.encode())
+        digest.update(file.read_bytes())
+    return digest.hexdigest()
+
+
+'''
+Get the source files of a module and of the modules it imports from its own folder, recursively, so that the code
+fingerprint of a stage covers every helper it runs.
+
+:param path: Path to the module source file.
+
+:return: Paths to the source files, sorted.
+'''
+def module_files(path: Path) -> list[Path]:
+    files, pending = set(), [path.resolve()]
+    while pending:
+        file = pending.pop()
+        if file in files:
+            continue
+        files.add(file)
+        for node in ast.walk(ast.parse(file.read_text(encoding="utf-8"))):
+            names = [alias.name for alias in node.names] if isinstance(node, ast.Import) else []
+            if isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            pending.extend(file.with_name(f"{name}.py") for name in names if file.with_name(f"{name}.py").is_file())
+    return sorted(files)
+
+
+'''
+Build the cache key of a stage from the fingerprint of its inputs, its code and its parameters.
+
+:param inputs: JSON-serializable fingerprint of the stage inputs.
+:param code: Hex digest of the stage code.
+:param params: Stage parameters.
+
+:return: Hex digest identifying the stage run.
+'''
+def stage_cache_key(inputs, code: str, params: dict) -> str:
+    payload = json.dumps({"inputs": inputs, "code": code, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+'''
+Load the cache keys of the last successful run of every stage.
+
+:param path: Path to the cache state file.
+
+:return: Cache keys by stage name.
+'''
+def load_cache_state(path: Path) -> dict[str, str]:
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        return {}
+
+
+'''
+Save the cache keys of the last successful run of every stage.
+
+:param path: Path to the cache state file.
+:param state: Cache keys by stage name.
+'''
+def save_cache_state(path: Path, state: dict[str, str]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+    tmp_path.replace(path)
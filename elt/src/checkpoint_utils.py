@@ -0,0 +1,183 @@
+'''
+Utilities for checkpointed, resumable pipeline runs: a run-state file records the stages and the steps of the current
+run as they complete, so that a rerun after a failure resumes from the first incomplete step instead of starting over.
+
+Steps are identified by their profiling path (e.g. "silver/write/tracking" or "gold/agg_team") and only count for
+the stage run they were recorded in: a stage whose inputs, code or parameters changed since starts from scratch.
+'''
+
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from profile_utils import current_step_path
+
+_lock = threading.Lock()
+_run_state_path: Path | None = None
+_run_state: dict | None = None
+_stage: str | None = None
+
+
+'''
+Save the run state, atomically so that a crash while saving cannot corrupt it.
+'''
+def _save_run_state():
+    _run_state_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = _run_state_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(_run_state, indent=2, sort_keys=True), encoding="utf-8")
+    tmp_path.replace(_run_state_path)
+
+
+'''
+Start a checkpointed run. When the previous run did not complete (it failed, or the process died), its checkpoints
+are kept and the run resumes from them.
+
+:param path: Path to the run-state file.
+:param resume: Resume an incomplete previous run (default is True). When False, its checkpoints are discarded.
+
+:return: True if the run resumes an incomplete previous run.
+'''
+def start_run(path: Path, resume: bool = True) -> bool:
+    global _run_state_path, _run_state, _stage
+
+    previous = None
+    if resume and path.exists():
+        try:
+            previous = json.loads(path.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            previous = None
+
+    resumed = previous is not None and previous.get("status") != "completed" and bool(previous.get("stages"))
+
+    with _lock:
+        _run_state_path = path
+        _run_state = previous if resumed else {"stages": {}}
+        _run_state["status"] = "running"
+        _run_state["started_at"] = datetime.now().isoformat(timespec="seconds")
+        _stage = None
+        _save_run_state()
+
+    return resumed
+
+
+'''
+Finish the checkpointed run. A completed run leaves nothing to resume, the next run starts from scratch.
+
+:param status: Final status of the run, "completed" or "failed".
+'''
+def finish_run(status: str):
+    global _run_state_path, _run_state, _stage
+
+    if _run_state is None:
+        return
+
+    with _lock:
+        _run_state["status"] = status
+        _run_state["finished_at"] = datetime.now().isoformat(timespec="seconds")
+        _save_run_state()
+        _run_state_path, _run_state, _stage = None, None, None
+
+
+'''
+Tell whether a stage completed in the resumed run.
+
+:param name: Name of the stage.
+:param key: Key of the stage run, from its inputs, code and parameters.
+
+:return: True if the same stage run (same key) completed.
+'''
+def is_stage_completed(name: str, key: str) -> bool:
+    if _run_state is None:
+        return False
+
+    with _lock:
+        entry = _run_state["stages"].get(name)
+        return entry is not None and entry.get("key") == key and entry.get("status") == "completed"
+
+
+'''
+Start a stage of the checkpointed run. The steps the stage checkpointed in the resumed run are kept if it is the same
+stage run (same key) and it did not complete, and discarded otherwise.
+
+:param name: Name of the stage.
+:param key: Key of the stage run, from its inputs, code and parameters.
+'''
+def start_stage(name: str, key: str):
+    global _stage
+
+    if _run_state is None:
+        return
+
+    with _lock:
+        entry = _run_state["stages"].get(name)
+        if entry is None or entry.get("key") != key or entry.get("status") == "completed":
+            entry = _run_state["stages"][name] = {"key": key, "steps": []}
+        entry["status"] = "running"
+        _stage = name
+        _save_run_state()
+
+
+'''
+Record the end of the current stage of the checkpointed run.
+
+:param name: Name of the stage.
+:param status: Status of the stage, "completed" or "failed".
+:param key: Key of the stage run, for stages completed without being started (e.g. skipped by the stage cache).
+'''
+def finish_stage(name: str, status: str, key: str | None = None):
+    global _stage
+
+    if _run_state is None:
+        return
+
+    with _lock:
+        entry = _run_state["stages"].setdefault(name, {"key": key, "steps": []})
+        if key is not None and entry.get("key") != key:
+            entry.update({"key": key, "steps": []})
+        entry["status"] = status
+        _stage = None
+        _save_run_state()
+
+
+'''
+Get the path of a step, as recorded in the run state.
+
+:param name: Name of the step.
+:param parent: Path of the parent step (default is None, the step running in the current thread).
+
+:return: Step path.
+'''
+def step_path(name: str, parent: str | None = None) -> str:
+    parent = parent if parent is not None else current_step_path()
+    return f"{parent}/{name}" if parent else name
+
+
+'''
+Tell whether a step of the current stage completed in the resumed run.
+
+:param path: Step path.
+
+:return: True if the step can be skipped.
+'''
+def is_step_completed(path: str) -> bool:
+    if _run_state is None or _stage is None:
+        return False
+
+    with _lock:
+        return path in _run_state["stages"][_stage]["steps"]
+
+
+'''
+Checkpoint a completed step of the current stage: its outputs are persisted, a rerun does not need to run it again.
+
+:param path: Step path.
+'''
+def complete_step(path: str):
+    if _run_state is None or _stage is None:
+        return
+
+    with _lock:
+        steps = _run_state["stages"][_stage]["steps"]
+        if path not in steps:
+            steps.append(path)
+            _save_run_state()
@@ -0,0 +1,144 @@
+'''
+Utilities to run independent table builds concurrently, respecting their data dependencies.
+'''
+
+import polars as pl
+import time
+from checkpoint_utils import complete_step, is_step_completed, step_path
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from memory_utils import check_memory_budget
+from profile_utils import current_step_path, profile_step
+from typing import Callable
+
+
+'''
+Run a DAG of tasks on a thread pool: each task starts as soon as all of its dependencies have finished. Polars and
+PyArrow release the GIL while they work, so tasks run concurrently without copying frames between processes. Each
+task is profiled as a step nested in the step running the tasks, and the memory budget of the run is checked after it.
+Each completed task is checkpointed: when resuming a run, a task completed before is skipped as long as no task left
+to run needs its result.
+
+:param tasks: Tasks by name, as (callable, dependency names). The callable receives the results of its dependencies
+    as keyword arguments named after them.
+:param max_workers: Maximum number of tasks running at once (default is None, the thread pool default).
+
+:return: Tuple with the task results by name and the task (start, end) times in seconds from the start of the run.
+'''
+def run_tasks(
+    tasks: dict[str, tuple[Callable, list[str]]],
+    max_workers: int | None = None,
+) -> tuple[dict[str, object], dict[str, tuple[float, float]]]:
+    for name, (_, dependencies) in tasks.items():
+        unknown = [dependency for dependency in dependencies if dependency not in tasks]
+        if unknown:
+            raise ValueError(f"Task '{name}' depends on unknown tasks: {unknown}")
+
+    origin = time.perf_counter()
+    parent = current_step_path()
+    results, timings = {}, {}
+    pending = dict(tasks)
+    running: dict[Future, str] = {}
+
+    # Results are handed over in memory: a completed task is only skipped if all of its dependents are skipped too
+    skipped = {name for name in tasks if is_step_completed(step_path(name, parent))}
+    while True:
+        needed = {
+            dependency
+            for name, (_, dependencies) in tasks.items() if name not in skipped
+            for dependency in dependencies
+        }
+        if not skipped & needed:
+            break
+        skipped -= needed
+
+    for name in [name for name in tasks if name in skipped]:
+        pending.pop(name)
+        results[name] = None
+        with profile_step(name, parent=parent) as step:
+            step["status"] = "resumed"
+        print(f"Skipped: {name} (completed by the interrupted run)", flush=True)
+
+    def run(name: str, task: Callable, dependencies: list[str]):
+        inputs = {dependency: results[dependency] for dependency in dependencies}
+        rows_in = sum(df.height for df in inputs.values() if isinstance(df, pl.DataFrame)) if inputs else None
+
+        start = time.perf_counter() - origin
+        with profile_step(name, rows_in=rows_in, parent=parent) as step:
+            result = task(**inputs)
+            if step["rows_out"] is None and isinstance(result, pl.DataFrame):
+                step["rows_out"] = result.height
+        timings[name] = (start, time.perf_counter() - origin)
+        check_memory_budget(f"task {name}")
+        complete_step(step_path(name, parent))
+
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            ready = [name for name, (_, dependencies) in pending.items() if all(d in results for d in dependencies)]
+            for name in ready:
+                task, dependencies = pending.pop(name)
+                running[executor.submit(run, name, task, dependencies)] = name
+
+            if not running:
+                raise ValueError(f"Cycle between tasks: {sorted(pending)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                error = future.exception()
+                if error is not None:
+                    for other in running:
+                        other.cancel()
+                    raise error
+                results[name] = future.result()
+
+    return results, timings
+
+
+'''
+Get the critical path of a finished run: the chain of dependent tasks with the longest total duration, which bounds
+the wall time of the run however many workers are available.
+
+:param tasks: Tasks by name, as (callable, dependency names).
+:param timings: Task (start, end) times, as returned by run_tasks.
+
+:return: Tuple with the task names along the critical path and its total duration in seconds.
+'''
+def critical_path(
+    tasks: dict[str, tuple[Callable, list[str]]],
+    timings: dict[str, tuple[float, float]],
+) -> tuple[list[str], float]:
+    longest: dict[str, tuple[float, list[str]]] = {}
+
+    def visit(name: str) -> tuple[float, list[str]]:
+        if name not in longest:
+            start, end = timings[name]
+            upstream = max((visit(dependency) for dependency in tasks[name][1]), default=(0.0, []), key=lambda x: x[0])
+            longest[name] = (upstream[0] + end - start, upstream[1] + [name])
+        return longest[name]
+
+    duration, path = max((visit(name) for name in timings), default=(0.0, []), key=lambda x: x[0])
+    return path, duration
+
+
+'''
+Print the wall time, the summed task time and the critical path of a finished run.
+
+:param label: Name of the run (e.g. the pipeline stage).
+:param tasks: Tasks by name, as (callable, dependency names).
+:param timings: Task (start, end) times, as returned by run_tasks.
+'''
+def report_tasks(
+    label: str,
+    tasks: dict[str, tuple[Callable, list[str]]],
+    timings: dict[str, tuple[float, float]],
+):
+    if not timings:
+        return
+
+    wall = max(end for _, end in timings.values())
+    total = sum(end - start for start, end in timings.values())
+    path, duration = critical_path(tasks, timings)
+
+    print(f"{label}: {wall:.2f}s wall, {total:.2f}s task time, critical path {' -> '.join(path)} ({duration:.2f}s)")
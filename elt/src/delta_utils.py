@@ -2,23 +2,521 @@
 Utility functions for reading from and writing to Delta Lake tables
 '''
 
+import itertools
+import json
 import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
+import tempfile
+from datetime import datetime
 from deltalake import DeltaTable, write_deltalake
+from deltalake.exceptions import DeltaError
 from pathlib import Path
+from typing import Iterator
 from schemas import get_arrow_schema, apply_schema
+from cache_utils import record_maintenance_commit
+from memory_utils import get_batch_rows
+from profile_utils import profile_step, record_output
+
+MB = 1024 * 1024
 
 
 '''
-Read a Delta Lake table from the specified path into a Polars LazyFrame.
+Read a Delta Lake table from the specified path into a Polars LazyFrame. Partition filters prune files from the
+table log, and the row predicate and column selection are pushed down into the scan: files whose statistics rule the
+predicate out are skipped, as are the Parquet row groups within the files read, and only the selected columns are
+read.
 
 :param path: Path to the Delta Lake table.
+:param columns: Columns to read (default is None, every column).
+:param predicate: Row filter (default is None, every row).
+:param partitions: Partition filters, as (column, operator, value) tuples (default is None, every partition).
+:param version: Version of the table to read (default is None, the latest).
+:param timestamp: Read the table as of this time, as a datetime or an ISO 8601 string (default is None, the latest).
 
 :return: Polars LazyFrame containing the data from the Delta Lake table.
 '''
-def read_delta(path: Path) -> pl.LazyFrame:
-    dt = DeltaTable(str(path))
-    ds = dt.to_pyarrow_dataset()
-    return pl.scan_pyarrow_dataset(ds)
+def read_delta(
+    path: Path,
+    columns: list[str] | None = None,
+    predicate: pl.Expr | None = None,
+    partitions: list[tuple[str, str, object]] | None = None,
+    version: int | None = None,
+    timestamp: datetime | str | None = None,
+) -> pl.LazyFrame:
+    if version is not None and timestamp is not None:
+        raise ValueError("A table is read either at a version or at a timestamp, not both")
+
+    dt = DeltaTable(str(path), version=version)
+    if timestamp is not None:
+        dt.load_with_datetime(timestamp if isinstance(timestamp, str) else timestamp.astimezone().isoformat())
+
+    ds = dt.to_pyarrow_dataset(partitions=partitions)
+    lf = pl.scan_pyarrow_dataset(ds)
+
+    # Polars hands the predicate and the projection over to the PyArrow scanner, which checks them against the
+    # statistics of every file (kept in the table log) and row group
+    if predicate is not None:
+        lf = lf.filter(predicate)
+    if columns is not None:
+        lf = lf.select(columns)
+
+    return lf
+
+
+'''
+Get a table handed over in memory by an upstream pipeline stage, falling back to its Delta Lake table.
+
+:param tables: Tables produced by the upstream stage, by name (None when the stage runs standalone).
+:param name: Name of the table.
+:param path: Path to the Delta Lake table.
+:param columns: Columns to read (default is None, every column).
+:param predicate: Row filter, pushed down into the Delta Lake scan (default is None, every row).
+
+:return: Polars LazyFrame containing the table.
+'''
+def read_table(
+    tables: dict[str, pl.DataFrame] | None,
+    name: str,
+    path: Path,
+    columns: list[str] | None = None,
+    predicate: pl.Expr | None = None,
+) -> pl.LazyFrame:
+    if not tables or tables.get(name) is None:
+        return read_delta(path, columns=columns, predicate=predicate)
+
+    lf = tables[name].lazy()
+    if predicate is not None:
+        lf = lf.filter(predicate)
+    if columns is not None:
+        lf = lf.select(columns)
+
+    return lf
+
+
+'''
+Get the Arrow schema data is written to Delta Lake with: large Arrow types, as Polars produces them, are written as
+their regular variant, which keeps the files readable by the delta-rs optimizer.
+
+:param schema: Arrow schema of the data.
+
+:return: Arrow schema to write the data with.
+'''
+def to_delta_schema(schema: pa.Schema) -> pa.Schema:
+    regular_types = {pa.large_string(): pa.string(), pa.large_binary(): pa.binary()}
+    return pa.schema([pa.field(field.name, regular_types.get(field.type, field.type)) for field in schema])
+
+
+'''
+Build the SQL predicate selecting the rows of a Delta Lake table with one of the given values.
+
+:param scope: Column and values, as (column, values), values being all strings or all integers.
+:param alias: Alias of the table in the statement (default is None).
+
+:return: SQL predicate.
+'''
+def scope_predicate(scope: tuple[str, list], alias: str | None = None) -> str:
+    column, values = scope
+    column = f'{alias}."{column}"' if alias else f'"{column}"'
+    values = [value for value in values if value is not None]
+
+    if all(isinstance(value, str) for value in values):
+        literals = ", ".join("'" + value.replace("'", "''") + "'" for value in values)
+        return f"{column} IN ({literals})"
+
+    # Integer literals are 64-bit: the column is cast so that they compare whatever its width
+    literals = ", ".join(str(int(value)) for value in values)
+    return f"CAST({column} AS BIGINT) IN ({literals})"
+
+
+'''
+Delete the rows of a Delta Lake table whose column value is one of the given values.
+
+:param path: Path to the Delta Lake table.
+:param column: Name of the column.
+:param values: Values of the rows to delete.
+
+:return: True if the table exists (and the rows were deleted), False otherwise.
+'''
+def delete_where(path: Path, column: str, values: list) -> bool:
+    if not (path / "_delta_log").is_dir():
+        return False
+
+    values = [value for value in values if value is not None]
+    if not values:
+        return True
+
+    DeltaTable(str(path)).delete(scope_predicate((column, values)))
+
+    return True
+
+
+'''
+Get the path of the journal of a scoped overwrite of a Delta Lake table, a JSON file next to the table folder.
+
+:param path: Path to the Delta Lake table.
+
+:return: Path to the journal.
+'''
+def get_scoped_write_journal_path(path: Path) -> Path:
+    return path.with_name(f"{path.name}.scoped_write.json")
+
+
+'''
+Get the write mode of a scoped overwrite: the rows to replace are deleted from the table, and the new rows appended.
+Without a scope, or when the table does not exist yet, the table is overwritten.
+
+Delta Lake (deltalake 0.13) can only replace the rows of unpartitioned tables in two commits, a delete then an append,
+so a scoped overwrite is not atomic: the version of the table before the delete is journaled, the writers roll the
+table back to it when their append fails (see end_scoped_write), and an append interrupted by a crash is rolled back
+by recover_scoped_write before the table is written again or the pipeline runs. Readers in between see the table
+without the replaced rows.
+
+:param path: Path to the Delta Lake table.
+:param mode: Requested write mode.
+:param replace_where: Scope of the overwrite, as (column, values), or None.
+
+:return: Write mode to use.
+'''
+def get_scoped_write_mode(path: Path, mode: str, replace_where: tuple[str, list] | None) -> str:
+    recover_scoped_write(path)
+
+    if mode == "overwrite" and replace_where is not None and (path / "_delta_log").is_dir():
+        column, values = replace_where
+        journal = {"version": DeltaTable(str(path)).version(), "column": column, "values": values}
+        get_scoped_write_journal_path(path).write_text(json.dumps(journal, default=str), encoding="utf-8")
+        delete_where(path, column, values)
+        return "append"
+
+    return mode
+
+
+'''
+Roll a Delta Lake table back from an incomplete scoped overwrite: if the last commit of the table is the delete of the
+journaled overwrite, its append never committed and the table is restored to its version before the delete. The
+journal is removed.
+
+:param path: Path to the Delta Lake table.
+
+:return: True if the table was restored.
+'''
+def recover_scoped_write(path: Path) -> bool:
+    journal_path = get_scoped_write_journal_path(path)
+    if not journal_path.exists():
+        return False
+
+    version = json.loads(journal_path.read_text(encoding="utf-8"))["version"]
+    restored = False
+    if (path / "_delta_log").is_dir():
+        table = DeltaTable(str(path))
+        last_commit = table.history(1)[0]
+        if last_commit["operation"] == "DELETE" and last_commit["version"] > version:
+            table.restore(version)
+            restored = True
+    journal_path.unlink()
+
+    return restored
+
+
+'''
+End a write started with get_scoped_write_mode: a completed write drops the journal of its scoped overwrite, a failed
+one rolls the table back to its rows before the delete.
+
+:param path: Path to the Delta Lake table.
+:param completed: Whether the append committed.
+'''
+def end_scoped_write(path: Path, completed: bool):
+    if completed:
+        get_scoped_write_journal_path(path).unlink(missing_ok=True)
+    elif recover_scoped_write(path):
+        print(f"{path.name}: scoped overwrite failed, table restored to its rows before the overwrite")
+
+
+'''
+Roll back the scoped overwrites interrupted by a crash in the Delta Lake tables of the given layers, so that the rows
+they deleted are back before any stage reads the tables, and a resumed run writes them again.
+
+:param delta_path: Path to the Delta Lake folder, containing a folder per layer.
+:param layers: Layers to recover (default is bronze and silver, gold tables are Parquet files).
+
+:return: Names of the restored tables ("layer/table").
+'''
+def recover_scoped_writes(delta_path: Path, layers: tuple[str, ...] = ("bronze", "silver")) -> list[str]:
+    restored = []
+    for layer in layers:
+        for journal_path in sorted((delta_path / layer).glob("*.scoped_write.json")):
+            table_path = journal_path.with_name(journal_path.name.removesuffix(".scoped_write.json"))
+            if recover_scoped_write(table_path):
+                restored.append(f"{layer}/{table_path.name}")
+
+    return restored
+
+
+'''
+Write a Polars DataFrame to a Delta Lake table as is, without a schema (e.g. raw bronze data). Appended rows are cast
+to the schema of the table, as types inferred from raw files may differ between files.
+
+:param path: Path to the Delta Lake table.
+:param df: Polars DataFrame to write.
+:param replace_where: Scope of the overwrite, as (column, values) (default is None, the whole table).
+'''
+def write_raw(path: Path, df: pl.DataFrame, replace_where: tuple[str, list] | None = None):
+    mode = get_scoped_write_mode(path, "overwrite", replace_where)
+    previous_files = None
+
+    try:
+        if mode == "append":
+            table = DeltaTable(str(path))
+            previous_files = set(table.files())
+            table_schema = pl.from_arrow(table.schema().to_pyarrow(as_large_types=True).empty_table()).schema
+            df = df.select([
+                pl.col(name).cast(dtype) if name in df.columns else pl.lit(None).cast(dtype).alias(name)
+                for name, dtype in table_schema.items()
+            ])
+
+        arrow_table = df.to_arrow()
+        write_deltalake(
+            str(path),
+            arrow_table.cast(to_delta_schema(arrow_table.schema)),
+            mode=mode,
+            overwrite_schema=mode == "overwrite",
+        )
+    except BaseException:
+        end_scoped_write(path, completed=False)
+        raise
+    end_scoped_write(path, completed=True)
+
+    record_output(path, df.height, previous_files)
+
+
+'''
+Order a Polars frame to cluster it by a set of columns, so that the files and row groups written from it cover narrow
+ranges of these columns and their statistics let the reads filtering on them skip most of them. A linear order sorts
+by the columns in turn and clusters the first one best. A Z-order sorts by the interleaved bits of the column ranks:
+no column is clustered as tightly as a leading sort column, but every one of them is to some extent.
+
+:param data: Polars DataFrame or LazyFrame.
+:param columns: Columns to cluster by.
+:param method: Clustering method, "linear" or "zorder" (default is "linear").
+
+:return: Ordered frame, of the same kind.
+'''
+def cluster_frame(data: pl.DataFrame | pl.LazyFrame, columns: list[str], method: str = "linear") -> pl.DataFrame | pl.LazyFrame:
+    if method not in ("linear", "zorder"):
+        raise ValueError(f"Unknown clustering method: {method}")
+    if method == "linear" or len(columns) == 1:
+        return data.sort(columns, nulls_last=True)
+
+    # Dense ranks from 0 (nulls last), stretched over the bits each column gets in the 64-bit Z-value: a column with
+    # few distinct values still splits the curve at its top bits instead of only reordering neighbouring rows
+    bits = 64 // len(columns)
+    ranks = []
+    for column in columns:
+        rank = pl.col(column).rank("dense").cast(pl.Float64)
+        rank = rank.fill_null(rank.max() + 1) - 1
+        ranks.append((rank * ((2 ** bits - 1) / pl.max_horizontal(rank.max(), 1))).cast(pl.UInt64))
+
+    z_value = pl.sum_horizontal(
+        (rank // pl.lit(2 ** bit, dtype=pl.UInt64) % 2) * pl.lit(2 ** (bit * len(columns) + index), dtype=pl.UInt64)
+        for bit in range(bits)
+        for index, rank in enumerate(ranks)
+    )
+    return data.sort(z_value)
+
+
+'''
+Iterate over the record batches of a Polars frame with a schema applied, cast to its Arrow schema.
+
+:param df: Polars DataFrame.
+:param schema_name: Name of the schema to apply.
+:param arrow_schema: Arrow schema of the table.
+:param batch_rows: Maximum number of rows per batch.
+
+:return: Iterator of Arrow record batches.
+'''
+def iter_frame_batches(
+    df: pl.DataFrame,
+    schema_name: str,
+    arrow_schema: pa.Schema,
+    batch_rows: int,
+) -> Iterator[pa.RecordBatch]:
+    if df.height == 0:
+        return
+    yield from apply_schema(df, schema_name).to_arrow().cast(arrow_schema).to_batches(max_chunksize=batch_rows)
+
+
+'''
+Iterate over the record batches of a LazyFrame with a schema applied. The query, casts included, is streamed into a
+temporary Parquet file that is then read batch by batch, so the result is never held in memory as a whole. Queries
+the streaming engine cannot sink are collected with it instead.
+
+:param lf: Polars LazyFrame.
+:param schema_name: Name of the schema to apply.
+:param arrow_schema: Arrow schema of the table.
+:param batch_rows: Maximum number of rows per batch.
+
+:return: Iterator of Arrow record batches.
+'''
+def iter_lazy_batches(
+    lf: pl.LazyFrame,
+    schema_name: str,
+    arrow_schema: pa.Schema,
+    batch_rows: int,
+) -> Iterator[pa.RecordBatch]:
+    yield from iter_sunk_batches(apply_schema(lf, schema_name), arrow_schema, batch_rows)
+
+
+'''
+Iterate over the record batches of a LazyFrame, cast to an Arrow schema, through a temporary Parquet file the query
+is streamed into (see iter_lazy_batches).
+
+:param lf: Polars LazyFrame.
+:param arrow_schema: Arrow schema to cast the batches to.
+:param batch_rows: Maximum number of rows per batch.
+
+:return: Iterator of Arrow record batches.
+'''
+def iter_sunk_batches(lf: pl.LazyFrame, arrow_schema: pa.Schema, batch_rows: int) -> Iterator[pa.RecordBatch]:
+    with tempfile.TemporaryDirectory(prefix="delta_write_") as tmp_path:
+        sink_path = Path(tmp_path) / "data.parquet"
+        try:
+            lf.sink_parquet(sink_path, row_group_size=batch_rows)
+        except pl.exceptions.InvalidOperationError:
+            df = lf.collect(streaming=True)
+            if df.height > 0:
+                yield from df.to_arrow().cast(arrow_schema).to_batches(max_chunksize=batch_rows)
+            return
+
+        for batch in pq.ParquetFile(sink_path).iter_batches(batch_size=batch_rows):
+            yield from pa.Table.from_batches([batch]).cast(arrow_schema).to_batches()
+
+
+'''
+Iterate over the record batches of any supported source, each one validated and cast against the table schema.
+Missing and extra columns are reported once, from the first frame or batch of the source.
+
+:param data: Polars DataFrame or LazyFrame, iterator of Polars frames, or Arrow RecordBatchReader.
+:param schema_name: Name of the schema to apply.
+:param arrow_schema: Arrow schema of the table.
+:param batch_rows: Maximum number of rows per batch.
+:param label: Name of the table, for the report.
+:param cluster_by: Clustering of the rows, as (columns, method) (default is None, the order of the source). Each
+    frame of an iterator, or batch of a reader, is ordered on its own.
+
+:return: Iterator of Arrow record batches.
+'''
+def iter_typed_batches(
+    data,
+    schema_name: str,
+    arrow_schema: pa.Schema,
+    batch_rows: int,
+    label: str,
+    cluster_by: tuple[list[str], str] | None = None,
+) -> Iterator[pa.RecordBatch]:
+    if isinstance(data, pa.RecordBatchReader):
+        frames = (pl.from_arrow(pa.Table.from_batches([batch], schema=data.schema)) for batch in data)
+    elif isinstance(data, (pl.DataFrame, pl.LazyFrame)):
+        frames = iter([data])
+    else:
+        frames = iter(data)
+
+    reported = False
+    for frame in frames:
+        if not reported:
+            expected_cols = set(arrow_schema.names)
+            frame_cols = set(frame.columns)
+            if expected_cols - frame_cols:
+                print(f"{label} - Missing columns: {sorted(expected_cols - frame_cols)}")
+            if frame_cols - expected_cols:
+                print(f"{label} - Extra columns: {sorted(frame_cols - expected_cols)}")
+            reported = True
+
+        if cluster_by is not None:
+            frame = cluster_frame(frame, *cluster_by)
+
+        if isinstance(frame, pl.LazyFrame):
+            yield from iter_lazy_batches(frame, schema_name, arrow_schema, batch_rows)
+        else:
+            yield from iter_frame_batches(frame, schema_name, arrow_schema, batch_rows)
+
+
+'''
+Write data of any size to a Delta Lake table with the specified schema, with bounded memory: the data is streamed to
+the writer batch by batch, each batch validated and cast against the table schema. Files are rolled over at a target
+size, estimated from the in-memory size of the first batch (Parquet files, compressed, come out smaller).
+
+:param path: Path to the Delta Lake table.
+:param data: Polars DataFrame or LazyFrame, iterator of Polars frames, or Arrow RecordBatchReader.
+:param schema_name: Name of the schema to apply.
+:param mode: Write mode, either "overwrite" or "append" (default is "overwrite").
+:param partition_by: List of columns to partition by (default is None).
+:param replace_where: Scope of an overwrite, as (column, values): only the rows with one of these values are
+    replaced (default is None, the whole table).
+:param target_file_mb: Target size of the written files in megabytes (default is 128).
+:param batch_rows: Maximum number of rows per batch, and per Parquet row group (default is 131072). Under a memory
+    budget, row groups are smaller if they would not fit in the memory left (see memory_utils.get_batch_rows).
+:param cluster_by: Clustering of the rows, as (columns, method), see cluster_frame (default is None, the order of
+    the data).
+
+:return: Number of rows written.
+'''
+def write_stream_with_schema(
+    path: Path,
+    data,
+    schema_name: str,
+    mode: str = "overwrite",
+    partition_by: list[str] | None = None,
+    replace_where: tuple[str, list] | None = None,
+    target_file_mb: int = 128,
+    batch_rows: int = 131072,
+    cluster_by: tuple[list[str], str] | None = None,
+) -> int:
+    arrow_schema = to_delta_schema(get_arrow_schema(schema_name))
+    batches = iter_typed_batches(data, schema_name, arrow_schema, batch_rows, path.name, cluster_by)
+
+    # The first batch tells whether there is anything to write, and the size of a row
+    first_batch = next(batches, None)
+    if first_batch is None:
+        print(f"{path.name} - Empty DataFrame!")
+        return 0
+
+    path.mkdir(parents=True, exist_ok=True)
+    mode = get_scoped_write_mode(path, mode, replace_where)
+    previous_files = set(DeltaTable(str(path)).files()) if mode == "append" and (path / "_delta_log").is_dir() else None
+
+    row_bytes = max(1, first_batch.nbytes // max(1, first_batch.num_rows))
+    rows_per_file = max(1, target_file_mb * 1024 * 1024 // row_bytes)
+    # The writer buffers a row group before encoding it: under a memory budget, row groups fit in the memory left
+    group_rows = get_batch_rows(row_bytes, min(batch_rows, rows_per_file))
+    rows = 0
+
+    def counted_batches():
+        nonlocal rows
+        for batch in itertools.chain([first_batch], batches):
+            rows += batch.num_rows
+            yield batch
+
+    try:
+        write_deltalake(
+            str(path),
+            pa.RecordBatchReader.from_batches(arrow_schema, counted_batches()),
+            mode=mode,
+            schema=arrow_schema,
+            partition_by=partition_by,
+            overwrite_schema=mode == "overwrite",
+            max_rows_per_file=rows_per_file,
+            max_rows_per_group=group_rows,
+            min_rows_per_group=min(group_rows, batch_rows // 2),
+        )
+    except BaseException:
+        # The batches are streamed into the append: a batch failing to build or validate fails it too
+        end_scoped_write(path, completed=False)
+        raise
+    end_scoped_write(path, completed=True)
+
+    record_output(path, rows, previous_files)
+
+    return rows
 
 
 '''
@@ -29,6 +527,9 @@ Write a Polars DataFrame to a Delta Lake table with the specified schema.
 :param schema_name: Name of the schema to apply.
 :param mode: Write mode, either "overwrite" or "append" (default is "overwrite").
 :param partition_by: List of columns to partition by (default is None).
+:param replace_where: Scope of an overwrite, as (column, values): only the rows with one of these values are
+    replaced (default is None, the whole table).
+:param cluster_by: Clustering of the rows, as (columns, method) (default is None, the order of the DataFrame).
 '''
 def write_with_schema(
     path: Path,
@@ -36,38 +537,285 @@ def write_with_schema(
     schema_name: str,
     mode: str = "overwrite",
     partition_by: list[str] | None = None,
+    replace_where: tuple[str, list] | None = None,
+    cluster_by: tuple[list[str], str] | None = None,
 ):
     if df is None or df.height == 0:
         print(f"{path.name} - Empty DataFrame!")
         return
 
-    path.mkdir(parents=True, exist_ok=True)
+    rows = write_stream_with_schema(path, df, schema_name, mode, partition_by, replace_where, cluster_by=cluster_by)
+
+    print(f"{path.name}: {rows} rows written with schema '{schema_name}'!")
+
+
+'''
+Merge a Polars DataFrame into a Delta Lake table with the specified schema, by primary key: rows with a new key are
+inserted, rows whose key exists are updated only if one of their values changed, and the other rows are left
+untouched. Nothing is committed when no row changed. The table is created if it does not exist yet.
+
+:param path: Path to the Delta Lake table.
+:param df: Polars DataFrame to merge, with one row per key.
+:param schema_name: Name of the schema to apply.
+:param keys: Primary key columns.
+:param delete_missing: Delete the rows of the table whose key is not in the DataFrame (default is False).
+:param scope: Restrict the deletion of missing rows to the rows of the table with one of these values, as
+    (column, values) (default is None, the whole table).
+'''
+def merge_with_schema(
+    path: Path,
+    df: pl.DataFrame,
+    schema_name: str,
+    keys: list[str],
+    delete_missing: bool = False,
+    scope: tuple[str, list] | None = None,
+):
+    if df is None or df.height == 0:
+        print(f"{path.name} - Empty DataFrame!")
+        return
+
+    if not (path / "_delta_log").is_dir():
+        write_with_schema(path, df, schema_name)
+        return
 
-    # Aplies schema and converts to Arrow Table
     df_typed = apply_schema(df, schema_name)
-    arrow_schema = get_arrow_schema(schema_name)
-    arrow_table = df_typed.to_arrow()
+    delete_missing = delete_missing and (scope is None or any(value is not None for value in scope[1]))
 
-    # Validates missing or extra columns
-    expected_cols = set(arrow_schema.names)
-    df_cols = set(df_typed.columns)
-    missing = expected_cols - df_cols
-    extra = df_cols - expected_cols
+    # Changes are found up front, so that a load without any leaves the table version (and its readers' caches) as is
+    target = read_delta(path, predicate=pl.col(scope[0]).is_in(scope[1]) if scope else None).collect()
+    target = target.select([pl.col(name).cast(dtype) for name, dtype in df_typed.schema.items()])
+    changed = df_typed.join(target, on=df_typed.columns, how="anti", join_nulls=True).height
+    missing = target.join(df_typed, on=keys, how="anti", join_nulls=True).height if delete_missing else 0
+    if not changed and not missing:
+        print(f"{path.name}: unchanged")
+        return
 
-    if missing:
-        print(f"{path.name} - Missing columns: {sorted(missing)}")
-    if extra:
-        print(f"{path.name} - Extra columns: {sorted(extra)}")
+    table = DeltaTable(str(path))
+    previous_files = set(table.files())
+    arrow_schema = to_delta_schema(get_arrow_schema(schema_name))
+    source = df_typed.to_arrow().cast(arrow_schema)
+
+    # Identifiers are quoted, some columns are SQL keywords (e.g. "group")
+    values = [name for name in arrow_schema.names if name not in keys]
+    merger = table.merge(
+        source,
+        predicate=" AND ".join(f't."{key}" = s."{key}"' for key in keys),
+        source_alias="s",
+        target_alias="t",
+    )
+    if values:
+        merger = merger.when_matched_update_all(
+            predicate=" OR ".join(f'(t."{name}" IS DISTINCT FROM s."{name}")' for name in values)
+        )
+    merger = merger.when_not_matched_insert_all()
+    if delete_missing:
+        merger = merger.when_not_matched_by_source_delete(predicate=scope_predicate(scope, "t") if scope else None)
+    metrics = merger.execute()
+
+    inserted, updated = metrics["num_target_rows_inserted"], metrics["num_target_rows_updated"]
+    deleted = metrics["num_target_rows_deleted"]
+    record_output(path, inserted + updated, previous_files)
+
+    print(f"{path.name}: {inserted} rows inserted, {updated} updated, {deleted} deleted with schema '{schema_name}'!")
+
+
+'''
+Write Parquet files spilled by the out-of-core mode to a Delta Lake table with the specified schema. The files are
+read, typed and handed to the writer one at a time, so memory holds a single file instead of the whole table.
+
+:param path: Path to the Delta Lake table.
+:param parts: Paths to the spilled Parquet files.
+:param schema_name: Name of the schema to apply.
+:param partition_by: List of columns to partition by (default is None).
+:param replace_where: Scope of the overwrite, as (column, values) (default is None, the whole table).
+:param cluster_by: Clustering of the rows of each file, as (columns, method) (default is None, the order of the
+    files).
+'''
+def write_parts_with_schema(
+    path: Path,
+    parts: list[Path],
+    schema_name: str,
+    partition_by: list[str] | None = None,
+    replace_where: tuple[str, list] | None = None,
+    cluster_by: tuple[list[str], str] | None = None,
+):
+    if not parts:
+        print(f"{path.name} - Empty DataFrame!")
+        return
+
+    rows = write_stream_with_schema(
+        path, (pl.read_parquet(part) for part in parts), schema_name, partition_by=partition_by,
+        replace_where=replace_where, cluster_by=cluster_by,
+    )
+
+    print(f"{path.name}: {rows} rows written with schema '{schema_name}' from {len(parts)} spilled parts!")
+
+
+'''
+Get the file metrics of a Delta Lake table: data files of the current version, small files among them, files left
+on disk by earlier versions and entries of the transaction log.
+
+:param path: Path to the Delta Lake table.
+:param small_file_mb: Size under which a data file counts as small, in megabytes (default is 32).
+
+:return: Table metrics.
+'''
+def get_table_metrics(path: Path, small_file_mb: int = 32) -> dict:
+    table = DeltaTable(str(path))
+    actions = table.get_add_actions(flatten=True).to_pydict()
+    sizes = actions["size_bytes"]
+
+    referenced = set(actions["path"])
+    unreferenced = [
+        file for file in path.rglob("*.parquet")
+        if "_delta_log" not in file.parts and file.relative_to(path).as_posix() not in referenced
+    ]
+
+    last_checkpoint = path / "_delta_log/_last_checkpoint"
+    checkpoint_version = json.loads(last_checkpoint.read_text())["version"] if last_checkpoint.exists() else None
+
+    return {
+        "version": table.version(),
+        "files": len(sizes),
+        "size_mb": round(sum(sizes) / MB, 2),
+        "small_files": sum(1 for size in sizes if size < small_file_mb * MB),
+        "avg_file_mb": round(sum(sizes) / len(sizes) / MB, 2) if sizes else 0.0,
+        "unreferenced_files": len(unreferenced),
+        "unreferenced_mb": round(sum(file.stat().st_size for file in unreferenced) / MB, 2),
+        "log_entries": len(list((path / "_delta_log").glob("*.json"))),
+        "checkpoint_version": checkpoint_version,
+    }
+
+
+'''
+Compact a Delta Lake table by rewriting its current version into files of the target size, in a single overwrite
+commit, recorded as a maintenance commit (see cache_utils.record_maintenance_commit). The table is streamed from its
+files to the writer, so memory holds a batch at a time. Given a clustering, the rows are also ordered by it (see
+cluster_frame), through an external sort for unpartitioned tables.
+
+:param path: Path to the Delta Lake table.
+:param target_file_mb: Target size of the written files in megabytes.
+:param cluster_by: Clustering of the rows, as (columns, method) (default is None, the order of the table).
+:param row_group_rows: Maximum number of rows per Parquet row group (default is 131072).
+
+:return: Number of files replaced.
+'''
+def rewrite_table(
+    path: Path,
+    target_file_mb: int,
+    cluster_by: tuple[list[str], str] | None = None,
+    row_group_rows: int = 131072,
+) -> int:
+    table = DeltaTable(str(path))
+    actions = table.get_add_actions(flatten=True).to_pydict()
+    rows, size = sum(actions["num_records"]), sum(actions["size_bytes"])
+    rows_per_file = max(1, target_file_mb * MB * rows // max(1, size))
+
+    # Files written with large Arrow types are read back as such, batches are cast to the regular types
+    schema = table.schema().to_pyarrow()
+    if cluster_by is not None:
+        # Partition values are not stored in the files, partitioned tables are read through their dataset instead
+        source = (
+            pl.scan_pyarrow_dataset(table.to_pyarrow_dataset()) if table.metadata().partition_columns
+            else pl.scan_parquet(table.file_uris())
+        )
+        batches = iter_sunk_batches(cluster_frame(source, *cluster_by), schema, row_group_rows)
+    else:
+        batches = (
+            typed_batch
+            for batch in table.to_pyarrow_dataset().to_batches()
+            for typed_batch in pa.Table.from_batches([batch]).cast(schema).to_batches()
+        )
 
-    # Writes to Delta Lake and applies schema
     write_deltalake(
         str(path),
-        arrow_table,
-        mode=mode,
-        schema=arrow_schema,
-        partition_by=partition_by,
-        overwrite_schema=True,
+        pa.RecordBatchReader.from_batches(schema, batches),
+        mode="overwrite",
+        partition_by=table.metadata().partition_columns or None,
+        max_rows_per_file=rows_per_file,
+        max_rows_per_group=min(row_group_rows, rows_per_file),
+        min_rows_per_group=min(row_group_rows // 2, rows_per_file),
     )
+    # The overwrite keeps the rows of the table, it must not count as a data change for the stage and query caches
+    record_maintenance_commit(path)
+
+    return len(actions["path"])
+
+
+'''
+Maintain a Delta Lake table: bin-pack its small files into files of the target size, vacuum the files no longer
+referenced for longer than the retention window, then write a checkpoint of its transaction log, so that readers load
+one Parquet file instead of replaying every log entry. Vacuumed versions can no longer be read with time travel.
+
+:param path: Path to the Delta Lake table.
+:param target_file_mb: Target size of the compacted files in megabytes (default is 128).
+:param retention_hours: Age in hours past which unreferenced files are deleted (default is 168, one week).
+:param small_file_mb: Size under which a data file counts as small, in megabytes (default is 32).
+
+:return: Table metrics before and after, with the number of files compacted and vacuumed.
+'''
+def maintain_table(
+    path: Path,
+    target_file_mb: int = 128,
+    retention_hours: int = 168,
+    small_file_mb: int = 32,
+) -> dict:
+    before = get_table_metrics(path, small_file_mb)
+    table = DeltaTable(str(path))
+
+    files_compacted = 0
+    if before["small_files"] > 1:
+        try:
+            compaction = table.optimize.compact(target_size=target_file_mb * MB)
+            files_compacted = compaction.get("numFilesRemoved", 0)
+        except DeltaError:
+            # The optimizer rejects files written with large Arrow types, the table is rewritten with regular ones
+            files_compacted = rewrite_table(path, target_file_mb)
+        table = DeltaTable(str(path))
+
+    # The retention window is the caller's choice, even under the one week Delta Lake enforces by default
+    vacuumed = table.vacuum(retention_hours=retention_hours, dry_run=False, enforce_retention_duration=False)
+
+    # Vacuum commits to the log too: the checkpoint comes last, to cover the final version
+    table = DeltaTable(str(path))
+    table.create_checkpoint()
+
+    return {
+        "before": before,
+        "after": get_table_metrics(path, small_file_mb),
+        "files_compacted": files_compacted,
+        "files_vacuumed": len(vacuumed),
+    }
+
+
+'''
+Maintain every Delta Lake table of the given layers (see maintain_table), reporting file metrics per table.
+
+:param delta_path: Path to the Delta Lake folder, containing a folder per layer.
+:param layers: Layers to maintain (default is bronze and silver, gold tables are Parquet files).
+:param target_file_mb: Target size of the compacted files in megabytes (default is 128).
+:param retention_hours: Age in hours past which unreferenced files are deleted (default is 168, one week).
+
+:return: Maintenance metrics by table ("layer/table").
+'''
+def maintain_tables(
+    delta_path: Path,
+    layers: tuple[str, ...] = ("bronze", "silver"),
+    target_file_mb: int = 128,
+    retention_hours: int = 168,
+) -> dict[str, dict]:
+    metrics = {}
+    for layer in layers:
+        for log_path in sorted((delta_path / layer).glob("*/_delta_log")):
+            name = f"{layer}/{log_path.parent.name}"
+            with profile_step(name) as step:
+                metrics[name] = step["metrics"] = maintain_table(log_path.parent, target_file_mb, retention_hours)
 
-    print(f"{path.name}: {df_typed.height} rows written with schema '{schema_name}'!")
+            before, after = metrics[name]["before"], metrics[name]["after"]
+            print(
+                f"{name}: {before['files']} -> {after['files']} files ({after['size_mb']} MB), "
+                f"{metrics[name]['files_vacuumed']} files vacuumed, {after['log_entries']} log entries, "
+                f"checkpoint at version {after['checkpoint_version']}"
+            )
 
+    return metrics
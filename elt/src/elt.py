@@ -1,45 +1,502 @@
 """
-Runs the ELT pipeline scripts sequentially:
-    1. ingest_bronze.py
-    2. transform_silver.py
-    3. build_gold.py
+Runs the ELT pipeline in a single process as a DAG of stages:
+    1. bronze (ingest_bronze.py)
+    2. silver (transform_silver.py)
+    3. gold   (build_gold.py)
+
+Each stage hands its tables in memory to the stages that depend on it, so downstream stages do not re-read
+from Delta Lake what was just built. Logs are streamed as the stages run and the pipeline stops on the first
+failure with a non-zero exit code.
+
+Stages are memoized: a stage whose inputs (Delta table versions, input files, remote contents), code and parameters
+are unchanged since its last successful run is skipped, and its persisted outputs are reused.
+
+With a memory budget (--max-memory), the stages run out-of-core: tracking is processed in parts sized from the memory
+left under the budget and spilled to local Parquet files. As a last resort, the run fails if its RSS is still over the
+budget after a unit of work.
+
+Runs can be partial: a subset of the stages (--stages), reading the persisted outputs of the stages left out, and a
+selection of matches (--match-id, --competition-edition, --since) that only rewrites the rows of those matches.
+
+Runs are checkpointed after each stage and each of their steps (silver table written, gold output built) in a
+run-state file: a rerun after a failure resumes from the first incomplete step (--restart starts over instead). Scoped
+overwrites of Delta tables interrupted by a crash are rolled back first, so that the resumed step writes them again.
+
+Season aggregates are summed from per-match partials, recomputed for the matches whose silver rows changed only
+(--full-refresh recomputes every match).
+
+With --maintain, a maintenance stage compacts, vacuums and checkpoints the bronze and silver Delta tables after the
+run, and reports their file metrics (--stages maintenance runs it on demand).
 """
 
-from pathlib import Path
-import subprocess
+import argparse
 import sys
-from typing import List
+import time
+import traceback
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Callable
 
-def run_scripts(scripts: List[Path], python_exe: str = sys.executable):
-    for script in scripts:
-        if not script.exists():
-            print("Script not found: ", script)
+import build_gold
+import delta_utils
+import github_utils
+import ingest_bronze
+import transform_silver
+from cache_utils import (
+    code_fingerprint, load_cache_state, module_files, path_fingerprint, save_cache_state, stage_cache_key
+)
+from checkpoint_utils import finish_run, finish_stage, is_stage_completed, start_run, start_stage
+from datetime import date, datetime
+from memory_utils import check_memory_budget, set_memory_budget
+from profile_utils import StackSampler, peak_rss_mb, profile_step, write_run_report
+from selection_utils import Selection, is_selective
 
-        print("Starting: ", script.name)
 
-        try:
-            proc = subprocess.run([python_exe, str(script)], capture_output=True, text=True)
-            
-            if proc.stdout:
-                print(f"[{script.name} stdout]\n{proc.stdout}")
-            if proc.stderr:
-                print(f"[{script.name} stderr]\n{proc.stderr}")
-        except subprocess.CalledProcessError:
-            print("Script failed: ", script.name)
+'''
+A pipeline stage: a callable receiving the outputs of its dependencies as keyword arguments, named after them,
+plus its parameters and options. Options, unlike parameters, do not change the stage outputs (e.g. the number of
+workers) and are not part of its cache key. `inputs` fingerprints the stage inputs for caching (None disables caching
+of the stage), `code` lists the source files implementing it and `outputs` the paths that must exist to reuse a
+cached run.
+'''
+@dataclass
+class Stage:
+    name: str
+    run: Callable[..., dict | None]
+    depends_on: list[str] = field(default_factory=list)
+    params: dict = field(default_factory=dict)
+    options: dict = field(default_factory=dict)
+    inputs: Callable[[], object] | None = None
+    code: list[Path] = field(default_factory=list)
+    outputs: list[Path] = field(default_factory=list)
+
+
+'''
+Sort the stages so that every stage comes after its dependencies.
+
+:param stages: Pipeline stages.
+
+:return: Stages in execution order.
+'''
+def topological_order(stages: list[Stage]) -> list[Stage]:
+    by_name = {stage.name: stage for stage in stages}
+    ordered, visiting, done = [], set(), set()
+
+    def visit(stage: Stage):
+        if stage.name in done:
+            return
+        if stage.name in visiting:
+            raise ValueError(f"Cycle in pipeline at stage '{stage.name}'")
+        visiting.add(stage.name)
+        for dependency in stage.depends_on:
+            if dependency not in by_name:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dependency}'")
+            visit(by_name[dependency])
+        visiting.discard(stage.name)
+        done.add(stage.name)
+        ordered.append(stage)
+
+    for stage in stages:
+        visit(stage)
+
+    return ordered
+
+
+'''
+Keep the given stages only. A kept stage whose dependency is left out reads its persisted outputs instead of
+receiving them in memory.
+
+:param stages: Pipeline stages.
+:param names: Names of the stages to keep.
+
+:return: Kept stages.
+'''
+def select_stages(stages: list[Stage], names: list[str]) -> list[Stage]:
+    unknown = sorted(set(names) - {stage.name for stage in stages})
+    if unknown:
+        raise ValueError(f"Unknown stages: {unknown}")
+
+    return [
+        replace(stage, depends_on=[dependency for dependency in stage.depends_on if dependency in names])
+        for stage in stages if stage.name in names
+    ]
+
+
+'''
+Get the cache key of a stage run, computed from the current state of its inputs.
+
+:param stage: Pipeline stage.
+
+:return: Cache key, or None if the stage is not cacheable or its inputs cannot be fingerprinted.
+'''
+def get_stage_cache_key(stage: Stage) -> str | None:
+    if stage.inputs is None:
+        return None
+
+    inputs = stage.inputs()
+    if inputs is None:
+        return None
+
+    return stage_cache_key(inputs, code_fingerprint(stage.code), stage.params)
+
+
+'''
+Run the pipeline stages in dependency order, in this process. A stage's outputs are released as soon as no
+remaining stage depends on them. Skipped stages hand over None, so their consumers read the persisted outputs.
+
+With a run-state file, the run is checkpointed after each stage and each of its steps. If the previous run did not
+complete, the stages and steps it completed are skipped, provided their inputs, code and parameters are unchanged.
+
+:param stages: Pipeline stages.
+:param cache_path: Path to the stage cache state file (default is None, no caching).
+:param run_state_path: Path to the run-state file (default is None, no checkpoints).
+:param resume: Resume the previous run if it did not complete (default is True).
+
+:return: Exit code, 0 on success and 1 on the first failed stage.
+'''
+def run_pipeline(
+    stages: list[Stage],
+    cache_path: Path | None = None,
+    run_state_path: Path | None = None,
+    resume: bool = True,
+) -> int:
+    ordered = topological_order(stages)
+    pending_consumers = {stage.name: 0 for stage in ordered}
+    for stage in ordered:
+        for dependency in stage.depends_on:
+            pending_consumers[dependency] += 1
+
+    cache_state = load_cache_state(cache_path) if cache_path else {}
+
+    if run_state_path and start_run(run_state_path, resume):
+        print(f"Resuming the interrupted run recorded in {run_state_path}", flush=True)
+
+    outputs = {}
+    for stage in ordered:
+        start = time.perf_counter()
+        stage_key = get_stage_cache_key(stage) if cache_path or run_state_path else None
+        cache_key = stage_key if cache_path else None
+        run_key = None
+        if run_state_path:
+            # Without fingerprinted inputs, the checkpoints of a stage are tied to its code and parameters only
+            run_key = stage_key or stage_cache_key(None, code_fingerprint(stage.code), stage.params)
+        outputs_exist = all(path.exists() for path in stage.outputs)
+
+        if cache_key is not None and cache_state.get(stage.name) == cache_key and outputs_exist:
+            outputs[stage.name] = None
+            with profile_step(stage.name) as step:
+                step["status"] = "skipped"
+            finish_stage(stage.name, "completed", run_key)
+            print(f"Skipped: {stage.name} (inputs, code and parameters unchanged)", flush=True)
+        elif run_key is not None and is_stage_completed(stage.name, run_key) and outputs_exist:
+            outputs[stage.name] = None
+            with profile_step(stage.name) as step:
+                step["status"] = "resumed"
+            print(f"Skipped: {stage.name} (completed by the interrupted run)", flush=True)
         else:
-            print("Completed: ", script.name)
+            print(f"Starting: {stage.name}", flush=True)
+            if run_key is not None:
+                start_stage(stage.name, run_key)
+            try:
+                with profile_step(stage.name):
+                    outputs[stage.name] = stage.run(
+                        **{dependency: outputs[dependency] for dependency in stage.depends_on},
+                        **stage.params,
+                        **stage.options,
+                    )
+                    check_memory_budget(f"stage {stage.name}")
+            except Exception:
+                traceback.print_exc()
+                print(f"Stage failed: {stage.name}", file=sys.stderr, flush=True)
+                if cache_path and cache_state.pop(stage.name, None) is not None:
+                    save_cache_state(cache_path, cache_state)
+                finish_stage(stage.name, "failed")
+                finish_run("failed")
+                return 1
 
+            if cache_path and cache_key is not None:
+                cache_state[stage.name] = cache_key
+                save_cache_state(cache_path, cache_state)
+            finish_stage(stage.name, "completed")
 
-def main() -> int:
-    base_path = Path(__file__).resolve().parent
+            print(f"Completed: {stage.name} ({time.perf_counter() - start:.1f}s)", flush=True)
+
+        for dependency in stage.depends_on:
+            pending_consumers[dependency] -= 1
+            if pending_consumers[dependency] == 0:
+                outputs.pop(dependency, None)
+
+    finish_run("completed")
+
+    return 0
+
+
+'''
+Maintain the bronze and silver Delta Lake tables once the gold stage has read them (see delta_utils.maintain_tables).
 
-    pipeline = [
-        base_path / "ingest_bronze.py",
-        base_path / "transform_silver.py",
-        base_path / "build_gold.py",
+:param gold: Outputs of the gold stage, unused.
+:param base_path: Path to the ELT folder, containing the data folder.
+:param retention_hours: Age in hours past which unreferenced files are vacuumed (default is 168, one week).
+
+:return: Maintenance metrics by table.
+'''
+def run_maintenance(gold=None, base_path: Path | None = None, retention_hours: int = 168) -> dict[str, dict]:
+    return delta_utils.maintain_tables(base_path / "data/delta", retention_hours=retention_hours)
+
+
+'''
+Build the bronze -> silver -> gold pipeline.
+
+:param base_path: Path to the ELT folder, containing the data folder.
+:param persist_intermediate: Write the bronze and silver Delta tables (default is True). Gold tables are always
+    written, they are consumed by the app.
+:param max_workers: Maximum number of tables built concurrently within a stage (default is None, the thread pool
+    default).
+:param max_memory_mb: Memory budget in megabytes, running the stages out-of-core (default is None, no budget).
+:param selection: Selection of matches to process (default is None, every match).
+:param maintain: Add the maintenance stage, run after the gold stage (default is False).
+:param retention_hours: Vacuum retention of the maintenance stage, in hours (default is 168, one week).
+:param full_refresh: Recompute the match partials of every match in the gold stage, instead of the new or changed
+    matches only (default is False).
+
+:return: Pipeline stages.
+'''
+def build_pipeline(
+    base_path: Path,
+    persist_intermediate: bool = True,
+    max_workers: int | None = None,
+    max_memory_mb: int | None = None,
+    selection: Selection | None = None,
+    maintain: bool = False,
+    retention_hours: int = 168,
+    full_refresh: bool = False,
+) -> list[Stage]:
+    delta_path = base_path / "data/delta"
+    # Part of the stage parameters, and so of their cache keys, for selective runs only
+    selection_params = {"selection": selection} if is_selective(selection) else {}
+    # Part of the gold parameters when set, so that a full refresh is never skipped as a cached run
+    refresh_params = {"full_refresh": True} if full_refresh else {}
+    bronze_tables = ["match", "tracking", "dynamic_events", "match_video_info"]
+    silver_tables = ["match", "player", "team", "competition", "team_kit", "player_match", "tracking", "dynamic_events"]
+    gold_tables = [
+        "tracking", "tracking_5hz", "tracking_1hz", "dynamic_events", "event_snapshots", "agg_player", "agg_team",
+        "player_percentiles", "similar_players", "player_form", "team_form",
     ]
+    app_ext_data_path = base_path.parent / "apps/dynamicSkillsFinder/inst/extdata"
+
+    def bronze_inputs():
+        remote = github_utils.get_github_fingerprint(ingest_bronze.REPO_URL)
+        if remote is None:
+            return None
+        return {"remote": remote, "match_video_info": path_fingerprint(base_path / "data/raw/match_video_info.csv")}
+
+    stages = [
+        Stage(
+            "bronze",
+            ingest_bronze.main,
+            params={"persist": persist_intermediate, **selection_params},
+            options={"base_path": base_path, "max_memory_mb": max_memory_mb},
+            inputs=bronze_inputs,
+            code=module_files(Path(ingest_bronze.__file__)),
+            outputs=[delta_path / "bronze" / table for table in bronze_tables],
+        ),
+        Stage(
+            "silver",
+            transform_silver.main,
+            depends_on=["bronze"],
+            params={"persist": persist_intermediate, **selection_params},
+            options={"base_path": base_path, "max_workers": max_workers, "max_memory_mb": max_memory_mb},
+            inputs=lambda: {table: path_fingerprint(delta_path / "bronze" / table) for table in bronze_tables},
+            code=module_files(Path(transform_silver.__file__)),
+            outputs=[delta_path / "silver" / table for table in silver_tables],
+        ),
+        Stage(
+            "gold",
+            build_gold.main,
+            depends_on=["silver"],
+            params={**selection_params, **refresh_params},
+            options={"base_path": base_path, "max_workers": max_workers, "max_memory_mb": max_memory_mb},
+            inputs=lambda: {table: path_fingerprint(delta_path / "silver" / table) for table in silver_tables},
+            code=module_files(Path(build_gold.__file__)),
+            outputs=[
+                *[delta_path / "gold" / f"{table}.parquet" for table in gold_tables],
+                # Copies of the gold tables for the app, and their Arrow IPC exports with their offset index
+                *[
+                    app_ext_data_path / f"{table}{suffix}"
+                    for table in gold_tables for suffix in (".parquet", ".arrow", ".index.json")
+                ],
+                # Match partials of the incremental aggregates, with the fingerprints of their matches
+                *[
+                    delta_path / "gold" / f"{table}{suffix}"
+                    for table in ["agg_player_match", "agg_team_match"] for suffix in (".parquet", ".fingerprints.json")
+                ],
+                # Bitmap index of the dynamic events, served by the query service
+                delta_path / "gold" / "dynamic_events.bitmap.arrow",
+            ],
+        ),
+    ]
+
+    if maintain:
+        stages.append(Stage(
+            "maintenance",
+            run_maintenance,
+            depends_on=["gold"],
+            params={"retention_hours": retention_hours},
+            options={"base_path": base_path},
+            code=module_files(Path(delta_utils.__file__)),
+        ))
+
+    return stages
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the bronze, silver and gold ELT stages.")
+    parser.add_argument(
+        "--in-memory",
+        action="store_true",
+        help="hand bronze and silver over in memory only, without rewriting their Delta tables (disables caching)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="run every stage, even when its inputs, code and parameters are unchanged",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="run every step of an interrupted run again instead of resuming it",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="maximum number of independent tables built concurrently within a stage",
+    )
+    parser.add_argument(
+        "--stages",
+        default=None,
+        help="comma-separated stages to run (bronze, silver, gold, maintenance), the others' persisted outputs are read",
+    )
+    parser.add_argument(
+        "--match-id",
+        type=int,
+        action="append",
+        default=[],
+        help="only process this match (repeatable)",
+    )
+    parser.add_argument(
+        "--competition-edition",
+        type=int,
+        action="append",
+        default=[],
+        help="only process the matches of this competition edition (repeatable)",
+    )
+    parser.add_argument(
+        "--since",
+        type=date.fromisoformat,
+        default=None,
+        metavar="YYYY-MM-DD",
+        help="only process the matches played on or after this date",
+    )
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="recompute the gold match partials of every match, instead of the new or changed matches only",
+    )
+    parser.add_argument(
+        "--maintain",
+        action="store_true",
+        help="compact, vacuum and checkpoint the bronze and silver Delta tables after the run",
+    )
+    parser.add_argument(
+        "--retention-hours",
+        type=int,
+        default=168,
+        help="age in hours past which the maintenance vacuums unreferenced files (default is one week)",
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=int,
+        default=None,
+        metavar="MB",
+        help="memory budget in megabytes: process tracking match by match, spilling to disk, and fail above the budget",
+    )
+    parser.add_argument(
+        "--report",
+        type=Path,
+        default=None,
+        help="path of the JSON run report (default is data/reports/run_<timestamp>.json)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="also sample the Python stacks and write them next to the run report, in collapsed-stack format",
+    )
+    args = parser.parse_args()
+
+    if args.in_memory and args.max_memory is not None:
+        parser.error("--max-memory hands tracking over through Delta Lake and cannot be combined with --in-memory")
+
+    selection = Selection(
+        match_ids=tuple(sorted(set(args.match_id))),
+        competition_edition_ids=tuple(sorted(set(args.competition_edition))),
+        since=args.since,
+    )
+    if args.in_memory and is_selective(selection):
+        parser.error("a selection only rewrites the rows of the selected matches and cannot be combined with --in-memory")
+    if args.full_refresh and is_selective(selection):
+        parser.error("--full-refresh recomputes the partials of every match and cannot be combined with a selection")
+
+    # Stream stage logs as they are printed, also when stdout is piped
+    sys.stdout.reconfigure(line_buffering=True)
+
+    base_path = Path(__file__).resolve().parent.parent
+    cache_path = None if args.in_memory or args.no_cache else base_path / "data/cache/stage_cache.json"
+    # In memory, what the stages completed is not persisted: there is nothing to resume from
+    run_state_path = None if args.in_memory else base_path / "data/cache/run_state.json"
+
+    report_path = args.report or base_path / f"data/reports/run_{datetime.now():%Y%m%dT%H%M%S}.json"
+
+    set_memory_budget(args.max_memory)
+
+    sampler = StackSampler().start() if args.profile else None
+    start = time.perf_counter()
+
+    stage_names = [name.strip() for name in args.stages.split(",")] if args.stages else []
+    stages = build_pipeline(
+        base_path,
+        persist_intermediate=not args.in_memory,
+        max_workers=args.workers,
+        max_memory_mb=args.max_memory,
+        selection=selection,
+        maintain=args.maintain or "maintenance" in stage_names,
+        retention_hours=args.retention_hours,
+        full_refresh=args.full_refresh,
+    )
+    if args.stages:
+        try:
+            stages = select_stages(stages, stage_names)
+        except ValueError as error:
+            parser.error(str(error))
+
+    # Scoped overwrites interrupted between their delete and append commits are rolled back before any stage reads
+    # their tables, the resumed stages write them again
+    for table in delta_utils.recover_scoped_writes(base_path / "data/delta"):
+        print(f"Rolled back the interrupted scoped overwrite of {table}")
+
+    exit_code = run_pipeline(stages, cache_path=cache_path, run_state_path=run_state_path, resume=not args.restart)
+
+    write_run_report(report_path, exit_code, time.perf_counter() - start, memory_budget_mb=args.max_memory)
+    if args.max_memory is not None:
+        print(f"Peak RSS: {peak_rss_mb():.1f} MB (memory budget {args.max_memory} MB)")
+    print(f"Run report written to {report_path}")
+
+    if sampler is not None:
+        sampler.stop()
+        sampler.write(report_path.with_suffix(".folded"))
+        print(f"Collapsed-stack profile written to {report_path.with_suffix('.folded')}")
 
-    return run_scripts(pipeline)
+    return exit_code
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
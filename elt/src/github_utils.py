@@ -2,6 +2,7 @@
 Utilities to interact with GitHub repositories, download files, and handle Git LFS files.
 '''
 
+import json
 import requests
 import time
 
@@ -65,10 +66,19 @@ Function to process the contents of a GitHub repository, downloading relevant fi
 :param base_url: The base URL of the GitHub repository.
 :param base_path: The local base path where files should be saved.
 :param downloaded_files: List to store the paths of downloaded files.
+:param selection: (Optional) Selection of matches to download. Match folders are skipped by name, and the other
+    files of a match are only downloaded once its match file shows it is selected.
 '''
-def process_github_contents(contents, base_url, base_path, downloaded_files):
-    for item in contents["entries"]:
+def process_github_contents(contents, base_url, base_path, downloaded_files, selection=None):
+    # Match file first: it tells whether the rest of the match folder is selected
+    entries = sorted(contents["entries"], key=lambda item: not item['name'].endswith('_match.json'))
+    match_selected = True
+
+    for item in entries:
         if item['type'] == 'file':
+            if not match_selected:
+                continue
+
             if item['name'].endswith('.json') or item['name'].endswith('.csv'):
                 raw_url = item['download_url']
 
@@ -77,6 +87,8 @@ def process_github_contents(contents, base_url, base_path, downloaded_files):
 
                 if download_file(raw_url, save_path):
                     downloaded_files.append(str(save_path))
+                    if selection is not None and item['name'].endswith('_match.json'):
+                        match_selected = selection.includes_match(json.loads(save_path.read_text(encoding="utf-8")))
 
                 time.sleep(0.1)
             
@@ -92,7 +104,24 @@ def process_github_contents(contents, base_url, base_path, downloaded_files):
                 time.sleep(0.1)
                 
         elif item['type'] == 'dir':
+            if selection is not None and item['name'].isdigit() and not selection.includes_match_id(int(item['name'])):
+                continue
             print(f"Proccessing subdirectory: {item['name']}")
             sub_contents = get_github_contents(None, item['url'])
             if sub_contents:
-                process_github_contents(sub_contents, base_url, base_path, downloaded_files)
\ No newline at end of file
+                process_github_contents(sub_contents, base_url, base_path, downloaded_files, selection)
+
+'''
+Function to get a content fingerprint of a GitHub repository path: the name and git SHA of its entries. The SHA of a
+directory entry changes whenever any file below it changes.
+
+:param repo_url: The URL of the GitHub repository or path.
+
+:return: List of [name, sha] pairs, or None if an error occurs.
+'''
+def get_github_fingerprint(repo_url):
+    contents = get_github_contents(repo_url)
+    if not contents:
+        return None
+
+    return sorted([item['name'], item['sha']] for item in contents["entries"])
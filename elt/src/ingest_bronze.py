@@ -4,79 +4,198 @@ Ingest data from a GitHub repository containing match data into a Delta Lake bro
 
 import json
 import polars as pl
-from deltalake import write_deltalake
 from schemas import apply_schema
 from pathlib import Path
+from checkpoint_utils import complete_step, is_step_completed, step_path
+from delta_utils import write_parts_with_schema, write_raw
 from github_utils import get_github_contents, process_github_contents
+from memory_utils import check_memory_budget, clear_spill_path, get_batch_rows, get_spill_path, set_memory_budget
+from profile_utils import profile_step
+from selection_utils import Selection, is_selective
 
-def main():
+REPO_URL = 'https://github.com/SkillCorner/opendata/tree/master/data/matches'
+
+# Memory taken by a raw tracking row until it is spilled, as a multiple of the length of its JSON line: the string, the
+# row dict, the Polars frame and the Parquet buffers
+RAW_ROW_BYTES_FACTOR = 4
+# Largest part of spilled raw tracking rows, whatever the budget
+MAX_PART_ROWS = 100_000
+
+
+'''
+Spill raw tracking rows to a new local Parquet part (out-of-core mode).
+
+:param rows: Raw tracking rows.
+:param spill_path: Path to the spill folder.
+:param parts: Paths to the spilled parts, the new part is appended to them.
+
+:return: Number of rows spilled.
+'''
+def spill_tracking(rows: list[dict], spill_path: Path, parts: list[Path]) -> int:
+    parts.append(spill_path / f"tracking_{len(parts)}.parquet")
+    apply_schema(pl.DataFrame(rows), "bronze_tracking_raw").write_parquet(parts[-1])
+    check_memory_budget(f"bronze tracking part {len(parts)}")
+
+    return len(rows)
+
+
+'''
+Download the raw match files and ingest them into the bronze layer.
+
+:param persist: Write the bronze Delta tables (default is True).
+:param base_path: Path to the ELT folder, containing the data folder (default is None, the folder of this script).
+:param download: Download the raw files from GitHub before ingesting them (default is True).
+:param max_memory_mb: Memory budget in megabytes (default is None, no budget). With a budget, tracking is read line
+    by line and spilled to local Parquet parts sized from the memory left under the budget instead of being held in
+    memory, and is not handed over.
+:param selection: Selection of matches to ingest (default is None, every match). Only the selected matches are
+    downloaded and read, and they replace their own rows in the bronze tables.
+
+:return: Bronze tables by name, for in-process downstream stages.
+'''
+def main(
+    persist: bool = True,
+    base_path: Path | None = None,
+    download: bool = True,
+    max_memory_mb: int | None = None,
+    selection: Selection | None = None,
+) -> dict[str, pl.DataFrame]:
     print("Bronze ingestion started...")
 
+    selective = is_selective(selection)
+    if selective:
+        print(f"Selection: {selection}")
+
+    out_of_core = max_memory_mb is not None
+    if out_of_core and not persist:
+        raise ValueError("The out-of-core mode hands tracking over through Delta Lake, it cannot run without persisting")
+    set_memory_budget(max_memory_mb)
+
     # GitHub repository files download
-    repo_url = 'https://github.com/SkillCorner/opendata/tree/master/data/matches'
-    base_path = Path(__file__).resolve().parent.parent
+    repo_url = REPO_URL
+    base_path = base_path or Path(__file__).resolve().parent.parent
 
     data_path = Path(base_path / "data/raw/")
     
-    print(f"Start downloading from: {repo_url}")
-    print(f"Saving files at: {data_path.absolute()}")
+    if download and is_step_completed(step_path("download")):
+        print("Download skipped, completed by the interrupted run")
+    elif download:
+        print(f"Start downloading from: {repo_url}")
+        print(f"Saving files at: {data_path.absolute()}")
     
-    data_path.mkdir(parents=True, exist_ok=True)
+        data_path.mkdir(parents=True, exist_ok=True)
     
-    contents = get_github_contents(repo_url)
+        with profile_step("download") as step:
+            contents = get_github_contents(repo_url)
     
-    if not contents:
-        print("Cannot access the GitHub repository or no contents found.")
-        return
+            if not contents:
+                print("Cannot access the GitHub repository or no contents found.")
+                return {}
     
-    downloaded_files = []
+            downloaded_files = []
+
+            process_github_contents(contents, repo_url, data_path, downloaded_files, selection if selective else None)
 
-    process_github_contents(contents, repo_url, data_path, downloaded_files)
+            print("Download finished!")
+            step["rows_out"] = len(downloaded_files)
 
-    print("Download finished!")
+        complete_step(step_path("download"))
 
     # Ingestion to Delta Lake bronze layerrows_match, rows_tracking = [], []
-    rows_match, rows_tracking = [], []
-    df_dynamic = pl.DataFrame()
-
-    for match_file in Path(base_path / "data/raw/").glob("*_match.json"):
-        match = json.loads(match_file.read_text(encoding="utf-8"))
-        match_id = match["id"]
-        rows_match.append({"match_id": match_id, "json": json.dumps(match, ensure_ascii=False)})
-
-        trk_file = match_file.with_name(match_file.stem.replace("_match", "_tracking_extrapolated.jsonl"))
-        if trk_file.exists():
-            for line in trk_file.read_text(encoding="utf-8").splitlines():
-                line = line.strip()
-                if line:
-                    rows_tracking.append({"match_id": match_id, "json": line})
-
-        dynamic_file = match_file.with_name(match_file.stem.replace("_match", "_dynamic_events.csv"))
-        if dynamic_file.exists():
-            df_dynamic = (
-                pl.concat([
-                    df_dynamic,
-                    pl.read_csv(dynamic_file, infer_schema_length=None)
-                ])
-            )
+    with profile_step("read_raw") as step:
+        rows_match, rows_tracking = [], []
+        tracking_parts, spilled_tracking_rows = [], 0
+        spill_path = get_spill_path(base_path, "bronze") if out_of_core else None
+        df_dynamic = pl.DataFrame()
+
+        selected_match_ids = []
+
+        for match_file in Path(base_path / "data/raw/").glob("*_match.json"):
+            file_match_id = match_file.name.split("_")[0]
+            if selective and file_match_id.isdigit() and not selection.includes_match_id(int(file_match_id)):
+                continue
+
+            match = json.loads(match_file.read_text(encoding="utf-8"))
+            if selective and not selection.includes_match(match):
+                continue
+
+            match_id = match["id"]
+            selected_match_ids.append(match_id)
+            rows_match.append({"match_id": match_id, "json": json.dumps(match, ensure_ascii=False)})
+
+            trk_file = match_file.with_name(match_file.stem.replace("_match", "_tracking_extrapolated.jsonl"))
+            if trk_file.exists():
+                with open(trk_file, encoding="utf-8") as tracking_lines:
+                    for line in tracking_lines:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        # Out-of-core, tracking is spilled in parts sized from the memory left under the budget
+                        if out_of_core and not rows_tracking:
+                            part_rows = get_batch_rows(RAW_ROW_BYTES_FACTOR * len(line), MAX_PART_ROWS)
+                        rows_tracking.append({"match_id": match_id, "json": line})
+                        if out_of_core and len(rows_tracking) >= part_rows:
+                            spilled_tracking_rows += spill_tracking(rows_tracking, spill_path, tracking_parts)
+                            rows_tracking = []
+
+            if out_of_core and rows_tracking:
+                spilled_tracking_rows += spill_tracking(rows_tracking, spill_path, tracking_parts)
+                rows_tracking = []
+
+            dynamic_file = match_file.with_name(match_file.stem.replace("_match", "_dynamic_events.csv"))
+            if dynamic_file.exists():
+                df_dynamic = (
+                    pl.concat([
+                        df_dynamic,
+                        pl.read_csv(dynamic_file, infer_schema_length=None)
+                    ])
+                )
     
-    # Load match video info file
-    match_video_info_file = pl.read_csv(base_path / "data/raw/match_video_info.csv", infer_schema_length=None)
-
-    df_match = apply_schema(pl.DataFrame(rows_match), "bronze_match_raw")
-    df_tracking = apply_schema(pl.DataFrame(rows_tracking), "bronze_tracking_raw")
-    df_match_video_info = apply_schema(match_video_info_file, "bronze_match_video_info")
-
-    if df_match.height: 
-        write_deltalake(str(base_path / "data/delta/bronze/match"), df_match.to_arrow(), mode="overwrite", overwrite_schema=True)
-    if df_tracking.height:   
-        write_deltalake(str(base_path / "data/delta/bronze/tracking"), df_tracking.to_arrow(), mode="overwrite", overwrite_schema=True)
-    if df_dynamic.height:
-        write_deltalake(str(base_path / "data/delta/bronze/dynamic_events"), df_dynamic.to_arrow(), mode="overwrite", overwrite_schema=True)
-    if df_match_video_info.height:
-        write_deltalake(str(base_path / "data/delta/bronze/match_video_info"), df_match_video_info.to_arrow(), mode="overwrite", overwrite_schema=True)
+        # Load match video info file
+        match_video_info_file = pl.read_csv(base_path / "data/raw/match_video_info.csv", infer_schema_length=None)
+
+        df_match = apply_schema(pl.DataFrame(rows_match), "bronze_match_raw")
+        df_tracking = apply_schema(pl.DataFrame(rows_tracking), "bronze_tracking_raw")
+        df_match_video_info = apply_schema(match_video_info_file, "bronze_match_video_info")
+        step["rows_out"] = (
+            df_match.height + df_tracking.height + spilled_tracking_rows + df_dynamic.height + df_match_video_info.height
+        )
+
+    bronze_tables = {
+        "match": df_match,
+        "tracking": df_tracking,
+        "dynamic_events": df_dynamic,
+        "match_video_info": df_match_video_info,
+    }
+    bronze_tables = {name: df for name, df in bronze_tables.items() if df.height}
+
+    # A selective run only replaces the rows of the selected matches, match video info is always read whole
+    match_scope = ("match_id", selected_match_ids) if selective else None
+
+    if persist:
+        with profile_step("write"):
+            # Each table written is checkpointed, a resumed run only writes the others
+            for name, df in bronze_tables.items():
+                if is_step_completed(step_path(name)):
+                    print(f"{name}: skipped, written by the interrupted run")
+                    continue
+                write_raw(
+                    base_path / f"data/delta/bronze/{name}",
+                    df,
+                    replace_where=None if name == "match_video_info" else match_scope,
+                )
+                complete_step(step_path(name))
+            if out_of_core and not is_step_completed(step_path("tracking")):
+                write_parts_with_schema(
+                    base_path / "data/delta/bronze/tracking", tracking_parts, "bronze_tracking_raw", replace_where=match_scope
+                )
+                complete_step(step_path("tracking"))
+            if out_of_core:
+                clear_spill_path(spill_path)
 
     print("Bronze layer ingestion completed!")
 
+    return bronze_tables
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,147 @@
+'''
+Utilities to export tables as Arrow IPC files (Feather v2) with an offset index, for readers that memory-map them:
+uncompressed record batches are read in place from the page cache, without being decompressed or decoded, and their
+pages are shared by every process mapping the same file.
+'''
+
+import bisect
+import json
+import os
+import polars as pl
+import pyarrow as pa
+from pathlib import Path
+from typing import Iterator
+from delta_utils import iter_sunk_batches
+
+
+'''
+Get the path of the offset index of an Arrow IPC file.
+
+:param path: Path to the Arrow IPC file.
+
+:return: Path to its offset index, a JSON file next to it.
+'''
+def get_index_path(path: Path) -> Path:
+    return path.with_suffix(".index.json")
+
+
+'''
+Iterate over the record batches of a Polars frame, ordered by a column if given (rows of the same key keep their
+order). LazyFrames are streamed through a temporary Parquet file, so they are never held in memory as a whole.
+
+:param data: Polars DataFrame or LazyFrame.
+:param order_by: Column to order the rows by (default is None, the order of the frame).
+:param batch_rows: Maximum number of rows per batch.
+
+:return: Arrow schema, and iterator of Arrow record batches.
+'''
+def iter_ordered_batches(
+    data: pl.DataFrame | pl.LazyFrame,
+    order_by: str | None,
+    batch_rows: int,
+) -> tuple[pa.Schema, Iterator[pa.RecordBatch]]:
+    if order_by is not None:
+        # The row index breaks ties, for a stable order
+        data = data.with_row_index("_row").sort([order_by, "_row"])
+
+    if isinstance(data, pl.DataFrame):
+        table = data.drop("_row").to_arrow() if order_by is not None else data.to_arrow()
+        return table.schema, iter(table.to_batches(max_chunksize=batch_rows))
+
+    # The row index is dropped from the batches rather than from the query: dropping it from a query streamed out of
+    # Parquet scans breaks the projection pushed down into the scans
+    sunk_schema = data.head(0).collect().to_arrow().schema
+    columns = [name for name in sunk_schema.names if name != "_row"]
+    schema = pa.schema([sunk_schema.field(name) for name in columns])
+    return schema, (batch.select(columns) for batch in iter_sunk_batches(data, sunk_schema, batch_rows))
+
+
+'''
+Export a table to an Arrow IPC file with an offset index. The index holds the row offset of every record batch and,
+given an index column, the row offset and count of every key: rows are ordered by the key, so that a reader maps the
+file and slices the batches of a key without reading the others. The file and its index are written to temporary
+paths and renamed, so that readers never map a partial file.
+
+:param data: Polars DataFrame or LazyFrame.
+:param path: Path to the Arrow IPC file.
+:param index_by: Column to index the rows by (default is None, batch offsets only).
+:param compression: Compression of the buffers, None or "lz4" (default is None: uncompressed buffers are mapped
+    without copy, compressed ones are decompressed as they are read).
+:param batch_rows: Maximum number of rows per record batch (default is 65536).
+
+:return: Number of rows written.
+'''
+def write_ipc_table(
+    data: pl.DataFrame | pl.LazyFrame,
+    path: Path,
+    index_by: str | None = None,
+    compression: str | None = None,
+    batch_rows: int = 65536,
+) -> int:
+    schema, batches = iter_ordered_batches(data, index_by, batch_rows)
+
+    batch_offsets, keys, rows = [], [], 0
+    tmp_path = path.with_suffix(".arrow.tmp")
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.ipc.new_file(str(tmp_path), schema, options=options) as writer:
+        for batch in batches:
+            if batch.num_rows == 0:
+                continue
+            writer.write_batch(batch)
+            batch_offsets.append(rows)
+
+            # Rows are ordered by key, a key continued from the previous batch extends its entry
+            if index_by is not None:
+                runs = pl.from_arrow(batch.column(index_by)).rle()
+                for key, length in zip(runs.struct.field("values").to_list(), runs.struct.field("lengths").to_list()):
+                    if keys and keys[-1][0] == key:
+                        keys[-1][2] += length
+                    else:
+                        keys.append([key, rows, length])
+                    rows += length
+            else:
+                rows += batch.num_rows
+
+    index = {"rows": rows, "batch_offsets": batch_offsets, "index_by": index_by, "keys": keys}
+    tmp_index_path = get_index_path(tmp_path)
+    tmp_index_path.write_text(json.dumps(index, default=str), encoding="utf-8")
+    os.replace(tmp_path, path)
+    os.replace(tmp_index_path, get_index_path(path))
+
+    return rows
+
+
+'''
+Read an Arrow IPC file by memory-mapping it: the record batches reference the mapped pages, nothing is copied. Given
+keys, only the batches holding their rows are sliced, through the offset index of the file.
+
+:param path: Path to the Arrow IPC file.
+:param keys: Values of the index column to read (default is None, every row).
+
+:return: Arrow Table.
+'''
+def read_ipc_table(path: Path, keys: list | None = None) -> pa.Table:
+    reader = pa.ipc.open_file(pa.memory_map(str(path)))
+    if keys is None:
+        return reader.read_all()
+
+    index = json.loads(get_index_path(path).read_text(encoding="utf-8"))
+    if index["index_by"] is None:
+        raise ValueError(f"{path.name} has no key index")
+    batch_offsets = index["batch_offsets"]
+
+    wanted = {str(key) for key in keys}
+    slices = []
+    for key, offset, rows in index["keys"]:
+        if str(key) not in wanted:
+            continue
+        end = offset + rows
+        batch_index = bisect.bisect_right(batch_offsets, offset) - 1
+        while batch_index < len(batch_offsets) and batch_offsets[batch_index] < end:
+            start = batch_offsets[batch_index]
+            batch = reader.get_batch(batch_index)
+            first, last = max(offset - start, 0), min(end - start, batch.num_rows)
+            slices.append(batch.slice(first, last - first))
+            batch_index += 1
+
+    return pa.Table.from_batches(slices, schema=reader.schema)
@@ -0,0 +1,116 @@
+'''
+Utilities to build level-of-detail tiers of tracking data: the frames of a lower frame rate, and optionally the
+trajectories of every tracked object simplified within a distance tolerance (Ramer-Douglas-Peucker), so that renderers
+of long animations or trajectory overlays read a fraction of the rows. Distances are measured between a position and
+the position interpolated at the same time between the kept ones, so that a simplified trajectory stays within the
+tolerance wherever a consumer interpolates it.
+'''
+
+import numpy as np
+import polars as pl
+
+TRAJECTORY_KEYS = ["match_id", "period", "object_id"]
+
+
+'''
+Downsample tracking data to every step-th frame.
+
+:param tracking: Polars DataFrame or LazyFrame of tracking data.
+:param step: Number of native frames per kept frame (e.g. 2 for 5 Hz tracking out of 10 Hz).
+
+:return: Polars DataFrame or LazyFrame with the kept frames.
+'''
+def downsample_frames(tracking: pl.DataFrame | pl.LazyFrame, step: int) -> pl.DataFrame | pl.LazyFrame:
+    return tracking.filter(pl.col("frame") % step == 0)
+
+
+'''
+Simplify timed polylines with the Ramer-Douglas-Peucker algorithm, every segment of every polyline split at once: the
+point farthest from its position interpolated along the chord of a segment is kept, and the segment split there, as
+long as it is farther than the tolerance.
+
+:param points: Array of point coordinates, one row per point.
+:param times: Array of point times, increasing along every polyline.
+:param starts: Index of the first point of every polyline.
+:param ends: Index of the last point of every polyline.
+:param tolerance: Maximum distance of a dropped point to its interpolated position.
+
+:return: Boolean array of the points kept.
+'''
+def simplify_polylines(
+    points: np.ndarray,
+    times: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    tolerance: float,
+) -> np.ndarray:
+    keep = np.zeros(len(points), dtype=bool)
+    keep[starts] = True
+    keep[ends] = True
+
+    while len(starts):
+        lengths = ends - starts - 1
+        inner = lengths > 0
+        starts, ends, lengths = starts[inner], ends[inner], lengths[inner]
+        if not len(starts):
+            break
+
+        # Inner points of every segment, with the segment they belong to
+        segment = np.repeat(np.arange(len(starts)), lengths)
+        offsets = np.cumsum(lengths) - lengths
+        index = np.arange(lengths.sum()) - offsets[segment] + starts[segment] + 1
+
+        start_times = times[starts][segment]
+        fraction = (times[index] - start_times) / (times[ends][segment] - start_times)
+        interpolated = points[starts][segment] + fraction[:, None] * (points[ends][segment] - points[starts][segment])
+        distance = np.linalg.norm(points[index] - interpolated, axis=1)
+
+        max_distance = np.maximum.reduceat(distance, offsets)
+        at_max = np.flatnonzero(distance == max_distance[segment])
+        farthest = index[at_max[np.unique(segment[at_max], return_index=True)[1]]]
+
+        split = max_distance > tolerance
+        keep[farthest[split]] = True
+        starts, ends = np.concatenate([starts[split], farthest[split]]), np.concatenate([farthest[split], ends[split]])
+
+    return keep
+
+
+'''
+Simplify the trajectories of tracking data: rows are dropped where the position of the object is within the tolerance
+of its position interpolated between the kept rows around it, so that consumers interpolate them back. Trajectories
+are broken at missing positions and missing frames, which are never interpolated over, and rows without a position are
+kept.
+
+:param tracking: Polars DataFrame of tracking data, with frame, x, y and z columns.
+:param tolerance: Maximum distance, in meters, of a dropped position to its interpolated position.
+:param step: Number of native frames between consecutive frames of the data (e.g. 2 for 5 Hz tracking out of 10 Hz).
+
+:return: Polars DataFrame with the kept rows, in their original order.
+'''
+def simplify_trajectories(tracking: pl.DataFrame, tolerance: float, step: int = 1) -> pl.DataFrame:
+    if tracking.height == 0:
+        return tracking
+
+    ordered = (
+        tracking.select([*TRAJECTORY_KEYS, "frame", "x", "y", "z"])
+        .with_row_index("_row")
+        .sort([*TRAJECTORY_KEYS, "frame"])
+    )
+    missing = pl.col("x").is_null() | pl.col("y").is_null()
+    breaks = ordered.select(
+        pl.any_horizontal([pl.col(key).ne_missing(pl.col(key).shift()) for key in TRAJECTORY_KEYS])
+        | (pl.col("frame").diff() != step)
+        | missing
+        | missing.shift(fill_value=True)
+    ).to_series().fill_null(True).to_numpy()
+
+    starts = np.flatnonzero(breaks)
+    ends = np.append(starts[1:] - 1, ordered.height - 1)
+    points = ordered.select(
+        pl.col("x").cast(pl.Float64), pl.col("y").cast(pl.Float64), pl.col("z").cast(pl.Float64).fill_null(0)
+    ).to_numpy()
+
+    keep = simplify_polylines(points, ordered["frame"].cast(pl.Float64).to_numpy(), starts, ends, tolerance)
+    kept_rows = ordered["_row"].filter(pl.Series(keep)).sort()
+    return tracking.with_row_index("_row").filter(pl.col("_row").is_in(kept_rows)).drop("_row")
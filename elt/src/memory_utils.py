@@ -0,0 +1,103 @@
+'''
+Utilities for the memory-budgeted, out-of-core execution mode: the memory budget of the run, the size of the batches
+of work it leaves room for, its enforcement and the local folders where stages spill their intermediate results as
+Parquet files.
+'''
+
+import shutil
+from pathlib import Path
+from profile_utils import current_rss_mb
+
+_memory_budget_mb: int | None = None
+
+# Share of the memory left under the budget a batch of work is sized to take: processing a batch makes copies of it
+# (parsed rows, Polars frame, Arrow batches, Parquet buffers) and the allocator does not return all freed memory
+BATCH_MEMORY_SHARE = 0.25
+
+
+'''
+Raised when the memory of the run goes over its memory budget.
+'''
+class MemoryBudgetExceeded(MemoryError):
+    pass
+
+
+'''
+Set the memory budget of the run.
+
+:param max_memory_mb: Maximum RSS in megabytes (None disables the budget).
+'''
+def set_memory_budget(max_memory_mb: int | None):
+    global _memory_budget_mb
+    _memory_budget_mb = max_memory_mb
+
+
+'''
+Get the memory budget of the run.
+
+:return: Maximum RSS in megabytes, or None without a budget.
+'''
+def get_memory_budget() -> int | None:
+    return _memory_budget_mb
+
+
+'''
+Get the number of rows of the next batch of work: as many as fit in a share of the memory left under the budget, so
+that batches are sized before they are run instead of the run failing once they are done. Without a budget, the batch
+is not limited.
+
+:param row_bytes: Estimated memory taken by a row of the batch while it is processed, in bytes.
+:param max_rows: Number of rows of the batch without a budget.
+:param min_rows: Smallest batch, so that a run close to its budget still makes progress (default is 1024).
+
+:return: Number of rows of the batch.
+'''
+def get_batch_rows(row_bytes: int, max_rows: int, min_rows: int = 1024) -> int:
+    if _memory_budget_mb is None:
+        return max_rows
+
+    headroom = max(0.0, _memory_budget_mb - current_rss_mb()) * 1024 * 1024 * BATCH_MEMORY_SHARE
+    return max(min(min_rows, max_rows), min(max_rows, int(headroom // max(1, row_bytes))))
+
+
+'''
+Enforce the memory budget, as a last resort: batches of work are sized from the budget beforehand (see get_batch_rows),
+this fails the run when the RSS of the process is still over it after a unit of work (a batch, a match, a task, a
+stage), e.g. because the unit could not be split or rows were larger than estimated.
+
+:param context: Unit of work just finished, for the error message.
+'''
+def check_memory_budget(context: str):
+    if _memory_budget_mb is None:
+        return
+
+    rss = current_rss_mb()
+    if rss > _memory_budget_mb:
+        raise MemoryBudgetExceeded(
+            f"RSS of {rss:.1f} MB is over the memory budget of {_memory_budget_mb} MB (after {context})"
+        )
+
+
+'''
+Get an empty spill folder for a stage, removing what a previous run may have left in it.
+
+:param base_path: Path to the ELT folder, containing the data folder.
+:param name: Name of the spill folder (e.g. the stage name).
+
+:return: Path to the spill folder.
+'''
+def get_spill_path(base_path: Path, name: str) -> Path:
+    spill_path = base_path / "data/spill" / name
+    shutil.rmtree(spill_path, ignore_errors=True)
+    spill_path.mkdir(parents=True, exist_ok=True)
+
+    return spill_path
+
+
+'''
+Remove a spill folder once the stage has consumed it.
+
+:param spill_path: Path to the spill folder.
+'''
+def clear_spill_path(spill_path: Path):
+    shutil.rmtree(spill_path, ignore_errors=True)
@@ -0,0 +1,224 @@
+'''
+Utilities to profile the pipeline: per-step wall time, CPU time, rows, bytes written and peak memory, a JSON run
+report and an optional sampled collapsed-stack profile (the input format of flame graph tools).
+'''
+
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from deltalake import DeltaTable
+from pathlib import Path
+
+_steps: list[dict] = []
+_steps_lock = threading.Lock()
+_local = threading.local()
+# Innermost step path by thread id, read by the stack sampler
+_thread_steps: dict[int, str] = {}
+
+
+'''
+Get the path of the step running in the current thread, e.g. "gold/agg_player".
+
+:return: Step path, or None outside of any step.
+'''
+def current_step_path() -> str | None:
+    stack = getattr(_local, "stack", [])
+    return stack[-1]["path"] if stack else None
+
+
+'''
+Get the peak resident set size of the process so far.
+
+:return: Peak RSS in megabytes.
+'''
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in kilobytes on Linux and in bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+'''
+Get the resident set size of the process now. Unlike the peak RSS, it goes down when memory is released, so it tells
+what a step holds at its end rather than the high-water mark of the whole run. Without /proc (e.g. on macOS), the peak
+RSS is returned instead.
+
+:return: RSS in megabytes.
+'''
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            resident_pages = int(statm.read().split()[1])
+    except OSError:
+        return peak_rss_mb()
+    return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+
+
+'''
+Profile a named step. Steps nest: a step started inside another one (or inside a task scheduled from it, see
+`parent`) is recorded under its path. CPU time is the process CPU time, so it includes the Polars worker threads.
+Memory is process-wide too: "rss_mb" is the RSS at the end of the step, and "process_peak_rss_mb" the high-water mark
+of the process at that time, which may have been reached by an earlier or concurrent step.
+
+:param name: Name of the step.
+:param rows_in: Number of input rows, when known.
+:param parent: Path of the parent step, for steps running in another thread than their parent (default is None,
+    the step running in the current thread).
+
+:return: Context manager yielding the step record, whose "rows_out", "bytes_written" and "status" can be updated.
+'''
+@contextmanager
+def profile_step(name: str, rows_in: int | None = None, parent: str | None = None):
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+
+    parent = parent if parent is not None else current_step_path()
+    step = {
+        "name": name,
+        "path": f"{parent}/{name}" if parent else name,
+        "started_at": datetime.now().isoformat(timespec="milliseconds"),
+        "rows_in": rows_in,
+        "rows_out": None,
+        "bytes_written": 0,
+    }
+
+    thread_id = threading.get_ident()
+    stack.append(step)
+    _thread_steps[thread_id] = step["path"]
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    status = "failed"
+    try:
+        yield step
+        status = "ok"
+    finally:
+        stack.pop()
+        if stack:
+            _thread_steps[thread_id] = stack[-1]["path"]
+        else:
+            _thread_steps.pop(thread_id, None)
+        step.setdefault("status", status)
+        step.update({
+            "wall_s": round(time.perf_counter() - wall_start, 4),
+            "cpu_s": round(time.process_time() - cpu_start, 4),
+            "rss_mb": current_rss_mb(),
+            "process_peak_rss_mb": peak_rss_mb(),
+        })
+        with _steps_lock:
+            _steps.append(step)
+
+
+'''
+Record rows and bytes written by the step running in the current thread.
+
+:param path: Path to the written Delta Lake table or file.
+:param rows: Number of rows written.
+:param previous_files: Files of the Delta Lake table before an append, not counted as written (default is None).
+'''
+def record_output(path: Path, rows: int, previous_files: set[str] | None = None):
+    stack = getattr(_local, "stack", [])
+    if not stack:
+        return
+
+    path = Path(path)
+    if (path / "_delta_log").is_dir():
+        # Files of the current table version only, an overwrite keeps the previous files until vacuumed
+        actions = DeltaTable(str(path)).get_add_actions(flatten=True).to_pydict()
+        size = sum(
+            size for file, size in zip(actions["path"], actions["size_bytes"])
+            if previous_files is None or file not in previous_files
+        )
+    elif path.is_file():
+        size = path.stat().st_size
+    else:
+        size = 0
+
+    step = stack[-1]
+    step["rows_out"] = (step["rows_out"] or 0) + rows
+    step["bytes_written"] += size
+
+
+'''
+Sampling profiler: records the Python stacks of the threads running a pipeline step at a fixed interval, prefixed
+with the step path, and writes them in collapsed-stack format ("frame;frame;frame count" per line).
+'''
+class StackSampler:
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            steps = dict(_thread_steps)
+            for thread_id, frame in sys._current_frames().items():
+                # Only threads working on a pipeline step, idle pool workers are left out
+                step = steps.get(thread_id)
+                if thread_id == own_id or step is None:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.samples[";".join(step.split("/") + frames[::-1])] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+'''
+Get the steps recorded so far, in completion order.
+
+:return: Step records.
+'''
+def get_steps() -> list[dict]:
+    with _steps_lock:
+        return list(_steps)
+
+
+'''
+Write the JSON run report: totals of the run and every recorded step (see profile_step for the memory of a step,
+measured for the whole process).
+
+:param path: Path to the report file.
+:param exit_code: Exit code of the run.
+:param wall_s: Wall time of the run, in seconds.
+:param memory_budget_mb: Memory budget of the run, in megabytes (default is None, no budget).
+
+:return: Run report.
+'''
+def write_run_report(path: Path, exit_code: int, wall_s: float, memory_budget_mb: int | None = None) -> dict:
+    report = {
+        "finished_at": datetime.now().isoformat(timespec="seconds"),
+        "exit_code": exit_code,
+        "wall_s": round(wall_s, 4),
+        "cpu_s": round(time.process_time(), 4),
+        "peak_rss_mb": peak_rss_mb(),
+        "memory_budget_mb": memory_budget_mb,
+        "within_memory_budget": None if memory_budget_mb is None else peak_rss_mb() <= memory_budget_mb,
+        "steps": sorted(get_steps(), key=lambda step: step["started_at"]),
+    }
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    return report
@@ -0,0 +1,484 @@
+'''
+Local query service over the gold tables: the app asks for the rows and columns it needs over HTTP on localhost,
+instead of loading whole tables at startup. Tables are opened as memory-mapped Parquet datasets, shared by every
+session and reopened when the gold stage rewrites them. Filters and column selections are pushed down into the scans,
+so the row groups whose statistics rule a filter out are skipped, and results are streamed back in the Arrow IPC
+stream format. Tables with a bitmap index (<table>.bitmap.arrow, e.g. the dynamic events) answer their equality filters
+on indexed columns from the index instead, and only read the matching rows. Scouting searches rank the players of an
+aggregates table by a weighted score of metrics, over a scouting index of the table kept in memory. Results are
+cached in an LRU cache keyed by the normalized query and the version of its table, so repeated queries are answered
+without running again until the gold stage rewrites the table.
+
+Endpoints:
+    GET /tables                 Tables served, with their columns and number of rows (JSON).
+    GET /cache                  Entries, size, hits and misses of the result cache (JSON).
+    GET /query/<table>          Rows of a table (Arrow IPC stream), with the query parameters:
+        columns=a,b             Columns to return (default is every column).
+        <column>=value          Rows whose column equals the value, or one of the values if the parameter is repeated.
+        <column>__<op>=value    Rows whose column compares to the value, op being gt, gte, lt, lte or ne.
+        limit=n                 Maximum number of rows to return (default is every row).
+    GET /scout/<table>          Top players of an aggregates table (Arrow IPC stream, with a score column if ranked):
+        columns=a,b, limit=n    As above, limit being the number of top players returned.
+        <column>=value          Rows whose string column is one of the values.
+        <column>__<op>=value    Rows whose numeric column compares to the value, op being gt, gte, lt or lte, or
+                                whose string column contains one of the values (op contains, ignoring case and
+                                accents) or lists one of them among its comma-separated items (op any).
+        score=a:w,b:w           Metrics and weights of the score the rows are ranked by, metrics being standardized
+                                (default is no ranking, the order of the table).
+
+E.g. events by filters:     /query/dynamic_events?event_type=off_ball_run&team_shortname=Team%20A
+     tracking by match/frame:   /query/tracking?match_id=1000001&frame__gte=1200&frame__lt=1500
+     aggregates by cohort:      /query/agg_player?season_name=2024/2025&age__lte=23&columns=player_name,xthreat
+     top young forwards:        /scout/agg_player?positions__any=CF&age__lte=23&minutes_played__gte=900
+                                    &score=xthreat_avg:2,off_ball_runs_90:1&limit=20
+'''
+
+import argparse
+import itertools
+import json
+import polars as pl
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlparse
+from bitmap_utils import BitmapIndex
+from cache_utils import file_version
+from result_cache_utils import ResultCache
+from scouting_utils import RANGE_OPS, ScoutingIndex
+
+ARROW_STREAM_TYPE = "application/vnd.apache.arrow.stream"
+COMPARISONS = {
+    "gt": lambda field, value: field > value,
+    "gte": lambda field, value: field >= value,
+    "lt": lambda field, value: field < value,
+    "lte": lambda field, value: field <= value,
+    "ne": lambda field, value: field != value,
+}
+
+
+'''
+Error in a query, reported to the client with a 4xx status.
+'''
+class QueryError(Exception):
+    def __init__(self, message: str, status: HTTPStatus = HTTPStatus.BAD_REQUEST):
+        super().__init__(message)
+        self.status = status
+
+
+'''
+Gold tables served from the gold layer folder, a Parquet file per table, as memory-mapped Parquet datasets. A dataset
+is opened on first use and reopened when its file changes, so the service follows the gold stage without restarting.
+'''
+class GoldTables:
+    def __init__(self, gold_path: Path):
+        self.gold_path = gold_path
+        self.filesystem = pafs.LocalFileSystem(use_mmap=True)
+        self._datasets: dict[str, tuple[int, ds.Dataset]] = {}
+        self._indexes: dict[str, tuple[tuple[int, int], BitmapIndex | None]] = {}
+        self._scouting: dict[str, tuple[int, pa.Table, ScoutingIndex]] = {}
+        self._lock = threading.Lock()
+
+    def names(self) -> list[str]:
+        return sorted(path.stem for path in self.gold_path.glob("*.parquet"))
+
+    def path(self, name: str) -> Path:
+        path = self.gold_path / f"{name}.parquet"
+        if "/" in name or not path.is_file():
+            raise QueryError(f"Unknown table: {name}", HTTPStatus.NOT_FOUND)
+        return path
+
+    def version(self, name: str) -> str:
+        return file_version(self.path(name))
+
+    def get(self, name: str) -> ds.Dataset:
+        path = self.path(name)
+        modified = path.stat().st_mtime_ns
+        with self._lock:
+            cached = self._datasets.get(name)
+            if cached is None or cached[0] != modified:
+                cached = self._datasets[name] = (
+                    modified, ds.dataset(str(path), format="parquet", filesystem=self.filesystem)
+                )
+            return cached[1]
+
+    def get_index(self, name: str, dataset: ds.Dataset) -> BitmapIndex | None:
+        path = self.gold_path / f"{name}.bitmap.arrow"
+        if not path.is_file():
+            return None
+
+        modified = (path.stat().st_mtime_ns, (self.gold_path / f"{name}.parquet").stat().st_mtime_ns)
+        with self._lock:
+            cached = self._indexes.get(name)
+            if cached is None or cached[0] != modified:
+                # An index older than its table, or of another number of rows, is ignored until rebuilt
+                index = BitmapIndex(path) if modified[0] >= modified[1] else None
+                if index is not None and index.rows != dataset.count_rows():
+                    index = None
+                cached = self._indexes[name] = (modified, index)
+            return cached[1]
+
+    def get_scouting(self, name: str) -> tuple[pa.Table, ScoutingIndex]:
+        dataset = self.get(name)
+        modified = (self.gold_path / f"{name}.parquet").stat().st_mtime_ns
+        with self._lock:
+            cached = self._scouting.get(name)
+            if cached is None or cached[0] != modified:
+                table = dataset.to_table()
+                cached = self._scouting[name] = (modified, table, ScoutingIndex(pl.from_arrow(table)))
+            return cached[1], cached[2]
+
+
+'''
+Cast the values of a filter to the type of its column.
+
+:param schema: Schema of the table.
+:param column: Column filtered.
+:param values: Values of the filter, as strings.
+
+:return: Pyarrow array of the values.
+'''
+def cast_values(schema: pa.Schema, column: str, values: list[str]) -> pa.Array:
+    try:
+        return pa.array(values, pa.string()).cast(schema.field(column).type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        raise QueryError(f"Invalid value for {column} ({schema.field(column).type}): {values}")
+
+
+'''
+Build the filter of a query from its parameters, with every value cast to the type of its column.
+
+:param schema: Schema of the table.
+:param params: Filter parameters, as lists of values by parameter name.
+
+:return: Pyarrow filter expression, or None to keep every row.
+'''
+def build_filter(schema: pa.Schema, params: dict[str, list[str]]) -> pc.Expression | None:
+    expression = None
+    for name, values in params.items():
+        column, _, op = name.partition("__")
+        if schema.get_field_index(column) < 0:
+            raise QueryError(f"Unknown column: {column}")
+        if op and op not in COMPARISONS:
+            raise QueryError(f"Unknown operator: {op}, expected one of {sorted(COMPARISONS)}")
+
+        typed = cast_values(schema, column, values)
+        field = pc.field(column)
+        if op:
+            condition = COMPARISONS[op](field, typed[0])
+        elif len(typed) == 1:
+            condition = field == typed[0]
+        else:
+            condition = field.isin(typed)
+        expression = condition if expression is None else expression & condition
+
+    return expression
+
+
+'''
+Parse the parameters of a query into its column selection, its row limit and its filters.
+
+:param schema: Schema of the table.
+:param params: Query parameters, as lists of values by parameter name.
+
+:return: Columns to return (None for every column), maximum number of rows to return (None for every row), and filter
+    parameters.
+'''
+def parse_query(
+    schema: pa.Schema,
+    params: dict[str, list[str]],
+) -> tuple[list[str] | None, int | None, dict[str, list[str]]]:
+    params = dict(params)
+
+    columns = None
+    if "columns" in params:
+        columns = [column for value in params.pop("columns") for column in value.split(",") if column]
+        unknown = [column for column in columns if schema.get_field_index(column) < 0]
+        if unknown:
+            raise QueryError(f"Unknown columns: {unknown}")
+
+    limit = None
+    if "limit" in params:
+        try:
+            limit = int(params.pop("limit")[-1])
+        except ValueError:
+            raise QueryError("Invalid limit, expected an integer")
+
+    return columns, limit, params
+
+
+'''
+Build the scanner of a query: its filter and column selection are pushed down into the read of the table.
+
+:param dataset: Pyarrow dataset of the table.
+:param params: Query parameters, as lists of values by parameter name.
+
+:return: Pyarrow scanner, and the maximum number of rows to return (None for every row).
+'''
+def build_scanner(dataset: ds.Dataset, params: dict[str, list[str]]) -> tuple[ds.Scanner, int | None]:
+    columns, limit, filters = parse_query(dataset.schema, params)
+    scanner = dataset.scanner(columns=columns, filter=build_filter(dataset.schema, filters))
+    return scanner, limit
+
+
+'''
+Run a query through the bitmap index of its table: its equality filters on indexed columns are intersected in the
+index, only the matching rows are taken from the table, then its other filters are applied to them.
+
+:param dataset: Pyarrow dataset of the table.
+:param index: Bitmap index of the table.
+:param params: Query parameters, as lists of values by parameter name.
+
+:return: Arrow Table of the rows, or None if no filter of the query is on an indexed column.
+'''
+def search_index(dataset: ds.Dataset, index: BitmapIndex, params: dict[str, list[str]]) -> pa.Table | None:
+    columns, limit, filters = parse_query(dataset.schema, params)
+
+    indexed = {
+        name: cast_values(dataset.schema, name, values).to_pylist()
+        for name, values in filters.items() if name in index.entries
+    }
+    if not indexed:
+        return None
+    filters = {name: values for name, values in filters.items() if name not in indexed}
+    expression = build_filter(dataset.schema, filters)
+
+    row_ids = index.search(indexed)
+    if expression is None and limit is not None:
+        row_ids = row_ids[:limit]
+
+    # Filtered columns are read along with the selected ones, and dropped once filtered on
+    read_columns = None
+    if columns is not None:
+        read_columns = list(dict.fromkeys(columns + [name.partition("__")[0] for name in filters]))
+    table = dataset.take(pa.array(row_ids), columns=read_columns)
+
+    if expression is not None:
+        table = table.filter(expression)
+    if columns is not None:
+        table = table.select(columns)
+    return table if limit is None else table.slice(0, limit)
+
+
+'''
+Run a scouting search: its filters and score are evaluated over the scouting index of the table, and only the top
+rows are taken from the table.
+
+:param table: Arrow Table of the aggregates.
+:param index: Scouting index of the table.
+:param params: Query parameters, as lists of values by parameter name.
+
+:return: Arrow Table of the top rows, ranked by score if one is given, with their score.
+'''
+def run_scouting(table: pa.Table, index: ScoutingIndex, params: dict[str, list[str]]) -> pa.Table:
+    params = dict(params)
+
+    weights = {}
+    for item in (item for value in params.pop("score", []) for item in value.split(",") if item):
+        metric, _, weight = item.partition(":")
+        try:
+            weights[metric] = float(weight) if weight else 1.0
+        except ValueError:
+            raise QueryError(f"Invalid weight for {metric}, expected a number")
+
+    columns, limit, filters = parse_query(table.schema, params)
+    conditions = []
+    for name, values in filters.items():
+        column, _, op = name.partition("__")
+        if op in RANGE_OPS:
+            try:
+                values = [float(values[0])]
+            except ValueError:
+                raise QueryError(f"Invalid value for {column}, expected a number: {values}")
+        conditions.append((column, op or "in", values))
+
+    try:
+        rows, scores = index.search(conditions, weights, limit)
+    except ValueError as error:
+        raise QueryError(str(error))
+
+    result = table.take(pa.array(rows))
+    if columns is not None:
+        result = result.select(columns)
+    if scores is not None:
+        result = result.append_column("score", pa.array(scores))
+    return result
+
+
+'''
+Normalize the parameters of a query, so that equivalent queries share their cache entries: parameters are sorted by
+name, and the values of equality filters sorted and deduplicated.
+
+:param params: Query parameters, as lists of values by parameter name.
+
+:return: JSON-serializable normalized query.
+'''
+def normalize_query(params: dict[str, list[str]]) -> dict[str, list[str]]:
+    normalized = {}
+    for name, values in sorted(params.items()):
+        if name == "columns":
+            normalized[name] = [column for value in values for column in value.split(",") if column]
+        elif name in ("limit", "score") or ("__" in name and name.partition("__")[2] not in ("any", "contains")):
+            normalized[name] = list(values)
+        else:
+            normalized[name] = sorted(set(values))
+    return normalized
+
+
+'''
+Handler of the requests to the query service. Queries are checked before their response starts, so that errors in
+them get a proper status, then their rows are streamed batch by batch, or sent from the result cache.
+'''
+class QueryHandler(BaseHTTPRequestHandler):
+    tables: GoldTables
+    cache: ResultCache | None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [unquote(part) for part in url.path.strip("/").split("/")]
+        try:
+            if parts == ["tables"]:
+                self.send_tables()
+            elif parts == ["cache"]:
+                self.send_json(self.cache.stats() if self.cache is not None else {})
+            elif len(parts) == 2 and parts[0] == "query":
+                self.send_query(parts[1], parse_qs(url.query, keep_blank_values=True))
+            elif len(parts) == 2 and parts[0] == "scout":
+                self.send_scouting(parts[1], parse_qs(url.query, keep_blank_values=True))
+            else:
+                raise QueryError(f"Unknown endpoint: {url.path}", HTTPStatus.NOT_FOUND)
+        except QueryError as error:
+            self.send_json({"error": str(error)}, error.status)
+
+    def send_tables(self):
+        tables = {}
+        for name in self.tables.names():
+            dataset = self.tables.get(name)
+            tables[name] = {
+                "columns": {field.name: str(field.type) for field in dataset.schema},
+                "rows": dataset.count_rows(),
+            }
+        self.send_json(tables)
+
+    def send_query(self, name: str, params: dict[str, list[str]]):
+        def run_query():
+            dataset = self.tables.get(name)
+            index = self.tables.get_index(name, dataset)
+            table = search_index(dataset, index, params) if index is not None else None
+            if table is not None:
+                return table.schema, table.to_batches()
+
+            scanner, limit = build_scanner(dataset, params)
+            batches = scanner.head(limit).to_batches() if limit is not None else scanner.to_batches()
+            return scanner.projected_schema, batches
+
+        self.send_cached("query", name, params, run_query)
+
+    def send_scouting(self, name: str, params: dict[str, list[str]]):
+        def run_search():
+            table, index = self.tables.get_scouting(name)
+            result = run_scouting(table, index, params)
+            return result.schema, result.to_batches()
+
+        self.send_cached("scout", name, params, run_search)
+
+    def send_cached(self, endpoint: str, name: str, params: dict[str, list[str]], run):
+        if self.cache is None:
+            self.send_batches(*run())
+            return
+
+        # The version is read before the query runs: a table rewritten meanwhile gets a new version, never this result
+        version = self.tables.version(name)
+        query = [endpoint, normalize_query(params)]
+        result = self.cache.get(name, version, query)
+        if result is None:
+            schema, batches = run()
+            batches = iter(batches)
+
+            # Batches are buffered only while the result can still be cached, a larger one is streamed uncached
+            buffered, size = [], 0
+            for batch in batches:
+                buffered.append(batch)
+                size += pa.ipc.get_record_batch_size(batch)
+                if size > self.cache.max_entry_bytes:
+                    self.send_batches(schema, itertools.chain(buffered, batches))
+                    return
+
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, schema) as writer:
+                for batch in buffered:
+                    writer.write_batch(batch)
+            result = sink.getvalue().to_pybytes()
+            self.cache.put(name, version, query, result)
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", ARROW_STREAM_TYPE)
+        self.send_header("Content-Length", str(len(result)))
+        self.end_headers()
+        self.wfile.write(result)
+
+    def send_batches(self, schema: pa.Schema, batches):
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", ARROW_STREAM_TYPE)
+        self.end_headers()
+
+        with pa.ipc.new_stream(self.wfile, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+
+    def send_json(self, payload, status: HTTPStatus = HTTPStatus.OK):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+'''
+Create the query service, serving each request in its own thread.
+
+:param gold_path: Path to the gold layer folder.
+:param host: Address to listen on (default is localhost only).
+:param port: Port to listen on (default is 8765).
+:param cache_mb: Budget of the result cache, in MB (default is 256, 0 disables the cache).
+:param cache_path: Folder to persist the result cache to (default is None, in memory only).
+
+:return: HTTP server, to run with serve_forever().
+'''
+def create_server(
+    gold_path: Path,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    cache_mb: int = 256,
+    cache_path: Path | None = None,
+) -> ThreadingHTTPServer:
+    cache = ResultCache(cache_mb * 1024 * 1024, cache_path) if cache_mb > 0 else None
+    handler = type("GoldQueryHandler", (QueryHandler,), {"tables": GoldTables(gold_path), "cache": cache})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve filtered queries over the gold tables on localhost.")
+    parser.add_argument("--gold-path", type=Path, default=Path(__file__).resolve().parent.parent / "data/delta/gold")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on")
+    parser.add_argument("--cache-mb", type=int, default=256, help="result cache budget in MB, 0 to disable it")
+    parser.add_argument("--cache-path", type=Path, default=None, help="folder to persist the result cache to")
+    args = parser.parse_args()
+
+    server = create_server(args.gold_path, args.host, args.port, args.cache_mb, args.cache_path)
+    print(f"Serving the gold tables of {args.gold_path} on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+'''
+Utilities to cache the results of the query service: an LRU cache of serialized results within a budget of bytes,
+keyed by the query and the version of the table it reads, optionally persisted to disk.
+'''
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+'''
+LRU cache of query results, within a budget of bytes. Results are keyed by their query and the version of the table
+they read, so that a new version of a table is never answered from the results of the previous one, and the entries
+of the previous versions of a table are dropped as soon as a new version is seen. Entries can be persisted to a folder
+(<table>.<version>.<key>.arrows files), to be reused by the next processes serving the same table versions. Results
+larger than a quarter of the budget are not cached.
+'''
+class ResultCache:
+    def __init__(self, max_bytes: int, path: Path | None = None):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        # Entries by key: table, version, result (None while only on disk) and size
+        self._entries: OrderedDict[str, tuple[str, str, bytes | None, int]] = OrderedDict()
+        self._versions: dict[str, str] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        if path is not None:
+            path.mkdir(parents=True, exist_ok=True)
+            for file in sorted(path.glob("*.arrows"), key=lambda file: file.stat().st_mtime_ns):
+                table, version, key = file.stem.rsplit(".", 2)
+                self._entries[key] = (table, version, None, file.stat().st_size)
+                self._bytes += file.stat().st_size
+            with self._lock:
+                self._evict()
+
+    def _file(self, key: str) -> Path:
+        table, version, _, _ = self._entries[key]
+        return self.path / f"{table}.{version}.{key}.arrows"
+
+    def _drop(self, key: str):
+        if self.path is not None:
+            self._file(key).unlink(missing_ok=True)
+        self._bytes -= self._entries.pop(key)[3]
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            self._drop(next(iter(self._entries)))
+
+    def _set_version(self, table: str, version: str):
+        if self._versions.get(table) != version:
+            self._versions[table] = version
+            for key in [key for key, entry in self._entries.items() if entry[0] == table and entry[1] != version]:
+                self._drop(key)
+
+    def _key(self, table: str, version: str, query) -> str:
+        payload = json.dumps([table, version, query], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def get(self, table: str, version: str, query) -> bytes | None:
+        key = self._key(table, version, query)
+        with self._lock:
+            self._set_version(table, version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if entry[2] is not None:
+                return entry[2]
+            file = self._file(key)
+
+        # Persisted entries are read outside of the lock, and kept in memory once read
+        try:
+            result = file.read_bytes()
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries[key] = (*self._entries[key][:2], result, len(result))
+        return result
+
+    @property
+    def max_entry_bytes(self) -> int:
+        return self.max_bytes // 4
+
+    def put(self, table: str, version: str, query, result: bytes):
+        if len(result) > self.max_entry_bytes:
+            return
+
+        key = self._key(table, version, query)
+        with self._lock:
+            self._set_version(table, version)
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (table, version, result, len(result))
+            self._bytes += len(result)
+            if self.path is not None:
+                tmp_file = self._file(key).with_suffix(".tmp")
+                tmp_file.write_bytes(result)
+                tmp_file.replace(self._file(key))
+            self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
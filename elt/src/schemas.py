@@ -223,6 +223,29 @@ gold_schemas = {
         "team_number_color": pl.Utf8,
     },
 
+    "gold_event_snapshots": {
+        "event_id": pl.Utf8,
+        "snapshot": pl.Utf8,
+        "match_id": pl.Int64,
+        "frame": pl.Int32,
+        "timestamp": pl.Utf8,
+        "period": pl.Int32,
+        "object_id": pl.Int32,
+        "player_id": pl.Int32,
+        "player_name": pl.Utf8,
+        "player_number": pl.Int16,
+        "team_id": pl.Int32,
+        "team_shortname": pl.Utf8,
+        "group": pl.Utf8,
+        "position_acronym": pl.Utf8,
+        "x": pl.Float32,
+        "y": pl.Float32,
+        "z": pl.Float32,
+        "has_possession": pl.Boolean,
+        "team_jersey_color": pl.Utf8,
+        "team_number_color": pl.Utf8,
+    },
+
     "gold_dynamic_events": {
         "match_id": pl.Int64,
         "match_name": pl.Utf8,
@@ -297,6 +320,133 @@ gold_schemas = {
         "y_end_tracking": pl.Float32,
     },
 
+    "gold_player_match_partials": {
+        "match_id": pl.Int64,
+        "player_id": pl.Int32,
+        "team_id": pl.Int32,
+        "competition_edition_id": pl.Int32,
+        "date_time": pl.Datetime("us"),
+        "position_acronym": pl.Utf8,
+        "minutes_played": pl.Float32,
+        "matches_played": pl.Int16,
+        "starts": pl.Int16,
+        "off_ball_runs": pl.Int32,
+        "off_ball_runs_targeted": pl.Int32,
+        "dropping_off_runs": pl.Int32,
+        "dropping_off_runs_targeted": pl.Int32,
+        "coming_short_runs": pl.Int32,
+        "coming_short_runs_targeted": pl.Int32,
+        "pulling_wide_runs": pl.Int32,
+        "pulling_wide_runs_targeted": pl.Int32,
+        "pulling_half_space_runs": pl.Int32,
+        "pulling_half_space_runs_targeted": pl.Int32,
+        "support_runs": pl.Int32,
+        "support_runs_targeted": pl.Int32,
+        "run_ahead_of_the_ball_runs": pl.Int32,
+        "run_ahead_of_the_ball_runs_targeted": pl.Int32,
+        "overlap_runs": pl.Int32,
+        "overlap_runs_targeted": pl.Int32,
+        "underlap_runs": pl.Int32,
+        "underlap_runs_targeted": pl.Int32,
+        "behind_runs": pl.Int32,
+        "behind_runs_targeted": pl.Int32,
+        "cross_receiver_runs": pl.Int32,
+        "cross_receiver_runs_targeted": pl.Int32,
+        "on_ball_engagements": pl.Int32,
+        "pressures": pl.Int32,
+        "recovery_pressures": pl.Int32,
+        "counter_pressures": pl.Int32,
+        "on_ball_engagement_recoveries": pl.Int32,
+        "pressure_recoveries": pl.Int32,
+        "recovery_pressure_recoveries": pl.Int32,
+        "counter_pressure_recoveries": pl.Int32,
+        "on_ball_engagements_high": pl.Int32,
+        "on_ball_engagement_high_recoveries": pl.Int32,
+        "pressures_high": pl.Int32,
+        "pressure_high_recoveries": pl.Int32,
+        "recovery_pressures_high": pl.Int32,
+        "recovery_pressure_high_recoveries": pl.Int32,
+        "counter_pressures_high": pl.Int32,
+        "counter_pressure_high_recoveries": pl.Int32,
+        "passing_option_score_sum": pl.Float32,
+        "passing_option_score_count": pl.Int32,
+        "in_possession_events": pl.Int32,
+        "passes": pl.Int32,
+        "passes_completed": pl.Int32,
+        "xpass_completion_sum": pl.Float32,
+        "xpass_completion_count": pl.Int32,
+        "xpass_completion_completed_sum": pl.Float32,
+        "xpass_completion_completed_count": pl.Int32,
+        "xthreat_sum": pl.Float32,
+        "xthreat_count": pl.Int32,
+        "line_breaking_passes": pl.Int32,
+        "line_breaking_passes_completed": pl.Int32,
+        "first_line_breaking_passes": pl.Int32,
+        "second_last_line_breaking_passes": pl.Int32,
+        "last_line_breaking_passes": pl.Int32,
+        "first_line_breaking_passes_completed": pl.Int32,
+        "second_last_line_breaking_passes_completed": pl.Int32,
+        "last_line_breaking_passes_completed": pl.Int32,
+        "ahead_passes": pl.Int32,
+        "ahead_passes_completed": pl.Int32,
+    },
+
+    "gold_team_match_partials": {
+        "match_id": pl.Int64,
+        "team_id": pl.Int32,
+        "competition_edition_id": pl.Int32,
+        "date_time": pl.Datetime("us"),
+        "minutes_played": pl.Float32,
+        "matches_played": pl.Int16,
+        "off_ball_runs": pl.Int32,
+        "off_ball_runs_targeted": pl.Int32,
+        "dropping_off_runs": pl.Int32,
+        "dropping_off_runs_targeted": pl.Int32,
+        "coming_short_runs": pl.Int32,
+        "coming_short_runs_targeted": pl.Int32,
+        "pulling_wide_runs": pl.Int32,
+        "pulling_wide_runs_targeted": pl.Int32,
+        "pulling_half_space_runs": pl.Int32,
+        "pulling_half_space_runs_targeted": pl.Int32,
+        "support_runs": pl.Int32,
+        "support_runs_targeted": pl.Int32,
+        "run_ahead_of_the_ball_runs": pl.Int32,
+        "run_ahead_of_the_ball_runs_targeted": pl.Int32,
+        "overlap_runs": pl.Int32,
+        "overlap_runs_targeted": pl.Int32,
+        "underlap_runs": pl.Int32,
+        "underlap_runs_targeted": pl.Int32,
+        "behind_runs": pl.Int32,
+        "behind_runs_targeted": pl.Int32,
+        "cross_receiver_runs": pl.Int32,
+        "cross_receiver_runs_targeted": pl.Int32,
+        "on_ball_engagements": pl.Int32,
+        "pressures": pl.Int32,
+        "recovery_pressures": pl.Int32,
+        "counter_pressures": pl.Int32,
+        "on_ball_engagement_recoveries": pl.Int32,
+        "pressure_recoveries": pl.Int32,
+        "recovery_pressure_recoveries": pl.Int32,
+        "counter_pressure_recoveries": pl.Int32,
+        "on_ball_engagements_high": pl.Int32,
+        "on_ball_engagement_high_recoveries": pl.Int32,
+        "pressures_high": pl.Int32,
+        "pressure_high_recoveries": pl.Int32,
+        "recovery_pressures_high": pl.Int32,
+        "recovery_pressure_high_recoveries": pl.Int32,
+        "counter_pressures_high": pl.Int32,
+        "counter_pressure_high_recoveries": pl.Int32,
+        "defense_recovery_height_sum": pl.Float32,
+        "defense_recovery_height_count": pl.Int32,
+        "midfield_recovery_height_sum": pl.Float32,
+        "midfield_recovery_height_count": pl.Int32,
+        "attack_recovery_height_sum": pl.Float32,
+        "attack_recovery_height_count": pl.Int32,
+        "defense_recoveries": pl.Int32,
+        "midfield_recoveries": pl.Int32,
+        "attack_recoveries": pl.Int32,
+    },
+
     "gold_player_aggregates": {
         "player_id": pl.Int32, 
         "player_name": pl.Utf8, 
@@ -554,6 +704,71 @@ gold_schemas = {
 }
 
 
+# Percentile table over every player metric (all numeric columns after the player info columns)
+player_aggregate_columns = list(gold_schemas["gold_player_aggregates"].keys())
+player_percentile_metrics = player_aggregate_columns[player_aggregate_columns.index("starts") + 1:]
+
+gold_schemas["gold_player_percentiles"] = {
+    "player_id": pl.Int32,
+    "team_id": pl.Int32,
+    "competition_id": pl.Int32,
+    "competition_name": pl.Utf8,
+    "season_id": pl.Int32,
+    "season_name": pl.Utf8,
+    "position_group": pl.Utf8,
+    "cohort_position_group": pl.Utf8,
+    "minutes_played": pl.Int32,
+    "cohort_size": pl.Int32,
+    **{f"{metric}_prct": pl.Float32 for metric in player_percentile_metrics},
+    **{f"{metric}_rank": pl.Int32 for metric in player_percentile_metrics},
+}
+
+gold_schemas["gold_similar_players"] = {
+    "player_id": pl.Int32,
+    "player_name": pl.Utf8,
+    "team_id": pl.Int32,
+    "team_shortname": pl.Utf8,
+    "competition_id": pl.Int32,
+    "competition_name": pl.Utf8,
+    "season_id": pl.Int32,
+    "season_name": pl.Utf8,
+    "position_group": pl.Utf8,
+    "similar_rank": pl.Int16,
+    "similar_player_id": pl.Int32,
+    "similar_player_name": pl.Utf8,
+    "similar_team_id": pl.Int32,
+    "similar_team_shortname": pl.Utf8,
+    "similar_competition_id": pl.Int32,
+    "similar_competition_name": pl.Utf8,
+    "similar_season_id": pl.Int32,
+    "similar_season_name": pl.Utf8,
+    "similar_position_group": pl.Utf8,
+    "distance": pl.Float32,
+    "similarity": pl.Float32,
+}
+
+# Rolling form tables: per-match partial columns summed over the last N matches, plus per 90 rates
+player_form_rate_metrics = [
+    column[:-len("_90")] for column in gold_schemas["gold_player_aggregates"]
+    if column.endswith("_90") and column[:-len("_90")] in gold_schemas["gold_player_match_partials"]
+]
+team_form_rate_metrics = [
+    column[:-len("_90")] for column in gold_schemas["gold_team_aggregates"]
+    if column.endswith("_90") and column[:-len("_90")] in gold_schemas["gold_team_match_partials"]
+]
+
+gold_schemas["gold_player_form"] = {
+    "window_size": pl.Int16,
+    **{column: dtype for column, dtype in gold_schemas["gold_player_match_partials"].items() if column != "position_acronym"},
+    **{f"{metric}_90": pl.Float32 for metric in player_form_rate_metrics},
+}
+
+gold_schemas["gold_team_form"] = {
+    "window_size": pl.Int16,
+    **gold_schemas["gold_team_match_partials"],
+    **{f"{metric}_90": pl.Float32 for metric in team_form_rate_metrics},
+}
+
 '''
 Convert a Polars DataType to a PyArrow DataType.
 
@@ -589,45 +804,63 @@ def polars_to_arrow_type(dt: pl.DataType) -> pa.DataType:
 
 
 '''
-Get the PyArrow schema for a given schema name.
+Get the specification of a schema: column names and Polars types, in the column order of the schema.
 
 :param name: Name of the schema.
 
-:return: PyArrow Schema object.
+:return: Polars data types by column name.
 '''
-def get_arrow_schema(name: str) -> pa.Schema:
+def get_schema_spec(name: str) -> dict[str, pl.DataType]:
     spec = bronze_schemas.get(name) or silver_schemas.get(name) or gold_schemas.get(name)
     if spec is None:
         raise ValueError(f"Schema '{name}' not found!")
 
-    return pa.schema([pa.field(col_name, polars_to_arrow_type(col_type)) for col_name, col_type in spec.items()])
+    return spec
 
 
 '''
-Apply the specified schema to a Polars DataFrame.
+Get the PyArrow schema for a given schema name.
 
-:param df: Polars DataFrame to apply the schema to.
 :param name: Name of the schema.
 
-:return: Polars DataFrame with the applied schema.
+:return: PyArrow Schema object.
 '''
-def apply_schema(df: pl.DataFrame, name: str) -> pl.DataFrame:
-    if df is None or df.height == 0:
-        return df
+def get_arrow_schema(name: str) -> pa.Schema:
+    spec = get_schema_spec(name)
 
-    spec = bronze_schemas.get(name) or silver_schemas.get(name) or gold_schemas.get(name)
+    return pa.schema([pa.field(col_name, polars_to_arrow_type(col_type)) for col_name, col_type in spec.items()])
 
-    if spec is None:
-        raise ValueError(f"Schema '{name}' not found!")
 
-    out = df
+'''
+Apply the specified schema to a Polars DataFrame or LazyFrame, as a single projection: every column of the schema is
+cast to its type, or added as nulls when missing, and the columns outside the schema are dropped. On a LazyFrame, the
+casts are part of the query plan and fused with it. Missing and extra columns are found from the frame schema, without
+reading any data.
 
-    for col_name, col_type in spec.items():
-        if col_name in out.columns:
-            out = out.with_columns(pl.col(col_name).cast(col_type))
-        else:
-            out = out.with_columns(pl.lit(None).cast(col_type).alias(col_name))
+:param df: Polars DataFrame or LazyFrame to apply the schema to.
+:param name: Name of the schema.
+:param on_mismatch: What to do when columns are missing or extra: "ignore" (default), "warn" to print them or
+    "raise" to fail.
 
-    out = out.select(list(spec.keys()))
+:return: Polars DataFrame or LazyFrame (as given) with the applied schema.
+'''
+def apply_schema(df: pl.DataFrame | pl.LazyFrame, name: str, on_mismatch: str = "ignore") -> pl.DataFrame | pl.LazyFrame:
+    if df is None or (isinstance(df, pl.DataFrame) and df.height == 0):
+        return df
 
-    return out
+    spec = get_schema_spec(name)
+    columns = df.columns
+
+    missing = [col_name for col_name in spec if col_name not in columns]
+    extra = [col_name for col_name in columns if col_name not in spec]
+    if (missing or extra) and on_mismatch != "ignore":
+        message = f"Schema '{name}': missing columns {missing} (filled with nulls), extra columns {extra} (dropped)"
+        if on_mismatch == "raise":
+            raise ValueError(message)
+        print(message)
+
+    # Null literals are added with with_columns, so that they take the height of the frame, and fused into the select
+    return (df
+        .with_columns([pl.lit(None).cast(spec[col_name]).alias(col_name) for col_name in missing])
+        .select([pl.col(col_name).cast(col_type) for col_name, col_type in spec.items()])
+    )
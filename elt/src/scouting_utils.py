@@ -0,0 +1,167 @@
+'''
+Utilities for scouting searches over a player aggregates table: range filters on many metrics at once, and a ranking
+of the matching players by a weighted score of metrics, keeping only the top k.
+
+Numeric columns are indexed by sorting: a range filter is a binary search in the sorted values of its column, and the
+rows of the most selective filter are the only candidates checked against the others. String columns are dictionary
+encoded, so their filters are evaluated once per distinct value. The top k of the scores is selected by a partial sort.
+'''
+
+import numpy as np
+import polars as pl
+import unicodedata
+
+RANGE_OPS = ("gt", "gte", "lt", "lte")
+STRING_OPS = ("in", "contains", "any")
+
+
+'''
+Fold a string for searches: lower case, without accents.
+
+:param value: String to fold.
+
+:return: Folded string.
+'''
+def fold_string(value: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", value.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+'''
+Scouting index of a player aggregates table. Numeric columns are sorted on first use, string columns are dictionary
+encoded when the index is built. Filters are (column, op, values) triples:
+    in          the column is one of the values (strings).
+    contains    the column contains one of the values, ignoring case and accents (strings, e.g. player names).
+    any         one of the comma-separated items of the column is one of the values (strings, e.g. positions).
+    gt, gte, lt, lte    the column compares to the value (numbers), null values never match.
+'''
+class ScoutingIndex:
+    def __init__(self, df: pl.DataFrame):
+        self.rows = df.height
+        self.numeric: dict[str, np.ndarray] = {}
+        self.strings: dict[str, tuple[list[str | None], np.ndarray, np.ndarray]] = {}
+        self._sorted: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._moments: dict[str, tuple[float, float]] = {}
+
+        for column, dtype in df.schema.items():
+            if dtype.is_numeric():
+                self.numeric[column] = df[column].cast(pl.Float64).fill_null(np.nan).to_numpy()
+            elif dtype == pl.Utf8:
+                encoded = df[column].cast(pl.Categorical).to_physical()
+                values = df[column].cast(pl.Categorical).cat.get_categories().to_list()
+                codes = encoded.fill_null(len(values)).to_numpy().astype(np.int32)
+                counts = np.bincount(codes, minlength=len(values) + 1)
+                self.strings[column] = (values + [None], codes, counts)
+
+    def _sorted_column(self, column: str) -> tuple[np.ndarray, np.ndarray]:
+        if column not in self._sorted:
+            # Null values (NaN) sort last, out of every range
+            order = np.argsort(self.numeric[column], kind="stable").astype(np.int32)
+            self._sorted[column] = (order, self.numeric[column][order])
+        return self._sorted[column]
+
+    def _range(self, column: str, op: str, value: float) -> tuple[int, int]:
+        _, values = self._sorted_column(column)
+        if op in ("gt", "gte"):
+            start = np.searchsorted(values, value, side="right" if op == "gt" else "left")
+            return int(start), int(np.searchsorted(values, np.inf, side="right"))
+        return 0, int(np.searchsorted(values, value, side="left" if op == "lt" else "right"))
+
+    def _allowed_codes(self, column: str, op: str, values: list[str]) -> np.ndarray:
+        categories = self.strings[column][0]
+        if op == "in":
+            wanted = set(values)
+            return np.array([category in wanted for category in categories])
+        if op == "contains":
+            wanted = [fold_string(value) for value in values]
+            return np.array([
+                category is not None and any(value in fold_string(category) for value in wanted)
+                for category in categories
+            ])
+        wanted = set(values)
+        return np.array([
+            category is not None and any(item.strip() in wanted for item in category.split(","))
+            for category in categories
+        ])
+
+    def _moments_of(self, column: str) -> tuple[float, float]:
+        if column not in self._moments:
+            values = self.numeric[column]
+            mean = float(np.nanmean(values)) if np.isfinite(values).any() else 0.0
+            std = float(np.nanstd(values)) if np.isfinite(values).any() else 0.0
+            self._moments[column] = (mean, std if std > 0 else 1.0)
+        return self._moments[column]
+
+    def _check(self, column: str, op: str, values: list) -> None:
+        if column in self.numeric:
+            if op not in RANGE_OPS:
+                raise ValueError(f"Unsupported filter on numeric column {column}: {op}, expected one of {RANGE_OPS}")
+        elif column in self.strings:
+            if op not in STRING_OPS:
+                raise ValueError(f"Unsupported filter on string column {column}: {op}, expected one of {STRING_OPS}")
+        else:
+            raise ValueError(f"Column not indexed: {column}")
+        if not values:
+            raise ValueError(f"No value for the filter on {column}")
+
+    def search(
+        self,
+        filters: list[tuple[str, str, list]],
+        weights: dict[str, float] | None = None,
+        k: int | None = None,
+    ) -> tuple[np.ndarray, np.ndarray | None]:
+        for column, op, values in filters:
+            self._check(column, op, values)
+        for column in weights or {}:
+            if column not in self.numeric:
+                raise ValueError(f"Score metric is not a numeric column: {column}")
+
+        # Candidates come from the most selective filter, every other filter is checked on them only
+        conditions = []
+        for column, op, values in filters:
+            if column in self.numeric:
+                start, end = self._range(column, op, float(values[0]))
+                conditions.append((end - start, column, (start, end)))
+            else:
+                allowed = self._allowed_codes(column, op, values)
+                conditions.append((int(self.strings[column][2][allowed].sum()), column, allowed))
+        conditions.sort(key=lambda condition: condition[0])
+
+        if not conditions:
+            rows = np.arange(self.rows, dtype=np.int32)
+        elif conditions[0][1] in self.numeric:
+            order, _ = self._sorted_column(conditions[0][1])
+            start, end = conditions[0][2]
+            rows = np.sort(order[start:end])
+        else:
+            rows = np.flatnonzero(conditions[0][2][self.strings[conditions[0][1]][1]]).astype(np.int32)
+
+        for _, column, condition in conditions[1:]:
+            if not len(rows):
+                break
+            if column in self.numeric:
+                _, values = self._sorted_column(column)
+                start, end = condition
+                # Bounds of the range as values: rows between them, ties included, are in the range
+                if start >= end:
+                    rows = rows[:0]
+                    continue
+                column_values = self.numeric[column][rows]
+                rows = rows[(column_values >= values[start]) & (column_values <= values[end - 1])]
+            else:
+                rows = rows[condition[self.strings[column][1][rows]]]
+
+        if not weights:
+            return (rows if k is None else rows[:k]), None
+
+        # Metrics are standardized over the whole table, so that weights compare metrics of different scales
+        scores = np.zeros(len(rows))
+        for column, weight in weights.items():
+            mean, std = self._moments_of(column)
+            scores += weight * np.nan_to_num((self.numeric[column][rows] - mean) / std)
+
+        if k is not None and k < len(rows):
+            top = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[top], scores[top]
+        ranked = np.lexsort((rows, -scores))
+        return rows[ranked], scores[ranked]
@@ -0,0 +1,94 @@
+'''
+Utilities for selective pipeline runs: a selection of matches (by identifier, competition edition and date) that the
+stages push down into file discovery, Delta Lake reads and scoped overwrites.
+'''
+
+import polars as pl
+from dataclasses import dataclass
+from datetime import date, datetime
+
+
+'''
+A selection of matches. Empty criteria select everything: matches are selected when they pass every criterion set.
+'''
+@dataclass(frozen=True)
+class Selection:
+    match_ids: tuple[int, ...] = ()
+    competition_edition_ids: tuple[int, ...] = ()
+    since: date | None = None
+
+    '''
+    Tell whether the selection selects every match.
+
+    :return: True when no criterion is set.
+    '''
+    def is_all(self) -> bool:
+        return not self.match_ids and not self.competition_edition_ids and self.since is None
+
+    '''
+    Tell whether a match may be selected knowing its identifier only (e.g. from a file or folder name).
+
+    :param match_id: Match identifier.
+
+    :return: False when the match identifier criterion excludes the match.
+    '''
+    def includes_match_id(self, match_id: int) -> bool:
+        return not self.match_ids or match_id in self.match_ids
+
+    '''
+    Tell whether a match is selected, from its raw match data.
+
+    :param match_data: Raw match data (parsed match JSON file).
+
+    :return: True when the match passes every criterion.
+    '''
+    def includes_match(self, match_data: dict) -> bool:
+        if not self.includes_match_id(match_data["id"]):
+            return False
+
+        if self.competition_edition_ids:
+            if (match_data.get("competition_edition") or {}).get("id") not in self.competition_edition_ids:
+                return False
+
+        if self.since is not None:
+            date_time = match_data.get("date_time")
+            if not date_time or datetime.fromisoformat(date_time.replace("Z", "+00:00")).date() < self.since:
+                return False
+
+        return True
+
+    '''
+    Get the selection as a filter on a match table (needs match_id, competition_edition_id and date_time).
+
+    :return: Polars expression, true for the selected matches.
+    '''
+    def match_filter(self) -> pl.Expr:
+        condition = pl.lit(True)
+        if self.match_ids:
+            condition = condition & pl.col("match_id").is_in(list(self.match_ids))
+        if self.competition_edition_ids:
+            condition = condition & pl.col("competition_edition_id").is_in(list(self.competition_edition_ids))
+        if self.since is not None:
+            condition = condition & (pl.col("date_time").cast(pl.Date) >= self.since)
+        return condition
+
+    def __str__(self) -> str:
+        criteria = []
+        if self.match_ids:
+            criteria.append(f"matches {', '.join(map(str, self.match_ids))}")
+        if self.competition_edition_ids:
+            criteria.append(f"competition editions {', '.join(map(str, self.competition_edition_ids))}")
+        if self.since is not None:
+            criteria.append(f"since {self.since.isoformat()}")
+        return "; ".join(criteria) or "all matches"
+
+
+'''
+Tell whether a run is selective.
+
+:param selection: Selection of matches, or None.
+
+:return: True when the selection leaves matches out.
+'''
+def is_selective(selection: Selection | None) -> bool:
+    return selection is not None and not selection.is_all()
@@ -0,0 +1,360 @@
+'''
+Generate synthetic match data shaped like the SkillCorner open data: one `_match.json`, one extrapolated tracking
+`_tracking_extrapolated.jsonl` and one `_dynamic_events.csv` per match, plus a `match_video_info.csv`. Used to
+benchmark the pipeline at scales the open data does not reach.
+'''
+
+import argparse
+import csv
+import json
+import numpy as np
+from pathlib import Path
+
+POSITIONS = [
+    (1, "GK", "Goalkeeper"),
+    (2, "RB", "Full Back"), (3, "RCB", "Central Defender"), (4, "LCB", "Central Defender"), (5, "LB", "Full Back"),
+    (6, "RDM", "Midfield"), (7, "LDM", "Midfield"), (8, "AM", "Midfield"),
+    (9, "RW", "Wide Attacker"), (10, "LW", "Wide Attacker"), (11, "CF", "Center Forward"),
+]
+SUBSTITUTES = 5
+SUBSTITUTIONS = 3
+
+OFF_BALL_RUN_SUBTYPES = [
+    "dropping_off", "coming_short", "pulling_wide", "pulling_half_space", "support",
+    "run_ahead_of_the_ball", "overlap", "underlap", "behind", "cross_receiver",
+]
+ENGAGEMENT_SUBTYPES = ["pressure", "recovery_press", "counter_press", "other"]
+EVENT_TYPES = ["player_possession", "passing_option", "off_ball_run", "on_ball_engagement"]
+EVENT_TYPE_WEIGHTS = [0.3, 0.4, 0.15, 0.15]
+
+DYNAMIC_EVENTS_COLUMNS = [
+    "match_id", "event_id", "frame_start", "frame_end", "time_start", "time_end", "period",
+    "team_id", "team_shortname", "event_type", "event_subtype",
+    "player_id", "player_name", "player_position",
+    "player_in_possession_id", "player_in_possession_name", "player_in_possession_position",
+    "x_start", "y_start", "x_end", "y_end",
+    "player_in_possession_x_start", "player_in_possession_y_start",
+    "player_in_possession_x_end", "player_in_possession_y_end",
+    "channel_start", "third_start", "channel_end", "third_end",
+    "team_in_possession_phase_type", "team_out_of_possession_phase_type",
+    "start_type", "end_type", "game_state_id", "game_state",
+    "associated_player_possession_event_id", "targeted", "received",
+    "xthreat", "xpass_completion", "passing_option_score", "speed_avg_band",
+    "pressing_chain_index", "pressing_chain_end_type",
+    "first_line_break", "second_last_line_break", "last_line_break",
+    "pass_ahead", "quick_pass", "one_touch",
+]
+
+
+'''
+Format a match clock time in seconds as "MM:SS.s", the dynamic events time format.
+
+:param seconds: Match clock time in seconds.
+
+:return: Formatted time.
+'''
+def format_clock(seconds: float) -> str:
+    return f"{int(seconds // 60):02d}:{seconds % 60:04.1f}"
+
+
+'''
+Build the team and player entries of a synthetic match.
+
+:param team_id: Team ID.
+:param player_id_start: First player ID of the team.
+:param rng: NumPy random generator.
+
+:return: Tuple with the team entry and its player entries.
+'''
+def generate_team(team_id: int, player_id_start: int, rng: np.random.Generator) -> tuple[dict, list[dict]]:
+    team = {"id": team_id, "name": f"Synthetic Team {team_id}", "short_name": f"Team {team_id}", "acronym": f"T{team_id}"}
+
+    # The first substitutes replace starters after 60 minutes, in their role; the others stay on the bench
+    replaced = sorted(rng.choice(range(1, len(POSITIONS)), SUBSTITUTIONS, replace=False).tolist())
+    roles = POSITIONS + [POSITIONS[index] for index in replaced] + [(0, "SUB", "Other")] * (SUBSTITUTES - SUBSTITUTIONS)
+
+    players = []
+    for number, (role_id, acronym, position_group) in enumerate(roles, start=1):
+        player_id = player_id_start + number
+        if number <= len(POSITIONS):
+            start_time, minutes_played = "00:00:00", 60.0 if number - 1 in replaced else 90.0
+        elif acronym != "SUB":
+            start_time, minutes_played = "01:00:00", 30.0
+        else:
+            start_time, minutes_played = None, 0.0
+
+        players.append({
+            "id": player_id,
+            "team_id": team_id,
+            "first_name": f"Player{player_id}",
+            "last_name": f"Synthetic{player_id}",
+            "short_name": f"P. Synthetic{player_id}",
+            "birthday": f"{1990 + int(rng.integers(0, 15))}-{int(rng.integers(1, 13)):02d}-{int(rng.integers(1, 29)):02d}",
+            "gender": "male",
+            "number": number,
+            "playing_time": {"total": {"minutes_played": minutes_played}},
+            "start_time": start_time,
+            "end_time": None,
+            "player_role": {"id": role_id, "acronym": acronym, "position_group": position_group},
+            "yellow_card": int(rng.random() < 0.1),
+            "red_card": 0,
+            "goal": int(rng.random() < 0.05),
+            "own_goal": 0,
+            "injured": False,
+        })
+
+    return team, players
+
+
+'''
+Generate the files of one synthetic match.
+
+:param output_path: Folder where the match files are written.
+:param match_id: Match ID.
+:param home_team_id: Home team ID.
+:param away_team_id: Away team ID.
+:param round_number: Competition round number.
+:param rng: NumPy random generator.
+:param frame_rate: Tracking frame rate in Hz (default is 10).
+:param match_minutes: Minutes of play, split into two periods (default is 90).
+:param events_per_minute: Average number of dynamic events per minute (default is 35).
+
+:return: Number of tracking rows (objects × frames) generated.
+'''
+def generate_match(
+    output_path: Path,
+    match_id: int,
+    home_team_id: int,
+    away_team_id: int,
+    round_number: int,
+    rng: np.random.Generator,
+    frame_rate: int = 10,
+    match_minutes: int = 90,
+    events_per_minute: int = 35,
+) -> int:
+    home_team, home_players = generate_team(home_team_id, home_team_id * 1000, rng)
+    away_team, away_players = generate_team(away_team_id, away_team_id * 1000, rng)
+    period_minutes = match_minutes / 2
+
+    match = {
+        "id": match_id,
+        "home_team_score": int(rng.integers(0, 4)),
+        "away_team_score": int(rng.integers(0, 4)),
+        "date_time": f"2024-{1 + round_number % 12:02d}-{1 + round_number % 28:02d}T18:00:00Z",
+        "stadium": {"id": home_team_id},
+        "home_team": home_team,
+        "away_team": away_team,
+        "home_team_kit": {"id": home_team_id * 10 + 1, "jersey_color": "#d7263d", "number_color": "#ffffff"},
+        "away_team_kit": {"id": away_team_id * 10 + 2, "jersey_color": "#1b998b", "number_color": "#000000"},
+        "home_team_coach": None,
+        "away_team_coach": None,
+        "home_team_side": ["left_to_right", "right_to_left"],
+        "home_team_playing_minutes_tip": round(period_minutes * rng.uniform(0.8, 1.2), 2),
+        "away_team_playing_minutes_tip": round(period_minutes * rng.uniform(0.8, 1.2), 2),
+        "home_team_playing_minutes_otip": round(period_minutes * rng.uniform(0.8, 1.2), 2),
+        "away_team_playing_minutes_otip": round(period_minutes * rng.uniform(0.8, 1.2), 2),
+        "match_periods": [
+            {"period": 1, "duration_minutes": period_minutes},
+            {"period": 2, "duration_minutes": period_minutes},
+        ],
+        "competition_edition": {
+            "id": 1,
+            "competition": {"id": 1, "name": "Synthetic League", "area": "SYN", "gender": "male", "age_group": "adult"},
+            "season": {"id": 1, "start_year": 2024, "end_year": 2025, "name": "2024/2025"},
+        },
+        "competition_round": {"round_number": round_number},
+        "players": home_players + away_players,
+    }
+    (output_path / f"{match_id}_match.json").write_text(json.dumps(match), encoding="utf-8")
+
+    # Tracking: players on the pitch random-walk around their position, the ball moves between them
+    on_pitch = [player for player in home_players + away_players if player["start_time"] == "00:00:00"]
+    frames_per_period = int(period_minutes * 60 * frame_rate)
+    n_frames = 2 * frames_per_period
+    steps = rng.normal(0, 0.35, size=(n_frames, len(on_pitch), 2))
+    positions = np.clip(
+        rng.uniform([-50, -32], [50, 32], size=(len(on_pitch), 2)) + np.cumsum(steps, axis=0) * 0.2,
+        [-52.5, -34],
+        [52.5, 34],
+    )
+    possession_changes = np.cumsum(rng.random(n_frames) < 1 / (8 * frame_rate))
+    possessor = rng.integers(0, len(on_pitch), size=possession_changes[-1] + 1)[possession_changes]
+
+    with open(output_path / f"{match_id}_tracking_extrapolated.jsonl", "w", encoding="utf-8") as f:
+        for index in range(n_frames):
+            period = 1 if index < frames_per_period else 2
+            seconds = index / frame_rate
+            ball_x, ball_y = positions[index, possessor[index]]
+            player = on_pitch[possessor[index]]
+            f.write(json.dumps({
+                "frame": index + 1,
+                "timestamp": f"{int(seconds // 3600):02d}:{int(seconds % 3600 // 60):02d}:{seconds % 60:05.2f}",
+                "period": period,
+                "ball_data": {"x": round(float(ball_x), 2), "y": round(float(ball_y), 2), "z": 0.1, "is_detected": True},
+                "possession": {
+                    "player_id": player["id"],
+                    "group": "home team" if player["team_id"] == home_team_id else "away team",
+                },
+                "player_data": [
+                    {
+                        "player_id": on_pitch[k]["id"],
+                        "x": round(float(positions[index, k, 0]), 2),
+                        "y": round(float(positions[index, k, 1]), 2),
+                        "is_detected": True,
+                    }
+                    for k in range(len(on_pitch))
+                ],
+            }))
+            f.write("\n")
+
+    # Dynamic events, located at the tracking positions of their players
+    n_events = int(events_per_minute * match_minutes)
+    frame_starts = np.sort(rng.integers(1, n_frames - 5 * frame_rate, size=n_events))
+    event_types = rng.choice(EVENT_TYPES, size=n_events, p=EVENT_TYPE_WEIGHTS)
+    player_index = {player["id"]: k for k, player in enumerate(on_pitch)}
+
+    with open(output_path / f"{match_id}_dynamic_events.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=DYNAMIC_EVENTS_COLUMNS)
+        writer.writeheader()
+
+        for index, (frame_start, event_type) in enumerate(zip(frame_starts.tolist(), event_types.tolist())):
+            frame_end = frame_start + int(rng.integers(1, 5 * frame_rate))
+            in_possession = on_pitch[possessor[frame_start - 1]]
+            teammates = [player for player in on_pitch if player["team_id"] == in_possession["team_id"]]
+            opponents = [player for player in on_pitch if player["team_id"] != in_possession["team_id"]]
+
+            if event_type == "player_possession":
+                player, subtype = in_possession, None
+            elif event_type == "on_ball_engagement":
+                player, subtype = opponents[int(rng.integers(len(opponents)))], str(rng.choice(ENGAGEMENT_SUBTYPES))
+            else:
+                player = teammates[int(rng.integers(len(teammates)))]
+                subtype = str(rng.choice(OFF_BALL_RUN_SUBTYPES)) if event_type == "off_ball_run" else None
+
+            period = 1 if frame_start <= frames_per_period else 2
+            seconds_start = frame_start / frame_rate
+            x_start, y_start = positions[frame_start - 1, player_index[player["id"]]]
+            x_end, y_end = positions[frame_end - 1, player_index[player["id"]]]
+            px_start, py_start = positions[frame_start - 1, player_index[in_possession["id"]]]
+            px_end, py_end = positions[frame_end - 1, player_index[in_possession["id"]]]
+            is_pass_option = event_type == "passing_option"
+
+            writer.writerow({
+                "match_id": match_id,
+                "event_id": f"{match_id}_{index}",
+                "frame_start": frame_start,
+                "frame_end": frame_end,
+                "time_start": format_clock(seconds_start),
+                "time_end": format_clock(frame_end / frame_rate),
+                "period": period,
+                "team_id": player["team_id"],
+                "team_shortname": f"Team {player['team_id']}",
+                "event_type": event_type,
+                "event_subtype": subtype,
+                "player_id": player["id"],
+                "player_name": player["short_name"],
+                "player_position": player["player_role"]["acronym"],
+                "player_in_possession_id": in_possession["id"] if event_type != "player_possession" else None,
+                "player_in_possession_name": in_possession["short_name"] if event_type != "player_possession" else None,
+                "player_in_possession_position": in_possession["player_role"]["acronym"] if event_type != "player_possession" else None,
+                "x_start": round(float(x_start), 2),
+                "y_start": round(float(y_start), 2),
+                "x_end": round(float(x_end), 2),
+                "y_end": round(float(y_end), 2),
+                "player_in_possession_x_start": round(float(px_start), 2),
+                "player_in_possession_y_start": round(float(py_start), 2),
+                "player_in_possession_x_end": round(float(px_end), 2),
+                "player_in_possession_y_end": round(float(py_end), 2),
+                "channel_start": None,
+                "third_start": None,
+                "channel_end": None,
+                "third_end": None,
+                "team_in_possession_phase_type": str(rng.choice(["build_up", "create", "finish", "transition"])),
+                "team_out_of_possession_phase_type": str(rng.choice(["high_block", "medium_block", "low_block"])),
+                "start_type": None,
+                "end_type": str(rng.choice(["direct_regain", "indirect_regain", "possession_loss", "pass"]))
+                    if event_type == "on_ball_engagement" else None,
+                "game_state_id": int(rng.integers(0, 3)),
+                "game_state": str(rng.choice(["drawing", "winning", "losing"])),
+                "associated_player_possession_event_id": None,
+                "targeted": bool(rng.random() < 0.3) if is_pass_option else None,
+                "received": bool(rng.random() < 0.2) if is_pass_option else None,
+                "xthreat": round(float(rng.exponential(0.01)), 4) if is_pass_option else None,
+                "xpass_completion": round(float(rng.uniform(0.3, 1)), 4) if is_pass_option else None,
+                "passing_option_score": round(float(rng.uniform(0, 1)), 4) if is_pass_option else None,
+                "speed_avg_band": str(rng.choice(["jogging", "running", "hsr", "sprinting"])),
+                "pressing_chain_index": None,
+                "pressing_chain_end_type": None,
+                "first_line_break": bool(rng.random() < 0.2) if is_pass_option else None,
+                "second_last_line_break": bool(rng.random() < 0.1) if is_pass_option else None,
+                "last_line_break": bool(rng.random() < 0.05) if is_pass_option else None,
+                "pass_ahead": bool(rng.random() < 0.5) if is_pass_option else None,
+                "quick_pass": bool(rng.random() < 0.3) if is_pass_option else None,
+                "one_touch": bool(rng.random() < 0.2) if is_pass_option else None,
+            })
+
+    return n_frames * (len(on_pitch) + 1)
+
+
+'''
+Generate a synthetic dataset of N matches between a pool of teams.
+
+:param output_path: Folder where the raw files are written (e.g. "<base>/data/raw").
+:param n_matches: Number of matches.
+:param frame_rate: Tracking frame rate in Hz (default is 10).
+:param match_minutes: Minutes of play per match (default is 90).
+:param events_per_minute: Average number of dynamic events per minute (default is 35).
+:param seed: Random seed (default is 0).
+
+:return: Number of tracking rows (objects × frames) generated.
+'''
+def generate_dataset(
+    output_path: Path,
+    n_matches: int,
+    frame_rate: int = 10,
+    match_minutes: int = 90,
+    events_per_minute: int = 35,
+    seed: int = 0,
+) -> int:
+    output_path.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    n_teams = max(2, min(20, n_matches + 1))
+    tracking_rows, video_info = 0, []
+    for index in range(n_matches):
+        match_id = 1_000_000 + index
+        home_team_id = 100 + index % n_teams
+        away_team_id = 100 + (index + 1 + index // n_teams) % n_teams
+        if away_team_id == home_team_id:
+            away_team_id = 100 + (home_team_id - 100 + 1) % n_teams
+
+        tracking_rows += generate_match(
+            output_path, match_id, home_team_id, away_team_id, index + 1, rng,
+            frame_rate=frame_rate, match_minutes=match_minutes, events_per_minute=events_per_minute,
+        )
+        video_info.append({"match_id": match_id, "youtube_video_id": "synthetic", "first_period_start": 0,
+                           "second_period_start": int(match_minutes / 2 * 60)})
+
+    with open(output_path / "match_video_info.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["match_id", "youtube_video_id", "first_period_start", "second_period_start"])
+        writer.writeheader()
+        writer.writerows(video_info)
+
+    return tracking_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic SkillCorner-shaped match data.")
+    parser.add_argument("output", type=Path, help="folder where the raw files are written")
+    parser.add_argument("--matches", type=int, default=10, help="number of matches")
+    parser.add_argument("--frame-rate", type=int, default=10, help="tracking frame rate in Hz")
+    parser.add_argument("--minutes", type=int, default=90, help="minutes of play per match")
+    parser.add_argument("--events-per-minute", type=int, default=35, help="average number of dynamic events per minute")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    rows = generate_dataset(args.output, args.matches, args.frame_rate, args.minutes, args.events_per_minute, args.seed)
+    print(f"{args.matches} matches generated at {args.output} ({rows} tracking rows)")
+
+if __name__ == "__main__":
+    main()
@@ -7,314 +7,538 @@ import polars as pl
 from pathlib import Path
 from schemas import apply_schema
 from data_utils import seconds_from_time, get_channel, get_subthird
-from delta_utils import read_delta, write_with_schema
+from delta_utils import merge_with_schema, read_table, write_parts_with_schema, write_with_schema
+from dag_utils import run_tasks, report_tasks
+from memory_utils import check_memory_budget, clear_spill_path, get_batch_rows, get_spill_path, set_memory_budget
+from selection_utils import Selection, is_selective
+from profile_utils import profile_step
 from math import trunc
 
-def main():
-    print("Silver layer transformation started...")
+# Primary keys of the silver tables merged by key: dimensions and player match facts
+PRIMARY_KEYS = {
+    "match": ["match_id"],
+    "player": ["player_id"],
+    "team": ["team_id"],
+    "competition": ["competition_edition_id"],
+    "team_kit": ["team_kit_id"],
+    "player_match": ["match_id", "player_id"],
+}
 
-    base_path = Path(__file__).resolve().parent.parent
+# Merged tables reloaded match by match: their rows missing from the load are deleted, within the loaded matches only.
+# The other merged tables are dimensions, upserted only, so that they keep the rows of earlier loads
+MATCH_FACTS = ["player_match"]
 
-    df_match_raw = read_delta(base_path / "data/delta/bronze/match").collect()
-    df_tracking_raw = read_delta(base_path / "data/delta/bronze/tracking").collect()
-    df_dynamic_events_raw = read_delta(base_path / "data/delta/bronze/dynamic_events")
-    df_match_video_info = read_delta(base_path / "data/delta/bronze/match_video_info").collect()
+# Layout of the silver fact tables, as (columns, method): their rows are written clustered by these columns, so that the
+# file and row group statistics let the reads filtering on them skip most of the data (see delta_utils.cluster_frame).
+# Both lead with match_id, the predicate of the pipeline's own reads (selective runs, gold partials, scoped overwrites),
+# dynamic events then cluster by team and event type for the app filters (see benchmark.py --layout)
+LAYOUTS = {
+    "tracking": (["match_id", "frame"], "linear"),
+    "dynamic_events": (["match_id", "team_id", "event_type"], "linear"),
+}
 
-    dim_match_rows, dim_player_rows, dim_team_rows = [], [], []
-    dim_competition_rows, dim_kit_rows = [], []
-    fact_player_match_rows, fact_tracking_rows = [], []
+# Types of the parsed tracking rows, so that frames built from any subset of the rows (e.g. a part without any ball
+# height) have the same schema
+PARSED_TRACKING_SCHEMA = {
+    "match_id": pl.Int64,
+    "frame": pl.Int64,
+    "timestamp": pl.Utf8,
+    "period": pl.Int64,
+    "object_id": pl.Int64,
+    "x": pl.Float64,
+    "y": pl.Float64,
+    "z": pl.Float64,
+    "group": pl.Utf8,
+    "has_possession": pl.Boolean,
+    "is_detected": pl.Boolean,
+}
+# Memory taken by a raw tracking frame while it is parsed, as a multiple of the length of its JSON line: a frame is
+# parsed into a row dict per tracked object, then into a Polars frame and Parquet buffers
+PARSED_FRAME_BYTES_FACTOR = 16
+
+'''
+Parse the raw tracking frames of a match into tracking fact rows: one row for the ball and one per player per frame.
+
+:param tracking_rows: Raw tracking frames of the match, as JSON strings.
+:param match_id: Match identifier.
+:param home_team_id: Home team identifier.
+:param away_team_id: Away team identifier.
+:param player_team_map: Team identifier by player identifier, for the match.
+
+:return: Tracking fact rows.
+'''
+def parse_tracking_rows(
+    tracking_rows: list[str],
+    match_id: int,
+    home_team_id: int | None,
+    away_team_id: int | None,
+    player_team_map: dict[int, int],
+) -> list[dict]:
+    fact_tracking_rows = []
+
+    for row in tracking_rows:
+        if not row.strip():
+            continue
+        try:
+            tracking_row = json.loads(row)
+        except json.JSONDecodeError:
+            continue
+
+        ts_time = tracking_row.get("timestamp")
 
-    for row in df_match_raw.iter_rows(named=True):
-        match_data = json.loads(row["json"])
-        match_id = match_data["id"]
-        home_team_id = (match_data.get("home_team") or {}).get("id")
-        away_team_id = (match_data.get("away_team") or {}).get("id")
+        period = tracking_row.get("period")
+        frame = tracking_row.get("frame")
 
-        dim_match_rows.append({
+        ball = tracking_row.get("ball_data") or {}
+        fact_tracking_rows.append({
             "match_id": match_id,
-            "home_team_score": match_data.get("home_team_score"),
-            "away_team_score": match_data.get("away_team_score"),
-            "home_team_side_first": match_data.get("home_team_side")[0].split("_")[0],
-            "home_team_side_second": match_data.get("home_team_side")[1].split("_")[0],
-            "away_team_side_first": match_data.get("home_team_side")[1].split("_")[0],
-            "away_team_side_second": match_data.get("home_team_side")[0].split("_")[0],
-            "date_time": match_data.get("date_time"),
-            "stadium_id": match_data.get("stadium", {}).get("id"),
-            "home_team_id": home_team_id,
-            "away_team_id": away_team_id,
-            "team_homekit_id": match_data.get("home_team_kit", {}).get("id"),
-            "team_awaykit_id": match_data.get("away_team_kit", {}).get("id"),
-            "home_team_coach_id": match_data.get("home_team_coach"),
-            "away_team_coach_id": match_data.get("away_team_coach"),
-            "home_team_playing_minutes_tip": match_data.get("home_team_playing_minutes_tip"),
-            "away_team_playing_minutes_tip": match_data.get("away_team_playing_minutes_tip"),
-            "home_team_playing_minutes_otip": match_data.get("home_team_playing_minutes_otip"),
-            "away_team_playing_minutes_otip": match_data.get("away_team_playing_minutes_otip"),
-            "first_period_duration_minutes": match_data.get("match_periods", {})[0].get("duration_minutes"),
-            "second_period_duration_minutes": match_data.get("match_periods", {})[1].get("duration_minutes"),
-            "competition_edition_id": match_data.get("competition_edition", {}).get("id"),
-            "competition_id": match_data.get("competition_edition", {}).get("competition", {}).get("id"),
-            "season_id": match_data.get("competition_edition", {}).get("season", {}).get("id"),
-            "round_number":match_data.get("competition_round", {}).get("round_number"),
+            "frame": frame,
+            "timestamp": ts_time,
+            "period": period,
+            "object_id": -1,
+            "x": ball.get("x"),
+            "y": ball.get("y"),
+            "z": ball.get("z"),
+            "group": "ball",
+            "has_possession": False,
+            "is_detected": ball.get("is_detected"),
         })
 
-        competition_edition = match_data.get("competition_edition", {}) or {}
-        competition = competition_edition.get("competition", {}) or {}
-        season = competition_edition.get("season", {}) or {}
-        dim_competition_rows.append({
-            "competition_edition_id": competition_edition.get("id"),
-            "competition_id": competition.get("id"),
-            "competition_name": competition.get("name"),
-            "area": competition.get("area"),
-            "name": competition.get("name"),
-            "gender": competition.get("gender"),
-            "age_group": competition.get("age_group"),
-            "season_id": season.get("id"),
-            "season_start_year": season.get("start_year"),
-            "season_end_year": season.get("end_year"),
-            "season_name": season.get("name"),
-        })
+        possession_player = tracking_row.get("possession").get("player_id") or {}
+        for player_row in tracking_row.get("player_data", []):
+            player_id = player_row.get("player_id")
+            team_id = player_team_map.get(player_id)
+            if team_id is None:
+                group = None
+            elif team_id == home_team_id:
+                group = "home team"
+            elif team_id == away_team_id:
+                group = "away team"
+            else:
+                group = None
 
-        home = match_data.get("home_team", {}) or {}
-        away = match_data.get("away_team", {}) or {}
-        dim_team_rows.extend([
-            {
-                "team_id": home.get("id"),
-                "name": home.get("name"),
-                "short_name": home.get("short_name"),
-                "acronym": home.get("acronym"),
-            },
-            {
-                "team_id": away.get("id"),
-                "name": away.get("name"),
-                "short_name": away.get("short_name"),
-                "acronym": away.get("acronym"),
-            },
-        ])
-
-        home_kit = match_data.get("home_team_kit", {}) or {}
-        away_kit = match_data.get("away_team_kit", {}) or {}
-        if home_kit:
-            dim_kit_rows.append({
-                "team_kit_id": home_kit.get("id"),
-                "jersey_color": home_kit.get("jersey_color"),
-                "number_color": home_kit.get("number_color"),
-            })
-        if away_kit:
-            dim_kit_rows.append({
-                "team_kit_id": away_kit.get("id"),
-                "jersey_color": away_kit.get("jersey_color"),
-                "number_color": away_kit.get("number_color"),
+            fact_tracking_rows.append({
+                "match_id": match_id,
+                "frame": frame,
+                "timestamp": ts_time,
+                "period": period,
+                "object_id": player_id,
+                "x": player_row.get("x"),
+                "y": player_row.get("y"),
+                "z": None,
+                "group": group,
+                "has_possession": player_id == possession_player,
+                "is_detected": player_row.get("is_detected"),
             })
 
-        player_team_map = {}
-        for player in match_data.get("players", []):
-            player_id = player.get("id")
-            team_id = player.get("team_id")
-            player_team_map[player_id] = team_id
-
-            dim_player_rows.append({
-                "player_id": player.get("id"),
-                "team_id": player.get("team_id"),
-                "first_name": player.get("first_name"),
-                "last_name": player.get("last_name"),
-                "short_name": player.get("short_name"),
-                "birthday": player.get("birthday"),
-                "gender": player.get("gender"),
-            })
+    return fact_tracking_rows
+
+
+'''
+Add the pitch zone (channel and subthird) of each tracked position.
+
+:param fact_tracking: Tracking facts.
+
+:return: Tracking facts with the zone_tracking column.
+'''
+def with_zone_tracking(fact_tracking: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame | pl.LazyFrame:
+    return fact_tracking.with_columns(
+        zone_tracking = pl.col("y").map_elements(get_channel) + pl.col("x").map_elements(get_subthird)
+    )
+
+'''
+Transform the bronze layer into the silver dimension and fact tables.
+
+:param bronze: Bronze tables handed over in memory by the ingestion stage (default is None, reads them from Delta Lake).
+:param persist: Write the silver Delta tables (default is True).
+:param max_workers: Maximum number of tables written concurrently (default is None, the thread pool default).
+:param base_path: Path to the ELT folder, containing the data folder (default is None, the folder of this script).
+:param max_memory_mb: Memory budget in megabytes (default is None, no budget). With a budget, bronze tracking is read
+    match by match and parsed in parts of frames sized from the memory left under the budget, spilled to local Parquet
+    files and streamed into its Delta table, tables are written one at a time and tracking is not handed over.
+:param selection: Selection of matches to transform (default is None, every match). Only the selected matches are
+    read from bronze, and they replace their own rows, and the dimension rows they reference, in the silver tables.
+    Tables are not handed over, downstream stages read the complete tables from Delta Lake.
+:param layouts: Clustering of the tables written, as (columns, method) by table name (default is None, LAYOUTS).
+    An empty mapping writes the rows in the order they are produced.
+
+:return: Silver tables by name, for in-process downstream stages.
+'''
+def main(
+    bronze: dict[str, pl.DataFrame] | None = None,
+    persist: bool = True,
+    max_workers: int | None = None,
+    base_path: Path | None = None,
+    max_memory_mb: int | None = None,
+    selection: Selection | None = None,
+    layouts: dict[str, tuple[list[str], str]] | None = None,
+) -> dict[str, pl.DataFrame]:
+    print("Silver layer transformation started...")
+
+    layouts = LAYOUTS if layouts is None else layouts
+
+    selective = is_selective(selection)
+    if selective:
+        print(f"Selection: {selection}")
+
+    base_path = base_path or Path(__file__).resolve().parent.parent
+
+    out_of_core = max_memory_mb is not None
+    if out_of_core and not persist:
+        raise ValueError("The out-of-core mode hands tracking over through Delta Lake, it cannot run without persisting")
+    set_memory_budget(max_memory_mb)
+
+    with profile_step("read_bronze") as step:
+        # Selected match identifiers are known up front, the other criteria need the match data
+        df_match_raw = read_table(
+            bronze, "match", base_path / "data/delta/bronze/match",
+            predicate=pl.col("match_id").is_in(list(selection.match_ids)) if selective and selection.match_ids else None,
+        ).collect()
+        matches = [json.loads(match_json) for match_json in df_match_raw["json"]]
+        if selective:
+            matches = [match_data for match_data in matches if selection.includes_match(match_data)]
+        match_ids = [match_data["id"] for match_data in matches]
+
+        # Only the selected matches are read from the bronze facts, the filter is pushed down into the Delta scans
+        match_predicate = pl.col("match_id").is_in(match_ids) if selective else None
+        df_tracking_raw = read_table(bronze, "tracking", base_path / "data/delta/bronze/tracking", predicate=match_predicate)
+        df_dynamic_events_raw = read_table(
+            bronze, "dynamic_events", base_path / "data/delta/bronze/dynamic_events", predicate=match_predicate
+        )
+        if not out_of_core:
+            df_tracking_raw = df_tracking_raw.collect()
+        df_match_video_info = read_table(bronze, "match_video_info", base_path / "data/delta/bronze/match_video_info").collect()
+        # Out-of-core, bronze tracking is only counted as it is read, match by match
+        tracking_raw_rows = 0 if out_of_core else df_tracking_raw.height
+        step["rows_out"] = df_match_raw.height + tracking_raw_rows + df_match_video_info.height
+
+    dim_match_rows, dim_player_rows, dim_team_rows = [], [], []
+    dim_competition_rows, dim_kit_rows = [], []
+    fact_player_match_rows, fact_tracking_rows = [], []
+    tracking_parts, spilled_tracking_rows = [], 0
+    spill_path = get_spill_path(base_path, "silver") if out_of_core else None
 
-            total_minutes = (player.get("playing_time") or {}).get("total") or {}
-            fact_player_match_rows.append({
+    with profile_step("parse_matches", rows_in=df_match_raw.height + tracking_raw_rows) as step:
+        for match_data in matches:
+            match_id = match_data["id"]
+            home_team_id = (match_data.get("home_team") or {}).get("id")
+            away_team_id = (match_data.get("away_team") or {}).get("id")
+
+            dim_match_rows.append({
                 "match_id": match_id,
-                "player_id": player.get("id"),
-                "team_id": player.get("team_id"),
+                "home_team_score": match_data.get("home_team_score"),
+                "away_team_score": match_data.get("away_team_score"),
+                "home_team_side_first": match_data.get("home_team_side")[0].split("_")[0],
+                "home_team_side_second": match_data.get("home_team_side")[1].split("_")[0],
+                "away_team_side_first": match_data.get("home_team_side")[1].split("_")[0],
+                "away_team_side_second": match_data.get("home_team_side")[0].split("_")[0],
+                "date_time": match_data.get("date_time"),
+                "stadium_id": match_data.get("stadium", {}).get("id"),
+                "home_team_id": home_team_id,
+                "away_team_id": away_team_id,
+                "team_homekit_id": match_data.get("home_team_kit", {}).get("id"),
+                "team_awaykit_id": match_data.get("away_team_kit", {}).get("id"),
+                "home_team_coach_id": match_data.get("home_team_coach"),
+                "away_team_coach_id": match_data.get("away_team_coach"),
+                "home_team_playing_minutes_tip": match_data.get("home_team_playing_minutes_tip"),
+                "away_team_playing_minutes_tip": match_data.get("away_team_playing_minutes_tip"),
+                "home_team_playing_minutes_otip": match_data.get("home_team_playing_minutes_otip"),
+                "away_team_playing_minutes_otip": match_data.get("away_team_playing_minutes_otip"),
+                "first_period_duration_minutes": match_data.get("match_periods", {})[0].get("duration_minutes"),
+                "second_period_duration_minutes": match_data.get("match_periods", {})[1].get("duration_minutes"),
+                "competition_edition_id": match_data.get("competition_edition", {}).get("id"),
+                "competition_id": match_data.get("competition_edition", {}).get("competition", {}).get("id"),
+                "season_id": match_data.get("competition_edition", {}).get("season", {}).get("id"),
+                "round_number":match_data.get("competition_round", {}).get("round_number"),
+            })
+
+            competition_edition = match_data.get("competition_edition", {}) or {}
+            competition = competition_edition.get("competition", {}) or {}
+            season = competition_edition.get("season", {}) or {}
+            dim_competition_rows.append({
                 "competition_edition_id": competition_edition.get("id"),
                 "competition_id": competition.get("id"),
+                "competition_name": competition.get("name"),
+                "area": competition.get("area"),
+                "name": competition.get("name"),
+                "gender": competition.get("gender"),
+                "age_group": competition.get("age_group"),
                 "season_id": season.get("id"),
-                "number": player.get("number"),
-                "minutes_played": total_minutes.get("minutes_played"),
-                "start_time": player.get("start_time"),
-                "end_time": player.get("end_time"),
-                "player_role_id": (player.get("player_role") or {}).get("id"),
-                "position_group": (player.get("player_role") or {}).get("position_group"),
-                "position_acronym": (player.get("player_role") or {}).get("acronym"),
-                "yellow_card": player.get("yellow_card"),
-                "red_card": player.get("red_card"),
-                "goal": player.get("goal"),
-                "own_goal": player.get("own_goal"),
-                "injured": player.get("injured"),
+                "season_start_year": season.get("start_year"),
+                "season_end_year": season.get("end_year"),
+                "season_name": season.get("name"),
             })
 
-        tracking_rows = (
-            df_tracking_raw.filter(pl.col("match_id") == match_id)["json"]
-            .to_list()
-        )
-        for row in tracking_rows:
-            if not row.strip():
-                continue
-            try:
-                tracking_row = json.loads(row)
-            except json.JSONDecodeError:
-                continue
+            home = match_data.get("home_team", {}) or {}
+            away = match_data.get("away_team", {}) or {}
+            dim_team_rows.extend([
+                {
+                    "team_id": home.get("id"),
+                    "name": home.get("name"),
+                    "short_name": home.get("short_name"),
+                    "acronym": home.get("acronym"),
+                },
+                {
+                    "team_id": away.get("id"),
+                    "name": away.get("name"),
+                    "short_name": away.get("short_name"),
+                    "acronym": away.get("acronym"),
+                },
+            ])
 
-            ts_time = tracking_row.get("timestamp")
+            home_kit = match_data.get("home_team_kit", {}) or {}
+            away_kit = match_data.get("away_team_kit", {}) or {}
+            if home_kit:
+                dim_kit_rows.append({
+                    "team_kit_id": home_kit.get("id"),
+                    "jersey_color": home_kit.get("jersey_color"),
+                    "number_color": home_kit.get("number_color"),
+                })
+            if away_kit:
+                dim_kit_rows.append({
+                    "team_kit_id": away_kit.get("id"),
+                    "jersey_color": away_kit.get("jersey_color"),
+                    "number_color": away_kit.get("number_color"),
+                })
 
-            period = tracking_row.get("period")
-            frame = tracking_row.get("frame")
+            player_team_map = {}
+            for player in match_data.get("players", []):
+                player_id = player.get("id")
+                team_id = player.get("team_id")
+                player_team_map[player_id] = team_id
 
-            ball = tracking_row.get("ball_data") or {}
-            fact_tracking_rows.append({
-                "match_id": match_id,
-                "frame": frame,
-                "timestamp": ts_time,
-                "period": period,
-                "object_id": -1,
-                "x": ball.get("x"),
-                "y": ball.get("y"),
-                "z": ball.get("z"),
-                "group": "ball",
-                "has_possession": False,
-                "is_detected": ball.get("is_detected"),
-            })
+                dim_player_rows.append({
+                    "player_id": player.get("id"),
+                    "team_id": player.get("team_id"),
+                    "first_name": player.get("first_name"),
+                    "last_name": player.get("last_name"),
+                    "short_name": player.get("short_name"),
+                    "birthday": player.get("birthday"),
+                    "gender": player.get("gender"),
+                })
 
-            possession_player = tracking_row.get("possession").get("player_id") or {}
-            for player_row in tracking_row.get("player_data", []):
-                player_id = player_row.get("player_id")
-                team_id = player_team_map.get(player_id)
-                if team_id is None:
-                    group = None
-                elif team_id == home_team_id:
-                    group = "home team"
-                elif team_id == away_team_id:
-                    group = "away team"
-                else:
-                    group = None
-
-                fact_tracking_rows.append({
+                total_minutes = (player.get("playing_time") or {}).get("total") or {}
+                fact_player_match_rows.append({
                     "match_id": match_id,
-                    "frame": frame,
-                    "timestamp": ts_time,
-                    "period": period,
-                    "object_id": player_id,
-                    "x": player_row.get("x"),
-                    "y": player_row.get("y"),
-                    "z": None,
-                    "group": group,
-                    "has_possession": player_id == possession_player,
-                    "is_detected": player_row.get("is_detected"),
+                    "player_id": player.get("id"),
+                    "team_id": player.get("team_id"),
+                    "competition_edition_id": competition_edition.get("id"),
+                    "competition_id": competition.get("id"),
+                    "season_id": season.get("id"),
+                    "number": player.get("number"),
+                    "minutes_played": total_minutes.get("minutes_played"),
+                    "start_time": player.get("start_time"),
+                    "end_time": player.get("end_time"),
+                    "player_role_id": (player.get("player_role") or {}).get("id"),
+                    "position_group": (player.get("player_role") or {}).get("position_group"),
+                    "position_acronym": (player.get("player_role") or {}).get("acronym"),
+                    "yellow_card": player.get("yellow_card"),
+                    "red_card": player.get("red_card"),
+                    "goal": player.get("goal"),
+                    "own_goal": player.get("own_goal"),
+                    "injured": player.get("injured"),
                 })
 
-    fact_tracking_rows = (
-        pl.LazyFrame(fact_tracking_rows)
-        .with_columns(
-            zone_tracking = pl.col("y").map_elements(get_channel) + pl.col("x").map_elements(get_subthird)
-        )
-    )
-
-    dynamic_events_rows = (
-        df_dynamic_events_raw
-            .select([
-                "match_id",
-                "event_id", 
-                "frame_start", "frame_end", 
-                "time_start", "time_end", 
-                "period", 
-                "team_id", "team_shortname",
-                "event_type", "event_subtype",
-                "player_id", "player_name", "player_position", 
-                "player_in_possession_id", "player_in_possession_name", "player_in_possession_position",
-                "x_start","y_start",
-                "x_end","y_end",
-                "player_in_possession_x_start","player_in_possession_y_start",
-                "player_in_possession_x_end","player_in_possession_y_end",
-                "channel_start", "third_start", 
-                "channel_end", "third_end",
-                "team_in_possession_phase_type", "team_out_of_possession_phase_type",
-                "start_type", 
-                "end_type",
-                "game_state_id", "game_state",
-                "associated_player_possession_event_id",
-                "targeted", "received",
-                "xthreat", "xpass_completion", "passing_option_score",
-                "speed_avg_band",
-                "pressing_chain_index",
-                "pressing_chain_end_type",  
-                "first_line_break", "second_last_line_break", "last_line_break",
-                "pass_ahead", "quick_pass", "one_touch",
-            ])
-            .with_columns(
-                seconds_start = pl.col("time_start").map_elements(seconds_from_time),
-                seconds_end = pl.col("time_end").map_elements(lambda x:seconds_from_time(x, start= False))
-            )
-            .with_columns(
-                minute_start = pl.col("seconds_start").map_elements(lambda x: trunc(x / 60) + 1),
-                minute_end = pl.col("seconds_end").map_elements(lambda x: trunc(x / 60) + 1),
-            )
-            .with_columns(
-                zone_start = pl.col("y_start").map_elements(get_channel) + pl.col("x_start").map_elements(get_subthird),
-                zone_end = pl.col("y_end").map_elements(get_channel) + pl.col("x_end").map_elements(get_subthird),
-            )
-            .join(
-                fact_tracking_rows.rename({
-                    "frame": "frame_start",
-                    "object_id": "player_in_possession_id",
-                    "zone_tracking": "player_in_possession_zone_start_from_tracking"
-                })
-                .select(["match_id", "frame_start", "player_in_possession_id", "player_in_possession_zone_start_from_tracking"]),
-                on=["match_id", "frame_start", "player_in_possession_id"],
-                how="left"
+            tracking_rows = (
+                df_tracking_raw.lazy().filter(pl.col("match_id") == match_id).select("json").collect()["json"]
+                .to_list()
             )
+
+            if out_of_core:
+                # Parsed and spilled in parts of frames sized from the memory left under the budget, only the current
+                # part is held in memory
+                frame_bytes = PARSED_FRAME_BYTES_FACTOR * max((len(row) for row in tracking_rows[:100]), default=0)
+                part_frames = get_batch_rows(frame_bytes, max(1, len(tracking_rows)), min_rows=64)
+                for start in range(0, len(tracking_rows), part_frames):
+                    part_rows = parse_tracking_rows(
+                        tracking_rows[start:start + part_frames], match_id, home_team_id, away_team_id, player_team_map
+                    )
+                    if part_rows:
+                        tracking_parts.append(spill_path / f"tracking_{match_id}_{start}.parquet")
+                        with_zone_tracking(pl.DataFrame(part_rows, schema=PARSED_TRACKING_SCHEMA)).write_parquet(
+                            tracking_parts[-1]
+                        )
+                        spilled_tracking_rows += len(part_rows)
+                    check_memory_budget(f"silver tracking of match {match_id}, frames from {start}")
+            else:
+                fact_tracking_rows.extend(
+                    parse_tracking_rows(tracking_rows, match_id, home_team_id, away_team_id, player_team_map)
+                )
+        step["rows_out"] = len(fact_tracking_rows) + spilled_tracking_rows + len(fact_player_match_rows)
+
+    if out_of_core:
+        fact_tracking_rows = pl.scan_parquet(tracking_parts)
+    else:
+        fact_tracking_rows = with_zone_tracking(pl.LazyFrame(fact_tracking_rows, schema=PARSED_TRACKING_SCHEMA))
+
+    with profile_step("dynamic_events") as step:
+        dynamic_events_rows = (
+            df_dynamic_events_raw
+                .select([
+                    "match_id",
+                    "event_id", 
+                    "frame_start", "frame_end", 
+                    "time_start", "time_end", 
+                    "period", 
+                    "team_id", "team_shortname",
+                    "event_type", "event_subtype",
+                    "player_id", "player_name", "player_position", 
+                    "player_in_possession_id", "player_in_possession_name", "player_in_possession_position",
+                    "x_start","y_start",
+                    "x_end","y_end",
+                    "player_in_possession_x_start","player_in_possession_y_start",
+                    "player_in_possession_x_end","player_in_possession_y_end",
+                    "channel_start", "third_start", 
+                    "channel_end", "third_end",
+                    "team_in_possession_phase_type", "team_out_of_possession_phase_type",
+                    "start_type", 
+                    "end_type",
+                    "game_state_id", "game_state",
+                    "associated_player_possession_event_id",
+                    "targeted", "received",
+                    "xthreat", "xpass_completion", "passing_option_score",
+                    "speed_avg_band",
+                    "pressing_chain_index",
+                    "pressing_chain_end_type",  
+                    "first_line_break", "second_last_line_break", "last_line_break",
+                    "pass_ahead", "quick_pass", "one_touch",
+                ])
+                .with_columns(
+                    seconds_start = pl.col("time_start").map_elements(seconds_from_time),
+                    seconds_end = pl.col("time_end").map_elements(lambda x:seconds_from_time(x, start= False))
+                )
+                .with_columns(
+                    minute_start = pl.col("seconds_start").map_elements(lambda x: trunc(x / 60) + 1),
+                    minute_end = pl.col("seconds_end").map_elements(lambda x: trunc(x / 60) + 1),
+                )
+                .with_columns(
+                    zone_start = pl.col("y_start").map_elements(get_channel) + pl.col("x_start").map_elements(get_subthird),
+                    zone_end = pl.col("y_end").map_elements(get_channel) + pl.col("x_end").map_elements(get_subthird),
+                )
+                .join(
+                    fact_tracking_rows.rename({
+                        "frame": "frame_start",
+                        "object_id": "player_in_possession_id",
+                        "zone_tracking": "player_in_possession_zone_start_from_tracking"
+                    })
+                    .select(["match_id", "frame_start", "player_in_possession_id", "player_in_possession_zone_start_from_tracking"]),
+                    on=["match_id", "frame_start", "player_in_possession_id"],
+                    how="left"
+                )
+                .join(
+                    fact_tracking_rows.rename({
+                        "frame": "frame_end",
+                        "object_id": "player_in_possession_id",
+                        "zone_tracking": "player_in_possession_zone_end_from_tracking"
+                    })
+                    .select(["match_id", "frame_end", "player_in_possession_id", "player_in_possession_zone_end_from_tracking"]),
+                    on=["match_id", "frame_end", "player_in_possession_id"],
+                    how="left"
+                )
+                .with_columns(
+                    player_in_possession_zone_start = pl.coalesce([
+                        pl.col("player_in_possession_y_start").map_elements(get_channel) + pl.col("player_in_possession_x_start").map_elements(get_subthird),
+                        pl.col("player_in_possession_zone_start_from_tracking")
+                    ]),
+                    player_in_possession_zone_end = pl.coalesce([
+                        pl.col("player_in_possession_y_end").map_elements(get_channel) + pl.col("player_in_possession_x_end").map_elements(get_subthird),
+                        pl.col("player_in_possession_zone_end_from_tracking")
+                    ])
+                )
+                .drop(["player_in_possession_zone_start_from_tracking","player_in_possession_zone_end_from_tracking"])
+        ).collect(streaming=out_of_core)
+        step["rows_out"] = dynamic_events_rows.height
+
+    with profile_step("apply_schemas"):
+        dim_match_df = (
+            pl.DataFrame(dim_match_rows)
             .join(
-                fact_tracking_rows.rename({
-                    "frame": "frame_end",
-                    "object_id": "player_in_possession_id",
-                    "zone_tracking": "player_in_possession_zone_end_from_tracking"
-                })
-                .select(["match_id", "frame_end", "player_in_possession_id", "player_in_possession_zone_end_from_tracking"]),
-                on=["match_id", "frame_end", "player_in_possession_id"],
+                df_match_video_info,
+                on="match_id",
                 how="left"
             )
-            .with_columns(
-                player_in_possession_zone_start = pl.coalesce([
-                    pl.col("player_in_possession_y_start").map_elements(get_channel) + pl.col("player_in_possession_x_start").map_elements(get_subthird),
-                    pl.col("player_in_possession_zone_start_from_tracking")
-                ]),
-                player_in_possession_zone_end = pl.coalesce([
-                    pl.col("player_in_possession_y_end").map_elements(get_channel) + pl.col("player_in_possession_x_end").map_elements(get_subthird),
-                    pl.col("player_in_possession_zone_end_from_tracking")
-                ])
-            )
-            .drop(["player_in_possession_zone_start_from_tracking","player_in_possession_zone_end_from_tracking"])
-    ).collect()
-
-    dim_match_df = (
-        pl.DataFrame(dim_match_rows)
-        .join(
-            df_match_video_info,
-            on="match_id",
-            how="left"
         )
-    )
 
-    dim_match = apply_schema(dim_match_df, "dim_match").unique(subset=["match_id"])
-    dim_player = apply_schema(pl.DataFrame(dim_player_rows), "dim_player").unique(subset=["player_id"])
-    dim_team = apply_schema(pl.DataFrame(dim_team_rows), "dim_team").unique(subset=["team_id"])
-    dim_competitionetition = apply_schema(pl.DataFrame(dim_competition_rows), "dim_competition").unique(subset=["competition_edition_id"])
-    dim_team_kit = apply_schema(pl.DataFrame(dim_kit_rows), "dim_team_kit").unique(subset=["team_kit_id"])
-    fact_player = apply_schema(pl.DataFrame(fact_player_match_rows), "fact_player_match").unique(subset=["match_id","player_id"])
-    fact_tracking = apply_schema(fact_tracking_rows.collect(), "fact_tracking")
-    fact_dynamic_events = apply_schema(pl.DataFrame(dynamic_events_rows), "fact_dynamic_events")
-
-    write_with_schema(Path(base_path / "data/delta/silver/match"), dim_match, "dim_match")
-    write_with_schema(Path(base_path / "data/delta/silver/player"), dim_player, "dim_player")
-    write_with_schema(Path(base_path / "data/delta/silver/team"), dim_team, "dim_team")
-    write_with_schema(Path(base_path / "data/delta/silver/competition"), dim_competitionetition, "dim_competition")
-    write_with_schema(Path(base_path / "data/delta/silver/team_kit"),  dim_team_kit, "dim_team_kit")
-    write_with_schema(Path(base_path / "data/delta/silver/player_match"), fact_player, "fact_player_match")
-    write_with_schema(Path(base_path / "data/delta/silver/tracking"), fact_tracking, "fact_tracking")
-    write_with_schema(Path(base_path / "data/delta/silver/dynamic_events"), fact_dynamic_events, "fact_dynamic_events")
+        dim_match = apply_schema(dim_match_df, "dim_match").unique(subset=PRIMARY_KEYS["match"])
+        dim_player = apply_schema(pl.DataFrame(dim_player_rows), "dim_player").unique(subset=PRIMARY_KEYS["player"])
+        dim_team = apply_schema(pl.DataFrame(dim_team_rows), "dim_team").unique(subset=PRIMARY_KEYS["team"])
+        dim_competitionetition = apply_schema(pl.DataFrame(dim_competition_rows), "dim_competition").unique(subset=PRIMARY_KEYS["competition"])
+        dim_team_kit = apply_schema(pl.DataFrame(dim_kit_rows), "dim_team_kit").unique(subset=PRIMARY_KEYS["team_kit"])
+        fact_player = apply_schema(pl.DataFrame(fact_player_match_rows), "fact_player_match").unique(subset=PRIMARY_KEYS["player_match"])
+        # Out-of-core, tracking is streamed from its spilled parts when written
+        fact_tracking = None if out_of_core else apply_schema(fact_tracking_rows, "fact_tracking").collect()
+        fact_dynamic_events = apply_schema(pl.DataFrame(dynamic_events_rows), "fact_dynamic_events")
+
+    silver_tables = {
+        "match": (dim_match, "dim_match"),
+        "player": (dim_player, "dim_player"),
+        "team": (dim_team, "dim_team"),
+        "competition": (dim_competitionetition, "dim_competition"),
+        "team_kit": (dim_team_kit, "dim_team_kit"),
+        "player_match": (fact_player, "fact_player_match"),
+        "tracking": (fact_tracking, "fact_tracking"),
+        "dynamic_events": (fact_dynamic_events, "fact_dynamic_events"),
+    }
+
+    # A selective run only replaces the rows of the selected matches, and the dimension rows they reference
+    scope_columns = {
+        "match": "match_id",
+        "player": "player_id",
+        "team": "team_id",
+        "competition": "competition_edition_id",
+        "team_kit": "team_kit_id",
+        "player_match": "match_id",
+        "tracking": "match_id",
+        "dynamic_events": "match_id",
+    }
+
+    def get_scope(name: str, df: pl.DataFrame | None) -> tuple[str, list] | None:
+        if not selective:
+            return None
+        column = scope_columns[name]
+        return (column, match_ids if column == "match_id" else df[column].unique().to_list())
+
+    # Tables with a primary key are merged: only the rows that changed are rewritten. Dimensions are upserted, match
+    # facts also lose their rows missing from the load, within the loaded matches. Tracking and dynamic events are
+    # replaced
+    def write_table(name: str, df: pl.DataFrame | None, schema_name: str):
+        path = Path(base_path / f"data/delta/silver/{name}")
+        if name in MATCH_FACTS:
+            scope = get_scope(name, df) or (("match_id", df["match_id"].unique().to_list()) if df is not None else None)
+            merge_with_schema(path, df, schema_name, PRIMARY_KEYS[name], delete_missing=True, scope=scope)
+        elif name in PRIMARY_KEYS:
+            merge_with_schema(path, df, schema_name, PRIMARY_KEYS[name])
+        else:
+            write_with_schema(path, df, schema_name, replace_where=get_scope(name, df), cluster_by=layouts.get(name))
+
+    # Silver tables are independent, they are written concurrently
+    if persist:
+        with profile_step("write"):
+            tasks = {
+                name: (lambda df=df, name=name, schema_name=schema_name: write_table(name, df, schema_name), [])
+                for name, (df, schema_name) in silver_tables.items()
+            }
+            if out_of_core:
+                tasks["tracking"] = (lambda:
+                    write_parts_with_schema(
+                        Path(base_path / "data/delta/silver/tracking"), tracking_parts, "fact_tracking",
+                        replace_where=get_scope("tracking", None), cluster_by=layouts.get("tracking")
+                    ), [])
+
+            # Out-of-core, tables are written one at a time to bound the memory held at once
+            _, timings = run_tasks(tasks, max_workers=1 if out_of_core else max_workers)
+            report_tasks("Silver layer", tasks, timings)
+
+    if out_of_core:
+        clear_spill_path(spill_path)
 
     print("Silver layer transformation completed!")
 
+    # Downstream stages need the complete tables, a selective run hands them over through Delta Lake
+    if selective:
+        return {}
+
+    return {name: df for name, (df, _) in silver_tables.items()}
+
 if __name__ == "__main__":
     main()
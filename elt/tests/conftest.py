@@ -0,0 +1,8 @@
+'''
+Test configuration: the pipeline modules import each other as top-level modules, from the source folder.
+'''
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
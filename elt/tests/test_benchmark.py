@@ -0,0 +1,94 @@
+'''
+Tests of the benchmark suite: synthetic data generation and the comparison of results against a baseline.
+'''
+
+import json
+import pytest
+from pathlib import Path
+from benchmark import compare_to_baseline, get_machine
+from synthetic_data import generate_dataset
+
+
+'''
+The synthetic dataset has the files of every match, with one tracking frame per frame of play, and its generator
+tells how many tracking rows (tracked objects × frames) it wrote. A seed gives the same files.
+'''
+def test_generate_dataset_is_reproducible(tmp_path: Path):
+    rows = generate_dataset(tmp_path / "a", 2, frame_rate=2, match_minutes=2, events_per_minute=10, seed=3)
+    generate_dataset(tmp_path / "b", 2, frame_rate=2, match_minutes=2, events_per_minute=10, seed=3)
+    generate_dataset(tmp_path / "c", 2, frame_rate=2, match_minutes=2, events_per_minute=10, seed=4)
+
+    files = sorted(file.name for file in (tmp_path / "a").iterdir())
+    assert files == [
+        f"{match_id}_{suffix}" for match_id in (1000000, 1000001)
+        for suffix in ("dynamic_events.csv", "match.json", "tracking_extrapolated.jsonl")
+    ] + ["match_video_info.csv"]
+    assert all((tmp_path / "a" / file).read_bytes() == (tmp_path / "b" / file).read_bytes() for file in files)
+    assert (tmp_path / "a" / files[2]).read_bytes() != (tmp_path / "c" / files[2]).read_bytes()
+
+    tracked = 0
+    for match_id in (1000000, 1000001):
+        match = json.loads((tmp_path / "a" / f"{match_id}_match.json").read_text())
+        assert match["id"] == match_id
+        assert match["home_team"]["id"] != match["away_team"]["id"]
+
+        lines = (tmp_path / "a" / f"{match_id}_tracking_extrapolated.jsonl").read_text().splitlines()
+        frames = [json.loads(line) for line in lines]
+        assert [frame["frame"] for frame in frames] == list(range(1, 2 * 60 * 2 + 1))
+        # Every player on the pitch and the ball
+        tracked += sum(len(frame["player_data"]) + 1 for frame in frames)
+    assert rows == tracked
+
+
+'''
+Build benchmark results of the bronze stage at one scale, measured on this machine.
+
+:param rows_per_s: Throughput of the stage.
+:param peak_rss_mb: Peak memory of the stage.
+
+:return: Benchmark results.
+'''
+def build_results(rows_per_s: float, peak_rss_mb: float) -> dict:
+    return {
+        "config": {"frame_rate": 10, "match_minutes": 10, "machine": get_machine()},
+        "scales": {"1": {"bronze": {"rows_per_s": rows_per_s, "peak_rss_mb": peak_rss_mb}}},
+    }
+
+
+'''
+A throughput drop or a peak memory growth is a regression past the tolerance only, and is reported with its baseline.
+'''
+@pytest.mark.parametrize("rows_per_s, peak_rss_mb, regressions", [
+    (80_000, 120.0, []),
+    (70_000, 100.0, ["bronze at 1 matches: 70,000 rows/s (baseline 100,000 rows/s)"]),
+    (100_000, 130.0, ["bronze at 1 matches: 130.0 MB peak RSS (baseline 100.0 MB)"]),
+])
+def test_compare_to_baseline_flags_regressions_beyond_tolerance(rows_per_s: float, peak_rss_mb: float, regressions):
+    baseline = build_results(100_000, 100.0)
+    assert compare_to_baseline(build_results(rows_per_s, peak_rss_mb), baseline, tolerance=0.25) == regressions
+
+
+'''
+Results measured on another machine, or with another configuration, are not compared against the baseline, however
+much slower they are. Scales missing from the baseline are not compared either.
+'''
+def test_compare_to_baseline_skips_other_machines_and_configurations(capsys):
+    results = build_results(1_000, 1_000.0)
+
+    other_machine = build_results(100_000, 100.0)
+    other_machine["config"]["machine"]["host"] = "another-host"
+    assert compare_to_baseline(results, other_machine, tolerance=0.25) == []
+    assert "not compared" in capsys.readouterr().out
+
+    # Baselines recorded before the machine was
+    unknown_machine = build_results(100_000, 100.0)
+    del unknown_machine["config"]["machine"]
+    assert compare_to_baseline(results, unknown_machine, tolerance=0.25) == []
+
+    other_config = build_results(100_000, 100.0)
+    other_config["config"]["frame_rate"] = 25
+    assert compare_to_baseline(results, other_config, tolerance=0.25) == []
+
+    other_scale = build_results(100_000, 100.0)
+    other_scale["scales"] = {"4": other_scale["scales"].pop("1")}
+    assert compare_to_baseline(results, other_scale, tolerance=0.25) == []
@@ -0,0 +1,98 @@
+'''
+Tests of the bitmap indexes: searches give the rows of the same filters evaluated by Polars.
+'''
+
+import numpy as np
+import polars as pl
+import pytest
+from pathlib import Path
+from bitmap_utils import BITMAP, ROW_IDS, BitmapIndex, write_bitmap_index
+
+COLUMNS = ["event_type", "team_id", "targeted", "zone"]
+
+
+'''
+Build a table of events with low-cardinality columns: frequent and rare values, nulls and booleans.
+
+:param rows: Number of rows.
+
+:return: Polars DataFrame.
+'''
+def build_events(rows: int = 20000) -> pl.DataFrame:
+    rng = np.random.default_rng(0)
+    return pl.DataFrame({
+        "event_type": rng.choice(
+            ["off_ball_run", "passing_option", "player_possession", "rare"], rows, p=[0.4, 0.4, 0.1999, 0.0001]
+        ),
+        "team_id": rng.integers(100, 104, rows).astype(np.int32),
+        "targeted": rng.random(rows) < 0.1,
+        "zone": pl.Series(rng.choice(["left", "center", "right"], rows)).set(pl.Series(rng.random(rows) < 0.05), None),
+    })
+
+
+'''
+Search the rows of a DataFrame with Polars, for the same equality filters as a bitmap index search.
+
+:param df: Polars DataFrame.
+:param filters: Accepted values by column.
+
+:return: Row numbers of the matching rows.
+'''
+def polars_search(df: pl.DataFrame, filters: dict[str, list]) -> np.ndarray:
+    predicate = pl.lit(True)
+    for column, values in filters.items():
+        condition = pl.col(column).is_in([value for value in values if value is not None])
+        if None in values:
+            condition = condition | pl.col(column).is_null()
+        predicate = predicate & condition.fill_null(False)
+    return df.with_row_index("row").filter(predicate)["row"].to_numpy()
+
+
+'''
+Events and their bitmap index, written once for the module.
+'''
+@pytest.fixture(scope="module")
+def events_index(tmp_path_factory) -> tuple[pl.DataFrame, BitmapIndex]:
+    events = build_events()
+    path = tmp_path_factory.mktemp("bitmap") / "events.bitmap.arrow"
+    write_bitmap_index(events, COLUMNS, path)
+    return events, BitmapIndex(path)
+
+
+'''
+Both encodings are used: row ids for rare values, bitmaps for frequent ones.
+'''
+def test_encodings(events_index):
+    _, index = events_index
+    assert index.entries["event_type"]["rare"][0] == ROW_IDS
+    assert index.entries["event_type"]["off_ball_run"][0] == BITMAP
+
+
+'''
+Searches combining filters on several columns, starting from row ids or from bitmaps, give the rows Polars filters.
+'''
+@pytest.mark.parametrize("filters", [
+    {},
+    {"event_type": ["off_ball_run"]},
+    {"event_type": ["rare"]},
+    {"event_type": ["rare", "player_possession"], "team_id": [101]},
+    {"event_type": ["off_ball_run", "passing_option"], "team_id": [100, 103], "targeted": [True]},
+    {"targeted": [False], "zone": [None]},
+    {"zone": ["left", None], "team_id": [102]},
+    {"event_type": ["unknown"]},
+    {"event_type": ["rare"], "targeted": [True], "zone": ["center"]},
+])
+def test_search_matches_polars_filter(events_index, filters: dict):
+    events, index = events_index
+    rows = index.search(filters)
+    assert np.array_equal(rows, polars_search(events, filters))
+    assert index.count(filters) == len(rows)
+
+
+'''
+A column that is not indexed cannot be searched.
+'''
+def test_search_unknown_column(events_index):
+    _, index = events_index
+    with pytest.raises(KeyError):
+        index.search({"player_name": ["Someone"]})
@@ -0,0 +1,297 @@
+'''
+Tests of the gold stage: season aggregates updated incrementally from the match partials.
+'''
+
+import numpy as np
+import pytest
+import polars as pl
+import shutil
+from deltalake import DeltaTable
+from pathlib import Path
+import build_gold
+import ingest_bronze
+import transform_silver
+from schemas import apply_schema, gold_schemas, player_percentile_metrics
+from synthetic_data import generate_dataset
+
+AGGREGATE_TABLES = ["agg_player_match", "agg_team_match", "agg_player", "agg_team", "player_form", "team_form"]
+
+
+'''
+Build season aggregates of players of two competitions, with random metrics, null metrics and players under the minutes
+threshold, and their position groups.
+
+:param players: Number of players.
+
+:return: Polars DataFrames of the player aggregates and of the player position groups.
+'''
+def build_player_aggregates(players: int = 300) -> tuple[pl.DataFrame, pl.DataFrame]:
+    rng = np.random.default_rng(0)
+    ids = {
+        "player_id": np.arange(players, dtype=np.int32),
+        "team_id": rng.integers(1, 9, players).astype(np.int32),
+        "competition_id": rng.integers(1, 3, players).astype(np.int32),
+        "season_id": np.full(players, 2024, dtype=np.int32),
+    }
+    columns = {}
+    for column, dtype in gold_schemas["gold_player_aggregates"].items():
+        if column in ids:
+            columns[column] = ids[column]
+        elif column in player_percentile_metrics:
+            values = rng.gamma(2.0, 2.0, players)
+            values[rng.random(players) < 0.05] = np.nan
+            columns[column] = values.round(0) if dtype == pl.Int32 else values
+        elif column == "minutes_played":
+            columns[column] = rng.integers(0, 3000, players)
+        else:
+            columns[column] = None
+    player_aggregates = apply_schema(
+        pl.DataFrame(columns).with_columns(pl.col(player_percentile_metrics).fill_nan(None)), "gold_player_aggregates"
+    )
+
+    player_position_groups = pl.DataFrame(ids).drop("player_id").with_columns(
+        player_id=pl.Series(ids["player_id"]),
+        position_group=pl.Series(rng.choice(["Center Back", "Midfield", "Wide Attacker"], players)),
+    )
+    return player_aggregates, player_position_groups
+
+
+'''
+Read a gold table, in an order that does not depend on how it was built.
+
+:param base_path: Path to the ELT folder, containing the data folder.
+:param name: Name of the table.
+
+:return: Polars DataFrame of the table, sorted by every column.
+'''
+def read_gold(base_path: Path, name: str) -> pl.DataFrame:
+    df = pl.read_parquet(base_path / f"data/delta/gold/{name}.parquet")
+    return df.sort(df.columns)
+
+
+'''
+A silver correction of an already aggregated match is picked up by the next incremental gold run, which recomputes
+that match only and gives the same aggregates as a full refresh.
+'''
+def test_incremental_aggregates_match_full_refresh(tmp_path: Path, capsys):
+    base_path = tmp_path / "incremental" / "elt"
+    generate_dataset(base_path / "data/raw", 3, frame_rate=1, match_minutes=4, events_per_minute=60)
+    ingest_bronze.main(base_path=base_path, download=False)
+    transform_silver.main(base_path=base_path)
+    build_gold.main(base_path=base_path)
+
+    # Correction of the silver events of a match: its second half is dropped
+    DeltaTable(str(base_path / "data/delta/silver/dynamic_events")).delete(
+        "CAST(match_id AS BIGINT) = 1000000 AND CAST(frame_start AS BIGINT) > 120"
+    )
+    before = {name: read_gold(base_path, name) for name in AGGREGATE_TABLES}
+
+    full_path = tmp_path / "full" / "elt"
+    shutil.copytree(base_path, full_path)
+
+    capsys.readouterr()
+    build_gold.main(base_path=base_path)
+    assert "Player match partials updated (1 new or changed matches)!" in capsys.readouterr().out
+    build_gold.main(base_path=full_path, full_refresh=True)
+
+    for name in AGGREGATE_TABLES:
+        incremental = read_gold(base_path, name)
+        assert incremental.equals(read_gold(full_path, name)), name
+    assert not read_gold(base_path, "agg_team").equals(before["agg_team"])
+
+
+'''
+Partials are collected without the common subexpression elimination of the pinned Polars version, which gives counts
+by position group filtered on the wrong is_in mask.
+'''
+def test_collect_partials_keeps_is_in_filters_apart():
+    events = pl.LazyFrame({
+        "team_id": [1] * 6,
+        "position_group": [
+            "Full Back", "Central Defender", "Wide Attacker", "Center Forward", "Wide Attacker", "Midfield"
+        ],
+        "x_end": [10.0, 20.0, 70.0, 80.0, 90.0, 50.0],
+    })
+    defense = pl.col("position_group").is_in(["Full Back", "Central Defender"])
+    attack = pl.col("position_group").is_in(["Center Forward", "Wide Attacker"])
+    partials = events.group_by("team_id").agg(
+        pl.col("x_end").filter(defense).count().alias("defense_recovery_height_count"),
+        pl.col("x_end").filter(attack).count().alias("attack_recovery_height_count"),
+        defense.sum().alias("defense_recoveries"),
+        attack.sum().alias("attack_recoveries"),
+    )
+
+    assert build_gold.collect_partials(partials).row(0) == (1, 2, 3, 2, 3)
+
+
+'''
+A second incremental run over unchanged silver tables recomputes no match.
+'''
+def test_incremental_run_skips_unchanged_matches(tmp_path: Path, capsys):
+    base_path = tmp_path / "elt"
+    generate_dataset(base_path / "data/raw", 2, frame_rate=1, match_minutes=4, events_per_minute=60)
+    ingest_bronze.main(base_path=base_path, download=False)
+    transform_silver.main(base_path=base_path)
+    build_gold.main(base_path=base_path)
+
+    capsys.readouterr()
+    build_gold.main(base_path=base_path)
+    output = capsys.readouterr().out
+    assert "Player match partials updated (0 new or changed matches)!" in output
+    assert "Team match partials updated (0 new or changed matches)!" in output
+
+
+'''
+The similar players of every player are its k nearest players of the same competition, season and position group, by
+euclidean distance over the per 90 metrics standardised within the cohort, whatever the size of the chunks of distances.
+'''
+def test_similar_players_match_brute_force():
+    player_aggregates, player_position_groups = build_player_aggregates()
+    metrics = [metric for metric in player_percentile_metrics if metric.endswith("_90")]
+
+    similar_players = build_gold.build_similar_players(
+        player_aggregates, player_position_groups, k=5, min_minutes=270, chunk_size=7
+    )
+
+    players = (player_aggregates
+        .join(player_position_groups, on=["player_id", "team_id", "competition_id", "season_id"])
+        .filter(pl.col("minutes_played") >= 270)
+    )
+    expected = []
+    for group in players.partition_by(["competition_id", "season_id", "position_group"]):
+        values = group.select(metrics).cast(pl.Float64).fill_null(0.0).to_numpy()
+        std = values.std(axis=0)
+        values = (values - values.mean(axis=0)) / np.where(std == 0, 1.0, std)
+        distances = np.linalg.norm(values[:, None, :] - values[None, :, :], axis=2)
+        np.fill_diagonal(distances, np.inf)
+        nearest = np.argsort(distances, axis=1, kind="stable")[:, :5]
+        expected.append(pl.DataFrame({
+            "player_id": np.repeat(group["player_id"].to_numpy(), 5),
+            "similar_rank": np.tile(np.arange(1, 6), group.height),
+            "similar_player_id": group["player_id"].to_numpy()[nearest.ravel()],
+            "distance": np.take_along_axis(distances, nearest, axis=1).ravel(),
+        }))
+    expected = pl.concat(expected).sort(["player_id", "similar_rank"])
+
+    actual = similar_players.sort(["player_id", "similar_rank"])
+    assert actual["player_id"].equals(expected["player_id"])
+    assert actual["similar_player_id"].equals(expected["similar_player_id"].cast(pl.Int32))
+    assert np.allclose(actual["distance"].to_numpy(), expected["distance"].to_numpy())
+    for column in ["competition_id", "season_id", "position_group"]:
+        assert (actual[column] == actual[f"similar_{column}"]).all()
+
+
+'''
+Without any player over the minutes threshold, the similar players table is written empty, with its schema.
+'''
+def test_no_similar_players(tmp_path: Path, capsys):
+    base_path = tmp_path / "elt"
+    generate_dataset(base_path / "data/raw", 1, frame_rate=1, match_minutes=4, events_per_minute=60)
+    ingest_bronze.main(base_path=base_path, download=False)
+    transform_silver.main(base_path=base_path)
+    build_gold.main(base_path=base_path, percentile_min_minutes=10_000)
+
+    similar_players = pl.read_parquet(base_path / "data/delta/gold/similar_players.parquet")
+    assert similar_players.height == 0
+    assert similar_players.schema == gold_schemas["gold_similar_players"]
+    assert "Similar players table created!" in capsys.readouterr().out
+
+
+'''
+Percentiles and ranks of the players over the minutes threshold are those of their value among the values of their
+(competition, season, position group) cohort and of their "All" positions cohort. Other players and null values get
+none.
+'''
+def test_player_percentiles_match_cohort_values():
+    player_aggregates, player_position_groups = build_player_aggregates()
+    metrics = [player_percentile_metrics[0], player_percentile_metrics[-1]]
+
+    percentiles = build_gold.build_player_percentiles(player_aggregates, player_position_groups, min_minutes=270)
+    assert percentiles.height == 2 * player_aggregates.height
+
+    for cohort in percentiles.partition_by(["competition_id", "season_id", "cohort_position_group"]):
+        eligible = cohort["minutes_played"].to_numpy() >= 270
+        assert (cohort["cohort_size"] == eligible.sum()).all()
+
+        players = cohort.select(["player_id"]).join(player_aggregates, on="player_id", how="left")
+        for metric in metrics:
+            values = players[metric].cast(pl.Float64).to_numpy()
+            ranked = np.where(eligible, values, np.nan)
+            others = ranked[~np.isnan(ranked)]
+
+            expected_prct = [
+                np.nan if np.isnan(value) else ((others <= value).sum() - 1) / len(others) * 100
+                for value in ranked
+            ]
+            expected_rank = [np.nan if np.isnan(value) else (others > value).sum() + 1 for value in ranked]
+
+            prct = cohort[f"{metric}_prct"].cast(pl.Float64).fill_null(np.nan).to_numpy()
+            rank = cohort[f"{metric}_rank"].cast(pl.Float64).fill_null(np.nan).to_numpy()
+            assert np.allclose(prct, expected_prct, atol=0.005, equal_nan=True), metric
+            assert np.array_equal(rank, expected_rank, equal_nan=True), metric
+
+
+'''
+Every event with a start frame gets a start and an end snapshot, an open-ended event being a single-frame one, with
+the positions of every object tracked on their frames. The full window keeps the frames in between, and the start
+snapshot of a single-frame event comes before its end one.
+'''
+@pytest.mark.parametrize("full_window", [False, True])
+def test_event_snapshots_cover_event_frames(full_window: bool):
+    dynamic_events = pl.LazyFrame({
+        "match_id": [1, 1, 1, 1, 2],
+        "event_id": ["a", "b", "c", "d", "e"],
+        "frame_start": [2, 3, None, 5, 1],
+        "frame_end": [4, 3, 4, None, 2],
+    }).cast({"match_id": pl.Int32, "frame_start": pl.Int32, "frame_end": pl.Int32})
+    tracking = pl.LazyFrame({
+        "match_id": [1] * 10 + [2] * 2,
+        "frame": [frame for frame in range(1, 6) for _ in range(2)] + [1, 1],
+        "object_id": [10, 20] * 5 + [30, 40],
+        "x": [float(index) for index in range(12)],
+    }).cast({"match_id": pl.Int32, "frame": pl.Int32})
+
+    snapshots = build_gold.build_event_snapshots(dynamic_events, tracking, full_window=full_window).collect()
+
+    # Frame 2 of match 2 is not tracked, so its end snapshot has no positions
+    expected = [("a", "start", 2), ("a", "end", 4), ("b", "start", 3), ("b", "end", 3), ("d", "start", 5),
+                ("d", "end", 5), ("e", "start", 1)]
+    if full_window:
+        expected.insert(1, ("a", "window", 3))
+    assert snapshots.select(["event_id", "snapshot", "frame"]).unique(maintain_order=True).rows() == expected
+    assert snapshots.filter(pl.col("match_id") == 1)["object_id"].to_list() == [10, 20] * (len(expected) - 1)
+    assert snapshots.join(tracking.collect(), on=["match_id", "frame", "object_id"])["x"].equals(snapshots["x"])
+
+
+'''
+The rolling form of a player at a match sums its metrics over its last N played matches up to that one, by date, and
+rates them per 90 minutes; matches it did not play are skipped.
+'''
+def test_rolling_form_sums_last_played_matches():
+    rng = np.random.default_rng(1)
+    rows = 60
+    partials = pl.DataFrame({
+        "match_id": rng.permutation(rows).astype(np.int32),
+        "player_id": rng.integers(1, 4, rows).astype(np.int32),
+        "date_time": rng.permutation(rows).astype("datetime64[D]").astype("datetime64[us]"),
+        "matches_played": (rng.random(rows) < 0.9).astype(np.int32),
+        "minutes_played": rng.integers(0, 91, rows),
+        "shots": rng.integers(0, 5, rows),
+    })
+
+    form = build_gold.build_rolling_form(partials, ["player_id"], ["shots"], windows=(1, 3))
+
+    played = partials.filter(pl.col("matches_played") > 0)
+    assert form.height == 2 * played.height
+    for player in played.partition_by("player_id"):
+        player = player.sort("date_time")
+        for window in (1, 3):
+            actual = form.filter((pl.col("window_size") == window) & (pl.col("player_id") == player["player_id"][0]))
+            actual = actual.sort("date_time")
+            assert actual["match_id"].equals(player["match_id"])
+            for index in range(player.height):
+                last = player.slice(max(0, index - window + 1), min(index + 1, window))
+                minutes, shots = last["minutes_played"].sum(), last["shots"].sum()
+                assert actual["minutes_played"][index] == minutes
+                assert actual["shots"][index] == shots
+                assert actual["shots_90"][index] == (round(shots / minutes * 90, 2) if minutes else 0.0)
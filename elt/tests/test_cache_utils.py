@@ -0,0 +1,85 @@
+'''
+Tests of the stage cache: a stage is skipped while its inputs, code and parameters are unchanged and its outputs exist,
+and runs again as soon as any of them changes.
+'''
+
+import pytest
+from pathlib import Path
+from cache_utils import module_files, path_fingerprint
+from elt import Stage, run_pipeline
+
+
+'''
+The source files of a module cover the local modules it imports, directly or not and however they are imported, and
+leave out the standard library and third-party packages. Import cycles are followed once.
+'''
+def test_module_files_follow_local_imports(tmp_path: Path):
+    (tmp_path / "stage.py").write_text("import json\nimport polars as pl\nfrom helpers import helper\n")
+    (tmp_path / "helpers.py").write_text("import shared, json\n\ndef helper():\n    import lazy\n")
+    (tmp_path / "shared.py").write_text("from helpers import helper\n")
+    (tmp_path / "lazy.py").write_text("")
+    (tmp_path / "unused.py").write_text("")
+
+    files = module_files(tmp_path / "stage.py")
+    assert [file.name for file in files] == ["helpers.py", "lazy.py", "shared.py", "stage.py"]
+
+
+'''
+A one-stage pipeline whose stage copies an input file to its output, with its code spread over two local modules.
+'''
+class CachedPipeline:
+    def __init__(self, path: Path):
+        self.input = path / "input.txt"
+        self.output = path / "output.txt"
+        self.cache_path = path / "cache.json"
+        self.stage_path = path / "copy_stage.py"
+        self.helper_path = path / "copy_helpers.py"
+        self.runs = 0
+        self.input.write_text("rows")
+        self.stage_path.write_text("from copy_helpers import copy\n")
+        self.helper_path.write_text("def copy(text):\n    return text\n")
+
+    def run(self, params: dict, options: dict | None = None) -> bool:
+        runs = self.runs
+
+        def copy(**_):
+            self.runs += 1
+            self.output.write_text(self.input.read_text())
+
+        stage = Stage(
+            "copy",
+            copy,
+            params=params,
+            options=options or {},
+            inputs=lambda: {"input": path_fingerprint(self.input)},
+            code=module_files(self.stage_path),
+            outputs=[self.output],
+        )
+        assert run_pipeline([stage], cache_path=self.cache_path) == 0
+        return self.runs > runs
+
+
+'''
+Changing the input, a helper module of the stage or its parameters, or deleting its output, runs the stage again,
+once. Changing its options does not.
+'''
+@pytest.mark.parametrize("change", ["input", "helper", "params", "output"])
+def test_stage_reruns_when_its_key_or_outputs_change(tmp_path: Path, change: str):
+    pipeline = CachedPipeline(tmp_path)
+    assert pipeline.run({"scale": 1})
+    assert not pipeline.run({"scale": 1}, options={"max_workers": 4})
+
+    params = {"scale": 1}
+    if change == "input":
+        pipeline.input.write_text("more rows")
+    elif change == "helper":
+        # The stage module is unchanged, the helper it imports is not
+        pipeline.helper_path.write_text("def copy(text):\n    return text.upper()\n")
+    elif change == "params":
+        params = {"scale": 2}
+    else:
+        pipeline.output.unlink()
+
+    assert pipeline.run(params)
+    assert pipeline.output.read_text() == pipeline.input.read_text()
+    assert not pipeline.run(params)
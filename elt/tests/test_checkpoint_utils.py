@@ -0,0 +1,92 @@
+'''
+Tests of checkpointed runs: a rerun after a failure resumes from the first incomplete stage and step.
+'''
+
+import json
+from collections import Counter
+from pathlib import Path
+from dag_utils import run_tasks
+from elt import Stage, run_pipeline
+
+
+'''
+A two-stage pipeline whose second stage runs three tasks: "players" and "teams", then "aggregates" from "players".
+Tasks fail on demand, and every stage and task run is counted.
+'''
+class FlakyPipeline:
+    def __init__(self, run_state_path: Path):
+        self.run_state_path = run_state_path
+        self.runs = Counter()
+        self.failing = set()
+
+    def task(self, name: str):
+        def run(**inputs):
+            self.runs[name] += 1
+            if name in self.failing:
+                raise RuntimeError(f"{name} failed")
+            return name
+        return run
+
+    def run(self, resume: bool = True, params: dict | None = None) -> int:
+        def bronze():
+            self.runs["bronze"] += 1
+
+        def silver(bronze=None, **_):
+            run_tasks({
+                "players": (self.task("players"), []),
+                "teams": (self.task("teams"), []),
+                "aggregates": (self.task("aggregates"), ["players"]),
+            }, max_workers=1)
+
+        stages = [Stage("bronze", bronze), Stage("silver", silver, depends_on=["bronze"], params=params or {})]
+        return run_pipeline(stages, run_state_path=self.run_state_path, resume=resume)
+
+
+'''
+After a failed task, the rerun skips the completed stage and the completed tasks no remaining task needs, reruns the
+failed task and the tasks it needs, and completes the run. The next run starts from scratch.
+'''
+def test_rerun_resumes_from_the_failed_step(tmp_path: Path, capsys):
+    pipeline = FlakyPipeline(tmp_path / "run_state.json")
+    pipeline.failing = {"aggregates"}
+    assert pipeline.run() == 1
+    assert pipeline.runs == {"bronze": 1, "players": 1, "teams": 1, "aggregates": 1}
+
+    state = json.loads(pipeline.run_state_path.read_text(encoding="utf-8"))
+    assert state["status"] == "failed"
+    assert state["stages"]["bronze"]["status"] == "completed"
+    assert sorted(state["stages"]["silver"]["steps"]) == ["silver/players", "silver/teams"]
+
+    pipeline.failing = set()
+    capsys.readouterr()
+    assert pipeline.run() == 0
+    output = capsys.readouterr().out
+    assert "Resuming the interrupted run" in output
+    assert "Skipped: bronze (completed by the interrupted run)" in output
+    # Aggregates need the players in memory, the teams are not needed
+    assert pipeline.runs == {"bronze": 1, "players": 2, "teams": 1, "aggregates": 2}
+
+    assert pipeline.run() == 0
+    assert pipeline.runs == {"bronze": 2, "players": 3, "teams": 2, "aggregates": 3}
+
+
+'''
+Restarting discards the checkpoints of the failed run, and a stage whose parameters changed since does not reuse its
+checkpointed steps.
+'''
+def test_restart_or_changed_stage_runs_again(tmp_path: Path):
+    pipeline = FlakyPipeline(tmp_path / "run_state.json")
+    pipeline.failing = {"aggregates"}
+    assert pipeline.run() == 1
+
+    pipeline.failing = set()
+    pipeline.runs.clear()
+    assert pipeline.run(params={"full_refresh": True}) == 0
+    assert pipeline.runs == {"players": 1, "teams": 1, "aggregates": 1}
+
+    pipeline.failing = {"aggregates"}
+    assert pipeline.run() == 1
+    pipeline.failing = set()
+    pipeline.runs.clear()
+    assert pipeline.run(resume=False) == 0
+    assert pipeline.runs == {"bronze": 1, "players": 1, "teams": 1, "aggregates": 1}
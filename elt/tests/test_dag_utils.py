@@ -0,0 +1,87 @@
+'''
+Tests of the task DAG runner: independent tasks run concurrently, dependent ones wait for their inputs.
+'''
+
+import pytest
+import threading
+import time
+from dag_utils import critical_path, run_tasks
+
+
+'''
+Independent tasks run at the same time: each waits for the other at a barrier, which would time out if they ran one
+after the other. Their dependent task starts once both have finished, and receives their results.
+'''
+def test_run_tasks_runs_independent_tasks_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def load(value: int):
+        def task():
+            barrier.wait()
+            time.sleep(0.01)
+            return value
+        return task
+
+    tasks = {
+        "total": (lambda players, teams: players + teams, ["players", "teams"]),
+        "players": (load(2), []),
+        "teams": (load(3), []),
+    }
+    results, timings = run_tasks(tasks, max_workers=2)
+
+    assert results == {"players": 2, "teams": 3, "total": 5}
+    assert timings["total"][0] >= max(timings["players"][1], timings["teams"][1])
+    assert timings["players"][0] < timings["teams"][1] and timings["teams"][0] < timings["players"][1]
+
+
+'''
+The first failed task fails the run with its own error, and the tasks depending on it never start.
+'''
+def test_run_tasks_raises_the_task_error():
+    started = []
+
+    def fail():
+        raise KeyError("missing column")
+
+    tasks = {
+        "silver": (fail, []),
+        "gold": (lambda silver: started.append("gold"), ["silver"]),
+    }
+    with pytest.raises(KeyError, match="missing column"):
+        run_tasks(tasks)
+    assert started == []
+
+
+'''
+Unknown dependencies are rejected before any task runs; a cycle is detected once no task is left to start.
+'''
+def test_run_tasks_rejects_invalid_graphs():
+    with pytest.raises(ValueError, match=r"unknown tasks: \['bronze'\]"):
+        run_tasks({"silver": (lambda bronze: bronze, ["bronze"])})
+
+    with pytest.raises(ValueError, match=r"Cycle between tasks: \['a', 'b'\]"):
+        run_tasks({"a": (lambda b: b, ["b"]), "b": (lambda a: a, ["a"]), "c": (lambda: 1, [])})
+
+
+'''
+The critical path is the chain of dependent tasks with the longest summed duration, not the chain ending last nor the
+longest task.
+'''
+def test_critical_path_is_the_longest_dependent_chain():
+    tasks = {
+        "events": (None, []),
+        "tracking": (None, []),
+        "partials": (None, ["events"]),
+        "aggregates": (None, ["partials"]),
+        "snapshots": (None, ["events", "tracking"]),
+    }
+    timings = {
+        "events": (0.0, 1.0),
+        "tracking": (0.0, 3.0),
+        "partials": (1.0, 3.5),
+        "aggregates": (3.5, 5.5),
+        "snapshots": (4.5, 6.0),
+    }
+
+    assert critical_path(tasks, timings) == (["events", "partials", "aggregates"], 5.5)
+    assert critical_path(tasks, {}) == ([], 0.0)
@@ -0,0 +1,353 @@
+'''
+Tests of the Delta Lake utilities: scoped overwrites and their recovery, streamed writes, table maintenance,
+pushed down reads, merges and clustering.
+'''
+
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import time
+from datetime import datetime, timezone
+from deltalake import DeltaTable
+from pathlib import Path
+import delta_utils
+from cache_utils import delta_data_version, path_fingerprint
+from delta_utils import (
+    cluster_frame, get_scoped_write_journal_path, get_scoped_write_mode, maintain_table, merge_with_schema, read_delta,
+    recover_scoped_writes, rewrite_table, to_delta_schema, write_raw, write_stream_with_schema,
+)
+
+
+'''
+Read the rows of a Delta Lake table, sorted by match and row.
+
+:param path: Path to the Delta Lake table.
+
+:return: Polars DataFrame.
+'''
+def read_rows(path: Path) -> pl.DataFrame:
+    return pl.from_arrow(DeltaTable(str(path)).to_pyarrow_table()).sort(["match_id", "row"])
+
+
+'''
+Build the raw rows of some matches.
+
+:param match_ids: Match identifiers.
+:param rows: Number of rows by match.
+:param tag: Value of the tag column, telling writes apart.
+
+:return: Polars DataFrame.
+'''
+def build_rows(match_ids: list[int], rows: int, tag: str) -> pl.DataFrame:
+    return pl.DataFrame({
+        "match_id": [match_id for match_id in match_ids for _ in range(rows)],
+        "row": list(range(rows)) * len(match_ids),
+        "tag": tag,
+    })
+
+
+'''
+A scoped overwrite replaces the rows of the matches it is scoped to, whatever their number, and leaves the other
+matches as they were.
+'''
+def test_scoped_overwrite_replaces_selected_matches_only(tmp_path: Path):
+    path = tmp_path / "bronze" / "tracking"
+    write_raw(path, build_rows([1, 2, 3], 3, "initial"))
+
+    write_raw(path, build_rows([2], 5, "rerun"), replace_where=("match_id", [2]))
+
+    expected = pl.concat([build_rows([1], 3, "initial"), build_rows([2], 5, "rerun"), build_rows([3], 3, "initial")])
+    assert read_rows(path).equals(expected)
+    assert not get_scoped_write_journal_path(path).exists()
+
+
+'''
+A scoped overwrite whose append fails leaves the table with its rows before the overwrite.
+'''
+def test_failed_scoped_overwrite_is_rolled_back(tmp_path: Path, monkeypatch):
+    path = tmp_path / "bronze" / "tracking"
+    write_raw(path, build_rows([1, 2], 2, "initial"))
+    before = read_rows(path)
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(delta_utils, "write_deltalake", fail)
+
+    with pytest.raises(OSError, match="disk full"):
+        write_raw(path, build_rows([2], 2, "rerun"), replace_where=("match_id", [2]))
+
+    assert read_rows(path).equals(before)
+    assert not get_scoped_write_journal_path(path).exists()
+
+
+'''
+A scoped overwrite interrupted between its delete and its append, as by a crash, is rolled back before the next run
+reads the table. A journal whose append committed is dropped without rolling anything back.
+'''
+def test_interrupted_scoped_overwrite_is_recovered(tmp_path: Path):
+    delta_path = tmp_path / "delta"
+    interrupted, completed = delta_path / "silver" / "tracking", delta_path / "silver" / "player_match"
+    for path in (interrupted, completed):
+        write_raw(path, build_rows([1, 2], 2, "initial"))
+    before = read_rows(interrupted)
+
+    # Crash after the delete: the journal is left behind, the rows of match 2 are gone
+    assert get_scoped_write_mode(interrupted, "overwrite", ("match_id", [2])) == "append"
+    assert read_rows(interrupted)["match_id"].to_list() == [1, 1]
+
+    # Crash after the append, before the journal was dropped
+    assert get_scoped_write_mode(completed, "overwrite", ("match_id", [2])) == "append"
+    rows = build_rows([2], 1, "rerun").to_arrow()
+    delta_utils.write_deltalake(str(completed), rows.cast(to_delta_schema(rows.schema)), mode="append")
+    assert get_scoped_write_journal_path(completed).exists()
+
+    assert recover_scoped_writes(delta_path) == ["silver/tracking"]
+    assert read_rows(interrupted).equals(before)
+    assert read_rows(completed)["tag"].to_list() == ["initial", "initial", "rerun"]
+    assert not any(delta_path.rglob("*.scoped_write.json"))
+
+
+'''
+Build teams in the dim_team schema, with their identifiers as 64-bit integers and an extra column.
+
+:param rows: Number of teams.
+:param start: First team identifier.
+
+:return: Polars DataFrame.
+'''
+def build_teams(rows: int, start: int = 0) -> pl.DataFrame:
+    return pl.DataFrame({
+        "team_id": range(start, start + rows),
+        "name": [f"Team {index:08d} of a long enough name" for index in range(start, start + rows)],
+        "short_name": [f"T{index}" for index in range(start, start + rows)],
+        "acronym": "TMS",
+        "city": "Lyon",
+    })
+
+
+'''
+Read the teams of a Delta Lake table, sorted by identifier.
+
+:param path: Path to the Delta Lake table.
+
+:return: Polars DataFrame.
+'''
+def read_teams(path: Path) -> pl.DataFrame:
+    return pl.from_arrow(DeltaTable(str(path)).to_pyarrow_table()).sort("team_id")
+
+
+'''
+Every kind of source is streamed into the same table, cast to the schema, in files of bounded size whose row groups
+hold at most a batch of rows.
+'''
+@pytest.mark.parametrize("source", ["frame", "lazy", "frames", "reader"])
+def test_stream_writes_any_source_in_bounded_files(tmp_path: Path, source: str, capsys):
+    teams = build_teams(60_000)
+    data = {
+        "frame": lambda: teams,
+        "lazy": lambda: teams.lazy().filter(pl.col("team_id") >= 0),
+        "frames": lambda: (teams.slice(start, 7_000) for start in range(0, teams.height, 7_000)),
+        "reader": lambda: pa.RecordBatchReader.from_batches(
+            teams.to_arrow().schema, teams.to_arrow().to_batches(5_000)
+        ),
+    }[source]()
+    path = tmp_path / "silver" / "team"
+
+    rows = write_stream_with_schema(path, data, "dim_team", target_file_mb=1, batch_rows=4096)
+
+    assert rows == teams.height
+    assert "team - Extra columns: ['city']" in capsys.readouterr().out
+    assert read_teams(path).equals(teams.drop("city").with_columns(pl.col("team_id").cast(pl.Int32)))
+
+    files = DeltaTable(str(path)).get_add_actions(flatten=True).to_pydict()
+    assert len(files["path"]) > 1 and sum(files["num_records"]) == teams.height
+    for file in files["path"]:
+        metadata = pq.ParquetFile(path / file).metadata
+        assert all(metadata.row_group(index).num_rows <= 4096 for index in range(metadata.num_row_groups))
+
+
+'''
+An empty source writes nothing, and a source failing midway leaves the table as it was: the batches are streamed
+into a single commit.
+'''
+def test_stream_write_commits_whole_sources_only(tmp_path: Path):
+    path = tmp_path / "silver" / "team"
+    assert write_stream_with_schema(path, build_teams(0), "dim_team") == 0
+    assert not path.exists()
+
+    write_stream_with_schema(path, build_teams(10), "dim_team")
+
+    def failing_frames():
+        yield build_teams(10, start=100)
+        raise RuntimeError("bronze file truncated")
+
+    with pytest.raises(RuntimeError, match="truncated"):
+        write_stream_with_schema(path, failing_frames(), "dim_team", batch_rows=4)
+    table = DeltaTable(str(path))
+    assert table.version() == 0
+    assert pl.from_arrow(table.to_pyarrow_table())["team_id"].sort().to_list() == list(range(10))
+
+
+'''
+Maintaining a table made of small appends compacts it into one file, vacuums the replaced files and checkpoints its
+log, with its rows and its data version unchanged: the stages reading it stay cached. A later append changes it.
+'''
+def test_maintenance_keeps_rows_and_data_version(tmp_path: Path):
+    path = tmp_path / "silver" / "team"
+    for start in range(0, 50, 10):
+        write_stream_with_schema(path, build_teams(10, start=start), "dim_team", mode="append")
+    rows = read_teams(path)
+    fingerprint = path_fingerprint(path)
+
+    metrics = maintain_table(path, retention_hours=0)
+
+    assert (metrics["before"]["files"], metrics["after"]["files"]) == (5, 1)
+    assert metrics["files_vacuumed"] == 5
+    assert metrics["after"]["unreferenced_files"] == 0
+    assert metrics["after"]["checkpoint_version"] == metrics["after"]["version"]
+    assert read_teams(path).equals(rows)
+    assert path_fingerprint(path) == fingerprint == {"delta_version": 4}
+
+    write_stream_with_schema(path, build_teams(1, start=50), "dim_team", mode="append")
+    assert path_fingerprint(path) == {"delta_version": DeltaTable(str(path)).version()}
+
+
+'''
+A rewrite ordering the table by a clustering commits a plain overwrite, which keeps the data version as a maintenance
+commit. An overwrite of the same rows by a writer is a data change.
+'''
+def test_rewrite_is_not_a_data_change(tmp_path: Path):
+    path = tmp_path / "silver" / "team"
+    teams = build_teams(100).sample(fraction=1.0, shuffle=True, seed=0)
+    write_stream_with_schema(path, teams, "dim_team")
+
+    assert rewrite_table(path, target_file_mb=1, cluster_by=(["team_id"], "linear")) == 1
+    assert DeltaTable(str(path)).version() == 1
+    assert delta_data_version(path) == 0
+    assert pl.from_arrow(DeltaTable(str(path)).to_pyarrow_table())["team_id"].to_list() == list(range(100))
+
+    write_stream_with_schema(path, teams, "dim_team")
+    assert delta_data_version(path) == 2
+
+
+'''
+A predicate skips the files whose statistics rule it out: with the file of the first teams gone, reading the other
+teams still works, while a full read fails. Partition filters and column selections are pushed down too.
+'''
+def test_read_delta_pushes_filters_down(tmp_path: Path):
+    path = tmp_path / "silver" / "team"
+    for start in range(0, 30, 10):
+        write_stream_with_schema(path, build_teams(10, start=start), "dim_team", mode="append")
+
+    actions = DeltaTable(str(path)).get_add_actions(flatten=True).to_pydict()
+    (path / actions["path"][actions["min.team_id"].index(0)]).unlink()
+
+    teams = read_delta(path, columns=["team_id", "name"], predicate=pl.col("team_id") >= 15).collect()
+    assert teams.columns == ["team_id", "name"]
+    assert teams["team_id"].sort().to_list() == list(range(15, 30))
+    with pytest.raises(pl.exceptions.ComputeError):
+        read_delta(path).collect()
+
+    partitioned_path = tmp_path / "silver" / "team_partitioned"
+    teams = build_teams(6).with_columns(acronym=pl.Series(["A", "B", "C"] * 2))
+    write_stream_with_schema(partitioned_path, teams, "dim_team", partition_by=["acronym"])
+    teams = read_delta(partitioned_path, partitions=[("acronym", "in", ["A", "C"])]).collect()
+    assert teams.sort("team_id").select(["team_id", "acronym"]).rows() == [(0, "A"), (2, "C"), (3, "A"), (5, "C")]
+
+
+'''
+A table is read as of a version, or as of the time of a commit, whatever was written after.
+'''
+def test_read_delta_travels_in_time(tmp_path: Path):
+    path = tmp_path / "silver" / "team"
+    for start in range(0, 30, 10):
+        write_stream_with_schema(path, build_teams(10, start=start), "dim_team", mode="append")
+        time.sleep(0.01)
+    write_stream_with_schema(path, build_teams(1, start=100), "dim_team")
+
+    assert read_delta(path, version=0).collect().height == 10
+    assert read_delta(path).collect()["team_id"].to_list() == [100]
+
+    commits = {commit["version"]: commit["timestamp"] for commit in DeltaTable(str(path)).history()}
+    as_of = datetime.fromtimestamp(commits[1] / 1000, tz=timezone.utc)
+    assert read_delta(path, timestamp=as_of).collect().height == 20
+    assert read_delta(path, timestamp=as_of.isoformat()).collect().height == 20
+
+    with pytest.raises(ValueError, match="either at a version or at a timestamp"):
+        read_delta(path, version=1, timestamp=as_of)
+
+
+'''
+A merge inserts the new keys and updates the changed rows only, leaving the rows missing from the load as they are:
+dimensions are upserted. A load without any change commits nothing.
+'''
+def test_merge_upserts_changed_rows(tmp_path: Path, capsys):
+    path = tmp_path / "silver" / "team"
+    merge_with_schema(path, build_teams(4), "dim_team", keys=["team_id"])
+
+    load = pl.concat([
+        build_teams(4).slice(1, 2).with_columns(
+            acronym=pl.when(pl.col("team_id") == 2).then(pl.lit("OGCN")).otherwise("acronym")
+        ),
+        build_teams(1, start=9),
+    ])
+    capsys.readouterr()
+    merge_with_schema(path, load, "dim_team", keys=["team_id"])
+    assert "team: 1 rows inserted, 1 updated, 0 deleted" in capsys.readouterr().out
+
+    teams = read_teams(path)
+    assert teams["team_id"].to_list() == [0, 1, 2, 3, 9]
+    assert teams["acronym"].to_list() == ["TMS", "TMS", "OGCN", "TMS", "TMS"]
+
+    version = DeltaTable(str(path)).version()
+    merge_with_schema(path, load, "dim_team", keys=["team_id"])
+    assert "team: unchanged" in capsys.readouterr().out
+    assert DeltaTable(str(path)).version() == version
+
+
+'''
+Deleting the missing rows is restricted to the scope of the load: the rows of the loaded scope values that are not in
+the load are deleted, and the rows of other values are kept.
+'''
+def test_merge_deletes_missing_rows_within_scope(tmp_path: Path):
+    path = tmp_path / "silver" / "team"
+    teams = build_teams(6).with_columns(acronym=pl.Series(["A", "B"] * 3))
+    merge_with_schema(path, teams, "dim_team", keys=["team_id"])
+
+    # Team 4 left the A teams, team 6 joined them
+    load = pl.concat([teams.filter(pl.col("acronym") == "A").filter(pl.col("team_id") != 4), build_teams(1, start=6)])
+    load = load.with_columns(acronym=pl.lit("A"))
+    merge_with_schema(path, load, "dim_team", keys=["team_id"], delete_missing=True, scope=("acronym", ["A"]))
+
+    teams = read_teams(path)
+    assert teams.select(["team_id", "acronym"]).rows() == [(0, "A"), (1, "B"), (2, "A"), (3, "B"), (5, "B"), (6, "A")]
+
+
+'''
+A linear clustering sorts by the columns in turn, nulls last. A Z-order keeps rows close on every column: each run of
+four rows of a 4 × 4 grid covers a 2 × 2 block, where the linear order covers a whole row of the grid.
+'''
+@pytest.mark.parametrize("lazy", [False, True])
+def test_cluster_frame_orders_rows_by_layout(lazy: bool):
+    grid = pl.DataFrame({"x": [x for x in range(4) for _ in range(4)], "y": list(range(4)) * 4})
+    grid = grid.sample(fraction=1.0, shuffle=True, seed=1)
+    data = grid.lazy() if lazy else grid
+
+    def collect(frame):
+        return frame.collect() if lazy else frame
+
+    linear = collect(cluster_frame(data, ["x", "y"]))
+    assert linear.equals(grid.sort(["x", "y"]))
+
+    zorder = collect(cluster_frame(data, ["x", "y"], method="zorder"))
+    assert zorder.sort(["x", "y"]).equals(linear)
+    for start in range(0, 16, 4):
+        block, row = zorder.slice(start, 4), linear.slice(start, 4)
+        assert (block["x"].n_unique(), block["y"].n_unique()) == (2, 2)
+        assert (row["x"].n_unique(), row["y"].n_unique()) == (1, 4)
+
+    with_nulls = pl.DataFrame({"x": [None, 2, 1], "y": [1, None, 3]})
+    assert cluster_frame(with_nulls, ["x"])["x"].to_list() == [1, 2, None]
+    with pytest.raises(ValueError, match="Unknown clustering method: hilbert"):
+        cluster_frame(grid, ["x", "y"], method="hilbert")
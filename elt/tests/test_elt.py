@@ -0,0 +1,94 @@
+'''
+Tests of the pipeline runner: stages run in dependency order, in one process, handing their outputs over in memory.
+'''
+
+import pytest
+from elt import Stage, run_pipeline, select_stages, topological_order
+
+
+'''
+Build stages recording their runs, each returning its name and the outputs it received.
+
+:param calls: List the names of the stages run are appended to.
+:param dependencies: Dependencies by stage name, in declaration order.
+
+:return: Pipeline stages.
+'''
+def build_stages(calls: list, dependencies: dict[str, list[str]]) -> list[Stage]:
+    def run(name: str):
+        def run_stage(**received):
+            calls.append((name, received))
+            return name.upper()
+        return run_stage
+
+    return [Stage(name, run(name), depends_on=depends_on) for name, depends_on in dependencies.items()]
+
+
+'''
+Stages declared in any order run after their dependencies, each once, in declaration order otherwise.
+'''
+def test_topological_order_puts_dependencies_first():
+    stages = build_stages([], {"gold": ["silver"], "report": ["gold", "bronze"], "silver": ["bronze"], "bronze": []})
+
+    assert [stage.name for stage in topological_order(stages)] == ["bronze", "silver", "gold", "report"]
+
+
+'''
+A cycle, or a dependency on a stage missing from the pipeline, is rejected before any stage runs.
+'''
+@pytest.mark.parametrize("dependencies, message", [
+    ({"bronze": ["gold"], "silver": ["bronze"], "gold": ["silver"]}, "Cycle in pipeline"),
+    ({"bronze": [], "silver": ["raw"]}, "unknown stage 'raw'"),
+])
+def test_topological_order_rejects_invalid_graphs(dependencies: dict, message: str):
+    with pytest.raises(ValueError, match=message):
+        topological_order(build_stages([], dependencies))
+
+
+'''
+Selected stages lose their dependencies on the stages left out, which they read from disk instead.
+'''
+def test_select_stages_drops_dependencies_left_out():
+    stages = build_stages([], {"bronze": [], "silver": ["bronze"], "gold": ["silver"]})
+
+    selected = select_stages(stages, ["gold", "silver"])
+    assert [(stage.name, stage.depends_on) for stage in selected] == [("silver", []), ("gold", ["silver"])]
+    # The pipeline itself is left unchanged
+    assert stages[1].depends_on == ["bronze"]
+
+    with pytest.raises(ValueError, match="platinum"):
+        select_stages(stages, ["gold", "platinum"])
+
+
+'''
+Every stage receives the outputs of its dependencies as keyword arguments, with its parameters and options.
+'''
+def test_run_pipeline_hands_outputs_over_in_memory(capsys):
+    calls = []
+    stages = build_stages(calls, {"gold": ["silver", "bronze"], "silver": ["bronze"], "bronze": []})
+    stages[0].params = {"full_refresh": True}
+    stages[0].options = {"max_workers": 2}
+
+    assert run_pipeline(stages) == 0
+    assert calls == [
+        ("bronze", {}),
+        ("silver", {"bronze": "BRONZE"}),
+        ("gold", {"silver": "SILVER", "bronze": "BRONZE", "full_refresh": True, "max_workers": 2}),
+    ]
+    assert "Completed: gold" in capsys.readouterr().out
+
+
+'''
+A failed stage stops the run with exit code 1: the stages depending on it, and those after it, do not run.
+'''
+def test_run_pipeline_stops_on_first_failure(capsys):
+    calls = []
+    stages = build_stages(calls, {"bronze": [], "silver": ["bronze"], "gold": ["silver"]})
+
+    def fail(**received):
+        raise RuntimeError("silver failed")
+    stages[1].run = fail
+
+    assert run_pipeline(stages) == 1
+    assert [name for name, _ in calls] == ["bronze"]
+    assert "Stage failed: silver" in capsys.readouterr().err
@@ -0,0 +1,74 @@
+'''
+Tests of the Arrow IPC exports: reading the rows of some keys through the offset index gives the rows of a full read
+filtered on the same keys.
+'''
+
+import numpy as np
+import polars as pl
+import pytest
+from pathlib import Path
+from ipc_utils import read_ipc_table, write_ipc_table
+
+
+'''
+Build a table of events whose match ids are shuffled, so that the export has to order them.
+
+:param rows: Number of rows.
+
+:return: Polars DataFrame.
+'''
+def build_events(rows: int = 5000) -> pl.DataFrame:
+    rng = np.random.default_rng(0)
+    return pl.DataFrame({
+        "match_id": rng.integers(1_000_000, 1_000_040, rows),
+        "event_id": [f"{index}" for index in range(rows)],
+        "x": rng.normal(size=rows).astype(np.float32),
+    })
+
+
+'''
+Keys read through the offset index, spanning several record batches, give the rows of a filtered full read, in the
+order of the table within every key.
+'''
+@pytest.mark.parametrize("lazy", [False, True])
+def test_read_keys_matches_filtered_full_read(tmp_path: Path, lazy: bool):
+    events = build_events()
+    path = tmp_path / "events.arrow"
+    if lazy:
+        events.write_parquet(tmp_path / "events.parquet")
+        data = pl.scan_parquet(tmp_path / "events.parquet")
+    else:
+        data = events
+    assert write_ipc_table(data, path, index_by="match_id", batch_rows=256) == events.height
+
+    full = pl.from_arrow(read_ipc_table(path))
+    # Rows are ordered by key, rows of a key keep their order
+    assert full.equals(events.lazy().sort("match_id", maintain_order=True).collect())
+
+    keys = [1_000_003, 1_000_017, 1_000_039, 42]
+    expected = full.filter(pl.col("match_id").is_in(keys))
+    assert pl.from_arrow(read_ipc_table(path, keys=keys)).equals(expected)
+    assert expected.height > 256
+
+
+'''
+A key missing from the export gives an empty table with the schema of the export.
+'''
+def test_read_missing_key(tmp_path: Path):
+    path = tmp_path / "events.arrow"
+    write_ipc_table(build_events(), path, index_by="match_id")
+
+    table = read_ipc_table(path, keys=[42])
+    assert table.num_rows == 0
+    assert table.schema.names == ["match_id", "event_id", "x"]
+
+
+'''
+An export without a key index cannot be read by key.
+'''
+def test_read_keys_without_index(tmp_path: Path):
+    path = tmp_path / "events.arrow"
+    write_ipc_table(build_events(), path)
+
+    with pytest.raises(ValueError):
+        read_ipc_table(path, keys=[1_000_003])
@@ -0,0 +1,120 @@
+'''
+Tests of the tracking level-of-detail tiers: simplified trajectories stay within the tolerance of the original ones
+wherever they are interpolated.
+'''
+
+import numpy as np
+import polars as pl
+import pytest
+from lod_utils import TRAJECTORY_KEYS, downsample_frames, simplify_trajectories
+
+
+'''
+Build tracking data: random walks of a few objects over two periods, with missing frames and missing positions.
+
+:param frames: Number of frames per period.
+:param objects: Number of tracked objects.
+
+:return: Polars DataFrame of tracking data, in frame order.
+'''
+def build_tracking(frames: int = 600, objects: int = 4) -> pl.DataFrame:
+    rng = np.random.default_rng(0)
+    parts = []
+    for period in (1, 2):
+        for object_id in range(objects):
+            steps = rng.normal(scale=0.3, size=(frames, 3)) * [1, 1, 0.1]
+            positions = np.cumsum(steps, axis=0)
+            parts.append(pl.DataFrame({
+                "match_id": 1,
+                "period": period,
+                "object_id": object_id,
+                "frame": np.arange(frames) + period * 10_000,
+                "x": positions[:, 0],
+                "y": positions[:, 1],
+                "z": positions[:, 2] if object_id == 0 else None,
+            }, schema_overrides={"z": pl.Float64}))
+
+    tracking = pl.concat(parts).sort(["frame", "object_id"]).filter(~pl.col("frame").is_in([10_100, 10_101, 20_350]))
+    missing_position = pl.Series(rng.random(tracking.height) < 0.01)
+    return tracking.with_columns(pl.when(missing_position).then(None).otherwise(pl.col("x")).alias("x"))
+
+
+'''
+Get the largest distance between the positions of the original tracking and the positions interpolated in time
+between the kept rows, within the trajectories of the objects (broken at missing frames and positions).
+
+:param tracking: Polars DataFrame of the original tracking data.
+:param simplified: Polars DataFrame of the kept rows.
+:param step: Number of native frames between consecutive frames of the data.
+
+:return: Largest interpolation error.
+'''
+def max_interpolation_error(tracking: pl.DataFrame, simplified: pl.DataFrame, step: int) -> float:
+    kept = simplified.select([*TRAJECTORY_KEYS, "frame"]).with_columns(kept=pl.lit(True))
+    trajectories = (tracking
+        .join(kept, on=[*TRAJECTORY_KEYS, "frame"], how="left")
+        .filter(pl.col("x").is_not_null() & pl.col("y").is_not_null())
+        .sort([*TRAJECTORY_KEYS, "frame"])
+        .with_columns(
+            segment=(
+                pl.any_horizontal([pl.col(key).ne_missing(pl.col(key).shift()) for key in TRAJECTORY_KEYS])
+                | (pl.col("frame").diff() != step)
+            ).fill_null(True).cum_sum(),
+            z=pl.col("z").fill_null(0.0),
+        )
+    )
+
+    error = 0.0
+    for segment in trajectories.partition_by("segment"):
+        frames = segment["frame"].to_numpy().astype(float)
+        points = segment.select(["x", "y", "z"]).to_numpy()
+        kept_rows = segment["kept"].fill_null(False).to_numpy()
+        assert kept_rows[0] and kept_rows[-1]
+
+        interpolated = np.column_stack([
+            np.interp(frames, frames[kept_rows], points[kept_rows, axis]) for axis in range(3)
+        ])
+        error = max(error, float(np.linalg.norm(points - interpolated, axis=1).max()))
+
+    return error
+
+
+'''
+Simplified trajectories are within the tolerance of the original ones, at the native frame rate and at a lower one,
+and drop most of the rows.
+'''
+@pytest.mark.parametrize("tolerance", [0.1, 0.5, 2.0])
+@pytest.mark.parametrize("step", [1, 2])
+def test_simplified_trajectories_within_tolerance(tolerance: float, step: int):
+    tracking = downsample_frames(build_tracking(), step)
+    simplified = simplify_trajectories(tracking, tolerance, step)
+
+    assert max_interpolation_error(tracking, simplified, step) <= tolerance + 1e-9
+    assert simplified.height < tracking.height
+    assert simplified.columns == tracking.columns
+
+
+'''
+Kept rows are rows of the original tracking, in their original order, rows without a position are all kept, and a
+tolerance of zero keeps every position off the straight lines, so every row of random walks.
+'''
+def test_kept_rows():
+    tracking = build_tracking()
+    simplified = simplify_trajectories(tracking, 0.5)
+
+    assert tracking.join(simplified, on=tracking.columns, how="semi", join_nulls=True).equals(simplified)
+    assert simplified.filter(pl.col("x").is_null()).height == tracking.filter(pl.col("x").is_null()).height
+    assert simplify_trajectories(tracking, 0.0).equals(tracking)
+    assert simplify_trajectories(tracking.clear(), 0.5).height == 0
+
+
+'''
+Downsampling keeps every step-th frame.
+'''
+def test_downsample_frames():
+    tracking = build_tracking()
+    tier = downsample_frames(tracking, 5)
+
+    assert (tier["frame"] % 5 == 0).all()
+    assert tier.height == tracking.filter(pl.col("frame") % 5 == 0).height
+    assert downsample_frames(tracking.lazy(), 5).collect().equals(tier)
@@ -0,0 +1,113 @@
+'''
+Tests of the memory-budgeted execution mode: batches sized from the memory left under the budget, the budget check,
+and out-of-core runs giving the tables of in-memory runs.
+'''
+
+import polars as pl
+import pytest
+from deltalake import DeltaTable
+from pathlib import Path
+import build_gold
+import ingest_bronze
+import memory_utils
+import transform_silver
+from memory_utils import MemoryBudgetExceeded, check_memory_budget, get_batch_rows, set_memory_budget
+from synthetic_data import generate_dataset
+
+
+'''
+Leave the run without a memory budget after each test, whatever the test set.
+'''
+@pytest.fixture(autouse=True)
+def no_memory_budget():
+    yield
+    set_memory_budget(None)
+
+
+'''
+A batch takes a share of the memory left under the budget, between its smallest and its largest size. Without a
+budget, it is not limited.
+'''
+def test_batch_rows_fit_in_the_memory_left(monkeypatch):
+    monkeypatch.setattr(memory_utils, "current_rss_mb", lambda: 300.0)
+    monkeypatch.setattr(memory_utils, "BATCH_MEMORY_SHARE", 0.5)
+
+    assert get_batch_rows(row_bytes=100, max_rows=10**9) == 10**9
+
+    set_memory_budget(400)
+    # 100 MB left, 50 MB for the batch
+    assert get_batch_rows(row_bytes=100, max_rows=10**9) == 50 * 1024 * 1024 // 100
+    assert get_batch_rows(row_bytes=100, max_rows=1000) == 1000
+    assert get_batch_rows(row_bytes=10**8, max_rows=10**9) == 1024
+    assert get_batch_rows(row_bytes=10**8, max_rows=10**9, min_rows=10) == 10
+
+    # Already over the budget: the smallest batch, still no larger than the largest one
+    set_memory_budget(200)
+    assert get_batch_rows(row_bytes=1, max_rows=10**9) == 1024
+    assert get_batch_rows(row_bytes=1, max_rows=100) == 100
+
+
+'''
+The budget check fails the run once its RSS is over the budget, not at it, and never without a budget.
+'''
+def test_memory_budget_check_fails_the_run_over_budget(monkeypatch):
+    monkeypatch.setattr(memory_utils, "current_rss_mb", lambda: 300.0)
+    check_memory_budget("stage bronze")
+
+    set_memory_budget(300)
+    check_memory_budget("stage bronze")
+
+    set_memory_budget(299)
+    with pytest.raises(MemoryBudgetExceeded, match=r"RSS of 300.0 MB .* budget of 299 MB \(after stage bronze\)"):
+        check_memory_budget("stage bronze")
+
+
+'''
+Read the rows of a table, in an order that does not depend on how it was written.
+
+:param path: Path to the Delta Lake table, or to the Parquet file.
+
+:return: Polars DataFrame of the table, sorted by every column.
+'''
+def read_sorted(path: Path) -> pl.DataFrame:
+    df = pl.read_parquet(path) if path.suffix == ".parquet" else pl.from_arrow(DeltaTable(str(path)).to_pyarrow_table())
+    return df.sort(df.columns, nulls_last=True)
+
+
+'''
+Under a budget leaving room for the smallest batches only, tracking is ingested and parsed in many spilled parts, and
+the bronze, silver and gold tables are those of an in-memory run.
+'''
+def test_out_of_core_run_matches_in_memory_run(tmp_path: Path, monkeypatch):
+    paths = {}
+    for mode in ["in_memory", "out_of_core"]:
+        paths[mode] = tmp_path / mode / "elt"
+        generate_dataset(paths[mode] / "data/raw", 2, frame_rate=5, match_minutes=6, events_per_minute=30)
+
+    ingest_bronze.main(base_path=paths["in_memory"], download=False)
+    transform_silver.main(base_path=paths["in_memory"])
+    build_gold.main(base_path=paths["in_memory"])
+
+    spilled = []
+    spill_tracking = ingest_bronze.spill_tracking
+    monkeypatch.setattr(
+        ingest_bronze, "spill_tracking", lambda rows, *args: spilled.append(len(rows)) or spill_tracking(rows, *args)
+    )
+    monkeypatch.setattr(memory_utils, "BATCH_MEMORY_SHARE", 1e-9)
+    budget = int(memory_utils.current_rss_mb()) + 10_000
+    ingest_bronze.main(base_path=paths["out_of_core"], download=False, max_memory_mb=budget)
+    transform_silver.main(base_path=paths["out_of_core"], max_memory_mb=budget)
+    build_gold.main(base_path=paths["out_of_core"], max_memory_mb=budget)
+
+    # 1800 frames a match, spilled in parts of the smallest batch
+    assert spilled == [1024, 776] * 2
+
+    tables = [
+        "bronze/tracking", "bronze/dynamic_events", "silver/tracking", "silver/player_match",
+        "gold/tracking.parquet", "gold/agg_player.parquet", "gold/agg_team.parquet",
+    ]
+    for table in tables:
+        assert read_sorted(paths["out_of_core"] / "data/delta" / table).equals(
+            read_sorted(paths["in_memory"] / "data/delta" / table), null_equal=True
+        ), table
+    assert not (paths["out_of_core"] / "data/spill/bronze").exists()
@@ -0,0 +1,133 @@
+'''
+Tests of the pipeline profiler: step records, run report and sampled stacks.
+'''
+
+import json
+import pytest
+import threading
+import time
+from pathlib import Path
+from uuid import uuid4
+from profile_utils import StackSampler, get_steps, profile_step, record_output, write_run_report
+
+
+'''
+Get the records of the steps under a root step, by path (steps are recorded for the whole process).
+
+:param root: Name of the root step.
+
+:return: Step records by path.
+'''
+def steps_under(root: str) -> dict[str, dict]:
+    return {step["path"]: step for step in get_steps() if step["path"].split("/")[0] == root}
+
+
+'''
+Run an empty step.
+
+:param name: Name of the step.
+:param parent: Path of the parent step.
+'''
+def run_step(name: str, parent: str | None):
+    with profile_step(name, parent=parent):
+        pass
+
+
+'''
+Steps nest by thread, or under the parent they are given when they run in a worker thread. A step records the rows
+and bytes written in it, and fails with the error raised in it.
+'''
+def test_profile_step_records_nested_steps(tmp_path: Path):
+    root = f"run-{uuid4().hex}"
+    output = tmp_path / "player.parquet"
+
+    with profile_step(root):
+        with profile_step("silver", rows_in=10) as silver:
+            output.write_bytes(b"x" * 100)
+            record_output(output, rows=4)
+            record_output(output, rows=6)
+
+        # A task of a worker thread is nested under the step scheduling it only when given as its parent
+        workers = [
+            threading.Thread(target=run_step, args=("agg_player", root)),
+            threading.Thread(target=run_step, args=(f"{root}-detached", None)),
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        with pytest.raises(ZeroDivisionError):
+            with profile_step("gold"):
+                1 / 0
+
+    steps = steps_under(root)
+    assert set(steps) == {root, f"{root}/silver", f"{root}/agg_player", f"{root}/gold"}
+    assert silver == steps[f"{root}/silver"]
+    assert (silver["rows_in"], silver["rows_out"], silver["bytes_written"]) == (10, 10, 200)
+    assert steps[f"{root}/gold"]["status"] == "failed"
+    assert steps[root]["status"] == "ok"
+    assert all(step["wall_s"] >= 0 and step["rss_mb"] > 0 for step in steps.values())
+
+    assert f"{root}-detached" in steps_under(f"{root}-detached")
+
+
+'''
+The run report holds the run totals and its steps in start order, and tells whether the run stayed within its memory
+budget.
+'''
+def test_run_report_lists_steps_in_start_order(tmp_path: Path):
+    root = f"run-{uuid4().hex}"
+    # Start times are recorded to the millisecond
+    with profile_step(root):
+        time.sleep(0.002)
+        with profile_step("bronze") as bronze:
+            bronze["status"] = "skipped"
+        time.sleep(0.002)
+        with profile_step("silver"):
+            pass
+
+    path = tmp_path / "reports" / "run.json"
+    report = write_run_report(path, exit_code=0, wall_s=1.23456, memory_budget_mb=1_000_000)
+
+    assert json.loads(path.read_text(encoding="utf-8")) == report
+    assert report["wall_s"] == 1.2346
+    assert report["within_memory_budget"] is True
+    assert write_run_report(path, exit_code=1, wall_s=1.0, memory_budget_mb=1)["within_memory_budget"] is False
+    assert write_run_report(path, exit_code=0, wall_s=1.0)["within_memory_budget"] is None
+
+    steps = [step for step in report["steps"] if step["path"].startswith(root)]
+    assert [step["path"] for step in steps] == [root, f"{root}/bronze", f"{root}/silver"]
+    assert steps[1]["status"] == "skipped"
+
+
+'''
+Sampled stacks are prefixed with the path of the step the thread was running, and written most frequent first.
+'''
+def test_stack_sampler_collapses_stacks_by_step(tmp_path: Path):
+    root = f"run-{uuid4().hex}"
+
+    def busy_loop():
+        deadline = time.perf_counter() + 0.2
+        while time.perf_counter() < deadline:
+            pass
+
+    sampler = StackSampler(interval=0.001).start()
+    with profile_step(root):
+        with profile_step("gold"):
+            busy_loop()
+    sampler.stop()
+
+    path = tmp_path / "profile.folded"
+    sampler.write(path)
+    lines = path.read_text(encoding="utf-8").splitlines()
+    counts = [int(line.rsplit(" ", 1)[1]) for line in lines]
+    assert counts == sorted(counts, reverse=True)
+
+    stacks = [line.rsplit(" ", 1)[0].split(";") for line in lines if line.startswith(root)]
+    assert stacks
+    busy_stacks = [
+        stack for stack in stacks if any(frame.startswith("busy_loop (test_profile_utils.py:") for frame in stack)
+    ]
+    assert busy_stacks
+    assert all(stack[:2] == [root, "gold"] for stack in busy_stacks)
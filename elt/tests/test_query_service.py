@@ -0,0 +1,170 @@
+'''
+Tests of the query service: queries over HTTP give the rows of the same filters evaluated by Polars.
+'''
+
+import json
+import numpy as np
+import os
+import polars as pl
+import pyarrow as pa
+import pytest
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+from query_service import create_server
+
+
+'''
+Build tracking rows of a few matches.
+
+:param rows: Number of rows.
+
+:return: Polars DataFrame.
+'''
+def build_tracking(rows: int = 2000) -> pl.DataFrame:
+    rng = np.random.default_rng(0)
+    return pl.DataFrame({
+        "match_id": rng.integers(1_000_000, 1_000_004, rows).astype(np.int32),
+        "frame": np.arange(rows, dtype=np.int32),
+        "team_shortname": rng.choice(["Team A", "Team B"], rows),
+        "x": rng.normal(size=rows),
+    })
+
+
+'''
+Start a query service over a gold folder, in a background thread.
+
+:param gold_path: Path to the gold layer folder.
+:param cache_mb: Budget of the result cache, in MB (0 disables it).
+
+:return: HTTP server, and a function getting the status and the JSON or Arrow body of a response to a path.
+'''
+def start_service(gold_path: Path, cache_mb: int):
+    server = create_server(gold_path, port=0, cache_mb=cache_mb)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def get(path: str) -> tuple[int, object]:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}{path}") as response:
+                body = response.read()
+                status = response.status
+        except urllib.error.HTTPError as error:
+            body, status = error.read(), error.code
+        if body.startswith(b"{"):
+            return status, json.loads(body)
+        return status, pl.from_arrow(pa.ipc.open_stream(body).read_all())
+
+    return server, get
+
+
+'''
+A service over a gold folder with a tracking table, without result cache.
+'''
+@pytest.fixture
+def service(tmp_path: Path):
+    gold_path = tmp_path / "gold"
+    gold_path.mkdir()
+    build_tracking().write_parquet(gold_path / "tracking.parquet", row_group_size=256)
+
+    server, get = start_service(gold_path, cache_mb=0)
+    yield gold_path, get
+    server.shutdown()
+    server.server_close()
+
+
+'''
+Filters, column selections and limits give the rows of Polars, in the order of the table.
+'''
+@pytest.mark.parametrize("query, expected", [
+    ("match_id=1000001", lambda df: df.filter(pl.col("match_id") == 1_000_001)),
+    ("match_id=1000001&match_id=1000003&columns=frame,x",
+     lambda df: df.filter(pl.col("match_id").is_in([1_000_001, 1_000_003])).select(["frame", "x"])),
+    ("frame__gte=1200&frame__lt=1500&team_shortname=Team%20B",
+     lambda df: df.filter(pl.col("frame").is_between(1200, 1499) & (pl.col("team_shortname") == "Team B"))),
+    ("match_id__ne=1000000&limit=7", lambda df: df.filter(pl.col("match_id") != 1_000_000).head(7)),
+    ("x__gt=100", lambda df: df.filter(pl.col("x") > 100)),
+])
+def test_query_matches_polars_filters(service, query: str, expected):
+    _, get = service
+    status, rows = get(f"/query/tracking?{query}")
+
+    assert status == 200
+    assert rows.equals(expected(build_tracking()))
+
+
+'''
+The tables are listed with their columns and number of rows, and a table rewritten by the gold stage is served from
+its new file without restarting the service.
+'''
+def test_tables_follow_gold_rewrites(service):
+    gold_path, get = service
+    status, tables = get("/tables")
+    assert status == 200
+    assert tables == {"tracking": {
+        "columns": {"match_id": "int32", "frame": "int32", "team_shortname": "large_string", "x": "double"},
+        "rows": 2000,
+    }}
+
+    path = gold_path / "tracking.parquet"
+    modified = path.stat().st_mtime_ns
+    build_tracking(10).write_parquet(path)
+    os.utime(path, ns=(modified + 10**9, modified + 10**9))
+
+    assert get("/query/tracking?columns=frame")[1]["frame"].to_list() == list(range(10))
+    assert get("/tables")[1]["tracking"]["rows"] == 10
+
+
+'''
+Invalid queries are answered with a 4xx status and the reason, as JSON.
+'''
+@pytest.mark.parametrize("path, status, error", [
+    ("/query/events", 404, "Unknown table: events"),
+    ("/query/..%2Ftracking", 404, "Unknown table: ../tracking"),
+    ("/download/tracking", 404, "Unknown endpoint: /download/tracking"),
+    ("/query/tracking?player_id=1", 400, "Unknown column: player_id"),
+    ("/query/tracking?columns=frame,y", 400, "Unknown columns: ['y']"),
+    ("/query/tracking?frame__between=1", 400,
+     "Unknown operator: between, expected one of ['gt', 'gte', 'lt', 'lte', 'ne']"),
+    ("/query/tracking?match_id=first", 400, "Invalid value for match_id (int32): ['first']"),
+    ("/query/tracking?limit=ten", 400, "Invalid limit, expected an integer"),
+])
+def test_invalid_queries_are_rejected(service, path: str, status: int, error: str):
+    _, get = service
+    assert get(path) == (status, {"error": error})
+
+
+'''
+With a result cache, a repeated query is answered from the cache until its table is rewritten. A result too large to
+be cached is streamed as it is read, without a length, and never cached.
+'''
+def test_cached_results_follow_table_versions(tmp_path: Path):
+    gold_path = tmp_path / "gold"
+    gold_path.mkdir()
+    tracking = build_tracking(50_000)
+    tracking.write_parquet(gold_path / "tracking.parquet")
+    server, get = start_service(gold_path, cache_mb=1)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        for _ in range(2):
+            assert get("/query/tracking?frame__lt=100")[1].equals(tracking.head(100))
+        stats = get("/cache")[1]
+        assert (stats["entries"], stats["hits"], stats["misses"], stats["max_bytes"]) == (1, 1, 1, 1024 * 1024)
+
+        for _ in range(2):
+            with urllib.request.urlopen(f"{url}/query/tracking") as response:
+                assert response.headers["Content-Length"] is None
+                assert pl.from_arrow(pa.ipc.open_stream(response.read()).read_all()).equals(tracking)
+        with urllib.request.urlopen(f"{url}/query/tracking?frame__lt=100") as response:
+            assert int(response.headers["Content-Length"]) == stats["bytes"]
+        assert get("/cache")[1]["entries"] == 1
+
+        path = gold_path / "tracking.parquet"
+        modified = path.stat().st_mtime_ns
+        tracking.with_columns(pl.col("x") + 1).write_parquet(path)
+        os.utime(path, ns=(modified + 10**9, modified + 10**9))
+        assert get("/query/tracking?frame__lt=100")[1]["x"].equals(tracking.head(100)["x"] + 1)
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,59 @@
+'''
+Tests of the query result cache: LRU eviction within its budget, invalidation by table version and persistence.
+'''
+
+from pathlib import Path
+from result_cache_utils import ResultCache
+
+
+'''
+Once over budget, the least recently used entries are evicted first, a read counting as a use. Results larger than a
+quarter of the budget are not cached.
+'''
+def test_least_recently_used_results_are_evicted():
+    cache = ResultCache(max_bytes=100)
+    for name in "abcde":
+        cache.put("tracking", "v1", {"match_id": [name]}, name.encode() * 20)
+
+    assert cache.get("tracking", "v1", {"match_id": ["a"]}) == b"a" * 20
+    cache.put("tracking", "v1", {"match_id": ["f"]}, b"f" * 20)
+
+    cached = [name for name in "abcdef" if cache.get("tracking", "v1", {"match_id": [name]}) is not None]
+    assert cached == ["a", "c", "d", "e", "f"]
+
+    cache.put("tracking", "v1", {"match_id": ["g"]}, b"g" * 26)
+    assert cache.get("tracking", "v1", {"match_id": ["g"]}) is None
+    assert cache.stats() == {"entries": 5, "bytes": 100, "max_bytes": 100, "hits": 6, "misses": 2}
+
+
+'''
+A new version of a table drops the results of its previous versions, and only of this table.
+'''
+def test_new_table_version_invalidates_its_results():
+    cache = ResultCache(max_bytes=1000)
+    cache.put("tracking", "v1", ["query", {}], b"tracking v1")
+    cache.put("agg_player", "v1", ["query", {}], b"agg_player v1")
+
+    assert cache.get("tracking", "v2", ["query", {}]) is None
+    assert cache.stats()["entries"] == 1
+    assert cache.get("tracking", "v1", ["query", {}]) is None
+    assert cache.get("agg_player", "v1", ["query", {}]) == b"agg_player v1"
+
+
+'''
+A cache over the folder of a previous one serves its results, most recently written last in the LRU order, within
+its own budget.
+'''
+def test_persisted_results_are_reused(tmp_path: Path):
+    cache = ResultCache(max_bytes=1000, path=tmp_path)
+    for index in range(3):
+        cache.put("tracking", "v1", {"frame": [index]}, bytes([index]) * 200)
+
+    reopened = ResultCache(max_bytes=500, path=tmp_path)
+    assert reopened.stats()["entries"] == 2
+    assert reopened.get("tracking", "v1", {"frame": [0]}) is None
+    assert reopened.get("tracking", "v1", {"frame": [2]}) == bytes([2]) * 200
+    assert len(list(tmp_path.glob("tracking.v1.*.arrows"))) == 2
+
+    reopened.put("tracking", "v2", {"frame": [0]}, b"new")
+    assert [file.name.split(".")[1] for file in tmp_path.glob("*.arrows")] == ["v2"]
@@ -0,0 +1,57 @@
+'''
+Tests of apply_schema: DataFrames and LazyFrames get the same columns, in the schema order and types.
+'''
+
+import polars as pl
+import pytest
+from schemas import apply_schema, get_arrow_schema
+
+TEAMS = {
+    "city": ["Lyon", "Nantes"],
+    "short_name": ["OL", "FCN"],
+    "team_id": [1, 2],
+    "name": ["Olympique Lyonnais", "FC Nantes"],
+}
+
+
+'''
+Columns are cast to the schema types and ordered as in the schema, missing ones are null and extra ones dropped, for a
+DataFrame as for a LazyFrame.
+'''
+@pytest.mark.parametrize("lazy", [False, True])
+def test_apply_schema_projects_frames_onto_the_schema(lazy: bool):
+    teams = pl.LazyFrame(TEAMS) if lazy else pl.DataFrame(TEAMS)
+
+    result = apply_schema(teams, "dim_team")
+    assert isinstance(result, pl.LazyFrame) == lazy
+
+    result = result.collect() if lazy else result
+    assert result.schema == {"team_id": pl.Int32, "name": pl.Utf8, "short_name": pl.Utf8, "acronym": pl.Utf8}
+    assert result.rows() == [(1, "Olympique Lyonnais", "OL", None), (2, "FC Nantes", "FCN", None)]
+    assert result.to_arrow().schema == get_arrow_schema("dim_team")
+
+
+'''
+Missing and extra columns are reported or fail the call as asked, before any row of a LazyFrame is computed.
+'''
+def test_apply_schema_reports_mismatches(capsys):
+    def unreadable(value):
+        raise RuntimeError("rows were read")
+
+    teams = pl.LazyFrame(TEAMS).with_columns(pl.col("team_id").map_elements(unreadable, return_dtype=pl.Int64))
+
+    with pytest.raises(ValueError, match=r"missing columns \['acronym'\] .* extra columns \['city'\]"):
+        apply_schema(teams, "dim_team", on_mismatch="raise")
+
+    apply_schema(teams, "dim_team", on_mismatch="warn")
+    assert "Schema 'dim_team': missing columns ['acronym']" in capsys.readouterr().out
+
+    apply_schema(teams, "dim_team")
+    assert capsys.readouterr().out == ""
+
+    complete = pl.DataFrame({**TEAMS, "acronym": ["OL", "FCN"]}).drop("city")
+    result = apply_schema(complete, "dim_team", on_mismatch="raise")
+    assert result.columns == ["team_id", "name", "short_name", "acronym"]
+
+    with pytest.raises(ValueError, match="Schema 'dim_teams' not found"):
+        apply_schema(complete, "dim_teams")
@@ -0,0 +1,130 @@
+'''
+Tests of the scouting index: searches give the rows of the same filters evaluated by Polars, and the top players by a
+weighted score of standardized metrics.
+'''
+
+import numpy as np
+import polars as pl
+import pytest
+from scouting_utils import ScoutingIndex, fold_string
+
+
+'''
+Build a table of player aggregates, with null metrics and tied values.
+
+:param rows: Number of players.
+
+:return: Polars DataFrame.
+'''
+def build_players(rows: int = 3000) -> pl.DataFrame:
+    rng = np.random.default_rng(0)
+    minutes = rng.integers(0, 3000, rows).astype(float)
+    minutes[rng.random(rows) < 0.02] = np.nan
+    return pl.DataFrame({
+        "player_id": np.arange(rows),
+        "player_name": rng.choice(["Jérôme Boateng", "Jerome Dupont", "Ana Lima", "Luís Díaz"], rows),
+        "positions": rng.choice(["CF", "LW, RW", "RB", "GK", "LB, LW"], rows),
+        "minutes_played": minutes,
+        "age": rng.integers(17, 38, rows),
+        "off_ball_runs_90": rng.gamma(2.0, 2.0, rows).round(1),
+        "pressures_90": rng.gamma(3.0, 1.5, rows).round(1),
+    }).with_columns(pl.col("minutes_played").fill_nan(None))
+
+
+'''
+Evaluate scouting filters with Polars.
+
+:param df: Polars DataFrame.
+:param filters: Filters, as (column, op, values) triples.
+
+:return: Polars DataFrame of the matching rows, in table order.
+'''
+def polars_filter(df: pl.DataFrame, filters: list[tuple[str, str, list]]) -> pl.DataFrame:
+    comparisons = {
+        "gt": lambda column, value: column > value,
+        "gte": lambda column, value: column >= value,
+        "lt": lambda column, value: column < value,
+        "lte": lambda column, value: column <= value,
+    }
+    predicate = pl.lit(True)
+    for column, op, values in filters:
+        if op in comparisons:
+            condition = comparisons[op](pl.col(column), values[0])
+        elif op == "in":
+            condition = pl.col(column).is_in(values)
+        elif op == "contains":
+            wanted = [fold_string(value) for value in values]
+            condition = pl.col(column).map_elements(
+                lambda name: any(value in fold_string(name) for value in wanted), return_dtype=pl.Boolean
+            )
+        else:
+            condition = pl.col(column).str.split(",").list.eval(pl.element().str.strip_chars().is_in(values)).list.any()
+        predicate = predicate & condition.fill_null(False)
+    return df.filter(predicate)
+
+
+'''
+Players and their scouting index, built once for the module.
+'''
+@pytest.fixture(scope="module")
+def players_index() -> tuple[pl.DataFrame, ScoutingIndex]:
+    players = build_players()
+    return players, ScoutingIndex(players)
+
+
+'''
+Searches combining range and string filters give the rows Polars filters, in table order.
+'''
+@pytest.mark.parametrize("filters", [
+    [],
+    [("minutes_played", "gte", [900.0])],
+    [("minutes_played", "gt", [900.0]), ("age", "lte", [23.0])],
+    [("age", "gte", [20.0]), ("age", "lt", [20.0])],
+    [("off_ball_runs_90", "gte", [4.0]), ("positions", "any", ["LW"]), ("pressures_90", "lt", [6.0])],
+    [("player_name", "contains", ["jerome"]), ("minutes_played", "lte", [1500.0])],
+    [("player_name", "in", ["Ana Lima"]), ("positions", "in", ["CF", "RB"])],
+    [("player_name", "in", ["Nobody"])],
+])
+def test_search_matches_polars_filter(players_index, filters: list):
+    players, index = players_index
+    rows, scores = index.search(filters)
+
+    assert scores is None
+    assert players["player_id"].gather(rows).to_list() == polars_filter(players, filters)["player_id"].to_list()
+
+
+'''
+The top k players by a weighted score are the k best of the matching players, ranked, with scores from metrics
+standardized over the whole table.
+'''
+def test_top_k_by_weighted_score(players_index):
+    players, index = players_index
+    filters = [("minutes_played", "gte", [600.0]), ("positions", "any", ["LW", "CF"])]
+    weights = {"off_ball_runs_90": 2.0, "pressures_90": -0.5}
+
+    rows, scores = index.search(filters, weights, k=25)
+
+    expected = polars_filter(players, filters).with_columns(
+        score=pl.sum_horizontal([
+            weight * (pl.col(metric) - players[metric].mean()) / players[metric].std(ddof=0)
+            for metric, weight in weights.items()
+        ])
+    ).sort(["score", "player_id"], descending=[True, False]).head(25)
+    assert players["player_id"].gather(rows).to_list() == expected["player_id"].to_list()
+    assert np.allclose(scores, expected["score"].to_numpy())
+
+
+'''
+Filters of the wrong kind for their column, or on columns that are not indexed, are rejected.
+'''
+@pytest.mark.parametrize("filters, weights", [
+    ([("age", "contains", ["2"])], None),
+    ([("player_name", "gte", [1.0])], None),
+    ([("unknown", "in", ["x"])], None),
+    ([("age", "gte", [])], None),
+    ([], {"player_name": 1.0}),
+])
+def test_invalid_search(players_index, filters: list, weights: dict | None):
+    _, index = players_index
+    with pytest.raises(ValueError):
+        index.search(filters, weights)
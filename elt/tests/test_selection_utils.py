@@ -0,0 +1,57 @@
+'''
+Tests of the match selections of selective runs: raw match files and match tables select the same matches.
+'''
+
+import polars as pl
+import pytest
+from datetime import date, datetime
+from selection_utils import Selection, is_selective
+
+MATCHES = [
+    {"id": 1, "competition_edition": {"id": 10}, "date_time": "2024-08-17T14:00:00Z"},
+    {"id": 2, "competition_edition": {"id": 10}, "date_time": "2024-09-01T23:30:00Z"},
+    {"id": 3, "competition_edition": {"id": 20}, "date_time": "2024-09-01T12:00:00Z"},
+    {"id": 4, "competition_edition": None, "date_time": None},
+]
+
+
+'''
+Every criterion set must pass, an empty selection selects every match, and a match without the data of a criterion is
+left out by it.
+'''
+@pytest.mark.parametrize("selection, selected", [
+    (Selection(), [1, 2, 3, 4]),
+    (Selection(match_ids=(2, 4, 99)), [2, 4]),
+    (Selection(competition_edition_ids=(10,)), [1, 2]),
+    (Selection(since=date(2024, 9, 1)), [2, 3]),
+    (Selection(match_ids=(1, 2, 3), competition_edition_ids=(10, 20), since=date(2024, 9, 1)), [2, 3]),
+])
+def test_raw_matches_and_match_table_select_the_same_matches(selection: Selection, selected: list[int]):
+    assert [match["id"] for match in MATCHES if selection.includes_match(match)] == selected
+
+    match_table = pl.DataFrame({
+        "match_id": [match["id"] for match in MATCHES],
+        "competition_edition_id": [(match["competition_edition"] or {}).get("id") for match in MATCHES],
+        "date_time": [
+            datetime.fromisoformat(match["date_time"].replace("Z", "")) if match["date_time"] else None
+            for match in MATCHES
+        ],
+    })
+    assert match_table.filter(selection.match_filter())["match_id"].to_list() == selected
+
+
+'''
+A match identifier alone excludes a match only when identifiers are selected, and a selection without criterion does
+not make a run selective.
+'''
+def test_selection_criteria():
+    selection = Selection(match_ids=(5, 6), since=date(2024, 1, 31))
+
+    assert selection.includes_match_id(5) and not selection.includes_match_id(7)
+    assert Selection(competition_edition_ids=(10,)).includes_match_id(7)
+    assert str(selection) == "matches 5, 6; since 2024-01-31"
+    assert str(Selection()) == "all matches"
+
+    assert is_selective(selection)
+    assert not is_selective(Selection())
+    assert not is_selective(None)
@@ -0,0 +1,29 @@
+'''
+Tests of the silver stage: the layout of its fact tables.
+'''
+
+import polars as pl
+from deltalake import DeltaTable
+from pathlib import Path
+import ingest_bronze
+import transform_silver
+from synthetic_data import generate_dataset
+
+
+'''
+The rows of the silver fact tables are written in the order of their layout, led by the match, so that the statistics
+of their files and row groups let a read of one match skip the others.
+'''
+def test_fact_tables_are_clustered_by_layout(tmp_path: Path):
+    base_path = tmp_path / "elt"
+    generate_dataset(base_path / "data/raw", 3, frame_rate=1, match_minutes=4, events_per_minute=60)
+    ingest_bronze.main(base_path=base_path, download=False)
+    transform_silver.main(base_path=base_path)
+
+    for table, (columns, method) in transform_silver.LAYOUTS.items():
+        assert method == "linear" and columns[0] == "match_id"
+        path = base_path / "data/delta/silver" / table
+        for file in DeltaTable(str(path)).files():
+            rows = pl.read_parquet(path / file, columns=columns)
+            assert rows.height > 0
+            assert rows.equals(rows.sort(columns, nulls_last=True)), table